@@ -14,6 +14,16 @@ class JobSystem(metaclass=abc.ABCMeta):
         """
         pass
 
+    @property
+    def is_blocking(self):
+        """
+        Does run_queued_jobs wait for all the jobs to finish before returning.
+        Long-running schedulers cannot use blocking job systems, since they would stop scheduling
+        for as long as the jobs take.
+        :return: True iff run_queued_jobs blocks until the jobs are done. Default False.
+        """
+        return False
+
     @abc.abstractmethod
     def can_generate_dataset(self, simulator, config):
         """
@@ -50,6 +60,15 @@ class JobSystem(metaclass=abc.ABCMeta):
         """
         pass
 
+    def wait_for_jobs(self):
+        """
+        Wait for any jobs this job system is running inside this process to finish.
+        Call this before exiting, so that those jobs are not lost.
+        Job systems whose jobs run independently of this process, or that block, have nothing to wait for.
+        :return: void
+        """
+        pass
+
     @abc.abstractmethod
     def run_queued_jobs(self):
         """
@@ -1,9 +1,11 @@
 import os
+import json
 import logging
 import subprocess
 import re
 import time
 import batch_analysis.job_system
+import batch_analysis.task
 import run_task
 
 
@@ -20,6 +22,18 @@ python {script} {args}
 """
 
 
+# Additional arguments to make the job an array, where each sub-job runs a different batch of tasks
+ARRAY_ARGS_TEMPLATE = """
+#PBS -J 0-{last_index}
+"""
+
+# Arguments for an array job to read the task ids for its index from the task list file
+ARRAY_TASK_ARGS_TEMPLATE = '$(sed -n "$((PBS_ARRAY_INDEX + 1))p" {task_list})'
+
+# Job states from qstat for jobs that are no longer running: Finished, sub-job finished (X), and Completed (torque)
+FINISHED_JOB_STATES = {'F', 'X', 'C'}
+
+
 # Some additional arguments in the script for using GPUs
 GPU_ARGS_TEMPLATE = """
 #PBS -l ngpus={gpus}
@@ -31,7 +45,10 @@ GPU_ARGS_TEMPLATE = """
 class HPCJobSystem(batch_analysis.job_system.JobSystem):
     """
     A job system using HPC to run tasks.
-
+    Small tasks with the same resource requirements are grouped together into a single PBS job,
+    which runs them one after another, so that they only wait in the queue and start python once.
+    Batches with the same requirements are then submitted together as a job array.
+    The states of all the jobs are read with a single call to qstat, which is cached for a short time.
     """
 
     def __init__(self, config):
@@ -43,6 +60,10 @@ class HPCJobSystem(batch_analysis.job_system.JobSystem):
             'environment': 'path-to-virtualenv-activate'
             'job_location: 'folder-to-create-jobs'      # Default ~
             'job_name_prefix': 'prefix-to-job-names'    # Default ''
+            'batch_walltime': '1:00:00'     # Maximum total expected duration of tasks in one job, default 1 hour
+            'max_batch_size': 100           # Maximum number of tasks in one job, default 100. 1 disables batching
+            'use_job_arrays': True          # Submit batches with the same requirements as job arrays, default True
+            'status_cache_time': 30         # Seconds to reuse job states from qstat, default 30
         }
         :param config: A dict of configuration parameters
         """
@@ -53,10 +74,21 @@ class HPCJobSystem(batch_analysis.job_system.JobSystem):
         elif 'VIRTUAL_ENV' in os.environ:
             # No configured virtual environment, but this process has one, use it
             self._virtual_env = os.path.join(os.environ['VIRTUAL_ENV'], 'bin/activate')
-        self._virtual_env = os.path.expanduser(self._virtual_env)
+        if self._virtual_env is not None:
+            self._virtual_env = os.path.expanduser(self._virtual_env)
         self._job_folder = config['job_location'] if 'job_location' in config else '~'
         self._job_folder = os.path.expanduser(self._job_folder)
         self._name_prefix = config['job_name_prefix'] if 'job_name_prefix' in config else ''
+        self._batch_walltime = batch_analysis.task.parse_duration(config['batch_walltime']) \
+            if 'batch_walltime' in config else None
+        if self._batch_walltime is None:
+            self._batch_walltime = 3600
+        self._max_batch_size = max(1, int(config['max_batch_size'])) if 'max_batch_size' in config else 100
+        self._use_job_arrays = bool(config['use_job_arrays']) if 'use_job_arrays' in config else True
+        self._status_cache_time = float(config['status_cache_time']) if 'status_cache_time' in config else 30
+        self._batches = []
+        self._job_states = None
+        self._job_states_time = None
 
     @property
     def node_id(self):
@@ -83,8 +115,10 @@ class HPCJobSystem(batch_analysis.job_system.JobSystem):
         """
         Is the specified job id currently running through this job system.
         This is used by the task manager to work out which jobs have failed without notification, to reschedule them.
-        For the HPC, a job is valid based on the output of the command 'qstat'
-        A running job id produced output like:
+        For the HPC, a job is running if it is in the output of 'qstat', and not finished.
+        Rather than calling qstat for each job, the states of all jobs are read at once with 'qstat -x -t -F json',
+        and reused for all the jobs checked within the status cache time.
+        If that fails, we fall back to calling qstat for the particular job, which produces output like:
         Job id            Name             User              Time Use S Queue
         ----------------  ---------------- ----------------  -------- - -----
         2315056.pbs       jrs_auto_task_1  n9520864                 0 Q quick
@@ -94,16 +128,35 @@ class HPCJobSystem(batch_analysis.job_system.JobSystem):
         and an invalid job:
         qstat: illegally formed job identifier: 231512525
 
+        The job ids given out by this job system are not the PBS job ids, since they are decided before the job
+        is submitted. The PBS job id is found from the id file saved when the job was submitted.
+        Job ids without an id file are assumed to be PBS job ids.
+
         :param job_id: The integer job id to check
         :return: True if the job is currently running on this node
         """
-        result = subprocess.run(['qstat', int(job_id)], stdout=subprocess.PIPE, universal_newlines=True)
-        return 'Unknown Job Id' not in result.stdout    # TODO: Better distinguish here once we have example output
+        pbs_job_id = self._read_pbs_job_id(job_id)
+        if pbs_job_id is None:
+            pbs_job_id = str(int(job_id))
+        job_states = self._get_job_states()
+        if job_states is None:
+            result = subprocess.run(['qstat', pbs_job_id], stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                    universal_newlines=True)
+            return result.returncode == 0 and 'Unknown Job Id' not in (result.stdout + result.stderr)
+
+        state = job_states.get(pbs_job_id, None)
+        if state is None and '[' in pbs_job_id:
+            # Sub-jobs may not be listed separately, use the state of the whole array
+            state = job_states.get(pbs_job_id[:pbs_job_id.index('[')] + '[]', None)
+        return state is not None and state not in FINISHED_JOB_STATES
 
     def run_task(self, task_id, num_cpus=1, num_gpus=0, memory_requirements='3GB',
                  expected_duration='1:00:00'):
         """
-        Run a particular task
+        Run a particular task.
+        The task is added to a batch of other tasks with the same requirements, if their total expected duration
+        fits within the batch walltime, otherwise it starts a new batch.
+        Jobs are not submitted until run_queued_jobs is called.
         :param task_id: The id of the task to run
         :param num_cpus: The number of CPUs required for the job. Default 1.
         :param num_gpus: The number of GPUs required for the job. Default 0.
@@ -111,17 +164,114 @@ class HPCJobSystem(batch_analysis.job_system.JobSystem):
         :param expected_duration: The expected time this job will take. Default 1 hour.
         :return: The job id if the job has been started correctly, None if failed.
         """
-
-        # Job meta-information
-        # TODO: We need better job names
-        name = self._name_prefix + "auto_task_{0}".format(time.time()).replace('.', '-')
-        if not isinstance(expected_duration, str) or not re.match('^[0-9]+:[0-9]{2}:[0-9]{2}$', expected_duration):
-            expected_duration = '1:00:00'
-        if not isinstance(memory_requirements, str) or not re.match('^[0-9]+[TGMK]B$', memory_requirements):
+        duration = batch_analysis.task.parse_duration(expected_duration)
+        if duration is None:
+            duration = 3600
+        if batch_analysis.task.parse_memory(memory_requirements) is None:
             memory_requirements = '3GB'
-        job_params = ""
-        if num_gpus > 0:
-            job_params = GPU_ARGS_TEMPLATE.format(gpus=num_gpus)
+        num_cpus = int(num_cpus)
+        num_gpus = int(num_gpus)
+
+        for batch in self._batches:
+            if (batch.num_cpus == num_cpus and batch.num_gpus == num_gpus and
+                    batch.memory_requirements == memory_requirements and
+                    len(batch.task_ids) < self._max_batch_size and
+                    batch.duration + duration <= self._batch_walltime):
+                batch.add_task(task_id, duration)
+                return batch.job_id
+
+        batch = JobBatch(
+            job_id=new_job_id(),
+            num_cpus=num_cpus,
+            num_gpus=num_gpus,
+            memory_requirements=memory_requirements
+        )
+        batch.add_task(task_id, duration)
+        self._batches.append(batch)
+        return batch.job_id
+
+    def run_queued_jobs(self):
+        """
+        Submit the batches of queued tasks to PBS.
+        Batches with the same requirements are submitted as a single job array, if job arrays are enabled,
+        otherwise each batch is submitted as a separate job.
+        :return:
+        """
+        groups = []
+        for batch in self._batches:
+            for group in groups:
+                if group[0].has_same_requirements(batch):
+                    group.append(batch)
+                    break
+            else:
+                groups.append([batch])
+
+        logging.getLogger(__name__).info("Submitting {0} jobs for {1} tasks".format(
+            len(self._batches), sum(len(batch.task_ids) for batch in self._batches)))
+        for group in groups:
+            if self._use_job_arrays and len(group) > 1:
+                self._submit_array(group)
+            else:
+                for batch in group:
+                    self._submit_batch(batch)
+        self._batches = []
+        # The cached job states are missing the jobs just submitted, read them again next time
+        self._job_states_time = None
+
+    def _submit_batch(self, batch):
+        """
+        Write the job script for a batch of tasks, and submit it with qsub.
+        The PBS job id is saved in a file next to the script, so that is_job_running can find it.
+        :param batch: The JobBatch to submit
+        :return: void
+        """
+        name = self._name_prefix + "auto_task_{0}".format(batch.job_id)
+        job_file_path = self._write_job_file(
+            name=name,
+            batch=batch,
+            duration=batch.duration,
+            args=' '.join(str(task_id) for task_id in batch.task_ids)
+        )
+        pbs_job_id = self._submit_job_file(job_file_path)
+        if pbs_job_id is not None:
+            self._write_pbs_job_id(batch.job_id, pbs_job_id)
+
+    def _submit_array(self, batches):
+        """
+        Submit several batches of tasks with the same requirements as a single job array.
+        Each sub-job of the array runs one batch, reading its task ids from a task list file.
+        :param batches: The list of JobBatch to submit, which must all have the same requirements
+        :return: void
+        """
+        name = self._name_prefix + "auto_array_{0}".format(batches[0].job_id)
+        task_list_path = os.path.join(self._job_folder, name + '.tasks')
+        with open(task_list_path, 'w+') as task_list_file:
+            for batch in batches:
+                task_list_file.write(' '.join(str(task_id) for task_id in batch.task_ids) + '\n')
+        job_file_path = self._write_job_file(
+            name=name,
+            batch=batches[0],
+            duration=max(batch.duration for batch in batches),
+            args=ARRAY_TASK_ARGS_TEMPLATE.format(task_list=quote(task_list_path)),
+            job_params=ARRAY_ARGS_TEMPLATE.format(last_index=len(batches) - 1)
+        )
+        pbs_job_id = self._submit_job_file(job_file_path)
+        if pbs_job_id is not None:
+            for index, batch in enumerate(batches):
+                self._write_pbs_job_id(batch.job_id, '{0}[{1}]'.format(pbs_job_id, index))
+
+    def _write_job_file(self, name, batch, duration, args, job_params=''):
+        """
+        Write a job script, running run_task with the given arguments
+        :param name: The name of the job, which is also the name of the script file
+        :param batch: A JobBatch, which gives the resource requirements of the job
+        :param duration: The walltime of the job, in seconds
+        :param args: The arguments to run_task
+        :param job_params: Additional PBS parameters for the job
+        :return: The path of the job script
+        """
+        if batch.num_gpus > 0:
+            job_params += GPU_ARGS_TEMPLATE.format(gpus=batch.num_gpus)
         env = ('source ' + quote(self._virtual_env)) if self._virtual_env is not None else ''
 
         # Parameter args
@@ -130,29 +280,142 @@ class HPCJobSystem(batch_analysis.job_system.JobSystem):
         with open(job_file_path, 'w+') as job_file:
             job_file.write(JOB_TEMPLATE.format(
                 name=name,
-                time=expected_duration,
-                mem=memory_requirements,
-                cpus=int(num_cpus),
+                time=batch_analysis.task.format_duration(duration),
+                mem=batch.memory_requirements,
+                cpus=batch.num_cpus,
                 job_params=job_params,
                 env=env,
                 working_directory=quote(os.path.dirname(script_path)),
                 script=quote(script_path),
-                args=str(task_id)
+                args=args
             ))
+        return job_file_path
 
+    def _submit_job_file(self, job_file_path):
+        """
+        Submit a job script with qsub
+        :param job_file_path: The path to the job script
+        :return: The PBS job id, without the server name, or None if the job could not be submitted
+        """
         logging.getLogger(__name__).info("Submitting job file {0}".format(job_file_path))
         result = subprocess.run(['qsub', job_file_path], stdout=subprocess.PIPE, universal_newlines=True)
-        # TODO: Get some example output, I'm parsing on guesswork here
-        job_id = re.search('(\d+)', result.stdout).group()
-        return int(job_id)
+        match = re.search('(\\d+)', result.stdout)
+        if match is None:
+            # The tasks will be rescheduled when the job is found not to be running
+            logging.getLogger(__name__).error("Could not submit job file {0}: {1}".format(
+                job_file_path, result.stdout))
+            return None
+        return match.group()
 
-    def run_queued_jobs(self):
+    def _get_job_states(self):
         """
-        Run queued jobs.
-        Since we've already sent the jobs to the PBS job system, don't do anything.
-        :return:
+        Get the states of all the jobs known to PBS, from a single call to qstat.
+        The states are cached, and only read again after the status cache time.
+        :return: A map of PBS job ids, without the server name, to job state letters, or None if qstat failed
         """
-        pass
+        now = time.time()
+        if self._job_states_time is None or now - self._job_states_time > self._status_cache_time:
+            self._job_states = read_job_states()
+            self._job_states_time = now
+        return self._job_states
+
+    def _get_job_id_file(self, job_id):
+        """
+        Get the path of the file holding the PBS job id for a job id from this job system
+        :param job_id: The job id given out by run_task
+        :return: The path of the id file
+        """
+        return os.path.join(self._job_folder, self._name_prefix + "auto_task_{0}.jobid".format(job_id))
+
+    def _read_pbs_job_id(self, job_id):
+        """
+        Read the PBS job id of a submitted job
+        :param job_id: The job id given out by run_task
+        :return: The PBS job id as a string, or None if the job was not submitted by this job system
+        """
+        id_file_path = self._get_job_id_file(job_id)
+        if not os.path.isfile(id_file_path):
+            return None
+        with open(id_file_path, 'r') as id_file:
+            return id_file.read().strip()
+
+    def _write_pbs_job_id(self, job_id, pbs_job_id):
+        """
+        Save the PBS job id for a submitted job
+        :param job_id: The job id given out by run_task
+        :param pbs_job_id: The id of the job in PBS
+        :return: void
+        """
+        with open(self._get_job_id_file(job_id), 'w+') as id_file:
+            id_file.write(pbs_job_id)
+
+
+class JobBatch:
+    """
+    A group of tasks with the same requirements, to be run one after another in a single job
+    """
+
+    def __init__(self, job_id, num_cpus, num_gpus, memory_requirements):
+        self.job_id = job_id
+        self.num_cpus = num_cpus
+        self.num_gpus = num_gpus
+        self.memory_requirements = memory_requirements
+        self.task_ids = []
+        self.duration = 0
+
+    def add_task(self, task_id, duration):
+        """
+        Add a task to the batch
+        :param task_id: The id of the task
+        :param duration: The expected duration of the task, in seconds
+        :return: void
+        """
+        self.task_ids.append(task_id)
+        self.duration += duration
+
+    def has_same_requirements(self, other):
+        """
+        Does another batch have the same resource requirements as this one
+        :param other: Another JobBatch
+        :return: True iff the batches need the same CPUs, GPUs, and memory
+        """
+        return (self.num_cpus == other.num_cpus and self.num_gpus == other.num_gpus and
+                self.memory_requirements == other.memory_requirements)
+
+
+_last_job_id = 0
+
+
+def new_job_id():
+    """
+    Make a new unique job id.
+    Job ids are handed out before the jobs are submitted, so they can't be the PBS job id,
+    and they need to be unique between different runs of the scheduler. They are based on the current time.
+    :return: An integer job id, larger than any previous job id
+    """
+    global _last_job_id
+    _last_job_id = max(int(time.time() * 1000) * 1000, _last_job_id + 1)
+    return _last_job_id
+
+
+def read_job_states():
+    """
+    Read the state of every job from PBS, using a single call to 'qstat -x -t -F json'.
+    This includes finished jobs (-x), and each of the sub-jobs of job arrays (-t).
+    :return: A map of PBS job ids, without the server name, to job state letters, or None if qstat failed
+    """
+    result = subprocess.run(['qstat', '-x', '-t', '-F', 'json'], stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                            universal_newlines=True)
+    if result.returncode != 0:
+        logging.getLogger(__name__).warning("Could not read job states from qstat: {0}".format(result.stderr))
+        return None
+    try:
+        jobs = json.loads(result.stdout)
+    except ValueError:
+        logging.getLogger(__name__).warning("Could not parse job states from qstat")
+        return None
+    jobs = jobs['Jobs'] if isinstance(jobs, dict) and 'Jobs' in jobs else {}
+    return {pbs_job_id.split('.')[0]: job['job_state'] for pbs_job_id, job in jobs.items() if 'job_state' in job}
 
 
 def quote(string):
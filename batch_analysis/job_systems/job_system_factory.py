@@ -1,5 +1,6 @@
 import batch_analysis.job_systems.hpc_job_system
 import batch_analysis.job_systems.simple_job_system
+import batch_analysis.job_systems.local_process_job_system
 
 
 def create_job_system(config):
@@ -10,7 +11,7 @@ def create_job_system(config):
     The inner 'job_system_config' will be passed to the constructor
     {
         'job_system_config': {
-            'job_system': ('hpc'|'simple') # Case insensitive
+            'job_system': ('hpc'|'local'|'simple') # Case insensitive
             ...additional parameters...
         }
     }
@@ -22,4 +23,6 @@ def create_job_system(config):
     job_system_type = job_system_type.lower()
     if job_system_type == 'hpc':
         return batch_analysis.job_systems.hpc_job_system.HPCJobSystem(job_system_config)
+    elif job_system_type == 'local':
+        return batch_analysis.job_systems.local_process_job_system.LocalProcessJobSystem(job_system_config)
     return batch_analysis.job_systems.simple_job_system.SimpleJobSystem(job_system_config)
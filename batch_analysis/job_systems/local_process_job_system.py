@@ -0,0 +1,205 @@
+import os
+import sys
+import time
+import logging
+import subprocess
+import batch_analysis.job_system
+import batch_analysis.task
+import batch_analysis.job_systems.hpc_job_system as hpc_job_system
+import run_task
+
+
+class LocalProcessJobSystem(batch_analysis.job_system.JobSystem):
+    """
+    A job system that runs tasks in parallel on the local machine.
+    Each task runs in its own python process, so a task that crashes cannot take down the others,
+    and as many tasks are run at once as will fit within the configured CPUs, GPUs, and memory of this node.
+    Like the simple job system, jobs are queued until run_queued_jobs is called,
+    which then blocks until every queued job has finished.
+    If it is configured not to block, run_queued_jobs instead starts as many jobs as fit and returns straight away,
+    and needs to be called again to start more jobs as the running ones finish.
+    The scheduler daemon does this on each of its passes. Before exiting, call wait_for_jobs,
+    or the jobs that have not started will be lost.
+    Job ids are unique between runs, so that a job from a previous run is never mistaken for a new one.
+    """
+
+    def __init__(self, config):
+        """
+        Takes configuration parameters in a dict with the following format:
+        {
+            'node_id': 'name_of_job_system_node'
+            'num_cpus': 32          # Default is the number of CPUs on this machine
+            'num_gpus': 1           # Default 0
+            'memory': '64GB'        # Default is not to limit memory
+            'poll_interval': 1      # Seconds between checks for finished jobs, default 1
+            'blocking': True        # Wait for all the jobs to finish in run_queued_jobs, default True
+        }
+        :param config: A dict of configuration parameters
+        """
+        self._node_id = config['node_id'] if 'node_id' in config else 'local-job-system'
+        self._num_cpus = max(1, int(config['num_cpus'])) if 'num_cpus' in config else (os.cpu_count() or 1)
+        self._num_gpus = max(0, int(config['num_gpus'])) if 'num_gpus' in config else 0
+        self._memory = batch_analysis.task.parse_memory(config['memory']) if 'memory' in config else None
+        self._poll_interval = float(config['poll_interval']) if 'poll_interval' in config else 1
+        self._blocking = bool(config['blocking']) if 'blocking' in config else True
+        self._queue = []
+        self._running = {}
+
+    @property
+    def node_id(self):
+        """
+        All job systems should have a node id, controlled by the configuration.
+        The idea is that different job systems on different computers have different
+        node ids, so that we can track which system is supposed to be running which job id.
+        :return:
+        """
+        return self._node_id
+
+    @property
+    def is_blocking(self):
+        """
+        Does run_queued_jobs wait for all the jobs to finish, which is controlled by the configuration.
+        :return: True iff run_queued_jobs blocks until the jobs are done
+        """
+        return self._blocking
+
+    def can_generate_dataset(self, simulator, config):
+        """
+        Can this job system generate synthetic datasets?
+        This job system can, since it runs on a local machine.
+        :param simulator: The simulator id that will be doing the generation
+        :param config: Configuration passed to the simulator at run time
+        :return: True
+        """
+        return True
+
+    def is_job_running(self, job_id):
+        """
+        Is the specified job id currently running through this job system.
+        This is used by the task manager to work out which jobs have failed without notification, to reschedule them.
+        A job is running if it is waiting in the queue, or its process has not yet finished.
+        :param job_id: The integer job id to check
+        :return: True if the job is currently running on this node
+        """
+        return job_id in self._running or any(job.job_id == job_id for job in self._queue)
+
+    def run_task(self, task_id, num_cpus=1, num_gpus=0, memory_requirements='3GB',
+                 expected_duration='1:00:00'):
+        """
+        Queue a particular task to run.
+        Resource requirements larger than this node are reduced to fit, so that the job will run alone.
+        :param task_id: The id of the task to run
+        :param num_cpus: The number of CPUs required. Default 1.
+        :param num_gpus: The number of GPUs required. Default 0.
+        :param memory_requirements: The required amount of memory. Default 3 GB.
+        :param expected_duration: The duration given for the job to run. Ignored.
+        :return: The job id if the job has been queued correctly, None if failed.
+        """
+        memory = batch_analysis.task.parse_memory(memory_requirements)
+        if memory is None:
+            memory = batch_analysis.task.parse_memory('3GB')
+        job = LocalJob(
+            job_id=hpc_job_system.new_job_id(),
+            task_id=str(task_id),
+            num_cpus=min(max(1, int(num_cpus)), self._num_cpus),
+            num_gpus=min(max(0, int(num_gpus)), self._num_gpus),
+            memory=min(memory, self._memory) if self._memory is not None else memory
+        )
+        self._queue.append(job)
+        return job.job_id
+
+    def run_queued_jobs(self):
+        """
+        Run all the queued jobs, as many at once as will fit on this node.
+        Queued jobs are started in order, but a job that does not fit will let later, smaller jobs go first.
+        Blocks until all the jobs have finished, unless the job system is not blocking,
+        in which case it only clears out the finished jobs and starts the queued jobs that now fit.
+        :return: void
+        """
+        logging.getLogger(__name__).info("Running {0} jobs, using up to {1} CPUs...".format(
+            len(self._queue), self._num_cpus))
+        if not self._blocking:
+            self._check_finished_jobs()
+            self._start_fitting_jobs()
+            return
+        self.wait_for_jobs()
+
+    def wait_for_jobs(self):
+        """
+        Keep running the queued jobs as others finish, until all the jobs have finished.
+        :return: void
+        """
+        while len(self._queue) > 0 or len(self._running) > 0:
+            self._start_fitting_jobs()
+            self._check_finished_jobs()
+            if len(self._running) > 0:
+                time.sleep(self._poll_interval)
+
+    def _start_fitting_jobs(self):
+        """
+        Start each queued job that will fit in the resources not used by the running jobs.
+        :return: void
+        """
+        free_cpus = self._num_cpus - sum(job.num_cpus for job in self._running.values())
+        free_gpus = self._num_gpus - sum(job.num_gpus for job in self._running.values())
+        free_memory = (self._memory - sum(job.memory for job in self._running.values())
+                       if self._memory is not None else None)
+        remaining = []
+        for job in self._queue:
+            if (job.num_cpus <= free_cpus and job.num_gpus <= free_gpus and
+                    (free_memory is None or job.memory <= free_memory)):
+                free_cpus -= job.num_cpus
+                free_gpus -= job.num_gpus
+                if free_memory is not None:
+                    free_memory -= job.memory
+                self._start_job(job)
+            else:
+                remaining.append(job)
+        self._queue = remaining
+
+    def _start_job(self, job):
+        """
+        Start a new python process to run a job
+        :param job: The LocalJob to start
+        :return: void
+        """
+        script_path = os.path.abspath(run_task.__file__)
+        logging.getLogger(__name__).info("Starting job {0} for task {1}".format(job.job_id, job.task_id))
+        try:
+            job.process = subprocess.Popen([sys.executable, script_path, job.task_id],
+                                           cwd=os.path.dirname(script_path))
+        except OSError as exception:
+            # Could not start the process, the task will be rescheduled when it is found not to be running
+            logging.getLogger(__name__).error("Failed to start job {0} for task {1}: {2}".format(
+                job.job_id, job.task_id, exception))
+            return
+        self._running[job.job_id] = job
+
+    def _check_finished_jobs(self):
+        """
+        Remove all the jobs whose processes have finished from the running jobs
+        :return: void
+        """
+        for job_id in list(self._running.keys()):
+            job = self._running[job_id]
+            return_code = job.process.poll()
+            if return_code is not None:
+                del self._running[job_id]
+                if return_code != 0:
+                    logging.getLogger(__name__).error("Job {0} for task {1} exited with code {2}".format(
+                        job_id, job.task_id, return_code))
+
+
+class LocalJob:
+    """
+    A job queued or running in the local process job system, with the resources it uses
+    """
+
+    def __init__(self, job_id, task_id, num_cpus, num_gpus, memory):
+        self.job_id = job_id
+        self.task_id = task_id
+        self.num_cpus = num_cpus
+        self.num_gpus = num_gpus
+        self.memory = memory
+        self.process = None
+
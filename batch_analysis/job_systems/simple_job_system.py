@@ -27,6 +27,14 @@ class SimpleJobSystem(batch_analysis.job_system.JobSystem):
         """
         return self._node_id
 
+    @property
+    def is_blocking(self):
+        """
+        The simple job system runs each job when run_queued_jobs is called, so it always blocks.
+        :return: True
+        """
+        return True
+
     def can_generate_dataset(self, simulator, config):
         """
         Can this job system generate synthetic datasets?
@@ -1,8 +1,15 @@
 import unittest
 import unittest.mock as mock
 import os
+import re
+import time
+import subprocess
+import stat
+import shutil
+import tempfile
 import bson.objectid as oid
 import batch_analysis.job_systems.hpc_job_system as hpc
+import run_task
 
 
 class TestHPCJobSystem(unittest.TestCase):
@@ -618,3 +625,317 @@ class TestHPCJobSystem(unittest.TestCase):
     def test_quote_wraps_a_string_containing_spaces_in_double_quotes(self):
         string = 'this-is a#string!@#$%^&**)12344575{0}},./'
         self.assertEqual('"' + string + '"', hpc.quote(string))
+
+
+# A fake qsub, which records the submitted job file and prints a new job id
+FAKE_QSUB = """#!/bin/bash
+echo "$1" >> "{folder}/submitted"
+count=$(wc -l < "{folder}/submitted")
+if grep -q '^#PBS -J' "$1"; then
+    echo "$((1000 + count))[].pbs"
+else
+    echo "$((1000 + count)).pbs"
+fi
+"""
+
+# A fake qstat, which knows about the jobs listed in the 'running' file
+FAKE_QSTAT = """#!/bin/bash
+if grep -qx "$1" "{folder}/running" 2>/dev/null; then
+    echo "$1.pbs       auto_task  user  0 R quick"
+else
+    echo "qstat: Unknown Job Id $1.pbs" >&2
+    exit 153
+fi
+"""
+
+
+class TestHPCJobSystemBatching(unittest.TestCase):
+    """
+    Tests for grouping tasks into jobs, using fake PBS commands
+    """
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.folder)
+        self.job_folder = os.path.join(self.folder, 'jobs')
+        os.mkdir(self.job_folder)
+        for command, template in [('qsub', FAKE_QSUB), ('qstat', FAKE_QSTAT)]:
+            path = os.path.join(self.folder, command)
+            with open(path, 'w') as command_file:
+                command_file.write(template.format(folder=self.folder))
+            os.chmod(path, os.stat(path).st_mode | stat.S_IEXEC)
+        path_patch = mock.patch.dict(os.environ, {'PATH': self.folder + os.pathsep + os.environ.get('PATH', '')})
+        path_patch.start()
+        self.addCleanup(path_patch.stop)
+
+    def make_job_system(self, **kwargs):
+        config = {'job_location': self.job_folder, 'environment': '/tmp/env/bin/activate'}
+        config.update(kwargs)
+        return hpc.HPCJobSystem(config)
+
+    def get_submitted_scripts(self):
+        submitted_path = os.path.join(self.folder, 'submitted')
+        if not os.path.isfile(submitted_path):
+            return []
+        scripts = []
+        with open(submitted_path, 'r') as submitted_file:
+            for line in submitted_file:
+                with open(line.strip(), 'r') as job_file:
+                    scripts.append(job_file.read())
+        return scripts
+
+    def get_script_task_ids(self, script):
+        match = re.search('python {0} (.*)$'.format(re.escape(hpc.quote(run_task.__file__))), script, re.MULTILINE)
+        self.assertIsNotNone(match, "Script does not run run_task")
+        return match.group(1).split(' ')
+
+    def test_does_not_submit_until_run_queued_jobs(self):
+        subject = self.make_job_system()
+        subject.run_task(oid.ObjectId(), expected_duration='0:01:00')
+        self.assertEqual([], self.get_submitted_scripts())
+        subject.run_queued_jobs()
+        self.assertEqual(1, len(self.get_submitted_scripts()))
+
+    def test_groups_small_tasks_into_one_job(self):
+        subject = self.make_job_system()
+        task_ids = [oid.ObjectId() for _ in range(20)]
+        job_ids = {subject.run_task(task_id, expected_duration='0:00:30') for task_id in task_ids}
+        self.assertEqual(1, len(job_ids))
+        subject.run_queued_jobs()
+        scripts = self.get_submitted_scripts()
+        self.assertEqual(1, len(scripts))
+        self.assertEqual([str(task_id) for task_id in task_ids], self.get_script_task_ids(scripts[0]))
+        self.assertIn('#PBS -l walltime=0:10:00', scripts[0])
+
+    def test_splits_jobs_at_batch_walltime(self):
+        subject = self.make_job_system(batch_walltime='0:30:00', use_job_arrays=False)
+        job_ids = [subject.run_task(oid.ObjectId(), expected_duration='0:10:00') for _ in range(7)]
+        self.assertEqual(3, len(set(job_ids)))
+        self.assertEqual(job_ids[0], job_ids[2])
+        self.assertNotEqual(job_ids[2], job_ids[3])
+        subject.run_queued_jobs()
+        scripts = self.get_submitted_scripts()
+        self.assertEqual([3, 3, 1], [len(self.get_script_task_ids(script)) for script in scripts])
+        self.assertIn('#PBS -l walltime=0:30:00', scripts[0])
+        self.assertIn('#PBS -l walltime=0:10:00', scripts[2])
+
+    def test_splits_jobs_at_max_batch_size(self):
+        subject = self.make_job_system(max_batch_size=4)
+        job_ids = [subject.run_task(oid.ObjectId(), expected_duration='0:00:10') for _ in range(10)]
+        self.assertEqual(3, len(set(job_ids)))
+
+    def test_long_tasks_get_their_own_job(self):
+        subject = self.make_job_system(use_job_arrays=False)
+        job_ids = [subject.run_task(oid.ObjectId(), expected_duration='5:00:00') for _ in range(3)]
+        self.assertEqual(3, len(set(job_ids)))
+        subject.run_queued_jobs()
+        scripts = self.get_submitted_scripts()
+        self.assertEqual(3, len(scripts))
+        for script in scripts:
+            self.assertIn('#PBS -l walltime=5:00:00', script)
+
+    def test_only_groups_tasks_with_the_same_requirements(self):
+        subject = self.make_job_system()
+        job_id1 = subject.run_task(oid.ObjectId(), num_cpus=1, expected_duration='0:01:00')
+        job_id2 = subject.run_task(oid.ObjectId(), num_cpus=4, expected_duration='0:01:00')
+        job_id3 = subject.run_task(oid.ObjectId(), num_gpus=1, expected_duration='0:01:00')
+        job_id4 = subject.run_task(oid.ObjectId(), memory_requirements='16GB', expected_duration='0:01:00')
+        job_id5 = subject.run_task(oid.ObjectId(), num_cpus=1, expected_duration='0:01:00')
+        self.assertEqual(4, len({job_id1, job_id2, job_id3, job_id4}))
+        self.assertEqual(job_id1, job_id5)
+        subject.run_queued_jobs()
+        scripts = self.get_submitted_scripts()
+        self.assertEqual(4, len(scripts))
+        self.assertIn('#PBS -l ncpus=4', scripts[1])
+        self.assertIn('#PBS -l ngpus=1', scripts[2])
+        self.assertIn('#PBS -l mem=16GB', scripts[3])
+
+    def test_job_ids_are_unique_between_job_systems(self):
+        job_id1 = self.make_job_system().run_task(oid.ObjectId())
+        job_id2 = self.make_job_system().run_task(oid.ObjectId())
+        self.assertNotEqual(job_id1, job_id2)
+
+    def test_is_job_running_checks_submitted_job_with_qstat(self):
+        subject = self.make_job_system()
+        job_id = subject.run_task(oid.ObjectId(), expected_duration='0:01:00')
+        subject.run_queued_jobs()
+        self.assertFalse(subject.is_job_running(job_id))
+        with open(os.path.join(self.folder, 'running'), 'w') as running_file:
+            running_file.write('1001\n')
+        self.assertTrue(subject.is_job_running(job_id))
+
+    def test_is_job_running_works_for_other_job_system_instances(self):
+        job_system = self.make_job_system()
+        job_id = job_system.run_task(oid.ObjectId(), expected_duration='0:01:00')
+        job_system.run_queued_jobs()
+        with open(os.path.join(self.folder, 'running'), 'w') as running_file:
+            running_file.write('1001\n')
+        self.assertTrue(self.make_job_system().is_job_running(job_id))
+
+    def test_is_job_running_treats_unknown_ids_as_pbs_ids(self):
+        with open(os.path.join(self.folder, 'running'), 'w') as running_file:
+            running_file.write('2315056\n')
+        subject = self.make_job_system()
+        self.assertTrue(subject.is_job_running(2315056))
+        self.assertFalse(subject.is_job_running(2315057))
+
+    def test_unsubmitted_jobs_are_not_running(self):
+        subject = self.make_job_system()
+        job_id = subject.run_task(oid.ObjectId())
+        self.assertFalse(subject.is_job_running(job_id))
+
+
+# A fake qstat, which lists every job in the 'jobs' file as json, and logs each call
+FAKE_BULK_QSTAT = """#!/bin/bash
+echo "$@" >> "{folder}/qstat_calls"
+if [ "$1" != "-x" ]; then
+    exit 2
+fi
+echo '{{"pbs_version": "14.1", "Jobs": {{'
+first=1
+while read -r job_id state; do
+    if [ $first -eq 0 ]; then echo ','; fi
+    first=0
+    echo "\\"$job_id.pbsserver\\": {{\\"Job_Name\\": \\"job\\", \\"job_state\\": \\"$state\\"}}"
+done < "{folder}/job_states"
+echo '}}}}'
+"""
+
+
+class TestHPCJobSystemArraysAndStatus(unittest.TestCase):
+    """
+    Tests for job arrays and reading job states in bulk, using fake PBS commands
+    """
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.folder)
+        self.job_folder = os.path.join(self.folder, 'jobs')
+        os.mkdir(self.job_folder)
+        for command, template in [('qsub', FAKE_QSUB), ('qstat', FAKE_BULK_QSTAT)]:
+            path = os.path.join(self.folder, command)
+            with open(path, 'w') as command_file:
+                command_file.write(template.format(folder=self.folder))
+            os.chmod(path, os.stat(path).st_mode | stat.S_IEXEC)
+        self.set_jobs({})
+        path_patch = mock.patch.dict(os.environ, {'PATH': self.folder + os.pathsep + os.environ.get('PATH', '')})
+        path_patch.start()
+        self.addCleanup(path_patch.stop)
+
+    def make_job_system(self, **kwargs):
+        config = {'job_location': self.job_folder, 'environment': '/tmp/env/bin/activate'}
+        config.update(kwargs)
+        return hpc.HPCJobSystem(config)
+
+    def set_jobs(self, job_states):
+        with open(os.path.join(self.folder, 'job_states'), 'w') as jobs_file:
+            for pbs_job_id, state in job_states.items():
+                jobs_file.write('{0} {1}\n'.format(pbs_job_id, state))
+
+    def count_qstat_calls(self):
+        calls_path = os.path.join(self.folder, 'qstat_calls')
+        if not os.path.isfile(calls_path):
+            return 0
+        with open(calls_path, 'r') as calls_file:
+            return len(calls_file.readlines())
+
+    def get_submitted_files(self):
+        with open(os.path.join(self.folder, 'submitted'), 'r') as submitted_file:
+            return [line.strip() for line in submitted_file]
+
+    def test_submits_batches_with_the_same_requirements_as_an_array(self):
+        subject = self.make_job_system(batch_walltime='0:30:00')
+        task_ids = [oid.ObjectId() for _ in range(7)]
+        for task_id in task_ids:
+            subject.run_task(task_id, expected_duration='0:10:00')
+        subject.run_queued_jobs()
+
+        submitted = self.get_submitted_files()
+        self.assertEqual(1, len(submitted))
+        with open(submitted[0], 'r') as job_file:
+            script = job_file.read()
+        self.assertIn('#PBS -J 0-2', script)
+        self.assertIn('#PBS -l walltime=0:30:00', script)
+        self.assertIn('PBS_ARRAY_INDEX', script)
+        with open(os.path.join(self.job_folder, os.path.basename(submitted[0])[:-4] + '.tasks'), 'r') as tasks_file:
+            task_lists = [line.split() for line in tasks_file]
+        self.assertEqual([[str(task_id) for task_id in task_ids[0:3]],
+                          [str(task_id) for task_id in task_ids[3:6]],
+                          [str(task_id) for task_id in task_ids[6:7]]], task_lists)
+
+    def test_array_task_list_is_read_by_sub_job_index(self):
+        subject = self.make_job_system(batch_walltime='0:10:00')
+        task_ids = [oid.ObjectId() for _ in range(3)]
+        for task_id in task_ids:
+            subject.run_task(task_id, expected_duration='0:10:00')
+        subject.run_queued_jobs()
+        with open(self.get_submitted_files()[0], 'r') as job_file:
+            script = job_file.read()
+        args = re.search('python {0} (.*)$'.format(re.escape(hpc.quote(run_task.__file__))), script,
+                         re.MULTILINE).group(1)
+        for index, task_id in enumerate(task_ids):
+            with mock.patch.dict(os.environ, {'PBS_ARRAY_INDEX': str(index)}):
+                output = subprocess.run(['bash', '-c', 'echo ' + args], stdout=subprocess.PIPE,
+                                        universal_newlines=True).stdout
+            self.assertEqual(str(task_id), output.strip())
+
+    def test_does_not_use_arrays_for_different_requirements(self):
+        subject = self.make_job_system()
+        subject.run_task(oid.ObjectId(), num_cpus=1, expected_duration='0:10:00')
+        subject.run_task(oid.ObjectId(), num_cpus=2, expected_duration='0:10:00')
+        subject.run_queued_jobs()
+        submitted = self.get_submitted_files()
+        self.assertEqual(2, len(submitted))
+        for job_file_path in submitted:
+            with open(job_file_path, 'r') as job_file:
+                self.assertNotIn('#PBS -J', job_file.read())
+
+    def test_is_job_running_checks_array_sub_jobs(self):
+        subject = self.make_job_system(batch_walltime='0:10:00')
+        job_ids = [subject.run_task(oid.ObjectId(), expected_duration='0:10:00') for _ in range(3)]
+        subject.run_queued_jobs()
+        self.set_jobs({'1001[]': 'B', '1001[0]': 'X', '1001[1]': 'R', '1001[2]': 'Q'})
+        self.assertEqual([False, True, True], [subject.is_job_running(job_id) for job_id in job_ids])
+
+    def test_is_job_running_uses_array_state_if_sub_jobs_are_not_listed(self):
+        subject = self.make_job_system(batch_walltime='0:10:00')
+        job_ids = [subject.run_task(oid.ObjectId(), expected_duration='0:10:00') for _ in range(2)]
+        subject.run_queued_jobs()
+        self.set_jobs({'1001[]': 'Q'})
+        self.assertTrue(subject.is_job_running(job_ids[0]))
+        self.assertTrue(subject.is_job_running(job_ids[1]))
+
+    def test_is_job_running_reads_states_once_for_many_jobs(self):
+        self.set_jobs({str(pbs_job_id): 'R' for pbs_job_id in range(100, 200)})
+        subject = self.make_job_system()
+        for pbs_job_id in range(50, 250):
+            self.assertEqual(100 <= pbs_job_id < 200, subject.is_job_running(pbs_job_id))
+        self.assertEqual(1, self.count_qstat_calls())
+
+    def test_is_job_running_treats_finished_jobs_as_not_running(self):
+        self.set_jobs({'100': 'F', '101': 'R', '102': 'Q', '103': 'H', '104': 'E'})
+        subject = self.make_job_system()
+        self.assertEqual([False, True, True, True, True], [subject.is_job_running(job_id)
+                                                           for job_id in range(100, 105)])
+
+    def test_is_job_running_reads_states_again_after_cache_time(self):
+        self.set_jobs({'100': 'R'})
+        subject = self.make_job_system(status_cache_time=0)
+        self.assertTrue(subject.is_job_running(100))
+        self.set_jobs({'100': 'F'})
+        time.sleep(0.01)
+        self.assertFalse(subject.is_job_running(100))
+        self.assertEqual(2, self.count_qstat_calls())
+
+    def test_is_job_running_reads_states_again_after_submitting(self):
+        subject = self.make_job_system()
+        self.assertFalse(subject.is_job_running(1001))
+        job_id = subject.run_task(oid.ObjectId(), expected_duration='0:10:00')
+        subject.run_queued_jobs()
+        self.set_jobs({'1001': 'Q'})
+        self.assertTrue(subject.is_job_running(job_id))
+
+    def test_read_job_states_strips_server_name(self):
+        self.set_jobs({'100': 'R', '101[]': 'B', '101[0]': 'R'})
+        self.assertEqual({'100': 'R', '101[]': 'B', '101[0]': 'R'}, hpc.read_job_states())
+
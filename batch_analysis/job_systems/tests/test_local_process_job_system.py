@@ -0,0 +1,186 @@
+import unittest
+import unittest.mock as mock
+import os
+import bson.objectid as oid
+import batch_analysis.job_systems.local_process_job_system as local
+import batch_analysis.job_systems.job_system_factory as job_system_factory
+import run_task
+
+
+class MockProcess:
+    """
+    A fake process, that finishes after being polled a few times
+    """
+
+    def __init__(self, polls=2, return_code=0):
+        self.remaining_polls = polls
+        self.return_code = return_code
+
+    def poll(self):
+        if self.remaining_polls > 0:
+            self.remaining_polls -= 1
+            return None
+        return self.return_code
+
+
+class TestLocalProcessJobSystem(unittest.TestCase):
+
+    def setUp(self):
+        self.processes = []
+        self.max_running = 0
+        popen_patch = mock.patch('batch_analysis.job_systems.local_process_job_system.subprocess.Popen',
+                                 side_effect=self.make_process)
+        self.mock_popen = popen_patch.start()
+        self.addCleanup(popen_patch.stop)
+
+    def make_process(self, *args, **kwargs):
+        process = MockProcess()
+        self.processes.append(process)
+        running = sum(1 for proc in self.processes if proc.remaining_polls > 0)
+        self.max_running = max(self.max_running, running)
+        return process
+
+    def test_works_with_empty_config(self):
+        local.LocalProcessJobSystem({})
+
+    def test_can_generate_dataset(self):
+        subject = local.LocalProcessJobSystem({})
+        self.assertTrue(subject.can_generate_dataset(oid.ObjectId(), {}))
+
+    def test_node_id_from_config(self):
+        subject = local.LocalProcessJobSystem({'node_id': 'my-analysis-box'})
+        self.assertEqual('my-analysis-box', subject.node_id)
+
+    def test_run_task_returns_unique_job_ids(self):
+        subject = local.LocalProcessJobSystem({})
+        job_ids = [subject.run_task(oid.ObjectId()) for _ in range(10)]
+        self.assertEqual(len(job_ids), len(set(job_ids)))
+
+    def test_job_ids_are_unique_between_instances(self):
+        # A new job system, such as when the scheduler restarts, must not reuse the ids of old jobs
+        job_ids = [local.LocalProcessJobSystem({}).run_task(oid.ObjectId()) for _ in range(10)]
+        self.assertEqual(len(job_ids), len(set(job_ids)))
+
+    def test_queued_jobs_are_running_until_finished(self):
+        subject = local.LocalProcessJobSystem({'poll_interval': 0})
+        job_ids = [subject.run_task(oid.ObjectId()) for _ in range(3)]
+        for job_id in job_ids:
+            self.assertTrue(subject.is_job_running(job_id))
+        self.assertFalse(subject.is_job_running(max(job_ids) + 1))
+        subject.run_queued_jobs()
+        for job_id in job_ids:
+            self.assertFalse(subject.is_job_running(job_id))
+
+    def test_run_queued_jobs_runs_each_task_in_a_new_process(self):
+        subject = local.LocalProcessJobSystem({'poll_interval': 0})
+        task_ids = [oid.ObjectId() for _ in range(3)]
+        for task_id in task_ids:
+            subject.run_task(task_id)
+        self.assertFalse(self.mock_popen.called)
+        subject.run_queued_jobs()
+        self.assertEqual(len(task_ids), self.mock_popen.call_count)
+        for call_args, task_id in zip(self.mock_popen.call_args_list, task_ids):
+            command = call_args[0][0]
+            self.assertEqual(os.path.abspath(run_task.__file__), command[1])
+            self.assertEqual(str(task_id), command[2])
+
+    def test_run_queued_jobs_runs_jobs_in_parallel_up_to_cpu_limit(self):
+        subject = local.LocalProcessJobSystem({'num_cpus': 4, 'poll_interval': 0})
+        for _ in range(8):
+            subject.run_task(oid.ObjectId(), num_cpus=1)
+        subject.run_queued_jobs()
+        self.assertEqual(8, len(self.processes))
+        self.assertEqual(4, self.max_running)
+
+    def test_run_queued_jobs_packs_jobs_by_cpus(self):
+        subject = local.LocalProcessJobSystem({'num_cpus': 4, 'poll_interval': 0})
+        for _ in range(4):
+            subject.run_task(oid.ObjectId(), num_cpus=3)
+        subject.run_queued_jobs()
+        self.assertEqual(4, len(self.processes))
+        self.assertEqual(1, self.max_running)
+
+    def test_run_queued_jobs_packs_jobs_by_memory(self):
+        subject = local.LocalProcessJobSystem({'num_cpus': 16, 'memory': '8GB', 'poll_interval': 0})
+        for _ in range(6):
+            subject.run_task(oid.ObjectId(), num_cpus=1, memory_requirements='3GB')
+        subject.run_queued_jobs()
+        self.assertEqual(6, len(self.processes))
+        self.assertEqual(2, self.max_running)
+
+    def test_run_queued_jobs_packs_jobs_by_gpus(self):
+        subject = local.LocalProcessJobSystem({'num_cpus': 16, 'num_gpus': 1, 'poll_interval': 0})
+        for _ in range(3):
+            subject.run_task(oid.ObjectId(), num_gpus=1)
+        subject.run_queued_jobs()
+        self.assertEqual(3, len(self.processes))
+        self.assertEqual(1, self.max_running)
+
+    def test_run_queued_jobs_runs_jobs_too_large_for_the_node(self):
+        subject = local.LocalProcessJobSystem({'num_cpus': 2, 'memory': '4GB', 'poll_interval': 0})
+        subject.run_task(oid.ObjectId(), num_cpus=8, memory_requirements='16GB')
+        subject.run_queued_jobs()
+        self.assertEqual(1, len(self.processes))
+
+    def test_run_queued_jobs_lets_smaller_jobs_go_first(self):
+        subject = local.LocalProcessJobSystem({'num_cpus': 4, 'poll_interval': 0})
+        subject.run_task(oid.ObjectId(), num_cpus=3)
+        large_task = oid.ObjectId()
+        subject.run_task(large_task, num_cpus=4)
+        small_task = oid.ObjectId()
+        subject.run_task(small_task, num_cpus=1)
+        subject.run_queued_jobs()
+        started_tasks = [call_args[0][0][2] for call_args in self.mock_popen.call_args_list]
+        self.assertLess(started_tasks.index(str(small_task)), started_tasks.index(str(large_task)))
+
+    def test_run_queued_jobs_continues_after_a_job_crashes(self):
+        self.mock_popen.side_effect = [MockProcess(return_code=-11), MockProcess(), MockProcess()]
+        subject = local.LocalProcessJobSystem({'num_cpus': 1, 'poll_interval': 0})
+        job_ids = [subject.run_task(oid.ObjectId()) for _ in range(3)]
+        subject.run_queued_jobs()
+        self.assertEqual(3, self.mock_popen.call_count)
+        for job_id in job_ids:
+            self.assertFalse(subject.is_job_running(job_id))
+
+    def test_run_queued_jobs_continues_if_a_process_cannot_start(self):
+        self.mock_popen.side_effect = [OSError('Cannot start process'), MockProcess()]
+        subject = local.LocalProcessJobSystem({'num_cpus': 1, 'poll_interval': 0})
+        job_ids = [subject.run_task(oid.ObjectId()) for _ in range(2)]
+        subject.run_queued_jobs()
+        self.assertEqual(2, self.mock_popen.call_count)
+        for job_id in job_ids:
+            self.assertFalse(subject.is_job_running(job_id))
+
+    def test_is_blocking_by_default(self):
+        self.assertTrue(local.LocalProcessJobSystem({}).is_blocking)
+        self.assertFalse(local.LocalProcessJobSystem({'blocking': False}).is_blocking)
+
+    def test_non_blocking_run_queued_jobs_starts_jobs_and_returns(self):
+        subject = local.LocalProcessJobSystem({'num_cpus': 2, 'blocking': False})
+        job_ids = [subject.run_task(oid.ObjectId(), num_cpus=1) for _ in range(3)]
+        subject.run_queued_jobs()
+        self.assertEqual(2, len(self.processes))
+        for job_id in job_ids:
+            self.assertTrue(subject.is_job_running(job_id))
+
+        # Keep calling until the jobs finish, each call only polls the running jobs once
+        for _ in range(10):
+            subject.run_queued_jobs()
+        self.assertEqual(3, len(self.processes))
+        self.assertEqual(2, self.max_running)
+        for job_id in job_ids:
+            self.assertFalse(subject.is_job_running(job_id))
+
+    def test_wait_for_jobs_finishes_all_queued_jobs(self):
+        subject = local.LocalProcessJobSystem({'num_cpus': 2, 'blocking': False, 'poll_interval': 0})
+        job_ids = [subject.run_task(oid.ObjectId(), num_cpus=1) for _ in range(3)]
+        subject.run_queued_jobs()
+        subject.wait_for_jobs()
+        self.assertEqual(3, len(self.processes))
+        for job_id in job_ids:
+            self.assertFalse(subject.is_job_running(job_id))
+
+    def test_factory_creates_local_job_system(self):
+        subject = job_system_factory.create_job_system({'job_system_config': {'job_system': 'Local'}})
+        self.assertIsInstance(subject, local.LocalProcessJobSystem)
+
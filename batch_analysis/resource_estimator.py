@@ -0,0 +1,109 @@
+import logging
+import numpy as np
+import batch_analysis.task
+import batch_analysis.task_profile
+
+
+class ResourceEstimator:
+    """
+    Estimates the memory and time a task will need from the recent runs of similar tasks,
+    that is, tasks of the same type for the same system, benchmark or comparison, as grouped in the task stats.
+    Each estimate is a high percentile of the recent runs, so that one unusually large run does not
+    inflate the requests of every similar task from then on.
+    Requesting what tasks actually need, rather than a fixed guess, keeps jobs from being pushed down the queue
+    for asking for too much, or killed for asking for too little.
+    Tasks without enough history keep the requirements they were created with.
+    """
+
+    def __init__(self, stats_collection, config):
+        """
+        Takes configuration parameters in a dict with the following format:
+        {
+            'duration_margin': 1.5      # Multiplier on the estimated duration, default 1.5
+            'memory_margin': 1.25       # Multiplier on the estimated peak memory, default 1.25
+            'percentile': 95            # The percentile of the recent runs to estimate from, default 95
+            'min_samples': 3            # The number of recorded runs needed to make an estimate, default 3
+            'min_duration': '0:00:30'   # The shortest duration to request, default 30 seconds
+            'min_memory': '1GB'         # The smallest amount of memory to request, default 1 GB
+        }
+        :param stats_collection: The task stats collection, see batch_analysis.task_profile
+        :param config: A dict of configuration parameters
+        """
+        self._stats_collection = stats_collection
+        self._duration_margin = float(config['duration_margin']) if 'duration_margin' in config else 1.5
+        self._memory_margin = float(config['memory_margin']) if 'memory_margin' in config else 1.25
+        self._percentile = float(config['percentile']) if 'percentile' in config else 95
+        self._min_samples = int(config['min_samples']) if 'min_samples' in config else 3
+        self._min_duration = batch_analysis.task.parse_duration(
+            config['min_duration'] if 'min_duration' in config else '0:00:30')
+        self._min_memory = batch_analysis.task.parse_memory(
+            config['min_memory'] if 'min_memory' in config else '1GB')
+        self._stats = {}
+
+    def refresh(self):
+        """
+        Reload the task stats, to include tasks that have run since the last refresh
+        :return: void
+        """
+        self._stats = {
+            (s_stats['task_type'], s_stats['group_id']): s_stats
+            for s_stats in self._stats_collection.find({}, {
+                'task_type': True, 'group_id': True, 'recent_wall_times': True, 'recent_peak_memory': True
+            })
+        }
+
+    def estimate(self, task):
+        """
+        Estimate the resources a task will need
+        :param task: The task to estimate
+        :return: The memory requirements and expected duration, as strings, or the task's own if there is no estimate
+        """
+        memory_requirements = task.memory_requirements
+        expected_duration = task.expected_duration
+        group = batch_analysis.task_profile.get_task_group(task)
+        if group in self._stats:
+            s_stats = self._stats[group]
+            wall_time = self._get_percentile(s_stats, 'recent_wall_times')
+            if wall_time is not None:
+                expected_duration = batch_analysis.task.format_duration(max(
+                    self._min_duration, wall_time * self._duration_margin))
+            peak_memory = self._get_percentile(s_stats, 'recent_peak_memory')
+            if peak_memory is not None:
+                memory_requirements = batch_analysis.task.format_memory(max(
+                    self._min_memory, peak_memory * self._memory_margin))
+        return memory_requirements, expected_duration
+
+    def _get_percentile(self, s_stats, key):
+        """
+        Get the configured percentile of a list of recent samples in the task stats
+        :param s_stats: The task stats for a group of tasks
+        :param key: The key of the recent samples
+        :return: The percentile, or None if there are not enough samples
+        """
+        if key not in s_stats or len(s_stats[key]) < self._min_samples:
+            return None
+        return float(np.percentile(s_stats[key], self._percentile))
+
+
+def get_prediction_error(task, profile):
+    """
+    Compare the resources requested for a task with what it actually used.
+    :param task: The task that was run
+    :param profile: The profile of the task
+    :return: A dict with the ratios of actual to requested duration and memory, where they could be measured.
+    A ratio over 1 means the task needed more than it asked for.
+    """
+    prediction_error = {}
+    requested_duration = batch_analysis.task.parse_duration(task.expected_duration)
+    if requested_duration:
+        prediction_error['duration_ratio'] = profile['wall_time'] / requested_duration
+    requested_memory = batch_analysis.task.parse_memory(task.memory_requirements)
+    if requested_memory and profile['peak_memory'] is not None:
+        prediction_error['memory_ratio'] = profile['peak_memory'] / requested_memory
+    if len(prediction_error) > 0:
+        logging.getLogger(__name__).info("Task {0} used {1} of its requested time and {2} of its memory".format(
+            task.identifier,
+            '{0:.0%}'.format(prediction_error['duration_ratio']) if 'duration_ratio' in prediction_error else 'unknown',
+            '{0:.0%}'.format(prediction_error['memory_ratio']) if 'memory_ratio' in prediction_error else 'unknown'
+        ))
+    return prediction_error
@@ -0,0 +1,219 @@
+import time
+import logging
+import traceback
+import batch_analysis.task
+import batch_analysis.task_manager
+import batch_analysis.resource_estimator
+
+
+class SchedulerDaemon:
+    """
+    A long-running scheduler, which keeps the experiments in memory between passes,
+    rather than loading every experiment and re-scheduling everything each time it is run.
+
+    There are three kinds of pass, each run at a different rate:
+    - Imports, which call 'do_imports' on each experiment. These rarely change, so are run least often.
+    - Experiment scheduling, which calls 'schedule_tasks' on each experiment. This is only done
+      when something has changed since the last pass; a new experiment, an import, or another task finishing.
+    - Task scheduling, which hands the unstarted tasks to the job system.
+    Each pass is logged with how long it took.
+    When running continuously, the job system must not block while its jobs run, or none of the other passes
+    would happen in the meantime. To run jobs on this machine, use the local job system with 'blocking' set to False.
+    """
+
+    def __init__(self, db_client, job_system, config):
+        """
+        Takes configuration parameters in a dict with the following format:
+        {
+            'import_interval': 3600         # Seconds between import passes, default 3600
+            'schedule_interval': 60         # Minimum seconds between experiment scheduling passes, default 60
+            'task_interval': 60             # Seconds between passes scheduling tasks with the job system, default 60
+            'push_tasks': True              # Hand tasks to the job system, set False when task workers run them
+            'poll_interval': 5              # Seconds to wait between checking if a pass is due, default 5
+            'estimate_resources': True      # Request resources for each task based on similar tasks, default True
+            'estimator_config': {}          # Configuration for the resource estimator, see ResourceEstimator
+        }
+        :param db_client: The database client
+        :param job_system: The job system used to run the tasks, which must not be blocking to call run
+        :param config: A dict of configuration parameters
+        """
+        self._db_client = db_client
+        self._job_system = job_system
+        self._task_manager = batch_analysis.task_manager.TaskManager(db_client.tasks_collection, db_client)
+        self._import_interval = float(config['import_interval']) if 'import_interval' in config else 3600
+        self._schedule_interval = float(config['schedule_interval']) if 'schedule_interval' in config else 60
+        self._task_interval = float(config['task_interval']) if 'task_interval' in config else 60
+        self._poll_interval = float(config['poll_interval']) if 'poll_interval' in config else 5
+        self._push_tasks = bool(config['push_tasks']) if 'push_tasks' in config else True
+        self._estimator = None
+        if 'estimate_resources' not in config or bool(config['estimate_resources']):
+            self._estimator = batch_analysis.resource_estimator.ResourceEstimator(
+                db_client.task_stats_collection,
+                config['estimator_config'] if 'estimator_config' in config else {}
+            )
+
+        self._experiments = {}
+        self._num_finished_tasks = None
+        self._experiments_changed = True
+        self._last_import = None
+        self._last_schedule = None
+        self._last_tasks = None
+
+    @property
+    def experiments(self):
+        """
+        The experiments currently loaded by the scheduler
+        :return: A list of experiment objects
+        """
+        return list(self._experiments.values())
+
+    def load_new_experiments(self, do_imports=True):
+        """
+        Load any experiments that have been added to the database since the last time we checked,
+        and perform the imports for them straight away.
+        :param do_imports: Whether to do the imports for the new experiments. Default True.
+        :return: The number of new experiments loaded
+        """
+        s_experiments = self._db_client.experiments_collection.find({
+            '_id': {'$nin': list(self._experiments.keys())}
+        })
+        num_loaded = 0
+        for s_experiment in s_experiments:
+            experiment = self._db_client.deserialize_entity(s_experiment)
+            if experiment is not None:
+                self._experiments[experiment.identifier] = experiment
+                if do_imports:
+                    self._run_experiment(experiment, experiment.do_imports)
+                num_loaded += 1
+        if num_loaded > 0:
+            self._experiments_changed = True
+        return num_loaded
+
+    def do_imports(self):
+        """
+        Perform the imports for all the experiments
+        :return: void
+        """
+        for experiment in self._experiments.values():
+            self._run_experiment(experiment, experiment.do_imports)
+        self._experiments_changed = True
+
+    def schedule_experiments(self, force=False):
+        """
+        Schedule tasks for all the experiments, if anything has changed since the last time they were scheduled.
+        Experiments only create new tasks in response to other tasks finishing, so if no tasks have finished,
+        there is nothing new to schedule. Since finished tasks never change state again,
+        this can be checked by counting them.
+        :param force: Schedule the experiments even if nothing has changed. Default False.
+        :return: True if the experiments were scheduled, false if nothing had changed
+        """
+        num_finished_tasks = self._db_client.tasks_collection.count_documents({
+            'state': batch_analysis.task.JobState.DONE.value
+        })
+        if not force and not self._experiments_changed and num_finished_tasks == self._num_finished_tasks:
+            return False
+        self._num_finished_tasks = num_finished_tasks
+        self._experiments_changed = False
+        for experiment in self._experiments.values():
+            self._run_experiment(experiment, experiment.schedule_tasks)
+        return True
+
+    def schedule_tasks(self):
+        """
+        Hand all the unstarted tasks to the job system, and run them.
+        Since the job system does not block, this also picks up the jobs that have finished since the last pass.
+        If resources are being estimated, the estimates are updated first.
+        If tasks are not pushed to the job system, because task workers are pulling them instead,
+        this only reclaims tasks with expired leases and releases the tasks whose dependencies have finished.
+        :return: void
+        """
+        if not self._push_tasks:
+            num_reclaimed = self._task_manager.reclaim_expired_tasks()
+            if num_reclaimed > 0:
+                logging.getLogger(__name__).warning("Reclaimed {0} tasks with expired leases".format(num_reclaimed))
+            self._task_manager.release_dependents()
+            return
+        if self._estimator is not None:
+            self._estimator.refresh()
+        self._task_manager.schedule_tasks(self._job_system, estimator=self._estimator)
+        self._job_system.run_queued_jobs()
+
+    def run_once(self):
+        """
+        Do a single full pass, importing and scheduling everything, like a single run of the scheduler.
+        Waits for any jobs the job system is running in this process, so that they are not lost when it exits.
+        :return: void
+        """
+        self._task_manager.create_indexes()
+        self._timed_pass("Loading experiments", self.load_new_experiments, do_imports=False)
+        self._timed_pass("Importing", self.do_imports)
+        self._timed_pass("Scheduling experiments", self.schedule_experiments, force=True)
+        self._timed_pass("Scheduling tasks", self.schedule_tasks)
+        self._job_system.wait_for_jobs()
+
+    def run(self, max_passes=None):
+        """
+        Keep running passes, each at its own rate, until stopped.
+        :param max_passes: The maximum number of times to check for work before stopping.
+        Default None, which runs forever.
+        :return: void
+        :raises ValueError: If the job system is blocking
+        """
+        if self._job_system.is_blocking:
+            raise ValueError("The scheduler daemon cannot use a blocking job system like {0}, "
+                             "it would stop scheduling until every job finished. "
+                             "Use the local job system with 'blocking' set to False instead.".format(
+                                 type(self._job_system).__name__))
+        self._task_manager.create_indexes()
+        num_passes = 0
+        while max_passes is None or num_passes < max_passes:
+            now = time.time()
+            schedule_due = self._last_schedule is None or now - self._last_schedule >= self._schedule_interval
+            import_due = self._last_import is None or now - self._last_import >= self._import_interval
+            if schedule_due:
+                # New experiments are imported straight away, unless all the imports are about to be done anyway
+                self._timed_pass("Loading experiments", self.load_new_experiments, do_imports=not import_due)
+            if import_due:
+                self._last_import = now
+                self._timed_pass("Importing", self.do_imports)
+            if schedule_due:
+                self._last_schedule = now
+                self._timed_pass("Scheduling experiments", self.schedule_experiments)
+            if self._last_tasks is None or now - self._last_tasks >= self._task_interval:
+                self._last_tasks = now
+                self._timed_pass("Scheduling tasks", self.schedule_tasks)
+            num_passes += 1
+            if max_passes is None or num_passes < max_passes:
+                time.sleep(self._poll_interval)
+        self._job_system.wait_for_jobs()
+
+    def _run_experiment(self, experiment, method):
+        """
+        Run one of the experiment scheduling methods, and save the changes to the experiment.
+        An exception from one experiment will not stop the others being scheduled.
+        Any new tasks the experiment held back for a bulk insert are always saved.
+        :param experiment: The experiment
+        :param method: The bound method to call, either do_imports or schedule_tasks
+        :return: void
+        """
+        try:
+            method(self._task_manager, self._db_client)
+            experiment.save_updates(self._db_client)
+        except Exception:
+            logging.getLogger(__name__).error("Exception occurred during scheduling:\n{0}".format(
+                traceback.format_exc()))
+        finally:
+            self._task_manager.save_pending_tasks()
+
+    @staticmethod
+    def _timed_pass(name, func, *args, **kwargs):
+        """
+        Run a pass of the scheduler, logging how long it took
+        :param name: The name of the pass, for the log
+        :param func: The function to call
+        :return: The result of the function
+        """
+        start = time.time()
+        result = func(*args, **kwargs)
+        logging.getLogger(__name__).info("{0} took {1:.2f} seconds".format(name, time.time() - start))
+        return result
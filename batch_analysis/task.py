@@ -1,11 +1,14 @@
-import database.entity
+import re
+import math
 import enum
+import database.entity
 
 
 class JobState(enum.Enum):
     UNSTARTED = 0
     RUNNING = 1
     DONE = 2
+    WAITING = 3     # Waiting for the tasks it depends on to finish before it can start
 
 
 class TaskType(enum.Enum):
@@ -34,7 +37,7 @@ class Task(database.entity.Entity, metaclass=database.entity.AbstractEntityMetac
     """
 
     def __init__(self, state=JobState.UNSTARTED, node_id=None, job_id=None, result=None, num_cpus=1, num_gpus=0,
-                 memory_requirements='3GB', expected_duration='1:00:00', id_=None):
+                 memory_requirements='3GB', expected_duration='1:00:00', dependencies=None, id_=None):
         super().__init__(id_=id_)
         self._state = JobState(state)
         self._node_id = node_id
@@ -44,6 +47,7 @@ class Task(database.entity.Entity, metaclass=database.entity.AbstractEntityMetac
         self._num_gpus = int(num_gpus)
         self._memory_requirements = memory_requirements
         self._expected_duration = expected_duration
+        self._dependencies = dict(dependencies) if dependencies is not None else {}
         self._updates = {}
 
     @property
@@ -90,6 +94,25 @@ class Task(database.entity.Entity, metaclass=database.entity.AbstractEntityMetac
         """
         return JobState.UNSTARTED == self._state
 
+    @property
+    def is_waiting(self):
+        """
+        Is the job waiting for other tasks to finish before it can be started.
+        Waiting tasks are released by the TaskManager when their dependencies are done.
+        :return:
+        """
+        return JobState.WAITING == self._state
+
+    @property
+    def dependencies(self):
+        """
+        The upstream tasks this task depends on, as a map from the name of the input they provide
+        (such as 'trial_result_id') to the id of the task that will produce it.
+        When all the dependencies are done, their results are filled in as the inputs, and this task can start.
+        :return: A dict of input names to task ids
+        """
+        return dict(self._dependencies)
+
     @property
     def num_cpus(self):
         return self._num_cpus
@@ -102,6 +125,14 @@ class Task(database.entity.Entity, metaclass=database.entity.AbstractEntityMetac
     def memory_requirements(self):
         return self._memory_requirements
 
+    @property
+    def memory_bytes(self):
+        """
+        The memory requirements as a number of bytes, so that it can be compared in database queries
+        :return: The number of bytes required, or None if the memory requirements are not valid
+        """
+        return parse_memory(self._memory_requirements)
+
     @property
     def expected_duration(self):
         return self._expected_duration
@@ -124,6 +155,10 @@ class Task(database.entity.Entity, metaclass=database.entity.AbstractEntityMetac
             self._updates['$set']['state'] = JobState.RUNNING.value
             self._updates['$set']['node_id'] = node_id
             self._updates['$set']['job_id'] = job_id
+            # The lease is taken out when the task actually starts running, clear any old one
+            if '$unset' not in self._updates:
+                self._updates['$unset'] = {}
+            self._updates['$unset']['lease_expiry'] = True
             # Don't unset the job id anymore, we're setting it to something else insted
             if '$unset' in self._updates:
                 if 'node_id' in self._updates['$unset']:
@@ -147,6 +182,7 @@ class Task(database.entity.Entity, metaclass=database.entity.AbstractEntityMetac
                 self._updates['$unset'] = {}
             self._updates['$unset']['node_id'] = True
             self._updates['$unset']['job_id'] = True
+            self._updates['$unset']['lease_expiry'] = True
 
             # Don't set the job id anymore, it's getting unset
             if 'node_id' in self._updates['$set']:
@@ -166,6 +202,7 @@ class Task(database.entity.Entity, metaclass=database.entity.AbstractEntityMetac
                 self._updates['$unset'] = {}
             self._updates['$unset']['node_id'] = True
             self._updates['$unset']['job_id'] = True
+            self._updates['$unset']['lease_expiry'] = True
 
             # Don't set the job id anymore, it's getting unset
             if 'node_id' in self._updates['$set']:
@@ -173,6 +210,34 @@ class Task(database.entity.Entity, metaclass=database.entity.AbstractEntityMetac
             if 'job_id' in self._updates['$set']:
                 del self._updates['$set']['job_id']
 
+    def set_requirements(self, memory_requirements, expected_duration):
+        """
+        Change the resources requested for this task, such as from a resource estimate.
+        Only unstarted tasks can be changed, the requirements of a running task are already fixed.
+        :param memory_requirements: The new memory requirements, like '3GB'
+        :param expected_duration: The new expected duration, like '1:00:00'
+        :return: void
+        """
+        if JobState.UNSTARTED == self._state and (memory_requirements != self._memory_requirements or
+                                                  expected_duration != self._expected_duration):
+            self._memory_requirements = memory_requirements
+            self._expected_duration = expected_duration
+            if '$set' not in self._updates:
+                self._updates['$set'] = {}
+            self._updates['$set']['memory_requirements'] = memory_requirements
+            self._updates['$set']['memory_bytes'] = self.memory_bytes
+            self._updates['$set']['expected_duration'] = expected_duration
+
+    def record_profile(self, profile):
+        """
+        Store the resources used to run this task, see batch_analysis.task_profile
+        :param profile: The task profile, as a dict
+        :return: void
+        """
+        if '$set' not in self._updates:
+            self._updates['$set'] = {}
+        self._updates['$set']['profile'] = profile
+
     def save_updates(self, collection):
         if self.identifier is None:
             s_task = self.serialize()
@@ -188,7 +253,12 @@ class Task(database.entity.Entity, metaclass=database.entity.AbstractEntityMetac
         serialized['num_cpus'] = self._num_cpus
         serialized['num_gpus'] = self._num_gpus
         serialized['memory_requirements'] = self._memory_requirements
+        serialized['memory_bytes'] = self.memory_bytes
         serialized['expected_duration'] = self._expected_duration
+        if len(self._dependencies) > 0:
+            serialized['dependencies'] = self.dependencies
+            # A list of the upstream ids, so that the dependent tasks can be found in a single query
+            serialized['dependency_ids'] = list(self._dependencies.values())
         if self._state:
             serialized['node_id'] = self.node_id
             serialized['job_id'] = self.job_id
@@ -208,6 +278,8 @@ class Task(database.entity.Entity, metaclass=database.entity.AbstractEntityMetac
             kwargs['memory_requirements'] = serialized_representation['memory_requirements']
         if 'expected_duration' in serialized_representation:
             kwargs['expected_duration'] = serialized_representation['expected_duration']
+        if 'dependencies' in serialized_representation:
+            kwargs['dependencies'] = serialized_representation['dependencies']
         if 'node_id' in serialized_representation:
             kwargs['node_id'] = serialized_representation['node_id']
         if 'job_id' in serialized_representation:
@@ -215,3 +287,53 @@ class Task(database.entity.Entity, metaclass=database.entity.AbstractEntityMetac
         if 'result' in serialized_representation:
             kwargs['result'] = serialized_representation['result']
         return super().deserialize(serialized_representation, db_client, **kwargs)
+
+
+_MEMORY_UNITS = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3, 'T': 1024 ** 4}
+
+
+def parse_memory(memory_requirements):
+    """
+    Parse a memory requirement string, like '3GB' or '512MB', into a number of bytes
+    :param memory_requirements: The memory string, as used by tasks
+    :return: The number of bytes, or None if the string is not a valid memory requirement
+    """
+    if not isinstance(memory_requirements, str):
+        return None
+    match = re.match('^([0-9]+)([TGMK])B$', memory_requirements)
+    if match is None:
+        return None
+    return int(match.group(1)) * _MEMORY_UNITS[match.group(2)]
+
+
+def format_memory(num_bytes):
+    """
+    Format a number of bytes as a memory requirement string, the inverse of parse_memory
+    :param num_bytes: The number of bytes, which is rounded up to the next whole megabyte
+    :return: The memory string, like '1536MB'
+    """
+    return '{0}MB'.format(int(math.ceil(num_bytes / _MEMORY_UNITS['M'])))
+
+
+def parse_duration(expected_duration):
+    """
+    Parse a duration string in the format 'HH:MM:SS', as used for expected durations, into a number of seconds
+    :param expected_duration: The duration string
+    :return: The number of seconds, or None if the string is not a valid duration
+    """
+    if not isinstance(expected_duration, str):
+        return None
+    match = re.match('^([0-9]+):([0-9]{2}):([0-9]{2})$', expected_duration)
+    if match is None:
+        return None
+    return int(match.group(1)) * 3600 + int(match.group(2)) * 60 + int(match.group(3))
+
+
+def format_duration(seconds):
+    """
+    Format a number of seconds as a duration string 'HH:MM:SS', the inverse of parse_duration
+    :param seconds: The number of seconds, which is rounded up to the next whole second
+    :return: The duration string
+    """
+    seconds = int(math.ceil(seconds))
+    return '{0}:{1:02}:{2:02}'.format(seconds // 3600, (seconds // 60) % 60, seconds % 60)
@@ -0,0 +1,79 @@
+import logging
+import datetime
+import threading
+import batch_analysis.task
+
+
+DEFAULT_LEASE_DURATION = 600
+
+
+def get_lease_expiry(lease_duration=DEFAULT_LEASE_DURATION):
+    """
+    Get the time a lease taken out now will expire
+    :param lease_duration: The length of the lease in seconds
+    :return: A UTC datetime, as stored in the 'lease_expiry' of running tasks
+    """
+    return datetime.datetime.utcnow() + datetime.timedelta(seconds=lease_duration)
+
+
+class LeaseHeartbeat:
+    """
+    A background thread that keeps renewing the lease on a running task, for as long as it is running.
+    If the process running the task dies, the lease stops being renewed and expires,
+    and the task manager will reclaim the task so that it can be run again,
+    no matter which node it was running on.
+    """
+
+    def __init__(self, collection, task_id, lease_duration=DEFAULT_LEASE_DURATION, interval=None):
+        """
+        :param collection: The tasks collection
+        :param task_id: The id of the running task
+        :param lease_duration: The length of each lease in seconds. Default 600.
+        :param interval: The number of seconds between renewing the lease. Default is a third of the lease duration,
+        so a lease is only lost if the renewal fails several times.
+        """
+        self._collection = collection
+        self._task_id = task_id
+        self._lease_duration = lease_duration
+        self._interval = interval if interval is not None else lease_duration / 3
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def renew(self):
+        """
+        Renew the lease on the task, if it is still running.
+        Errors are logged, so that the task can keep going, and the lease is renewed again next time.
+        :return: void
+        """
+        try:
+            self._collection.update_one({
+                '_id': self._task_id,
+                'state': batch_analysis.task.JobState.RUNNING.value
+            }, {'$set': {'lease_expiry': get_lease_expiry(self._lease_duration)}})
+        except Exception as exception:
+            logging.getLogger(__name__).warning("Failed to renew the lease on task {0}: {1}".format(
+                self._task_id, exception))
+
+    def start(self):
+        """
+        Take out the first lease, and start renewing it in the background
+        :return: void
+        """
+        self.renew()
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='lease-{0}'.format(self._task_id), daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop renewing the lease. Call this when the task has finished running.
+        :return: void
+        """
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop_event.wait(self._interval):
+            self.renew()
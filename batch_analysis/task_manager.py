@@ -1,13 +1,32 @@
+import logging
+import datetime
+import bson
+import pymongo
 import batch_analysis.task
 import batch_analysis.tasks.import_dataset_task as import_dataset_task
 import batch_analysis.tasks.generate_dataset_task as generate_dataset_task
 import batch_analysis.tasks.train_system_task as train_system_task
 import batch_analysis.tasks.run_system_task as run_system_task
 import batch_analysis.tasks.benchmark_trial_task as benchmark_task
+import batch_analysis.tasks.multi_benchmark_trial_task as multi_benchmark_task
 import batch_analysis.tasks.compare_trials_task as compare_trials_task
 import batch_analysis.tasks.compare_benchmarks_task as compare_benchmarks_task
 
 
+# The classes for each type of task, used to choose which tasks to prefetch
+_TASK_CLASSES = {
+    batch_analysis.task.TaskType.GENERATE_DATASET: [generate_dataset_task.GenerateDatasetTask],
+    batch_analysis.task.TaskType.IMPORT_DATASET: [import_dataset_task.ImportDatasetTask],
+    batch_analysis.task.TaskType.TRAIN_SYSTEM: [train_system_task.TrainSystemTask],
+    batch_analysis.task.TaskType.IMPORT_SYSTEM: [],
+    batch_analysis.task.TaskType.TEST_SYSTEM: [run_system_task.RunSystemTask],
+    batch_analysis.task.TaskType.BENCHMARK_RESULT: [benchmark_task.BenchmarkTrialTask,
+                                                    multi_benchmark_task.MultiBenchmarkTrialTask],
+    batch_analysis.task.TaskType.COMPARE_TRIALS: [compare_trials_task.CompareTrialTask],
+    batch_analysis.task.TaskType.COMPARE_BENCHMARKS: [compare_benchmarks_task.CompareBenchmarksTask]
+}
+
+
 class TaskManager:
     """
     The task manager's job is to track what has been done and what hasn't, and see that it happens.
@@ -33,6 +52,7 @@ class TaskManager:
         self._collection = task_collection
         self._db_client = db_client
         self._pending_tasks = []
+        self._prefetched = {}
 
     def get_import_dataset_task(self, module_name, path, num_cpus=1, num_gpus=0,
                                 memory_requirements='3GB', expected_duration='1:00:00'):
@@ -48,7 +68,10 @@ class TaskManager:
         :param expected_duration: The expected time this job will take. Default 1 hour.
         :return: An ImportDatasetTask containing the task state.
         """
-        existing = self._collection.find_one({'module_name': module_name, 'path': path})
+        existing = self._find_existing(import_dataset_task.ImportDatasetTask, {
+            'module_name': module_name,
+            'path': path
+        })
         if existing is not None:
             return self._db_client.deserialize_entity(existing)
         else:
@@ -79,8 +102,12 @@ class TaskManager:
         :param expected_duration: The expected time this job will take. Default 1 hour.
         :return: An ImportDatasetTask containing the task state.
         """
-        existing = self._collection.find_one({'controller_id': controller_id, 'simulator_id': simulator_id,
-                                              'simulator_config': simulator_config, 'repeat': repeat})
+        existing = self._find_existing(generate_dataset_task.GenerateDatasetTask, {
+            'controller_id': controller_id,
+            'simulator_id': simulator_id,
+            'simulator_config': simulator_config,
+            'repeat': repeat
+        })
         if existing is not None:
             return self._db_client.deserialize_entity(existing)
         else:
@@ -108,7 +135,10 @@ class TaskManager:
         :param expected_duration: The expected time this job will take. Default 1 hour.
         :return: A TrainSystemTask
         """
-        existing = self._collection.find_one({'trainer_id': trainer_id, 'trainee_id': trainee_id})
+        existing = self._find_existing(train_system_task.TrainSystemTask, {
+            'trainer_id': trainer_id,
+            'trainee_id': trainee_id
+        })
         if existing is not None:
             return self._db_client.deserialize_entity(existing)
         else:
@@ -122,7 +152,8 @@ class TaskManager:
             )
 
     def get_run_system_task(self, system_id, image_source_id, repeat=0, num_cpus=1, num_gpus=0,
-                            memory_requirements='3GB', expected_duration='1:00:00'):
+                            memory_requirements='3GB', expected_duration='1:00:00',
+                            dependencies=None):
         """
         Get a task to run a system.
         Most of the parameters are resources requirements passed to the job system.
@@ -133,13 +164,15 @@ class TaskManager:
         :param num_gpus: The number of GPUs required for the job. Default 0.
         :param memory_requirements: The memory required for this job. Default 3 GB.
         :param expected_duration: The expected time this job will take. Default 1 hour.
+        :param dependencies: A map of input names to the ids of the unfinished tasks that will produce them.
+        The new task will wait for those tasks to finish, and then have their results filled in. Default None.
         :return: A RunSystemTask
         """
-        existing = self._collection.find_one({
+        existing = self._find_existing(run_system_task.RunSystemTask, make_existing_query({
             'system_id': system_id,
             'image_source_id': image_source_id,
             'repeat': repeat
-        })
+        }, dependencies))
         if existing is not None:
             return self._db_client.deserialize_entity(existing)
         else:
@@ -150,11 +183,15 @@ class TaskManager:
                 num_cpus=num_cpus,
                 num_gpus=num_gpus,
                 memory_requirements=memory_requirements,
-                expected_duration=expected_duration
+                expected_duration=expected_duration,
+                state=(batch_analysis.task.JobState.WAITING if dependencies
+                       else batch_analysis.task.JobState.UNSTARTED),
+                dependencies=dependencies
             )
 
     def get_benchmark_task(self, trial_result_id, benchmark_id, num_cpus=1, num_gpus=0,
-                           memory_requirements='3GB', expected_duration='1:00:00'):
+                           memory_requirements='3GB', expected_duration='1:00:00',
+                           dependencies=None):
         """
         Get a task to benchmark a trial result.
         Most of the parameters are resources requirements passed to the job system.
@@ -164,9 +201,14 @@ class TaskManager:
         :param num_gpus: The number of GPUs required for the job. Default 0.
         :param memory_requirements: The memory required for this job. Default 3 GB.
         :param expected_duration: The expected time this job will take. Default 1 hour.
+        :param dependencies: A map of input names to the ids of the unfinished tasks that will produce them.
+        The new task will wait for those tasks to finish, and then have their results filled in. Default None.
         :return: A BenchmarkTrialTask
         """
-        existing = self._collection.find_one({'trial_result_id': trial_result_id, 'benchmark_id': benchmark_id})
+        existing = self._find_existing(benchmark_task.BenchmarkTrialTask, make_existing_query({
+            'trial_result_id': trial_result_id,
+            'benchmark_id': benchmark_id
+        }, dependencies))
         if existing is not None:
             return self._db_client.deserialize_entity(existing)
         else:
@@ -176,11 +218,54 @@ class TaskManager:
                 num_cpus=num_cpus,
                 num_gpus=num_gpus,
                 memory_requirements=memory_requirements,
-                expected_duration=expected_duration
+                expected_duration=expected_duration,
+                state=(batch_analysis.task.JobState.WAITING if dependencies
+                       else batch_analysis.task.JobState.UNSTARTED),
+                dependencies=dependencies
+            )
+
+    def get_multi_benchmark_task(self, trial_result_id, benchmark_ids, num_cpus=1, num_gpus=0,
+                                 memory_requirements='3GB', expected_duration='1:00:00',
+                                 dependencies=None):
+        """
+        Get a task to benchmark a trial result with several benchmarks at once.
+        This is quicker than a separate benchmark task for each benchmark, since the trial result is only loaded once.
+        The task is identified by the trial result and the list of benchmarks, in order,
+        it will not find separate benchmark tasks for any of the same benchmarks.
+        Most of the parameters are resources requirements passed to the job system.
+        :param trial_result_id: The id of the trial result to benchmark
+        :param benchmark_ids: The ids of the benchmarks to use
+        :param num_cpus: The number of CPUs required for the job. Default 1.
+        :param num_gpus: The number of GPUs required for the job. Default 0.
+        :param memory_requirements: The memory required for this job. Default 3 GB.
+        :param expected_duration: The expected time this job will take. Default 1 hour.
+        :param dependencies: A map of input names to the ids of the unfinished tasks that will produce them.
+        The new task will wait for those tasks to finish, and then have their results filled in. Default None.
+        :return: A MultiBenchmarkTrialTask
+        """
+        benchmark_ids = list(benchmark_ids)
+        existing = self._find_existing(multi_benchmark_task.MultiBenchmarkTrialTask, make_existing_query({
+            'trial_result_id': trial_result_id,
+            'benchmark_ids': benchmark_ids
+        }, dependencies))
+        if existing is not None:
+            return self._db_client.deserialize_entity(existing)
+        else:
+            return multi_benchmark_task.MultiBenchmarkTrialTask(
+                trial_result_id=trial_result_id,
+                benchmark_ids=benchmark_ids,
+                num_cpus=num_cpus,
+                num_gpus=num_gpus,
+                memory_requirements=memory_requirements,
+                expected_duration=expected_duration,
+                state=(batch_analysis.task.JobState.WAITING if dependencies
+                       else batch_analysis.task.JobState.UNSTARTED),
+                dependencies=dependencies
             )
 
     def get_trial_comparison_task(self, trial_result1_id, trial_result2_id, comparison_id, num_cpus=1, num_gpus=0,
-                                  memory_requirements='3GB', expected_duration='1:00:00'):
+                                  memory_requirements='3GB', expected_duration='1:00:00',
+                                  dependencies=None):
         """
         Get a task to compare two trial results.
         Most of the parameters are resources requirements passed to the job system.
@@ -191,10 +276,15 @@ class TaskManager:
         :param num_gpus: The number of GPUs required for the job. Default 0.
         :param memory_requirements: The memory required for this job. Default 3 GB.
         :param expected_duration: The expected time this job will take. Default 1 hour.
+        :param dependencies: A map of input names to the ids of the unfinished tasks that will produce them.
+        The new task will wait for those tasks to finish, and then have their results filled in. Default None.
         :return: A BenchmarkTrialTask
         """
-        existing = self._collection.find_one({'trial_result1_id': trial_result1_id,
-                                              'trial_result2_id': trial_result2_id, 'comparison_id': comparison_id})
+        existing = self._find_existing(compare_trials_task.CompareTrialTask, make_existing_query({
+            'trial_result1_id': trial_result1_id,
+            'trial_result2_id': trial_result2_id,
+            'comparison_id': comparison_id
+        }, dependencies))
         if existing is not None:
             return self._db_client.deserialize_entity(existing)
         else:
@@ -205,11 +295,15 @@ class TaskManager:
                 num_cpus=num_cpus,
                 num_gpus=num_gpus,
                 memory_requirements=memory_requirements,
-                expected_duration=expected_duration
+                expected_duration=expected_duration,
+                state=(batch_analysis.task.JobState.WAITING if dependencies
+                       else batch_analysis.task.JobState.UNSTARTED),
+                dependencies=dependencies
             )
 
     def get_benchmark_comparison_task(self, benchmark_result1_id, benchmark_result2_id, comparison_id,
-                                      num_cpus=1, num_gpus=0, memory_requirements='3GB', expected_duration='1:00:00'):
+                                      num_cpus=1, num_gpus=0, memory_requirements='3GB', expected_duration='1:00:00',
+                                      dependencies=None):
         """
         Get a task to compare two benchmark results.
         Most of the parameters are resources requirements passed to the job system.
@@ -220,11 +314,15 @@ class TaskManager:
         :param num_gpus: The number of GPUs required for the job. Default 0.
         :param memory_requirements: The memory required for this job. Default 3 GB.
         :param expected_duration: The expected time this job will take. Default 1 hour.
+        :param dependencies: A map of input names to the ids of the unfinished tasks that will produce them.
+        The new task will wait for those tasks to finish, and then have their results filled in. Default None.
         :return: A BenchmarkTrialTask
         """
-        existing = self._collection.find_one({'benchmark_result1_id': benchmark_result1_id,
-                                              'benchmark_result2_id': benchmark_result2_id,
-                                              'comparison_id': comparison_id})
+        existing = self._find_existing(compare_benchmarks_task.CompareBenchmarksTask, make_existing_query({
+            'benchmark_result1_id': benchmark_result1_id,
+            'benchmark_result2_id': benchmark_result2_id,
+            'comparison_id': comparison_id
+        }, dependencies))
         if existing is not None:
             return self._db_client.deserialize_entity(existing)
         else:
@@ -235,7 +333,10 @@ class TaskManager:
                 num_cpus=num_cpus,
                 num_gpus=num_gpus,
                 memory_requirements=memory_requirements,
-                expected_duration=expected_duration
+                expected_duration=expected_duration,
+                state=(batch_analysis.task.JobState.WAITING if dependencies
+                       else batch_analysis.task.JobState.UNSTARTED),
+                dependencies=dependencies
             )
 
     def do_task(self, task):
@@ -247,7 +348,8 @@ class TaskManager:
         :param task: The task object to run, must be an instance of Task returned by the above get methods
         :return: void
         """
-        if isinstance(task, batch_analysis.task.Task) and task.identifier is None and task.is_unstarted:
+        if isinstance(task, batch_analysis.task.Task) and task.identifier is None and \
+                (task.is_unstarted or task.is_waiting):
             existing_query = {}
             # Each different task type has a different set of properties that identify it.
             if isinstance(task, import_dataset_task.ImportDatasetTask):
@@ -267,6 +369,9 @@ class TaskManager:
             elif isinstance(task, benchmark_task.BenchmarkTrialTask):
                 existing_query['trial_result_id'] = task.trial_result
                 existing_query['benchmark_id'] = task.benchmark
+            elif isinstance(task, multi_benchmark_task.MultiBenchmarkTrialTask):
+                existing_query['trial_result_id'] = task.trial_result
+                existing_query['benchmark_ids'] = task.benchmarks
             elif isinstance(task, compare_trials_task.CompareTrialTask):
                 existing_query['trial_result1_id'] = task.trial_result1
                 existing_query['trial_result2_id'] = task.trial_result2
@@ -276,23 +381,175 @@ class TaskManager:
                 existing_query['benchmark_result2_id'] = task.benchmark_result2
                 existing_query['comparison_id'] = task.comparison
 
+            # Tasks waiting on other tasks don't know their inputs yet, find them by their dependencies instead
+            if existing_query != {}:
+                existing_query = make_existing_query(existing_query, task.dependencies)
+
             # Make sure none of this task already exists
-            if existing_query != {} and self._collection.find(existing_query).limit(1).count() == 0:
-                task.save_updates(self._collection)
+            if existing_query != {}:
+                if type(task) in self._prefetched:
+                    # Hold new tasks to be inserted all at once, but remember them so they are only created once.
+                    # The id is chosen now, so that other tasks can depend on this one before it is saved
+                    if self._find_existing(type(task), existing_query) is None:
+                        task.refresh_id(bson.ObjectId())
+                        self._pending_tasks.append(task)
+                        self._prefetched[type(task)].add(task.serialize())
+                elif self._collection.find(existing_query).limit(1).count() == 0:
+                    task.save_updates(self._collection)
+
+    def prefetch_tasks(self, task_type, **key_space):
+        """
+        Load all the tasks of a particular type at once, so that the get methods for that type
+        are answered from memory, rather than querying the database for each task.
+        The key space limits which tasks are loaded, as lists of values for the properties that identify them,
+        such as 'system_id' for run system tasks. Tasks outside the key space are still found in the database.
 
-    def schedule_tasks(self, job_system):
+        While tasks are prefetched, new tasks of the same type passed to do_task are not saved straight away,
+        call save_pending_tasks afterwards to insert them all at once. They are given their ids straight away,
+        so that other tasks can depend on them.
+        :param task_type: The TaskType of the tasks to load
+        :param key_space: Lists of values for any of the identifying properties of the tasks, as keyword arguments
+        :return: The number of tasks loaded
+        """
+        num_loaded = 0
+        for task_class in _TASK_CLASSES[batch_analysis.task.TaskType(task_type)]:
+            query = {'_type': task_class.__module__ + '.' + task_class.__name__}
+            for key, values in key_space.items():
+                query[key] = {'$in': list(values)}
+            prefetched = PrefetchedTasks(key_space)
+            for s_task in self._collection.find(query):
+                prefetched.add(s_task)
+                num_loaded += 1
+            self._prefetched[task_class] = prefetched
+        return num_loaded
+
+    def save_pending_tasks(self):
+        """
+        Save all the new tasks that were held back while tasks were prefetched, in a single bulk insert.
+        This also forgets the prefetched tasks, since they will be out of date by the next time they are needed.
+        :return: The number of new tasks saved
+        """
+        pending_tasks = self._pending_tasks
+        self._pending_tasks = []
+        self._prefetched = {}
+        if len(pending_tasks) > 0:
+            self._collection.insert_many([task.serialize() for task in pending_tasks])
+        return len(pending_tasks)
+
+    def _find_existing(self, task_class, query):
+        """
+        Find an existing task matching a query, from the prefetched tasks if possible.
+        :param task_class: The class of the task to find
+        :param query: The query identifying the task, must only test for equality
+        :return: The serialized task, or None if it does not exist
+        """
+        if task_class in self._prefetched:
+            prefetched = self._prefetched[task_class]
+            s_task = prefetched.find(query)
+            if s_task is not None or prefetched.covers(query):
+                return s_task
+        return self._collection.find_one(query)
+
+    def release_dependents(self, task_id=None):
+        """
+        Release waiting tasks whose dependencies have all finished, so that they can be run.
+        The results of the finished tasks are filled in as the inputs of the waiting tasks.
+        This is called when a task finishes, so that the tasks that depend on it can start straight away,
+        rather than waiting for the experiments to be scheduled again.
+        :param task_id: The id of the task that has just finished, only tasks depending on it are checked.
+        Default None, which checks all the waiting tasks.
+        :return: The number of tasks released
+        """
+        query = {'state': batch_analysis.task.JobState.WAITING.value}
+        if task_id is not None:
+            query['dependency_ids'] = task_id
+        all_waiting = list(self._collection.find(query, {'dependencies': True}))
+        if len(all_waiting) == 0:
+            return 0
+
+        # Find the results of all the finished dependencies at once
+        dependency_ids = set()
+        for s_waiting in all_waiting:
+            if 'dependencies' in s_waiting:
+                dependency_ids |= set(s_waiting['dependencies'].values())
+        results = {
+            s_task['_id']: s_task['result']
+            for s_task in self._collection.find({
+                '_id': {'$in': list(dependency_ids)},
+                'state': batch_analysis.task.JobState.DONE.value
+            }, {'result': True})
+        }
+
+        num_released = 0
+        for s_waiting in all_waiting:
+            dependencies = s_waiting['dependencies'] if 'dependencies' in s_waiting else {}
+            if all(dependency_id in results for dependency_id in dependencies.values()):
+                updates = {input_key: results[dependency_id] for input_key, dependency_id in dependencies.items()}
+                updates['state'] = batch_analysis.task.JobState.UNSTARTED.value
+                # Only update the task if it is still waiting, in case it has been released by someone else
+                result = self._collection.update_one({
+                    '_id': s_waiting['_id'],
+                    'state': batch_analysis.task.JobState.WAITING.value
+                }, {'$set': updates})
+                num_released += result.modified_count
+        return num_released
+
+    def reclaim_expired_tasks(self):
+        """
+        Reclaim running tasks whose lease has expired, so that they can be run again.
+        A task's lease is renewed for as long as it is running, so an expired lease means
+        the process running it has died or hung, whichever node it was on.
+        Tasks started by a job system have no lease until they actually start running,
+        so tasks waiting in a job queue are not reclaimed.
+        :return: The number of tasks reclaimed
+        """
+        result = self._collection.update_many({
+            'state': batch_analysis.task.JobState.RUNNING.value,
+            'lease_expiry': {'$lt': datetime.datetime.utcnow()}
+        }, {
+            '$set': {'state': batch_analysis.task.JobState.UNSTARTED.value},
+            '$unset': {'node_id': True, 'job_id': True, 'lease_expiry': True}
+        })
+        return result.modified_count
+
+    def create_indexes(self):
+        """
+        Create the database indexes used by the task manager.
+        This only needs to be done once, but is harmless to repeat.
+        :return: void
+        """
+        self._collection.create_index([('state', pymongo.ASCENDING), ('lease_expiry', pymongo.ASCENDING)])
+
+    def schedule_tasks(self, job_system, estimator=None):
         """
         Schedule all pending tasks using the provided job system
-        This should both star
+        Each task is claimed before it is submitted, so a task claimed by a task worker at the same time
+        is not run twice.
         :param job_system:
+        :param estimator: A ResourceEstimator to fill in the resources requested for each task. Default None,
+        which requests the resources the tasks were created with.
         :return:
         """
+        # Reclaim tasks that have stopped renewing their lease, on any node
+        num_reclaimed = self.reclaim_expired_tasks()
+        if num_reclaimed > 0:
+            logging.getLogger(__name__).warning("Reclaimed {0} tasks with expired leases".format(num_reclaimed))
+
+        # Release any waiting tasks whose dependencies have finished, so they can be scheduled below
+        self.release_dependents()
+
         # First, check the jobs that should already be running on this node
         all_running = self._collection.find({
             'state': batch_analysis.task.JobState.RUNNING.value,
             'node_id': job_system.node_id
         })
+        now = datetime.datetime.utcnow()
         for s_running in all_running:
+            if 'lease_expiry' in s_running and s_running['lease_expiry'] is not None and \
+                    s_running['lease_expiry'] > now:
+                # The task is still renewing its lease, so it is running even if the job system has lost track of it,
+                # such as a job left running by a previous run of the scheduler. It is reclaimed if the lease expires.
+                continue
             task_entity = self._db_client.deserialize_entity(s_running)
             if not job_system.is_job_running(task_entity.job_id):
                 # Task should be running, but job system says it isn't re-run
@@ -303,6 +560,20 @@ class TaskManager:
         all_unscheduled = self._collection.find({'state': batch_analysis.task.JobState.UNSTARTED.value})
         for s_unscheduled in all_unscheduled:
             task_entity = self._db_client.deserialize_entity(s_unscheduled)
+            if task_entity is None:
+                continue
+            # Claim the task before submitting it, it may have been claimed by a task worker since it was found
+            result = self._collection.update_one({
+                '_id': task_entity.identifier,
+                'state': batch_analysis.task.JobState.UNSTARTED.value
+            }, {
+                '$set': {'state': batch_analysis.task.JobState.RUNNING.value, 'node_id': job_system.node_id},
+                '$unset': {'lease_expiry': True}
+            })
+            if result.modified_count == 0:
+                continue
+            if estimator is not None:
+                task_entity.set_requirements(*estimator.estimate(task_entity))
             job_id = job_system.run_task(
                 task_id=task_entity.identifier,
                 num_cpus=task_entity.num_cpus,
@@ -312,3 +583,96 @@ class TaskManager:
             )
             task_entity.mark_job_started(job_system.node_id, job_id)
             task_entity.save_updates(self._collection)
+
+
+def make_existing_query(query, dependencies):
+    """
+    Adjust a query for an existing task to account for the task's dependencies.
+    The inputs provided by dependencies are not known until those tasks finish,
+    so the task is identified by the tasks it depends on instead.
+    :param query: The query for the task, based on its inputs
+    :param dependencies: The map of input names to task ids for the dependencies, may be None
+    :return: The query for the existing task
+    """
+    if dependencies:
+        for input_key, dependency_id in dependencies.items():
+            if input_key in query:
+                del query[input_key]
+            query['dependencies.' + input_key] = dependency_id
+    return query
+
+
+class PrefetchedTasks:
+    """
+    A set of serialized tasks held in memory, with hash indexes to find tasks by their properties.
+    An index is built for each different set of properties the tasks are looked up by, the first time it is used.
+    """
+
+    def __init__(self, key_space):
+        """
+        :param key_space: The lists of values for each property that were used to load the tasks
+        """
+        self._key_space = {key: set(make_hashable(value) for value in values) for key, values in key_space.items()}
+        self._tasks = []
+        self._indexes = {}
+
+    def add(self, s_task):
+        """
+        Add a serialized task
+        :param s_task: The serialized task
+        :return: void
+        """
+        self._tasks.append(s_task)
+        for keys, index in self._indexes.items():
+            index[make_index_key(s_task, keys)] = s_task
+
+    def find(self, query):
+        """
+        Find a task matching a query
+        :param query: A query testing for equality of one or more properties, which may use dot notation
+        :return: The matching serialized task, or None if none of the tasks match
+        """
+        keys = tuple(sorted(query.keys()))
+        if keys not in self._indexes:
+            self._indexes[keys] = {make_index_key(s_task, keys): s_task for s_task in self._tasks}
+        index_key = tuple(make_hashable(query[key]) for key in keys)
+        return self._indexes[keys].get(index_key, None)
+
+    def covers(self, query):
+        """
+        Does the key space of these tasks cover a given query.
+        If it does, tasks that match the query will have been loaded, if they exist.
+        :param query: The query
+        :return: True iff every matching task has been loaded
+        """
+        return all(key in query and make_hashable(query[key]) in values for key, values in self._key_space.items())
+
+
+def make_index_key(s_task, keys):
+    """
+    Get the values of several properties of a serialized task, for use as a key in an index.
+    :param s_task: The serialized task
+    :param keys: The property names, which may use dot notation for nested properties
+    :return: A hashable tuple of values, missing properties are None
+    """
+    index_key = []
+    for key in keys:
+        value = s_task
+        for part in key.split('.'):
+            value = value[part] if isinstance(value, dict) and part in value else None
+        index_key.append(make_hashable(value))
+    return tuple(index_key)
+
+
+def make_hashable(value):
+    """
+    Convert a value from a serialized object to something that can be used as a dict key.
+    Dicts and lists are converted to tuples.
+    :param value: The value
+    :return: An equivalent, hashable value
+    """
+    if isinstance(value, dict):
+        return tuple(sorted((key, make_hashable(inner)) for key, inner in value.items()))
+    elif isinstance(value, (list, tuple)):
+        return tuple(make_hashable(inner) for inner in value)
+    return value
@@ -0,0 +1,295 @@
+import time
+import threading
+import pymongo.monitoring
+import batch_analysis.tasks.run_system_task as run_system_task
+import batch_analysis.tasks.train_system_task as train_system_task
+import batch_analysis.tasks.benchmark_trial_task as benchmark_trial_task
+import batch_analysis.tasks.compare_trials_task as compare_trials_task
+import batch_analysis.tasks.compare_benchmarks_task as compare_benchmarks_task
+try:
+    import resource
+except ImportError:
+    resource = None     # Not available on windows, peak memory will not be recorded
+
+
+# Linux files used to measure the peak memory of each task, rather than of the whole process
+_CLEAR_REFS_FILE = '/proc/self/clear_refs'
+_STATUS_FILE = '/proc/self/status'
+
+# The number of recent runs of each group of tasks kept in the task stats, for estimating their resources
+NUM_RECENT_SAMPLES = 50
+
+
+# Commands that read from the database, including GridFS, which reads chunks with find and getMore
+_READ_COMMANDS = {'find', 'getMore', 'aggregate', 'count', 'distinct'}
+_WRITE_COMMANDS = {'insert', 'update', 'delete', 'findAndModify'}
+
+
+class DatabaseMonitor(pymongo.monitoring.CommandListener):
+    """
+    Listens to every command sent to the database by this process, and totals the time spent reading and writing,
+    the number of documents read, and the number of bytes of GridFS file data read.
+    Profiles take the difference between the totals at the start and end of a task.
+    Replies are not encoded again to measure their size, which would double the cost of every read,
+    GridFS chunks are counted by the length of their data, which is most of what tasks read.
+    Must be registered before the database client is created, see register_database_monitor.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.documents_read = 0
+        self.bytes_read = 0
+        self.read_time = 0
+        self.write_time = 0
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        num_documents, num_bytes = 0, 0
+        if event.command_name in _READ_COMMANDS:
+            num_documents, num_bytes = _count_read(event.reply)
+        self._add_command(event.command_name, event.duration_micros, num_documents, num_bytes)
+
+    def failed(self, event):
+        self._add_command(event.command_name, event.duration_micros, 0, 0)
+
+    def get_totals(self):
+        """
+        Get the running totals for all the commands so far
+        :return: The documents read, bytes read, seconds spent reading, and seconds spent writing, as a tuple
+        """
+        with self._lock:
+            return self.documents_read, self.bytes_read, self.read_time, self.write_time
+
+    def _add_command(self, command_name, duration_micros, num_documents, num_bytes):
+        with self._lock:
+            if command_name in _READ_COMMANDS:
+                self.documents_read += num_documents
+                self.bytes_read += num_bytes
+                self.read_time += duration_micros / 1000000
+            elif command_name in _WRITE_COMMANDS:
+                self.write_time += duration_micros / 1000000
+
+
+def _count_read(reply):
+    """
+    Count the documents returned by a read command, and the bytes of GridFS file data in them.
+    :param reply: The reply to the command
+    :return: The number of documents, and the number of bytes of GridFS chunk data, as a tuple
+    """
+    if 'cursor' not in reply:
+        return 0, 0
+    batch = reply['cursor'].get('firstBatch', reply['cursor'].get('nextBatch', []))
+    num_bytes = 0
+    for document in batch:
+        # GridFS chunks hold the file data in 'data', alongside the file id and chunk number
+        if 'files_id' in document and 'n' in document and isinstance(document.get('data'), bytes):
+            num_bytes += len(document['data'])
+    return len(batch), num_bytes
+
+
+_database_monitor = None
+_has_profiled_task = False     # Whether a task has already been profiled in this process
+
+
+def register_database_monitor():
+    """
+    Register a database monitor for this process, so that task profiles include database reads and writes.
+    This needs to be called before the database client is created, later calls do nothing.
+    :return: The registered DatabaseMonitor
+    """
+    global _database_monitor
+    if _database_monitor is None:
+        _database_monitor = DatabaseMonitor()
+        pymongo.monitoring.register(_database_monitor)
+    return _database_monitor
+
+
+class TaskProfiler:
+    """
+    Measures the resources used to run a single task: wall time, CPU time, peak memory,
+    documents and GridFS bytes read from the database, and the time spent in each phase of the task.
+    The phases are:
+    - 'deserialize': Deserializing entities loaded from the database
+    - 'database_read': Waiting on queries and GridFS reads
+    - 'database_write': Waiting on inserts and updates, such as saving results
+    - 'compute': Everything else, which is running the system or benchmark, and serializing results
+    Database time is only measured if the database monitor has been registered.
+    Reads made while deserializing, such as loading images, count towards both deserialize and database_read.
+    Peak memory is only recorded if it can be measured for this task alone, which needs the peak for the process
+    to be reset at the start of the task (only possible on linux), or this to be the first task in the process.
+    """
+
+    def __init__(self, db_client):
+        """
+        :param db_client: The database client used by the task, so that deserialization can be timed.
+        """
+        self._db_client = db_client
+        self._deserialize_entity = None
+        self._deserialize_time = 0
+        self._deserialize_depth = 0
+        self._start_wall = None
+        self._start_cpu = None
+        self._start_totals = None
+        self._measure_memory = False
+        self._profile = None
+
+    @property
+    def profile(self):
+        """
+        The profile of the task, once it has been stopped.
+        :return: A dict of measurements, which can be stored in the database, or None if not yet stopped
+        """
+        return self._profile
+
+    def start(self):
+        """
+        Start profiling, call this just before running the task
+        :return: void
+        """
+        self._deserialize_entity = self._db_client.deserialize_entity
+        self._db_client.deserialize_entity = self._timed_deserialize(self._deserialize_entity)
+        global _has_profiled_task
+        self._measure_memory = reset_peak_memory() or not _has_profiled_task
+        _has_profiled_task = True
+        self._start_totals = _database_monitor.get_totals() if _database_monitor is not None else (0, 0, 0, 0)
+        self._start_cpu = time.process_time()
+        self._start_wall = time.time()
+
+    def stop(self):
+        """
+        Stop profiling, and build the profile
+        :return: The profile, as a dict
+        """
+        wall_time = time.time() - self._start_wall
+        cpu_time = time.process_time() - self._start_cpu
+        end_totals = _database_monitor.get_totals() if _database_monitor is not None else (0, 0, 0, 0)
+        self._db_client.deserialize_entity = self._deserialize_entity
+
+        documents_read, bytes_read, read_time, write_time = (
+            end - start for start, end in zip(self._start_totals, end_totals))
+        self._profile = {
+            'wall_time': wall_time,
+            'cpu_time': cpu_time,
+            'peak_memory': get_peak_memory() if self._measure_memory else None,
+            'documents_read': documents_read,
+            'bytes_read': bytes_read,
+            'phases': {
+                'deserialize': self._deserialize_time,
+                'database_read': read_time,
+                'database_write': write_time,
+                'compute': max(0, wall_time - self._deserialize_time - read_time - write_time)
+            }
+        }
+        return self._profile
+
+    def _timed_deserialize(self, deserialize_entity):
+        """
+        Wrap the deserialize method of the database client, to time how long it takes.
+        Entities often deserialize other entities, only the outermost call is counted.
+        :param deserialize_entity: The deserialize_entity method
+        :return: A wrapped function with the same arguments
+        """
+        def wrapper(*args, **kwargs):
+            self._deserialize_depth += 1
+            start = time.time()
+            try:
+                return deserialize_entity(*args, **kwargs)
+            finally:
+                self._deserialize_depth -= 1
+                if self._deserialize_depth == 0:
+                    self._deserialize_time += time.time() - start
+        return wrapper
+
+
+def reset_peak_memory():
+    """
+    Reset the peak resident memory of this process to its current memory, so that the next peak is for
+    whatever runs from now on. This is only possible on linux.
+    :return: True if the peak was reset, False if it cannot be reset on this platform
+    """
+    try:
+        with open(_CLEAR_REFS_FILE, 'w') as clear_refs:
+            clear_refs.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def get_peak_memory():
+    """
+    Get the peak resident memory of this process, since it started or it was last reset by reset_peak_memory.
+    :return: The peak memory in bytes, or None if it cannot be measured on this platform
+    """
+    try:
+        with open(_STATUS_FILE, 'r') as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    # Given in kilobytes
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on linux, and is never reset
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def get_task_group(task):
+    """
+    Get the group a task belongs to for the task stats, which is the task type and the id of what it is for.
+    This is the system for tasks that run a system, the trainee for tasks that train one,
+    the benchmark for tasks that benchmark a trial, the comparison for comparison tasks, and None otherwise.
+    :param task: The task
+    :return: The task type, as stored in '_type', and the group id, as a tuple
+    """
+    group_id = None
+    if isinstance(task, run_system_task.RunSystemTask):
+        group_id = task.system
+    elif isinstance(task, train_system_task.TrainSystemTask):
+        group_id = task.trainee
+    elif isinstance(task, benchmark_trial_task.BenchmarkTrialTask):
+        group_id = task.benchmark
+    elif isinstance(task, (compare_trials_task.CompareTrialTask, compare_benchmarks_task.CompareBenchmarksTask)):
+        group_id = task.comparison
+    return type(task).__module__ + '.' + type(task).__name__, group_id
+
+
+def record_task_stats(collection, task_type, group_id, profile):
+    """
+    Add a task profile to the aggregate statistics for tasks in the same group, see get_task_group.
+    The statistics are running totals, so the average of any value is the total divided by the count.
+    The wall time and peak memory of the most recent runs are also kept, see NUM_RECENT_SAMPLES,
+    leaving out tasks where the peak memory could not be measured.
+    :param collection: The task stats collection
+    :param task_type: The type of the task, as stored in '_type'
+    :param group_id: The id of the system, benchmark or comparison the task was for, see get_task_group
+    :param profile: The profile from a TaskProfiler
+    :return: void
+    """
+    increments = {
+        'count': 1,
+        'total_wall_time': profile['wall_time'],
+        'total_cpu_time': profile['cpu_time'],
+        'total_documents_read': profile['documents_read'],
+        'total_bytes_read': profile['bytes_read']
+    }
+    for phase, phase_time in profile['phases'].items():
+        increments['total_phases.' + phase] = phase_time
+    maximums = {'max_wall_time': profile['wall_time']}
+    recent = {'recent_wall_times': {'$each': [profile['wall_time']], '$slice': -NUM_RECENT_SAMPLES}}
+    if profile['peak_memory'] is not None:
+        maximums['max_peak_memory'] = profile['peak_memory']
+        recent['recent_peak_memory'] = {'$each': [profile['peak_memory']], '$slice': -NUM_RECENT_SAMPLES}
+
+    # Track how well the requested resources matched what the task actually used
+    if 'prediction_error' in profile:
+        for resource_name in ['duration', 'memory']:
+            ratio = profile['prediction_error'].get(resource_name + '_ratio', None)
+            if ratio is not None:
+                increments['num_{0}_estimates'.format(resource_name)] = 1
+                increments['total_{0}_ratio'.format(resource_name)] = ratio
+                increments['num_{0}_overruns'.format(resource_name)] = 1 if ratio > 1 else 0
+    collection.update_one({'task_type': task_type, 'group_id': group_id},
+                          {'$inc': increments, '$max': maximums, '$push': recent}, upsert=True)
@@ -0,0 +1,199 @@
+import time
+import logging
+import datetime
+import pymongo
+import batch_analysis.task
+import batch_analysis.task_lease
+import run_task
+
+
+GENERATE_DATASET_TYPE = 'batch_analysis.tasks.generate_dataset_task.GenerateDatasetTask'
+
+
+class TaskWorker:
+    """
+    A long-lived worker, which pulls tasks from the database and runs them in this process.
+    Unlike the job systems, which have the scheduler push each task to a new 'run_task.py' process,
+    a worker only loads the configuration, connects to the database, and imports everything once,
+    and then keeps running tasks until it runs out.
+    This makes it much cheaper to run lots of small tasks, like benchmarks and comparisons.
+
+    Tasks are claimed atomically, so any number of workers can run at the same time,
+    and a worker will only claim tasks that fit within its resources.
+    Each claimed task records the node id of the worker, and a lease expiry time.
+    Tasks that fail are not claimed again until a retry delay has passed, which doubles each time they fail,
+    so that a task that always fails does not stop the worker running anything else.
+    """
+
+    def __init__(self, db_client, config):
+        """
+        Takes configuration parameters in a dict with the following format:
+        {
+            'node_id': 'name_of_worker_node'
+            'num_cpus': 4                       # Default 1
+            'num_gpus': 1                       # Default 0
+            'memory': '16GB'                    # Default is not to limit memory
+            'can_generate_dataset': True        # Can tasks using the simulators be run, default False
+            'task_types': ['batch_analysis.tasks.benchmark_trial_task.BenchmarkTrialTask']   # Default all types
+            'lease_duration': 600               # Seconds each claimed task is leased for, default 600
+            'poll_interval': 5                  # Seconds to wait when there are no tasks, default 5
+            'retry_delay': 60                   # Seconds before retrying a task that failed once, default 60
+            'max_retry_delay': 86400            # The longest to wait before retrying a failed task, default 1 day
+        }
+        :param db_client: The database client, shared by all the tasks run by this worker
+        :param config: A dict of configuration parameters
+        """
+        self._db_client = db_client
+        self._node_id = config['node_id'] if 'node_id' in config else 'task-worker'
+        self._num_cpus = int(config['num_cpus']) if 'num_cpus' in config else 1
+        self._num_gpus = int(config['num_gpus']) if 'num_gpus' in config else 0
+        self._memory = batch_analysis.task.parse_memory(config['memory']) if 'memory' in config else None
+        self._can_generate_dataset = bool(config['can_generate_dataset']) if 'can_generate_dataset' in config \
+            else False
+        self._task_types = list(config['task_types']) if 'task_types' in config else None
+        self._lease_duration = float(config['lease_duration']) if 'lease_duration' in config \
+            else batch_analysis.task_lease.DEFAULT_LEASE_DURATION
+        self._poll_interval = float(config['poll_interval']) if 'poll_interval' in config else 5
+        self._retry_delay = float(config['retry_delay']) if 'retry_delay' in config else 60
+        self._max_retry_delay = float(config['max_retry_delay']) if 'max_retry_delay' in config else 86400
+        self._next_job_id = 0
+
+    @property
+    def node_id(self):
+        return self._node_id
+
+    def get_claim_query(self):
+        """
+        Get the database query matching the tasks this worker can run.
+        That is, unstarted tasks of the allowed types, whose requirements fit within the worker's resources,
+        and which are not waiting to be retried after failing.
+        :return: A mongodb query
+        """
+        query = {
+            'state': batch_analysis.task.JobState.UNSTARTED.value,
+            'retry_after': {'$not': {'$gt': datetime.datetime.utcnow()}},
+            'num_cpus': {'$lte': self._num_cpus},
+            'num_gpus': {'$lte': self._num_gpus}
+        }
+        if self._memory is not None:
+            # Tasks without a memory requirement in bytes are assumed to fit
+            query['$or'] = [{'memory_bytes': {'$lte': self._memory}}, {'memory_bytes': None}]
+        if self._task_types is not None:
+            query['_type'] = {'$in': [task_type for task_type in self._task_types
+                                      if self._can_generate_dataset or task_type != GENERATE_DATASET_TYPE]}
+        elif not self._can_generate_dataset:
+            query['_type'] = {'$ne': GENERATE_DATASET_TYPE}
+        return query
+
+    def claim_task(self):
+        """
+        Atomically claim the oldest unstarted task this worker can run, marking it as running on this node.
+        No other worker can claim the same task.
+        :return: The claimed task, or None if there were no tasks available
+        """
+        s_task = self._claim_serialized_task()
+        if s_task is None:
+            return None
+        return self._load_claimed_task(s_task)
+
+    def run_next_task(self):
+        """
+        Claim and run a single task, if one is available.
+        If the task fails, it will not be claimed again until its retry delay has passed.
+        :return: True if a task was claimed, False if there were no tasks to run
+        """
+        s_task = self._claim_serialized_task()
+        if s_task is None:
+            return False
+        task = self._load_claimed_task(s_task)
+        if task is None:
+            return True
+        logging.getLogger(__name__).info("Worker {0} running {1} {2}".format(
+            self._node_id, type(task).__name__, task.identifier))
+        run_task.run_loaded_task(task, self._db_client, lease_duration=self._lease_duration)
+        if task.is_unstarted:
+            self._record_failure(task.identifier, s_task['num_failures'] if 'num_failures' in s_task else 0)
+        return True
+
+    def get_retry_delay(self, num_failures):
+        """
+        Get how long to wait before retrying a task that has failed a number of times.
+        :param num_failures: The number of times the task has failed, including the latest failure
+        :return: The delay in seconds
+        """
+        return min(self._max_retry_delay, self._retry_delay * 2 ** max(0, num_failures - 1))
+
+    def _claim_serialized_task(self):
+        """
+        Atomically claim the oldest task that matches the claim query
+        :return: The serialized task, or None if there were no tasks available
+        """
+        s_task = self._db_client.tasks_collection.find_one_and_update(
+            self.get_claim_query(),
+            {'$set': {
+                'state': batch_analysis.task.JobState.RUNNING.value,
+                'node_id': self._node_id,
+                'job_id': self._next_job_id,
+                'lease_expiry': batch_analysis.task_lease.get_lease_expiry(self._lease_duration)
+            }},
+            sort=[('_id', pymongo.ASCENDING)],
+            return_document=pymongo.ReturnDocument.AFTER
+        )
+        if s_task is not None:
+            self._next_job_id += 1
+        return s_task
+
+    def _load_claimed_task(self, s_task):
+        """
+        Deserialize a claimed task.
+        If it cannot be deserialized, it is put back straight away, rather than left running until its lease expires.
+        :param s_task: The serialized task
+        :return: The task object, or None if it could not be deserialized
+        """
+        task = self._db_client.deserialize_entity(s_task)
+        if task is None:
+            logging.getLogger(__name__).error("Could not deserialize claimed task {0}".format(s_task['_id']))
+            self._record_failure(s_task['_id'], s_task['num_failures'] if 'num_failures' in s_task else 0,
+                                 reset_state=True)
+        return task
+
+    def _record_failure(self, task_id, num_failures, reset_state=False):
+        """
+        Record that a claimed task failed, so that it is not claimed again until the retry delay has passed.
+        :param task_id: The id of the task that failed
+        :param num_failures: The number of times the task had failed before this
+        :param reset_state: Also put the task back in the unstarted state, for tasks that never ran
+        :return: void
+        """
+        num_failures += 1
+        retry_delay = self.get_retry_delay(num_failures)
+        update = {'$set': {
+            'num_failures': num_failures,
+            'retry_after': datetime.datetime.utcnow() + datetime.timedelta(seconds=retry_delay)
+        }}
+        if reset_state:
+            update['$set']['state'] = batch_analysis.task.JobState.UNSTARTED.value
+            update['$unset'] = {'node_id': True, 'job_id': True, 'lease_expiry': True}
+        self._db_client.tasks_collection.update_one({'_id': task_id}, update)
+        logging.getLogger(__name__).warning("Task {0} has failed {1} times, retrying in {2:.0f} seconds".format(
+            task_id, num_failures, retry_delay))
+
+    def run(self, max_tasks=None, idle_timeout=None):
+        """
+        Keep claiming and running tasks.
+        :param max_tasks: The maximum number of tasks to run before stopping. Default None, which never stops.
+        :param idle_timeout: Stop after there have been no tasks for this many seconds.
+        Default None, which keeps waiting for new tasks.
+        :return: The number of tasks run
+        """
+        num_run = 0
+        idle_since = time.time()
+        while max_tasks is None or num_run < max_tasks:
+            if self.run_next_task():
+                num_run += 1
+                idle_since = time.time()
+            elif idle_timeout is not None and time.time() - idle_since >= idle_timeout:
+                break
+            else:
+                time.sleep(self._poll_interval)
+        return num_run
@@ -0,0 +1,88 @@
+import batch_analysis.task
+
+
+class MultiBenchmarkTrialTask(batch_analysis.task.Task):
+    """
+    A task for benchmarking a trial result with several benchmarks at once.
+    The trial result is loaded only once, and its trajectories are shared between the benchmarks.
+    Result is a list of BenchmarkResult ids, in the same order as the benchmarks.
+    """
+    def __init__(self, trial_result_id, benchmark_ids, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._trial_result_id = trial_result_id
+        self._benchmark_ids = list(benchmark_ids)
+
+    @property
+    def trial_result(self):
+        return self._trial_result_id
+
+    @property
+    def benchmarks(self):
+        return self._benchmark_ids
+
+    def get_benchmark_result(self, benchmark_id):
+        """
+        Get the result id for a particular benchmark, once the task is finished.
+        :param benchmark_id: The id of one of the benchmarks
+        :return: The id of the benchmark result, or None if the task is not finished
+        """
+        if not self.is_finished or benchmark_id not in self._benchmark_ids:
+            return None
+        return self.result[self._benchmark_ids.index(benchmark_id)]
+
+    def run_task(self, db_client):
+        import logging
+        import traceback
+        import core.benchmark
+        import util.database_helpers as dh
+
+        trial_result = dh.load_object(db_client, db_client.trials_collection, self.trial_result)
+        benchmarks = [dh.load_object(db_client, db_client.benchmarks_collection, benchmark_id)
+                      for benchmark_id in self.benchmarks]
+
+        if trial_result is None:
+            logging.getLogger(__name__).error("Could not deserialize trial result {0}".format(self.trial_result))
+            self.mark_job_failed()
+            return
+        for benchmark_id, benchmark in zip(self.benchmarks, benchmarks):
+            if benchmark is None:
+                logging.getLogger(__name__).error("Could not deserialize benchmark {0}".format(benchmark_id))
+                self.mark_job_failed()
+                return
+            elif not benchmark.is_trial_appropriate(trial_result):
+                logging.getLogger(__name__).error("Benchmark {0} cannot assess trial {1}".format(
+                    benchmark_id, self.trial_result))
+                self.mark_job_failed()
+                return
+
+        logging.getLogger(__name__).info("Benchmarking result {0} with benchmarks {1}".format(self.trial_result,
+                                                                                              self.benchmarks))
+        try:
+            benchmark_results = core.benchmark.benchmark_trial(trial_result, benchmarks)
+        except Exception:
+            benchmark_results = None
+        if benchmark_results is None or any(result is None for result in benchmark_results):
+            logging.getLogger(__name__).error("Exception while benchmarking {0} with benchmarks {1}:\n{2}".format(
+                self.trial_result, self.benchmarks, traceback.format_exc()))
+            self.mark_job_failed()
+        else:
+            benchmark_result_ids = [db_client.results_collection.insert(benchmark_result.serialize())
+                                    for benchmark_result in benchmark_results]
+            logging.getLogger(__name__).info("Successfully benchmarked trial {0} with benchmarks {1},"
+                                             "producing results {2}".format(self.trial_result, self.benchmarks,
+                                                                            benchmark_result_ids))
+            self.mark_job_complete(benchmark_result_ids)
+
+    def serialize(self):
+        serialized = super().serialize()
+        serialized['trial_result_id'] = self.trial_result
+        serialized['benchmark_ids'] = self.benchmarks
+        return serialized
+
+    @classmethod
+    def deserialize(cls, serialized_representation, db_client, **kwargs):
+        if 'trial_result_id' in serialized_representation:
+            kwargs['trial_result_id'] = serialized_representation['trial_result_id']
+        if 'benchmark_ids' in serialized_representation:
+            kwargs['benchmark_ids'] = serialized_representation['benchmark_ids']
+        return super().deserialize(serialized_representation, db_client, **kwargs)
@@ -0,0 +1,123 @@
+import unittest
+import unittest.mock as mock
+import bson
+import pymongo.collection
+import batch_analysis.task
+import batch_analysis.tasks.run_system_task as run_system_task
+import batch_analysis.tasks.benchmark_trial_task as benchmark_trial_task
+import batch_analysis.resource_estimator as resource_estimator
+
+
+RUN_SYSTEM_TYPE = 'batch_analysis.tasks.run_system_task.RunSystemTask'
+BENCHMARK_TRIAL_TYPE = 'batch_analysis.tasks.benchmark_trial_task.BenchmarkTrialTask'
+
+
+class TestResourceEstimator(unittest.TestCase):
+
+    def setUp(self):
+        self.system_id = bson.ObjectId()
+        self.mock_collection = mock.create_autospec(pymongo.collection.Collection)
+        self.mock_collection.find.return_value = [{
+            'task_type': RUN_SYSTEM_TYPE,
+            'group_id': self.system_id,
+            'recent_wall_times': [3600 for _ in range(5)],
+            'recent_peak_memory': [4 * 1024 ** 3 for _ in range(5)]
+        }]
+
+    def test_works_with_empty_config(self):
+        resource_estimator.ResourceEstimator(self.mock_collection, {})
+
+    def test_estimates_from_recorded_runs_with_margins(self):
+        subject = resource_estimator.ResourceEstimator(self.mock_collection, {'duration_margin': 1.5,
+                                                                              'memory_margin': 1.25})
+        subject.refresh()
+        task = run_system_task.RunSystemTask(self.system_id, bson.ObjectId())
+        memory_requirements, expected_duration = subject.estimate(task)
+        self.assertEqual('1:30:00', expected_duration)
+        self.assertEqual(5 * 1024 ** 3, batch_analysis.task.parse_memory(memory_requirements))
+
+    def test_estimates_are_not_inflated_by_one_large_run(self):
+        self.mock_collection.find.return_value[0]['recent_wall_times'] = [60 for _ in range(49)] + [36000]
+        self.mock_collection.find.return_value[0]['recent_peak_memory'] = [1024 ** 3 for _ in range(49)] + \
+                                                                         [64 * 1024 ** 3]
+        subject = resource_estimator.ResourceEstimator(self.mock_collection, {'duration_margin': 1,
+                                                                              'memory_margin': 1,
+                                                                              'min_duration': '0:00:01',
+                                                                              'min_memory': '1MB'})
+        subject.refresh()
+        task = run_system_task.RunSystemTask(self.system_id, bson.ObjectId())
+        self.assertEqual(('1024MB', '0:01:00'), subject.estimate(task))
+
+    def test_default_minimum_duration_allows_short_tasks_to_be_batched(self):
+        self.mock_collection.find.return_value[0]['recent_wall_times'] = [0.5 for _ in range(5)]
+        subject = resource_estimator.ResourceEstimator(self.mock_collection, {})
+        subject.refresh()
+        task = run_system_task.RunSystemTask(self.system_id, bson.ObjectId())
+        self.assertLessEqual(batch_analysis.task.parse_duration(subject.estimate(task)[1]), 60)
+
+    def test_estimates_each_resource_only_if_it_has_enough_samples(self):
+        self.mock_collection.find.return_value[0]['recent_peak_memory'] = [4 * 1024 ** 3]
+        subject = resource_estimator.ResourceEstimator(self.mock_collection, {})
+        subject.refresh()
+        task = run_system_task.RunSystemTask(self.system_id, bson.ObjectId(), memory_requirements='2GB')
+        memory_requirements, expected_duration = subject.estimate(task)
+        self.assertEqual('2GB', memory_requirements)
+        self.assertEqual('1:30:00', expected_duration)
+
+    def test_estimates_are_at_least_the_minimum(self):
+        subject = resource_estimator.ResourceEstimator(self.mock_collection, {'min_duration': '4:00:00',
+                                                                              'min_memory': '8GB'})
+        subject.refresh()
+        task = run_system_task.RunSystemTask(self.system_id, bson.ObjectId())
+        self.assertEqual(('8192MB', '4:00:00'), subject.estimate(task))
+
+    def test_keeps_task_requirements_without_enough_history(self):
+        subject = resource_estimator.ResourceEstimator(self.mock_collection, {'min_samples': 10})
+        subject.refresh()
+        task = run_system_task.RunSystemTask(self.system_id, bson.ObjectId(), memory_requirements='2GB',
+                                             expected_duration='3:00:00')
+        self.assertEqual(('2GB', '3:00:00'), subject.estimate(task))
+        subject = resource_estimator.ResourceEstimator(self.mock_collection, {})
+        subject.refresh()
+        task = run_system_task.RunSystemTask(bson.ObjectId(), bson.ObjectId(), memory_requirements='2GB',
+                                             expected_duration='3:00:00')
+        self.assertEqual(('2GB', '3:00:00'), subject.estimate(task))
+
+    def test_estimates_each_benchmark_separately(self):
+        fast_benchmark_id = bson.ObjectId()
+        slow_benchmark_id = bson.ObjectId()
+        self.mock_collection.find.return_value = [{
+            'task_type': BENCHMARK_TRIAL_TYPE,
+            'group_id': fast_benchmark_id,
+            'recent_wall_times': [60 for _ in range(5)],
+            'recent_peak_memory': [1024 ** 3 for _ in range(5)]
+        }, {
+            'task_type': BENCHMARK_TRIAL_TYPE,
+            'group_id': slow_benchmark_id,
+            'recent_wall_times': [3600 for _ in range(5)],
+            'recent_peak_memory': [8 * 1024 ** 3 for _ in range(5)]
+        }]
+        subject = resource_estimator.ResourceEstimator(self.mock_collection, {'duration_margin': 1,
+                                                                              'memory_margin': 1,
+                                                                              'min_duration': '0:00:01',
+                                                                              'min_memory': '1MB'})
+        subject.refresh()
+        self.assertEqual(('1024MB', '0:01:00'), subject.estimate(
+            benchmark_trial_task.BenchmarkTrialTask(bson.ObjectId(), fast_benchmark_id)))
+        self.assertEqual(('8192MB', '1:00:00'), subject.estimate(
+            benchmark_trial_task.BenchmarkTrialTask(bson.ObjectId(), slow_benchmark_id)))
+
+
+class TestGetPredictionError(unittest.TestCase):
+
+    def test_compares_used_resources_with_requested(self):
+        task = batch_analysis.task.Task(memory_requirements='2GB', expected_duration='1:00:00')
+        prediction_error = resource_estimator.get_prediction_error(task, {'wall_time': 5400,
+                                                                          'peak_memory': 1024 ** 3})
+        self.assertEqual(1.5, prediction_error['duration_ratio'])
+        self.assertEqual(0.5, prediction_error['memory_ratio'])
+
+    def test_leaves_out_unmeasured_resources(self):
+        task = batch_analysis.task.Task(memory_requirements='lots', expected_duration='1:00:00')
+        prediction_error = resource_estimator.get_prediction_error(task, {'wall_time': 1800, 'peak_memory': None})
+        self.assertEqual({'duration_ratio': 0.5}, prediction_error)
@@ -0,0 +1,139 @@
+import unittest
+import unittest.mock as mock
+import bson
+import pymongo.collection
+import database.client
+import batch_analysis.task
+import batch_analysis.experiment
+import batch_analysis.job_system
+import batch_analysis.scheduler_daemon as scheduler_daemon
+
+
+class TestSchedulerDaemon(unittest.TestCase):
+
+    def setUp(self):
+        self.s_experiments = []
+        self.experiments = {}
+        self.num_finished = 0
+
+        self.mock_experiments_collection = mock.create_autospec(pymongo.collection.Collection)
+        self.mock_experiments_collection.find.side_effect = self.find_experiments
+        self.mock_tasks_collection = mock.create_autospec(pymongo.collection.Collection)
+        self.mock_tasks_collection.find.return_value = []
+        self.mock_tasks_collection.count_documents.side_effect = lambda *_, **__: self.num_finished
+        self.mock_tasks_collection.update_many.return_value = mock.Mock(modified_count=0)
+        self.mock_db_client = mock.create_autospec(database.client.DatabaseClient)
+        self.mock_db_client.experiments_collection = self.mock_experiments_collection
+        self.mock_db_client.tasks_collection = self.mock_tasks_collection
+        self.mock_db_client.deserialize_entity.side_effect = lambda s_experiment: self.experiments[s_experiment['_id']]
+        self.mock_job_system = mock.create_autospec(batch_analysis.job_system.JobSystem)
+        self.mock_job_system.is_blocking = False
+
+    def find_experiments(self, query, *args, **kwargs):
+        return [s_experiment for s_experiment in self.s_experiments
+                if s_experiment['_id'] not in query['_id']['$nin']]
+
+    def add_experiment(self):
+        id_ = bson.ObjectId()
+        experiment = mock.create_autospec(batch_analysis.experiment.Experiment)
+        experiment.identifier = id_
+        self.s_experiments.append({'_id': id_})
+        self.experiments[id_] = experiment
+        return experiment
+
+    def test_works_with_empty_config(self):
+        scheduler_daemon.SchedulerDaemon(self.mock_db_client, self.mock_job_system, {})
+
+    def test_load_new_experiments_only_loads_each_experiment_once(self):
+        experiments = [self.add_experiment() for _ in range(3)]
+        subject = scheduler_daemon.SchedulerDaemon(self.mock_db_client, self.mock_job_system, {})
+        self.assertEqual(3, subject.load_new_experiments())
+        self.assertEqual(0, subject.load_new_experiments())
+        new_experiment = self.add_experiment()
+        self.assertEqual(1, subject.load_new_experiments())
+        self.assertEqual(set(experiments + [new_experiment]), set(subject.experiments))
+        for experiment in experiments + [new_experiment]:
+            self.assertEqual(1, experiment.do_imports.call_count)
+
+    def test_schedule_experiments_skips_if_nothing_changed(self):
+        experiment = self.add_experiment()
+        subject = scheduler_daemon.SchedulerDaemon(self.mock_db_client, self.mock_job_system, {})
+        subject.load_new_experiments()
+        self.assertTrue(subject.schedule_experiments())
+        self.assertFalse(subject.schedule_experiments())
+        self.assertEqual(1, experiment.schedule_tasks.call_count)
+        self.assertTrue(subject.schedule_experiments(force=True))
+        self.assertEqual(2, experiment.schedule_tasks.call_count)
+
+    def test_schedule_experiments_runs_when_tasks_finish(self):
+        experiment = self.add_experiment()
+        subject = scheduler_daemon.SchedulerDaemon(self.mock_db_client, self.mock_job_system, {})
+        subject.load_new_experiments()
+        subject.schedule_experiments()
+        self.num_finished += 1
+        self.assertTrue(subject.schedule_experiments())
+        self.assertEqual(2, experiment.schedule_tasks.call_count)
+        self.mock_tasks_collection.count_documents.assert_called_with({
+            'state': batch_analysis.task.JobState.DONE.value
+        })
+
+    def test_schedule_experiments_runs_after_imports(self):
+        experiment = self.add_experiment()
+        subject = scheduler_daemon.SchedulerDaemon(self.mock_db_client, self.mock_job_system, {})
+        subject.load_new_experiments()
+        subject.schedule_experiments()
+        subject.do_imports()
+        self.assertTrue(subject.schedule_experiments())
+        self.assertEqual(2, experiment.schedule_tasks.call_count)
+
+    def test_exception_in_one_experiment_does_not_stop_others(self):
+        broken_experiment = self.add_experiment()
+        broken_experiment.schedule_tasks.side_effect = ValueError('Broken experiment')
+        experiment = self.add_experiment()
+        subject = scheduler_daemon.SchedulerDaemon(self.mock_db_client, self.mock_job_system, {})
+        subject.load_new_experiments()
+        subject.schedule_experiments()
+        self.assertTrue(experiment.schedule_tasks.called)
+        self.assertTrue(experiment.save_updates.called)
+
+    def test_run_once_imports_and_schedules_everything(self):
+        experiment = self.add_experiment()
+        subject = scheduler_daemon.SchedulerDaemon(self.mock_db_client, self.mock_job_system, {})
+        subject.run_once()
+        self.assertEqual(1, experiment.do_imports.call_count)
+        self.assertEqual(1, experiment.schedule_tasks.call_count)
+        self.assertTrue(self.mock_job_system.run_queued_jobs.called)
+        self.assertTrue(self.mock_job_system.wait_for_jobs.called)
+
+    def test_run_uses_separate_rates_for_each_pass(self):
+        experiment = self.add_experiment()
+        subject = scheduler_daemon.SchedulerDaemon(self.mock_db_client, self.mock_job_system, {
+            'import_interval': 3600,
+            'schedule_interval': 0,
+            'task_interval': 0,
+            'poll_interval': 0
+        })
+        subject.run(max_passes=4)
+        self.assertEqual(1, experiment.do_imports.call_count)
+        self.assertEqual(1, experiment.schedule_tasks.call_count)    # No tasks finished, so only scheduled once
+        self.assertEqual(4, self.mock_job_system.run_queued_jobs.call_count)
+
+    def test_run_rejects_blocking_job_system(self):
+        self.mock_job_system.is_blocking = True
+        subject = scheduler_daemon.SchedulerDaemon(self.mock_db_client, self.mock_job_system, {})
+        with self.assertRaises(ValueError):
+            subject.run(max_passes=1)
+        self.assertFalse(self.mock_job_system.run_queued_jobs.called)
+
+    def test_run_once_allows_blocking_job_system(self):
+        self.mock_job_system.is_blocking = True
+        subject = scheduler_daemon.SchedulerDaemon(self.mock_db_client, self.mock_job_system, {})
+        subject.run_once()
+        self.assertTrue(self.mock_job_system.run_queued_jobs.called)
+
+    def test_schedule_tasks_does_not_push_tasks_if_disabled(self):
+        subject = scheduler_daemon.SchedulerDaemon(self.mock_db_client, self.mock_job_system, {'push_tasks': False})
+        subject.schedule_tasks()
+        self.assertFalse(self.mock_job_system.run_task.called)
+        self.assertFalse(self.mock_job_system.run_queued_jobs.called)
+        self.assertTrue(self.mock_tasks_collection.update_many.called)     # Expired leases are still reclaimed
@@ -46,6 +46,7 @@ class TestTask(database.tests.test_entity.EntityContract, unittest.TestCase):
         self.assertEqual(task1.num_gpus, task2.num_gpus)
         self.assertEqual(task1.memory_requirements, task2.memory_requirements)
         self.assertEqual(task1.expected_duration, task2.expected_duration)
+        self.assertEqual(task1.dependencies, task2.dependencies)
 
     def test_mark_job_started_changes_unstarted_to_running(self):
         subject = task.Task(state=task.JobState.UNSTARTED)
@@ -213,3 +214,92 @@ class TestTask(database.tests.test_entity.EntityContract, unittest.TestCase):
                 self.assertNotEqual({}, subject._updates['$unset'])
                 unset_keys = set(subject._updates['$unset'].keys())
             self.assertEqual(set(), set_keys & unset_keys)
+
+    def test_serialize_includes_memory_bytes(self):
+        subject = self.make_instance(memory_requirements='2GB')
+        self.assertEqual(2 * 1024 ** 3, subject.memory_bytes)
+        self.assertEqual(2 * 1024 ** 3, subject.serialize()['memory_bytes'])
+
+    def test_serialize_and_deserialize_dependencies(self):
+        dependencies = {'trial_result_id': bson.ObjectId(), 'benchmark_result_id': bson.ObjectId()}
+        subject = self.make_instance(state=task.JobState.WAITING, dependencies=dependencies)
+        self.assertTrue(subject.is_waiting)
+        self.assertFalse(subject.is_unstarted)
+        s_task = subject.serialize()
+        self.assertEqual(dependencies, s_task['dependencies'])
+        self.assertEqual(set(dependencies.values()), set(s_task['dependency_ids']))
+        self.assertEqual(dependencies, task.Task.deserialize(s_task, self.create_mock_db_client()).dependencies)
+
+    def test_serialize_leaves_out_empty_dependencies(self):
+        s_task = self.make_instance().serialize()
+        self.assertNotIn('dependencies', s_task)
+        self.assertNotIn('dependency_ids', s_task)
+
+    def test_state_changes_clear_the_lease(self):
+        subject = self.make_instance(state=task.JobState.RUNNING)
+        subject.mark_job_failed()
+        self.assertIn('lease_expiry', subject._updates['$unset'])
+        subject.mark_job_started('test', 15)
+        self.assertIn('lease_expiry', subject._updates['$unset'])
+        subject.mark_job_complete(bson.ObjectId())
+        self.assertIn('lease_expiry', subject._updates['$unset'])
+
+    def test_set_requirements_changes_unstarted_tasks(self):
+        subject = self.make_instance(state=task.JobState.UNSTARTED, memory_requirements='3GB',
+                                     expected_duration='1:00:00')
+        subject.set_requirements('6GB', '2:30:00')
+        self.assertEqual('6GB', subject.memory_requirements)
+        self.assertEqual('2:30:00', subject.expected_duration)
+        self.assertEqual('6GB', subject._updates['$set']['memory_requirements'])
+        self.assertEqual(6 * 1024 ** 3, subject._updates['$set']['memory_bytes'])
+        self.assertEqual('2:30:00', subject._updates['$set']['expected_duration'])
+
+    def test_set_requirements_doesnt_affect_running_tasks(self):
+        subject = self.make_instance(state=task.JobState.RUNNING, memory_requirements='3GB',
+                                     expected_duration='1:00:00')
+        subject.set_requirements('6GB', '2:30:00')
+        self.assertEqual('3GB', subject.memory_requirements)
+        self.assertEqual('1:00:00', subject.expected_duration)
+        self.assertEqual({}, subject._updates)
+
+
+class TestParseMemory(unittest.TestCase):
+
+    def test_parses_each_unit(self):
+        self.assertEqual(3 * 1024 ** 3, task.parse_memory('3GB'))
+        self.assertEqual(512 * 1024 ** 2, task.parse_memory('512MB'))
+        self.assertEqual(2 * 1024 ** 4, task.parse_memory('2TB'))
+        self.assertEqual(100 * 1024, task.parse_memory('100KB'))
+
+    def test_format_memory_is_inverse_of_parse(self):
+        for num_bytes in [1024 ** 2, 512 * 1024 ** 2, 3 * 1024 ** 3]:
+            self.assertEqual(num_bytes, task.parse_memory(task.format_memory(num_bytes)))
+
+    def test_format_memory_rounds_up(self):
+        self.assertEqual('2MB', task.format_memory(1024 ** 2 + 1))
+
+    def test_returns_none_for_invalid_requirements(self):
+        self.assertIsNone(task.parse_memory('lots'))
+        self.assertIsNone(task.parse_memory('3 GB'))
+        self.assertIsNone(task.parse_memory(3))
+        self.assertIsNone(task.parse_memory(None))
+
+
+class TestDurations(unittest.TestCase):
+
+    def test_parse_duration(self):
+        self.assertEqual(3600, task.parse_duration('1:00:00'))
+        self.assertEqual(90061, task.parse_duration('25:01:01'))
+        self.assertEqual(59, task.parse_duration('0:00:59'))
+
+    def test_parse_duration_returns_none_for_invalid_durations(self):
+        self.assertIsNone(task.parse_duration('1:0:0'))
+        self.assertIsNone(task.parse_duration('an hour'))
+        self.assertIsNone(task.parse_duration(3600))
+
+    def test_format_duration_is_inverse_of_parse(self):
+        for duration in ['1:00:00', '25:01:01', '0:00:59', '123:45:06']:
+            self.assertEqual(duration, task.format_duration(task.parse_duration(duration)))
+
+    def test_format_duration_rounds_up(self):
+        self.assertEqual('0:00:02', task.format_duration(1.2))
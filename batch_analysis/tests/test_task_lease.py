@@ -0,0 +1,39 @@
+import unittest
+import unittest.mock as mock
+import time
+import datetime
+import bson
+import pymongo.collection
+import batch_analysis.task
+import batch_analysis.task_lease as task_lease
+
+
+class TestLeaseHeartbeat(unittest.TestCase):
+
+    def test_renew_extends_lease_on_running_task(self):
+        mock_collection = mock.create_autospec(pymongo.collection.Collection)
+        task_id = bson.ObjectId()
+        subject = task_lease.LeaseHeartbeat(mock_collection, task_id, lease_duration=60)
+        subject.renew()
+        self.assertTrue(mock_collection.update_one.called)
+        query, update = mock_collection.update_one.call_args[0]
+        self.assertEqual({'_id': task_id, 'state': batch_analysis.task.JobState.RUNNING.value}, query)
+        self.assertGreater(update['$set']['lease_expiry'], datetime.datetime.utcnow() + datetime.timedelta(seconds=50))
+
+    def test_renew_does_not_raise_on_database_errors(self):
+        mock_collection = mock.create_autospec(pymongo.collection.Collection)
+        mock_collection.update_one.side_effect = pymongo.errors.AutoReconnect('Connection lost')
+        subject = task_lease.LeaseHeartbeat(mock_collection, bson.ObjectId())
+        subject.renew()
+
+    def test_start_renews_lease_until_stopped(self):
+        mock_collection = mock.create_autospec(pymongo.collection.Collection)
+        subject = task_lease.LeaseHeartbeat(mock_collection, bson.ObjectId(), interval=0.01)
+        subject.start()
+        self.assertTrue(mock_collection.update_one.called)
+        time.sleep(0.1)
+        subject.stop()
+        num_renewals = mock_collection.update_one.call_count
+        self.assertGreater(num_renewals, 2)
+        time.sleep(0.05)
+        self.assertEqual(num_renewals, mock_collection.update_one.call_count)
@@ -1,15 +1,20 @@
 import unittest
 import unittest.mock as mock
+import datetime
 import bson
 import pymongo.collection
 import database.client
+import batch_analysis.task
 import batch_analysis.task_manager as manager
+import batch_analysis.job_system
+import batch_analysis.resource_estimator
 
 import batch_analysis.tasks.import_dataset_task as import_dataset_task
 import batch_analysis.tasks.generate_dataset_task as generate_dataset_task
 import batch_analysis.tasks.train_system_task as train_system_task
 import batch_analysis.tasks.run_system_task as run_system_task
 import batch_analysis.tasks.benchmark_trial_task as benchmark_task
+import batch_analysis.tasks.multi_benchmark_trial_task as multi_benchmark_task
 # TODO: Tests for these two as well
 # import batch_analysis.tasks.compare_trials_task as compare_trials_task
 # import batch_analysis.tasks.compare_benchmarks_task as compare_benchmarks_task
@@ -227,6 +232,48 @@ class TestTaskManager(unittest.TestCase):
         self.assertIsInstance(result, benchmark_task.BenchmarkTrialTask)
         self.assertIsNone(result.identifier)
 
+    def test_get_multi_benchmark_task_checks_for_existing_task(self):
+        mock_collection = mock.create_autospec(pymongo.collection.Collection)
+        mock_db_client = mock.create_autospec(database.client.DatabaseClient)
+        subject = manager.TaskManager(mock_collection, mock_db_client)
+        trial_result_id = bson.ObjectId()
+        benchmark_ids = [bson.ObjectId() for _ in range(3)]
+        subject.get_multi_benchmark_task(trial_result_id, benchmark_ids)
+
+        self.assertTrue(mock_collection.find_one.called)
+        query = mock_collection.find_one.call_args[0][0]
+        self.assertIn('trial_result_id', query)
+        self.assertEqual(trial_result_id, query['trial_result_id'])
+        self.assertIn('benchmark_ids', query)
+        self.assertEqual(benchmark_ids, query['benchmark_ids'])
+
+    def test_get_multi_benchmark_task_returns_deserialized_existing(self):
+        s_task = {'_type': 'MultiBenchmarkTrialTask', '_id': bson.ObjectId()}
+        mock_entity = mock.MagicMock()
+        mock_collection = mock.create_autospec(pymongo.collection.Collection)
+        mock_collection.find_one.return_value = s_task
+        mock_db_client = mock.create_autospec(database.client.DatabaseClient)
+        mock_db_client.deserialize_entity.return_value = mock_entity
+        subject = manager.TaskManager(mock_collection, mock_db_client)
+
+        result = subject.get_multi_benchmark_task(bson.ObjectId(), [bson.ObjectId(), bson.ObjectId()])
+        self.assertTrue(mock_db_client.deserialize_entity.called)
+        self.assertEqual(s_task, mock_db_client.deserialize_entity.call_args[0][0])
+        self.assertEqual(mock_entity, result)
+
+    def test_get_multi_benchmark_task_returns_new_instance_if_no_existing(self):
+        mock_collection = mock.create_autospec(pymongo.collection.Collection)
+        mock_collection.find_one.return_value = None
+        mock_db_client = mock.create_autospec(database.client.DatabaseClient)
+        subject = manager.TaskManager(mock_collection, mock_db_client)
+        trial_result_id = bson.ObjectId()
+        benchmark_ids = [bson.ObjectId() for _ in range(3)]
+        result = subject.get_multi_benchmark_task(trial_result_id, benchmark_ids)
+        self.assertIsInstance(result, multi_benchmark_task.MultiBenchmarkTrialTask)
+        self.assertIsNone(result.identifier)
+        self.assertEqual(trial_result_id, result.trial_result)
+        self.assertEqual(benchmark_ids, result.benchmarks)
+
     def test_do_task_checks_import_benchmark_task_is_unique(self):
         mock_collection = mock.create_autospec(pymongo.collection.Collection)
         mock_db_client = mock.create_autospec(database.client.DatabaseClient)
@@ -291,6 +338,22 @@ class TestTaskManager(unittest.TestCase):
         self.assertIn('benchmark_id', query)
         self.assertEqual(benchmark_id, query['benchmark_id'])
 
+    def test_do_task_checks_multi_benchmark_task_is_unique(self):
+        mock_collection = mock.create_autospec(pymongo.collection.Collection)
+        mock_db_client = mock.create_autospec(database.client.DatabaseClient)
+        subject = manager.TaskManager(mock_collection, mock_db_client)
+        trial_result_id = bson.ObjectId()
+        benchmark_ids = [bson.ObjectId() for _ in range(3)]
+        task = multi_benchmark_task.MultiBenchmarkTrialTask(trial_result_id, benchmark_ids)
+        subject.do_task(task)
+
+        self.assertTrue(mock_collection.find.called)
+        query = mock_collection.find.call_args[0][0]
+        self.assertIn('trial_result_id', query)
+        self.assertEqual(trial_result_id, query['trial_result_id'])
+        self.assertIn('benchmark_ids', query)
+        self.assertEqual(benchmark_ids, query['benchmark_ids'])
+
     def test_do_task_saves_new_task(self):
         # Mockthe method chain on the pymongo cursor
         mock_cursor = mock.MagicMock()
@@ -310,3 +373,344 @@ class TestTaskManager(unittest.TestCase):
         s_task = task.serialize()
         del s_task['_id']   # This gets set after the insert call, clear it again
         self.assertEqual(s_task, mock_collection.insert.call_args[0][0])
+
+    def test_get_benchmark_task_with_dependencies_finds_existing_by_dependency(self):
+        mock_collection = mock.create_autospec(pymongo.collection.Collection)
+        mock_db_client = mock.create_autospec(database.client.DatabaseClient)
+        subject = manager.TaskManager(mock_collection, mock_db_client)
+        run_task_id = bson.ObjectId()
+        benchmark_id = bson.ObjectId()
+        subject.get_benchmark_task(None, benchmark_id, dependencies={'trial_result_id': run_task_id})
+
+        self.assertTrue(mock_collection.find_one.called)
+        query = mock_collection.find_one.call_args[0][0]
+        self.assertNotIn('trial_result_id', query)
+        self.assertEqual(run_task_id, query['dependencies.trial_result_id'])
+        self.assertEqual(benchmark_id, query['benchmark_id'])
+
+    def test_get_benchmark_task_with_dependencies_returns_waiting_task(self):
+        mock_collection = mock.create_autospec(pymongo.collection.Collection)
+        mock_collection.find_one.return_value = None
+        mock_db_client = mock.create_autospec(database.client.DatabaseClient)
+        subject = manager.TaskManager(mock_collection, mock_db_client)
+        dependencies = {'trial_result_id': bson.ObjectId()}
+        result = subject.get_benchmark_task(None, bson.ObjectId(), dependencies=dependencies)
+        self.assertIsInstance(result, benchmark_task.BenchmarkTrialTask)
+        self.assertTrue(result.is_waiting)
+        self.assertEqual(dependencies, result.dependencies)
+
+    def test_do_task_checks_waiting_task_is_unique_by_dependencies(self):
+        mock_cursor = mock.MagicMock()
+        mock_cursor.limit.return_value = mock_cursor
+        mock_cursor.count.return_value = 1
+        mock_collection = mock.create_autospec(pymongo.collection.Collection)
+        mock_collection.find.return_value = mock_cursor
+        mock_db_client = mock.create_autospec(database.client.DatabaseClient)
+        subject = manager.TaskManager(mock_collection, mock_db_client)
+        run_task_id = bson.ObjectId()
+        task = benchmark_task.BenchmarkTrialTask(None, bson.ObjectId(), state=batch_analysis.task.JobState.WAITING,
+                                                 dependencies={'trial_result_id': run_task_id})
+        subject.do_task(task)
+
+        query = mock_collection.find.call_args[0][0]
+        self.assertNotIn('trial_result_id', query)
+        self.assertEqual(run_task_id, query['dependencies.trial_result_id'])
+
+    def test_release_dependents_releases_tasks_with_finished_dependencies(self):
+        run_task_id = bson.ObjectId()
+        trial_result_id = bson.ObjectId()
+        ready_id = bson.ObjectId()
+        mock_collection = mock.create_autospec(pymongo.collection.Collection)
+        mock_collection.find.side_effect = [
+            [{'_id': ready_id, 'dependencies': {'trial_result_id': run_task_id}}],
+            [{'_id': run_task_id, 'result': trial_result_id}]
+        ]
+        mock_collection.update_one.return_value = mock.Mock(modified_count=1)
+        mock_db_client = mock.create_autospec(database.client.DatabaseClient)
+        subject = manager.TaskManager(mock_collection, mock_db_client)
+
+        self.assertEqual(1, subject.release_dependents(run_task_id))
+        waiting_query = mock_collection.find.call_args_list[0][0][0]
+        self.assertEqual(batch_analysis.task.JobState.WAITING.value, waiting_query['state'])
+        self.assertEqual(run_task_id, waiting_query['dependency_ids'])
+        self.assertTrue(mock_collection.update_one.called)
+        query, update = mock_collection.update_one.call_args[0]
+        self.assertEqual(ready_id, query['_id'])
+        self.assertEqual(trial_result_id, update['$set']['trial_result_id'])
+        self.assertEqual(batch_analysis.task.JobState.UNSTARTED.value, update['$set']['state'])
+
+    def test_release_dependents_leaves_tasks_with_unfinished_dependencies(self):
+        run_task_id = bson.ObjectId()
+        mock_collection = mock.create_autospec(pymongo.collection.Collection)
+        mock_collection.find.side_effect = [
+            [{'_id': bson.ObjectId(), 'dependencies': {'trial_result1_id': run_task_id,
+                                                       'trial_result2_id': bson.ObjectId()}}],
+            [{'_id': run_task_id, 'result': bson.ObjectId()}]
+        ]
+        mock_db_client = mock.create_autospec(database.client.DatabaseClient)
+        subject = manager.TaskManager(mock_collection, mock_db_client)
+
+        self.assertEqual(0, subject.release_dependents(run_task_id))
+        self.assertFalse(mock_collection.update_one.called)
+
+    def test_release_dependents_does_not_count_tasks_released_by_someone_else(self):
+        run_task_id = bson.ObjectId()
+        mock_collection = mock.create_autospec(pymongo.collection.Collection)
+        mock_collection.find.side_effect = [
+            [{'_id': bson.ObjectId(), 'dependencies': {'trial_result_id': run_task_id}}],
+            [{'_id': run_task_id, 'result': bson.ObjectId()}]
+        ]
+        # Another scheduler or worker released the task after it was found, so the update matches nothing
+        mock_collection.update_one.return_value = mock.Mock(modified_count=0)
+        mock_db_client = mock.create_autospec(database.client.DatabaseClient)
+        subject = manager.TaskManager(mock_collection, mock_db_client)
+
+        self.assertEqual(0, subject.release_dependents(run_task_id))
+        self.assertTrue(mock_collection.update_one.called)
+
+    def test_release_dependents_does_nothing_if_no_tasks_are_waiting(self):
+        mock_collection = mock.create_autospec(pymongo.collection.Collection)
+        mock_collection.find.return_value = []
+        mock_db_client = mock.create_autospec(database.client.DatabaseClient)
+        subject = manager.TaskManager(mock_collection, mock_db_client)
+
+        self.assertEqual(0, subject.release_dependents())
+        self.assertEqual(1, mock_collection.find.call_count)
+        self.assertNotIn('dependency_ids', mock_collection.find.call_args[0][0])
+
+    def test_prefetch_tasks_loads_tasks_in_key_space(self):
+        system_ids = [bson.ObjectId() for _ in range(2)]
+        mock_collection = mock.create_autospec(pymongo.collection.Collection)
+        mock_collection.find.return_value = [{'_id': bson.ObjectId(), 'system_id': system_ids[0]}]
+        mock_db_client = mock.create_autospec(database.client.DatabaseClient)
+        subject = manager.TaskManager(mock_collection, mock_db_client)
+        self.assertEqual(1, subject.prefetch_tasks(batch_analysis.task.TaskType.TEST_SYSTEM, system_id=system_ids))
+
+        query = mock_collection.find.call_args[0][0]
+        self.assertEqual('batch_analysis.tasks.run_system_task.RunSystemTask', query['_type'])
+        self.assertEqual({'$in': system_ids}, query['system_id'])
+
+    def test_get_run_system_task_uses_prefetched_tasks(self):
+        system_id = bson.ObjectId()
+        image_source_id = bson.ObjectId()
+        s_task = {'_id': bson.ObjectId(), 'system_id': system_id, 'image_source_id': image_source_id, 'repeat': 0}
+        mock_entity = mock.MagicMock()
+        mock_collection = mock.create_autospec(pymongo.collection.Collection)
+        mock_collection.find.return_value = [s_task]
+        mock_db_client = mock.create_autospec(database.client.DatabaseClient)
+        mock_db_client.deserialize_entity.return_value = mock_entity
+        subject = manager.TaskManager(mock_collection, mock_db_client)
+        subject.prefetch_tasks(batch_analysis.task.TaskType.TEST_SYSTEM, system_id=[system_id])
+
+        self.assertEqual(mock_entity, subject.get_run_system_task(system_id, image_source_id))
+        self.assertEqual(s_task, mock_db_client.deserialize_entity.call_args[0][0])
+        result = subject.get_run_system_task(system_id, bson.ObjectId())
+        self.assertIsInstance(result, run_system_task.RunSystemTask)
+        self.assertFalse(mock_collection.find_one.called)
+
+    def test_get_task_outside_prefetched_key_space_checks_database(self):
+        mock_collection = mock.create_autospec(pymongo.collection.Collection)
+        mock_collection.find.return_value = []
+        mock_collection.find_one.return_value = None
+        mock_db_client = mock.create_autospec(database.client.DatabaseClient)
+        subject = manager.TaskManager(mock_collection, mock_db_client)
+        subject.prefetch_tasks(batch_analysis.task.TaskType.TEST_SYSTEM, system_id=[bson.ObjectId()])
+
+        subject.get_run_system_task(bson.ObjectId(), bson.ObjectId())
+        self.assertTrue(mock_collection.find_one.called)
+
+    def test_do_task_holds_prefetched_tasks_for_bulk_insert(self):
+        mock_collection = mock.create_autospec(pymongo.collection.Collection)
+        mock_collection.find.return_value = []
+        mock_db_client = mock.create_autospec(database.client.DatabaseClient)
+        subject = manager.TaskManager(mock_collection, mock_db_client)
+        system_id = bson.ObjectId()
+        image_source_ids = [bson.ObjectId() for _ in range(3)]
+        subject.prefetch_tasks(batch_analysis.task.TaskType.TEST_SYSTEM, system_id=[system_id])
+
+        tasks = []
+        for image_source_id in image_source_ids:
+            task = subject.get_run_system_task(system_id, image_source_id)
+            subject.do_task(task)
+            tasks.append(task)
+        # Asking for the same task again should not create a duplicate
+        subject.do_task(run_system_task.RunSystemTask(system_id, image_source_ids[0]))
+        self.assertEqual(1, mock_collection.find.call_count)
+        self.assertFalse(mock_collection.find_one.called)
+
+        # The held tasks already have their ids, so other tasks can depend on them
+        task_ids = [task.identifier for task in tasks]
+        self.assertNotIn(None, task_ids)
+        self.assertEqual(3, len(set(task_ids)))
+        subject.get_run_system_task(system_id, image_source_ids[0])
+        self.assertEqual(task_ids[0], mock_db_client.deserialize_entity.call_args[0][0]['_id'])
+
+        self.assertEqual(3, subject.save_pending_tasks())
+        self.assertEqual(1, mock_collection.insert_many.call_count)
+        self.assertEqual(task_ids, [s_task['_id'] for s_task in mock_collection.insert_many.call_args[0][0]])
+        self.assertEqual(task_ids, [task.identifier for task in tasks])
+
+    def test_pending_tasks_can_depend_on_each_other(self):
+        mock_collection = mock.create_autospec(pymongo.collection.Collection)
+        mock_collection.find.return_value = []
+        mock_db_client = mock.create_autospec(database.client.DatabaseClient)
+        subject = manager.TaskManager(mock_collection, mock_db_client)
+        system_id = bson.ObjectId()
+        benchmark_id = bson.ObjectId()
+        subject.prefetch_tasks(batch_analysis.task.TaskType.TEST_SYSTEM, system_id=[system_id])
+        subject.prefetch_tasks(batch_analysis.task.TaskType.BENCHMARK_RESULT, benchmark_id=[benchmark_id])
+
+        run_task = subject.get_run_system_task(system_id, bson.ObjectId())
+        subject.do_task(run_task)
+        benchmark = subject.get_benchmark_task(None, benchmark_id, dependencies={'trial_result_id': run_task.identifier})
+        subject.do_task(benchmark)
+        self.assertTrue(benchmark.is_waiting)
+
+        self.assertEqual(2, subject.save_pending_tasks())
+        s_run_task, s_benchmark = mock_collection.insert_many.call_args[0][0]
+        self.assertEqual([s_run_task['_id']], s_benchmark['dependency_ids'])
+
+    def test_save_pending_tasks_forgets_prefetched_tasks(self):
+        mock_collection = mock.create_autospec(pymongo.collection.Collection)
+        mock_collection.find.return_value = []
+        mock_collection.find_one.return_value = None
+        mock_db_client = mock.create_autospec(database.client.DatabaseClient)
+        subject = manager.TaskManager(mock_collection, mock_db_client)
+        system_id = bson.ObjectId()
+        subject.prefetch_tasks(batch_analysis.task.TaskType.TEST_SYSTEM, system_id=[system_id])
+        self.assertEqual(0, subject.save_pending_tasks())
+        self.assertFalse(mock_collection.insert_many.called)
+
+        subject.get_run_system_task(system_id, bson.ObjectId())
+        self.assertTrue(mock_collection.find_one.called)
+
+    def test_reclaim_expired_tasks_resets_running_tasks_with_expired_leases(self):
+        mock_collection = mock.create_autospec(pymongo.collection.Collection)
+        mock_collection.update_many.return_value = mock.Mock(modified_count=3)
+        mock_db_client = mock.create_autospec(database.client.DatabaseClient)
+        subject = manager.TaskManager(mock_collection, mock_db_client)
+
+        self.assertEqual(3, subject.reclaim_expired_tasks())
+        self.assertEqual(1, mock_collection.update_many.call_count)
+        query, update = mock_collection.update_many.call_args[0]
+        self.assertEqual(batch_analysis.task.JobState.RUNNING.value, query['state'])
+        self.assertIn('$lt', query['lease_expiry'])
+        self.assertNotIn('node_id', query)
+        self.assertEqual(batch_analysis.task.JobState.UNSTARTED.value, update['$set']['state'])
+        self.assertIn('lease_expiry', update['$unset'])
+
+    def test_schedule_tasks_requests_estimated_resources(self):
+        task = run_system_task.RunSystemTask(bson.ObjectId(), bson.ObjectId(), memory_requirements='3GB',
+                                             expected_duration='1:00:00', id_=bson.ObjectId())
+        mock_collection = mock.MagicMock()
+        mock_collection.update_many.return_value = mock.Mock(modified_count=0)
+        mock_collection.update_one.return_value = mock.Mock(modified_count=1)
+        mock_collection.find.side_effect = lambda query, *_, **__: (
+            [{'_id': task.identifier}] if query == {'state': batch_analysis.task.JobState.UNSTARTED.value} else [])
+        mock_db_client = mock.create_autospec(database.client.DatabaseClient)
+        mock_db_client.deserialize_entity.return_value = task
+        mock_job_system = mock.create_autospec(batch_analysis.job_system.JobSystem)
+        mock_job_system.run_task.return_value = 1
+        mock_estimator = mock.create_autospec(batch_analysis.resource_estimator.ResourceEstimator)
+        mock_estimator.estimate.return_value = ('5GB', '0:20:00')
+        subject = manager.TaskManager(mock_collection, mock_db_client)
+
+        subject.schedule_tasks(mock_job_system, estimator=mock_estimator)
+        self.assertTrue(mock_estimator.estimate.called)
+        self.assertEqual('5GB', mock_job_system.run_task.call_args[1]['memory_requirements'])
+        self.assertEqual('0:20:00', mock_job_system.run_task.call_args[1]['expected_duration'])
+        self.assertEqual('5GB', task.memory_requirements)
+
+    def test_schedule_tasks_claims_each_task_before_submitting(self):
+        task = run_system_task.RunSystemTask(bson.ObjectId(), bson.ObjectId(), id_=bson.ObjectId())
+        mock_collection = mock.MagicMock()
+        mock_collection.update_many.return_value = mock.Mock(modified_count=0)
+        mock_collection.update_one.return_value = mock.Mock(modified_count=1)
+        mock_collection.find.side_effect = lambda query, *_, **__: (
+            [{'_id': task.identifier}] if query == {'state': batch_analysis.task.JobState.UNSTARTED.value} else [])
+        mock_db_client = mock.create_autospec(database.client.DatabaseClient)
+        mock_db_client.deserialize_entity.return_value = task
+        mock_job_system = mock.create_autospec(batch_analysis.job_system.JobSystem)
+        mock_job_system.node_id = 'scheduler-node'
+        mock_job_system.run_task.return_value = 1
+        subject = manager.TaskManager(mock_collection, mock_db_client)
+
+        subject.schedule_tasks(mock_job_system)
+        self.assertIn(mock.call({'_id': task.identifier, 'state': batch_analysis.task.JobState.UNSTARTED.value},
+                                mock.ANY), mock_collection.update_one.call_args_list)
+        self.assertTrue(mock_job_system.run_task.called)
+        self.assertEqual('scheduler-node', task.node_id)
+
+    def test_schedule_tasks_skips_task_claimed_between_find_and_save(self):
+        task = run_system_task.RunSystemTask(bson.ObjectId(), bson.ObjectId(), id_=bson.ObjectId())
+        mock_collection = mock.MagicMock()
+        mock_collection.update_many.return_value = mock.Mock(modified_count=0)
+        # A task worker claims the task after it is found, so the conditional claim matches nothing
+        mock_collection.update_one.return_value = mock.Mock(modified_count=0)
+        mock_collection.find.side_effect = lambda query, *_, **__: (
+            [{'_id': task.identifier}] if query == {'state': batch_analysis.task.JobState.UNSTARTED.value} else [])
+        mock_db_client = mock.create_autospec(database.client.DatabaseClient)
+        mock_db_client.deserialize_entity.return_value = task
+        mock_job_system = mock.create_autospec(batch_analysis.job_system.JobSystem)
+        subject = manager.TaskManager(mock_collection, mock_db_client)
+
+        subject.schedule_tasks(mock_job_system)
+        self.assertFalse(mock_job_system.run_task.called)
+        self.assertFalse(mock_collection.update.called)
+        self.assertTrue(task.is_unstarted)
+
+
+    def test_schedule_tasks_trusts_running_tasks_with_a_live_lease(self):
+        task = run_system_task.RunSystemTask(bson.ObjectId(), bson.ObjectId(), id_=bson.ObjectId())
+        task.mark_job_started('scheduler-node', 1)
+        s_task = {'_id': task.identifier, 'state': batch_analysis.task.JobState.RUNNING.value,
+                  'lease_expiry': datetime.datetime.utcnow() + datetime.timedelta(minutes=10)}
+        mock_collection = mock.MagicMock()
+        mock_collection.update_many.return_value = mock.Mock(modified_count=0)
+        mock_collection.find.side_effect = lambda query, *_, **__: (
+            [s_task] if query.get('state') == batch_analysis.task.JobState.RUNNING.value else [])
+        mock_db_client = mock.create_autospec(database.client.DatabaseClient)
+        mock_db_client.deserialize_entity.return_value = task
+        mock_job_system = mock.create_autospec(batch_analysis.job_system.JobSystem)
+        mock_job_system.node_id = 'scheduler-node'
+        # The job system has lost track of the job, such as after the scheduler restarts
+        mock_job_system.is_job_running.return_value = False
+        subject = manager.TaskManager(mock_collection, mock_db_client)
+
+        subject.schedule_tasks(mock_job_system)
+        self.assertFalse(task.is_unstarted)
+        self.assertFalse(mock_job_system.is_job_running.called)
+
+        # Once the lease expires, the job system is checked as before
+        s_task['lease_expiry'] = datetime.datetime.utcnow() - datetime.timedelta(minutes=10)
+        subject.schedule_tasks(mock_job_system)
+        self.assertTrue(task.is_unstarted)
+
+class TestPrefetchedTasks(unittest.TestCase):
+
+    def test_find_matches_on_nested_and_list_properties(self):
+        task_id = bson.ObjectId()
+        benchmark_ids = [bson.ObjectId() for _ in range(3)]
+        s_task = {'_id': bson.ObjectId(), 'trial_result_id': None, 'benchmark_ids': benchmark_ids,
+                  'dependencies': {'trial_result_id': task_id}}
+        subject = manager.PrefetchedTasks({})
+        subject.add({'_id': bson.ObjectId(), 'trial_result_id': bson.ObjectId(), 'benchmark_ids': benchmark_ids})
+        subject.add(s_task)
+        self.assertEqual(s_task, subject.find({'dependencies.trial_result_id': task_id,
+                                               'benchmark_ids': list(benchmark_ids)}))
+        self.assertIsNone(subject.find({'dependencies.trial_result_id': task_id, 'benchmark_ids': []}))
+
+    def test_find_uses_tasks_added_after_indexing(self):
+        subject = manager.PrefetchedTasks({})
+        system_id = bson.ObjectId()
+        self.assertIsNone(subject.find({'system_id': system_id}))
+        s_task = {'_id': bson.ObjectId(), 'system_id': system_id}
+        subject.add(s_task)
+        self.assertEqual(s_task, subject.find({'system_id': system_id}))
+
+    def test_covers_queries_inside_key_space(self):
+        system_id = bson.ObjectId()
+        subject = manager.PrefetchedTasks({'system_id': [system_id]})
+        self.assertTrue(subject.covers({'system_id': system_id, 'image_source_id': bson.ObjectId()}))
+        self.assertFalse(subject.covers({'system_id': bson.ObjectId()}))
+        self.assertFalse(subject.covers({'image_source_id': bson.ObjectId()}))
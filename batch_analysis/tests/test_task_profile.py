@@ -0,0 +1,142 @@
+import unittest
+import unittest.mock as mock
+import time
+import bson
+import pymongo.collection
+import database.client
+import batch_analysis.task_profile as task_profile
+
+
+class TestDatabaseMonitor(unittest.TestCase):
+
+    def test_totals_reads_and_writes(self):
+        reply = {'cursor': {'firstBatch': [{'_id': bson.ObjectId(), 'data': 'x' * 1000}]}, 'ok': 1}
+        subject = task_profile.DatabaseMonitor()
+        subject.succeeded(mock.Mock(command_name='find', duration_micros=2000000, reply=reply))
+        subject.succeeded(mock.Mock(command_name='insert', duration_micros=500000, reply={'ok': 1}))
+        subject.failed(mock.Mock(command_name='getMore', duration_micros=1000000))
+        subject.succeeded(mock.Mock(command_name='ping', duration_micros=1000000, reply={'ok': 1}))
+        documents_read, bytes_read, read_time, write_time = subject.get_totals()
+        self.assertEqual(1, documents_read)
+        self.assertEqual(0, bytes_read)
+        self.assertEqual(3, read_time)
+        self.assertEqual(0.5, write_time)
+
+    def test_counts_gridfs_chunk_data(self):
+        files_id = bson.ObjectId()
+        reply = {'cursor': {'nextBatch': [{'_id': bson.ObjectId(), 'files_id': files_id, 'n': n, 'data': b'x' * 1024}
+                                          for n in range(3)]}, 'ok': 1}
+        subject = task_profile.DatabaseMonitor()
+        subject.succeeded(mock.Mock(command_name='getMore', duration_micros=1000, reply=reply))
+        subject.succeeded(mock.Mock(command_name='count', duration_micros=1000, reply={'n': 10, 'ok': 1}))
+        documents_read, bytes_read, _, _ = subject.get_totals()
+        self.assertEqual(3, documents_read)
+        self.assertEqual(3 * 1024, bytes_read)
+
+
+class TestTaskProfiler(unittest.TestCase):
+
+    def test_profile_includes_times_and_phases(self):
+        mock_db_client = mock.create_autospec(database.client.DatabaseClient)
+        subject = task_profile.TaskProfiler(mock_db_client)
+        self.assertIsNone(subject.profile)
+        subject.start()
+        time.sleep(0.01)
+        profile = subject.stop()
+        self.assertEqual(profile, subject.profile)
+        self.assertGreaterEqual(profile['wall_time'], 0.01)
+        self.assertGreaterEqual(profile['cpu_time'], 0)
+        self.assertEqual(0, profile['documents_read'])
+        self.assertEqual(0, profile['bytes_read'])
+        for phase in ['deserialize', 'database_read', 'database_write', 'compute']:
+            self.assertIn(phase, profile['phases'])
+        self.assertGreaterEqual(profile['phases']['compute'], 0.01)
+
+    def test_times_deserialization_and_restores_client(self):
+        mock_db_client = mock.create_autospec(database.client.DatabaseClient)
+        original = mock_db_client.deserialize_entity
+        original.side_effect = lambda *_, **__: time.sleep(0.02)
+        subject = task_profile.TaskProfiler(mock_db_client)
+        subject.start()
+        mock_db_client.deserialize_entity({'_type': 'Entity'})
+        profile = subject.stop()
+        self.assertTrue(original.called)
+        self.assertIs(original, mock_db_client.deserialize_entity)
+        self.assertGreaterEqual(profile['phases']['deserialize'], 0.02)
+
+    @mock.patch('batch_analysis.task_profile.reset_peak_memory', autospec=True)
+    @mock.patch('batch_analysis.task_profile.get_peak_memory', autospec=True)
+    def test_records_peak_memory_if_it_can_be_reset(self, mock_get_peak_memory, mock_reset_peak_memory):
+        mock_reset_peak_memory.return_value = True
+        mock_get_peak_memory.return_value = 1024
+        mock_db_client = mock.create_autospec(database.client.DatabaseClient)
+        for _ in range(2):
+            subject = task_profile.TaskProfiler(mock_db_client)
+            subject.start()
+            self.assertEqual(1024, subject.stop()['peak_memory'])
+        self.assertEqual(2, mock_reset_peak_memory.call_count)
+
+    @mock.patch('batch_analysis.task_profile.reset_peak_memory', autospec=True)
+    @mock.patch('batch_analysis.task_profile.get_peak_memory', autospec=True)
+    def test_only_records_peak_memory_for_first_task_if_it_cannot_be_reset(self, mock_get_peak_memory,
+                                                                           mock_reset_peak_memory):
+        mock_reset_peak_memory.return_value = False
+        mock_get_peak_memory.return_value = 1024
+        mock_db_client = mock.create_autospec(database.client.DatabaseClient)
+        with mock.patch('batch_analysis.task_profile._has_profiled_task', False):
+            subject = task_profile.TaskProfiler(mock_db_client)
+            subject.start()
+            self.assertEqual(1024, subject.stop()['peak_memory'])
+            subject = task_profile.TaskProfiler(mock_db_client)
+            subject.start()
+            self.assertIsNone(subject.stop()['peak_memory'])
+
+
+class TestPeakMemory(unittest.TestCase):
+
+    def test_reset_peak_memory_measures_peak_from_now(self):
+        if not task_profile.reset_peak_memory():
+            self.skipTest("Peak memory cannot be reset on this platform")
+        data = b'x' * (64 * 1024 * 1024)   # Written, so that the memory is actually used
+        large_peak = task_profile.get_peak_memory()
+        del data
+        self.assertTrue(task_profile.reset_peak_memory())
+        self.assertLess(task_profile.get_peak_memory(), large_peak - 32 * 1024 * 1024)
+
+
+class TestRecordTaskStats(unittest.TestCase):
+
+    def test_adds_profile_to_totals_for_type_and_system(self):
+        mock_collection = mock.create_autospec(pymongo.collection.Collection)
+        system_id = bson.ObjectId()
+        profile = {'wall_time': 10, 'cpu_time': 8, 'peak_memory': 1024, 'documents_read': 4, 'bytes_read': 2048,
+                   'phases': {'deserialize': 1, 'compute': 9}}
+        task_profile.record_task_stats(mock_collection, 'batch_analysis.tasks.run_system_task.RunSystemTask',
+                                       system_id, profile)
+        self.assertTrue(mock_collection.update_one.called)
+        query, update = mock_collection.update_one.call_args[0]
+        self.assertEqual({'task_type': 'batch_analysis.tasks.run_system_task.RunSystemTask',
+                          'group_id': system_id}, query)
+        self.assertEqual(1, update['$inc']['count'])
+        self.assertEqual(10, update['$inc']['total_wall_time'])
+        self.assertEqual(4, update['$inc']['total_documents_read'])
+        self.assertEqual(2048, update['$inc']['total_bytes_read'])
+        self.assertEqual(9, update['$inc']['total_phases.compute'])
+        self.assertEqual({'max_wall_time': 10, 'max_peak_memory': 1024}, update['$max'])
+        self.assertEqual([10], update['$push']['recent_wall_times']['$each'])
+        self.assertEqual([1024], update['$push']['recent_peak_memory']['$each'])
+        self.assertEqual(-task_profile.NUM_RECENT_SAMPLES, update['$push']['recent_wall_times']['$slice'])
+        self.assertTrue(mock_collection.update_one.call_args[1]['upsert'])
+
+    def test_adds_prediction_error_to_totals(self):
+        mock_collection = mock.create_autospec(pymongo.collection.Collection)
+        profile = {'wall_time': 10, 'cpu_time': 8, 'peak_memory': None, 'documents_read': 0, 'bytes_read': 0,
+                   'phases': {}, 'prediction_error': {'duration_ratio': 1.25}}
+        task_profile.record_task_stats(mock_collection, 'batch_analysis.task.Task', None, profile)
+        update = mock_collection.update_one.call_args[0][1]
+        self.assertEqual(1, update['$inc']['num_duration_estimates'])
+        self.assertEqual(1.25, update['$inc']['total_duration_ratio'])
+        self.assertEqual(1, update['$inc']['num_duration_overruns'])
+        self.assertNotIn('num_memory_estimates', update['$inc'])
+        self.assertNotIn('max_peak_memory', update['$max'])
+        self.assertNotIn('recent_peak_memory', update['$push'])
@@ -0,0 +1,190 @@
+import unittest
+import unittest.mock as mock
+import bson
+import pymongo.collection
+import database.client
+import batch_analysis.task
+import batch_analysis.task_worker as task_worker
+
+
+class TestTaskWorker(unittest.TestCase):
+
+    def setUp(self):
+        self.mock_collection = mock.create_autospec(pymongo.collection.Collection)
+        self.mock_collection.find_one_and_update.return_value = None
+        self.mock_db_client = mock.create_autospec(database.client.DatabaseClient)
+        self.mock_db_client.tasks_collection = self.mock_collection
+
+    def test_works_with_empty_config(self):
+        task_worker.TaskWorker(self.mock_db_client, {})
+
+    def test_claim_query_matches_unstarted_tasks_that_fit(self):
+        subject = task_worker.TaskWorker(self.mock_db_client, {'num_cpus': 8, 'num_gpus': 2, 'memory': '16GB'})
+        query = subject.get_claim_query()
+        self.assertEqual(batch_analysis.task.JobState.UNSTARTED.value, query['state'])
+        self.assertEqual({'$lte': 8}, query['num_cpus'])
+        self.assertEqual({'$lte': 2}, query['num_gpus'])
+        self.assertIn({'memory_bytes': {'$lte': 16 * 1024 ** 3}}, query['$or'])
+        self.assertIn({'memory_bytes': None}, query['$or'])
+
+    def test_claim_query_excludes_tasks_waiting_to_retry(self):
+        subject = task_worker.TaskWorker(self.mock_db_client, {})
+        query = subject.get_claim_query()
+        self.assertIn('retry_after', query)
+        self.assertIn('$gt', query['retry_after']['$not'])
+
+    def test_claim_query_does_not_limit_memory_by_default(self):
+        subject = task_worker.TaskWorker(self.mock_db_client, {})
+        self.assertNotIn('$or', subject.get_claim_query())
+
+    def test_claim_query_excludes_generate_dataset_tasks(self):
+        subject = task_worker.TaskWorker(self.mock_db_client, {})
+        self.assertEqual({'$ne': task_worker.GENERATE_DATASET_TYPE}, subject.get_claim_query()['_type'])
+        subject = task_worker.TaskWorker(self.mock_db_client, {'can_generate_dataset': True})
+        self.assertNotIn('_type', subject.get_claim_query())
+
+    def test_claim_query_limits_task_types(self):
+        task_types = ['batch_analysis.tasks.benchmark_trial_task.BenchmarkTrialTask',
+                      task_worker.GENERATE_DATASET_TYPE]
+        subject = task_worker.TaskWorker(self.mock_db_client, {'task_types': task_types})
+        self.assertEqual({'$in': task_types[:1]}, subject.get_claim_query()['_type'])
+        subject = task_worker.TaskWorker(self.mock_db_client, {'task_types': task_types,
+                                                               'can_generate_dataset': True})
+        self.assertEqual({'$in': task_types}, subject.get_claim_query()['_type'])
+
+    def test_claim_task_atomically_marks_task_running_on_this_node(self):
+        subject = task_worker.TaskWorker(self.mock_db_client, {'node_id': 'worker-1'})
+        subject.claim_task()
+        self.assertTrue(self.mock_collection.find_one_and_update.called)
+        query, update = self.mock_collection.find_one_and_update.call_args[0]
+        expected_query = subject.get_claim_query()
+        del query['retry_after']    # Includes the current time
+        del expected_query['retry_after']
+        self.assertEqual(expected_query, query)
+        self.assertEqual(batch_analysis.task.JobState.RUNNING.value, update['$set']['state'])
+        self.assertEqual('worker-1', update['$set']['node_id'])
+        self.assertIn('job_id', update['$set'])
+        self.assertIn('lease_expiry', update['$set'])
+
+    def test_claim_task_returns_none_if_no_tasks(self):
+        subject = task_worker.TaskWorker(self.mock_db_client, {})
+        self.assertIsNone(subject.claim_task())
+        self.assertFalse(self.mock_db_client.deserialize_entity.called)
+
+    def test_claim_task_returns_deserialized_task(self):
+        s_task = {'_id': bson.ObjectId(), '_type': 'batch_analysis.task.Task'}
+        mock_task = mock.create_autospec(batch_analysis.task.Task)
+        self.mock_collection.find_one_and_update.return_value = s_task
+        self.mock_db_client.deserialize_entity.return_value = mock_task
+        subject = task_worker.TaskWorker(self.mock_db_client, {})
+        self.assertEqual(mock_task, subject.claim_task())
+        self.assertEqual(s_task, self.mock_db_client.deserialize_entity.call_args[0][0])
+
+    def test_claim_task_uses_new_job_id_for_each_task(self):
+        self.mock_collection.find_one_and_update.return_value = {'_id': bson.ObjectId()}
+        subject = task_worker.TaskWorker(self.mock_db_client, {})
+        job_ids = set()
+        for _ in range(5):
+            subject.claim_task()
+            job_ids.add(self.mock_collection.find_one_and_update.call_args[0][1]['$set']['job_id'])
+        self.assertEqual(5, len(job_ids))
+
+    def test_run_next_task_runs_and_saves_task_with_shared_db_client(self):
+        mock_task = mock.create_autospec(batch_analysis.task.Task)
+        self.mock_collection.find_one_and_update.return_value = {'_id': bson.ObjectId()}
+        self.mock_db_client.deserialize_entity.return_value = mock_task
+        subject = task_worker.TaskWorker(self.mock_db_client, {})
+        self.assertTrue(subject.run_next_task())
+        self.assertTrue(mock_task.run_task.called)
+        self.assertEqual(self.mock_db_client, mock_task.run_task.call_args[0][0])
+        self.assertTrue(mock_task.save_updates.called)
+        self.assertEqual(self.mock_collection, mock_task.save_updates.call_args[0][0])
+
+    def test_run_next_task_records_task_profile(self):
+        mock_task = mock.create_autospec(batch_analysis.task.Task)
+        self.mock_collection.find_one_and_update.return_value = {'_id': bson.ObjectId()}
+        self.mock_db_client.deserialize_entity.return_value = mock_task
+        subject = task_worker.TaskWorker(self.mock_db_client, {})
+        subject.run_next_task()
+        self.assertTrue(mock_task.record_profile.called)
+        self.assertIn('wall_time', mock_task.record_profile.call_args[0][0])
+        self.assertTrue(self.mock_db_client.task_stats_collection.update_one.called)
+
+    def test_run_next_task_marks_task_failed_on_exception(self):
+        mock_task = mock.create_autospec(batch_analysis.task.Task)
+        mock_task.run_task.side_effect = ValueError('Task crashed')
+        self.mock_collection.find_one_and_update.return_value = {'_id': bson.ObjectId()}
+        self.mock_db_client.deserialize_entity.return_value = mock_task
+        subject = task_worker.TaskWorker(self.mock_db_client, {})
+        self.assertTrue(subject.run_next_task())
+        self.assertTrue(mock_task.mark_job_failed.called)
+        self.assertTrue(mock_task.save_updates.called)
+
+    def test_run_next_task_delays_retrying_failed_task(self):
+        task_id = bson.ObjectId()
+        mock_task = mock.create_autospec(batch_analysis.task.Task)
+        mock_task.identifier = task_id
+        mock_task.is_unstarted = True
+        self.mock_collection.find_one_and_update.return_value = {'_id': task_id, 'num_failures': 2}
+        self.mock_db_client.deserialize_entity.return_value = mock_task
+        subject = task_worker.TaskWorker(self.mock_db_client, {'retry_delay': 10})
+        subject.run_next_task()
+        self.assertIn(mock.call({'_id': task_id}, mock.ANY), self.mock_collection.update_one.call_args_list)
+        update = [args[1] for args, _ in self.mock_collection.update_one.call_args_list
+                  if args[0] == {'_id': task_id}][0]
+        self.assertEqual(3, update['$set']['num_failures'])
+        self.assertIn('retry_after', update['$set'])
+        self.assertNotIn('state', update['$set'])
+
+    def test_run_next_task_does_not_delay_finished_task(self):
+        task_id = bson.ObjectId()
+        mock_task = mock.create_autospec(batch_analysis.task.Task)
+        mock_task.identifier = task_id
+        mock_task.is_unstarted = False
+        self.mock_collection.find_one_and_update.return_value = {'_id': task_id}
+        self.mock_db_client.deserialize_entity.return_value = mock_task
+        subject = task_worker.TaskWorker(self.mock_db_client, {})
+        subject.run_next_task()
+        self.assertNotIn(mock.call({'_id': task_id}, mock.ANY), self.mock_collection.update_one.call_args_list)
+
+    def test_run_next_task_resets_task_that_cannot_be_deserialized(self):
+        task_id = bson.ObjectId()
+        self.mock_collection.find_one_and_update.return_value = {'_id': task_id}
+        self.mock_db_client.deserialize_entity.return_value = None
+        subject = task_worker.TaskWorker(self.mock_db_client, {})
+        self.assertTrue(subject.run_next_task())
+        self.assertTrue(self.mock_collection.update_one.called)
+        query, update = self.mock_collection.update_one.call_args[0]
+        self.assertEqual({'_id': task_id}, query)
+        self.assertEqual(batch_analysis.task.JobState.UNSTARTED.value, update['$set']['state'])
+        self.assertEqual(1, update['$set']['num_failures'])
+        self.assertIn('lease_expiry', update['$unset'])
+
+    def test_retry_delay_doubles_up_to_maximum(self):
+        subject = task_worker.TaskWorker(self.mock_db_client, {'retry_delay': 10, 'max_retry_delay': 50})
+        self.assertEqual(10, subject.get_retry_delay(1))
+        self.assertEqual(20, subject.get_retry_delay(2))
+        self.assertEqual(40, subject.get_retry_delay(3))
+        self.assertEqual(50, subject.get_retry_delay(4))
+
+    def test_run_next_task_returns_false_if_no_tasks(self):
+        subject = task_worker.TaskWorker(self.mock_db_client, {})
+        self.assertFalse(subject.run_next_task())
+
+    def test_run_stops_after_max_tasks(self):
+        self.mock_collection.find_one_and_update.return_value = {'_id': bson.ObjectId()}
+        self.mock_db_client.deserialize_entity.side_effect = lambda *_, **__: mock.create_autospec(
+            batch_analysis.task.Task)
+        subject = task_worker.TaskWorker(self.mock_db_client, {})
+        self.assertEqual(3, subject.run(max_tasks=3))
+        self.assertEqual(3, self.mock_collection.find_one_and_update.call_count)
+
+    def test_run_stops_when_idle(self):
+        tasks = [mock.create_autospec(batch_analysis.task.Task) for _ in range(2)]
+        self.mock_collection.find_one_and_update.side_effect = [{'_id': bson.ObjectId()}, {'_id': bson.ObjectId()},
+                                                                None, None, None]
+        self.mock_db_client.deserialize_entity.side_effect = tasks
+        subject = task_worker.TaskWorker(self.mock_db_client, {'poll_interval': 0})
+        self.assertEqual(2, subject.run(idle_timeout=0))
+        for task in tasks:
+            self.assertTrue(task.run_task.called)
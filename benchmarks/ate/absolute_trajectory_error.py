@@ -32,7 +32,7 @@
 # POSSIBILITY OF SUCH DAMAGE.
 
 import numpy as np
-import util.associate as ass
+import core.trajectory_cache
 import core.benchmark
 import benchmarks.ate.ate_result
 
@@ -44,22 +44,25 @@ class BenchmarkATE(core.benchmark.Benchmark):
     See: https://vision.in.tum.de/data/datasets/rgbd-dataset/tools
     """
 
-    def __init__(self, offset=0, max_difference=0.02, scale=1.0, id_=None):
+    def __init__(self, offset=0, max_difference=0.02, scale=1.0, align_scale=False, id_=None):
         """
         Create a Absolute Trajectory Error benchmark.
 
-        There are 3 configuration properties for calculating ATE, which can be set as parameters:
+        There are 4 configuration properties for calculating ATE, which can be set as parameters:
         - offset: A uniform offset to the timstamps of the calculated trajectory, relative to the ground truth
         - max_difference: The maximum difference between matched timestamps
         - scale: A scaling factor between the test trajectory and the ground truth trajectory locations
+        - align_scale: Also find the scale when aligning the trajectories, for monocular systems
         :param offset:
         :param max_difference:
         :param scale:
+        :param align_scale:
         """
         super().__init__(id_=id_)
         self._offset = offset
         self._max_difference = max_difference
         self._scale = scale     # TODO:
+        self._align_scale = bool(align_scale)
 
     @property
     def offset(self):
@@ -86,11 +89,20 @@ class BenchmarkATE(core.benchmark.Benchmark):
         if max_difference >= 0:
             self._max_difference = max_difference
 
+    @property
+    def align_scale(self):
+        return self._align_scale
+
+    @align_scale.setter
+    def align_scale(self, align_scale):
+        self._align_scale = bool(align_scale)
+
     def get_settings(self):
         return {
             'offset': self.offset,
             'scale': self.scale,
-            'max_difference': self.max_difference
+            'max_difference': self.max_difference,
+            'align_scale': self.align_scale
         }
 
     def serialize(self):
@@ -98,6 +110,7 @@ class BenchmarkATE(core.benchmark.Benchmark):
         output['offset'] = self.offset
         output['max_difference'] = self.max_difference
         output['scale'] = self.scale
+        output['align_scale'] = self.align_scale
         return output
 
     @classmethod
@@ -108,6 +121,8 @@ class BenchmarkATE(core.benchmark.Benchmark):
             kwargs['max_difference'] = serialized_representation['max_difference']
         if 'scale' in serialized_representation:
             kwargs['scale'] = serialized_representation['scale']
+        if 'align_scale' in serialized_representation:
+            kwargs['align_scale'] = serialized_representation['align_scale']
         return super().deserialize(serialized_representation, db_client, **kwargs)
 
     @classmethod
@@ -126,69 +141,145 @@ class BenchmarkATE(core.benchmark.Benchmark):
         :return:
         :rtype BenchmarkResult:
         """
-        ground_truth_traj = trial_result.get_ground_truth_camera_poses()
-        result_traj = trial_result.get_computed_camera_poses()
-        # TODO: Fix the format of these trajectories to what is expected below
-        matches = ass.associate(ground_truth_traj, result_traj, self.offset, self.max_difference)
-        if len(matches) < 2:
-            return core.benchmark.FailedBenchmark(self.identifier, trial_result.identifier,
-                                                  "Couldn't find matching timestamp pairs "
-                                                  "between groundtruth and estimated trajectory! "
-                                                  "Did you choose the correct sequence?")
-
-        # Construct matrices of the ground truth and calculated poses
-        ground_truth_xyz = []
-        result_xyz = []
-        gt_timestamps = []
-        for gt_stamp, result_stamp in matches:
-            ground_truth_xyz.append(ground_truth_traj[gt_stamp].location)
-            result_xyz.append(result_traj[result_stamp].location * float(self.scale))
-            gt_timestamps.append(gt_stamp)
-
-        # Align the two trajectories, based on the matching timestamps from both
-        ground_truth_xyz = np.matrix(ground_truth_xyz).transpose()
-        result_xyz = np.matrix(result_xyz).transpose()
-        rot, trans, trans_error = align(result_xyz, ground_truth_xyz)
-
-        # Match the trans error back to its ground-truth timestamps
-        mapped_error = {}
-        for col_num, timestamp in enumerate(gt_timestamps):
-            mapped_error[timestamp] = trans_error[col_num]
-
-        return benchmarks.ate.ate_result.BenchmarkATEResult(self.identifier, trial_result.identifier,
-                                                            mapped_error, self.get_settings())
-
-
-def align(model, data):
+        return self.benchmark_cached_results(core.trajectory_cache.TrajectoryCache(trial_result))
+
+    def benchmark_cached_results(self, trajectory_cache):
+        """
+        Benchmark a trial result using trajectories that have already been loaded.
+        :param trajectory_cache: A TrajectoryCache wrapping the trial result
+        :return:
+        :rtype BenchmarkResult:
+        """
+        return self.benchmark_many_cached_results([trajectory_cache])[0]
+
+    def benchmark_many_results(self, trial_results):
+        """
+        Benchmark several trial results at once.
+        Trials with the same ground truth trajectory are aligned to it together, in one batch.
+        :param trial_results: A list of trial results
+        :return: A list of benchmark results, in the same order as the trial results
+        :rtype list:
+        """
+        return self.benchmark_many_cached_results([core.trajectory_cache.TrajectoryCache(trial_result)
+                                                   for trial_result in trial_results])
+
+    def benchmark_many_cached_results(self, trajectory_caches):
+        """
+        Benchmark several trial results at once, from their already loaded trajectories.
+        See benchmark_many_results.
+        :param trajectory_caches: A list of TrajectoryCache objects, one for each trial result
+        :return: A list of benchmark results, in the same order as the trajectory caches
+        :rtype list:
+        """
+        # Group the trials by their ground truth, which is usually shared by every trial on the same dataset.
+        # Different datasets can have the same timestamps, so the ground truth locations must match as well
+        groups = {}
+        for idx, trajectory_cache in enumerate(trajectory_caches):
+            key = (np.asarray(trajectory_cache.ground_truth_timestamps, dtype=np.float64).tobytes(),
+                   np.ascontiguousarray(trajectory_cache.ground_truth_locations, dtype=np.float64).tobytes())
+            if key not in groups:
+                groups[key] = []
+            groups[key].append(idx)
+
+        results = [None for _ in range(len(trajectory_caches))]
+        for indexes in groups.values():
+            gt_timestamps = trajectory_caches[indexes[0]].ground_truth_timestamps
+            ground_truth_xyz = trajectory_caches[indexes[0]].ground_truth_locations.transpose()
+
+            # Construct the matched computed locations for each trial, masking out unmatched ground truth poses
+            result_xyz = np.zeros((len(indexes),) + ground_truth_xyz.shape)
+            mask = np.zeros((len(indexes), len(gt_timestamps)), dtype=bool)
+            for batch_idx, idx in enumerate(indexes):
+                gt_indexes, result_indexes = trajectory_caches[idx].associate(self.offset, self.max_difference)
+                if len(gt_indexes) > 0:
+                    result_xyz[batch_idx, :, gt_indexes] = trajectory_caches[idx].computed_locations[result_indexes]
+                mask[batch_idx, gt_indexes] = True
+            result_xyz *= float(self.scale)
+
+            # Align all the trajectories that have enough matches at once
+            valid = np.sum(mask, axis=1) >= 2
+            if np.any(valid):
+                _, _, _, trans_error = align_trajectories(result_xyz[valid], ground_truth_xyz, mask=mask[valid],
+                                                          with_scale=self.align_scale)
+            for batch_idx, idx in enumerate(indexes):
+                if not valid[batch_idx]:
+                    results[idx] = core.benchmark.FailedBenchmark(
+                        self.identifier, trajectory_caches[idx].trial_result.identifier,
+                        "Couldn't find matching timestamp pairs between groundtruth and estimated trajectory! "
+                        "Did you choose the correct sequence?")
+                    continue
+                # Match the trans error back to its ground-truth timestamps
+                error_idx = np.count_nonzero(valid[:batch_idx])
+                matched = mask[batch_idx]
+                mapped_error = dict(zip(gt_timestamps[matched], trans_error[error_idx, matched]))
+                results[idx] = benchmarks.ate.ate_result.BenchmarkATEResult(
+                    self.identifier, trajectory_caches[idx].trial_result.identifier, mapped_error, self.get_settings())
+        return results
+
+
+def align_trajectories(models, data, mask=None, with_scale=False):
+    """
+    Align several trajectories to the same data at once, using the method of Horn (closed-form),
+    or the method of Umeyama to also find the scale of each trajectory.
+
+    Input:
+    models -- the trajectories to align (kx3xn), or a single trajectory (3xn)
+    data -- the trajectory they are aligned to (3xn)
+    mask -- which points of each trajectory to align (kxn), or None to use all of them
+    with_scale -- find a similarity transform (Sim(3)) rather than a rigid transform (SE(3))
+
+    Output:
+    rot -- rotation matrices (kx3x3)
+    trans -- translation vectors (kx3)
+    scale -- scale factors (k), which are all 1 without with_scale
+    trans_error -- translational error per point (kxn), 0 where the points are masked out
+    """
+    models = np.asarray(models, dtype=np.float64)
+    if models.ndim == 2:
+        models = models[np.newaxis, :, :]
+    data = np.asarray(data, dtype=np.float64)
+    if mask is None:
+        weights = np.ones((models.shape[0], models.shape[2]))
+    else:
+        weights = np.asarray(mask, dtype=np.float64)
+    counts = np.sum(weights, axis=1)
+
+    model_mean = np.sum(models * weights[:, np.newaxis, :], axis=2) / counts[:, np.newaxis]
+    data_mean = np.dot(weights, data.transpose()) / counts[:, np.newaxis]
+    model_zerocentered = (models - model_mean[:, :, np.newaxis]) * weights[:, np.newaxis, :]
+    data_zerocentered = (data[np.newaxis, :, :] - data_mean[:, :, np.newaxis]) * weights[:, np.newaxis, :]
+
+    # The transpose of the cross-covariance, summed over all the points
+    W = np.matmul(data_zerocentered, model_zerocentered.transpose((0, 2, 1)))
+    U, d, Vh = np.linalg.svd(W)
+    S = np.ones((models.shape[0], 3))
+    S[np.linalg.det(U) * np.linalg.det(Vh) < 0, 2] = -1
+    rot = np.matmul(U * S[:, np.newaxis, :], Vh)
+    if with_scale:
+        scale = np.sum(d * S, axis=1) / np.sum(model_zerocentered * model_zerocentered, axis=(1, 2))
+    else:
+        scale = np.ones(models.shape[0])
+    trans = data_mean - scale[:, np.newaxis] * np.einsum('kij,kj->ki', rot, model_mean)
+
+    model_aligned = scale[:, np.newaxis, np.newaxis] * np.matmul(rot, models) + trans[:, :, np.newaxis]
+    alignment_error = (model_aligned - data[np.newaxis, :, :]) * weights[:, np.newaxis, :]
+    trans_error = np.sqrt(np.sum(alignment_error * alignment_error, axis=1))
+    return rot, trans, scale, trans_error
+
+
+def align(model, data, with_scale=False):
     """Align two trajectories using the method of Horn (closed-form).
 
     Input:
     model -- first trajectory (3xn)
     data -- second trajectory (3xn)
+    with_scale -- also find the scale of the model (Umeyama), which is applied to the returned rotation
 
     Output:
     rot -- rotation matrix (3x3)
     trans -- translation vector (3x1)
-    trans_error -- translational error per point (1xn)
+    trans_error -- translational error per point (n)
 
     """
-    np.set_printoptions(precision=3, suppress=True)
-    model_zerocentered = model - model.mean(1)
-    data_zerocentered = data - data.mean(1)
-
-    W = np.zeros((3, 3))
-    for column in range(model.shape[1]):
-        W += np.outer(model_zerocentered[:, column], data_zerocentered[:, column])
-    U, d, Vh = np.linalg.linalg.svd(W.transpose())
-    S = np.matrix(np.identity(3))
-    if (np.linalg.det(U) * np.linalg.det(Vh) < 0):
-        S[2, 2] = -1
-    rot = U * S * Vh
-    trans = data.mean(1) - rot * model.mean(1)
-
-    model_aligned = rot * model + trans
-    alignment_error = model_aligned - data
-
-    trans_error = np.sqrt(np.sum(np.multiply(alignment_error, alignment_error), 0)).A[0]
-
-    return rot, trans, trans_error
+    rot, trans, scale, trans_error = align_trajectories(model, data, with_scale=with_scale)
+    return scale[0] * rot[0], trans[0][:, np.newaxis], trans_error[0]
@@ -1,8 +1,8 @@
-import numpy as np
 import pickle
 import bson
 import util.associate as ass
 import core.benchmark_comparison
+import util.summary_statistics as stats
 
 
 class ATEBenchmarkComparison(core.benchmark_comparison.BenchmarkComparison):
@@ -83,18 +83,34 @@ class ATEBenchmarkComparison(core.benchmark_comparison.BenchmarkComparison):
         :param reference_benchmark_result: 
         :return: 
         """
-        matches = ass.associate(reference_benchmark_result.translational_error, benchmark_result.translational_error,
-                                offset=self.offset, max_difference=self.max_difference)
+        return self.compare_many_results([benchmark_result], reference_benchmark_result)[0]
 
-        trans_error_diff = {}
-        for ref_stamp, result_stamp in matches:
-            trans_error_diff[ref_stamp] = (reference_benchmark_result.translational_error[ref_stamp] -
-                                           benchmark_result.translational_error[result_stamp])
-        return ATEBenchmarkComparisonResult(benchmark_comparison_id=self.identifier,
-                                            benchmark_result=benchmark_result.identifier,
-                                            reference_benchmark_result=reference_benchmark_result.identifier,
-                                            difference_in_translational_error=trans_error_diff,
-                                            settings=self.get_settings())
+    def compare_many_results(self, benchmark_results, reference_benchmark_result):
+        """
+        Compare several Absolute Trajectory Error results with the same reference result.
+        Errors are compared as arrays, and the reference is only read once.
+        :param benchmark_results: A list of ATE results
+        :param reference_benchmark_result: The reference ATE result
+        :return: A list of ATEBenchmarkComparisonResult, in the same order as the benchmark results
+        """
+        ref_timestamps = reference_benchmark_result.timestamps
+        ref_errors = reference_benchmark_result.errors
+        comparison_results = []
+        for benchmark_result in benchmark_results:
+            ref_indexes, result_indexes = ass.associate_indexes(ref_timestamps, benchmark_result.timestamps,
+                                                                offset=self.offset,
+                                                                max_difference=self.max_difference)
+            trans_error_diff = ref_errors[ref_indexes] - benchmark_result.errors[result_indexes]
+            comparison_results.append(ATEBenchmarkComparisonResult(
+                benchmark_comparison_id=self.identifier,
+                benchmark_result=benchmark_result.identifier,
+                reference_benchmark_result=reference_benchmark_result.identifier,
+                difference_in_translational_error=dict(zip(ref_timestamps[ref_indexes].tolist(),
+                                                           trans_error_diff.tolist())),
+                settings=self.get_settings(),
+                statistics=stats.summarise(trans_error_diff)
+            ))
+        return comparison_results
 
 
 class ATEBenchmarkComparisonResult(core.benchmark_comparison.BenchmarkComparisonResult):
@@ -104,7 +120,16 @@ class ATEBenchmarkComparisonResult(core.benchmark_comparison.BenchmarkComparison
     """
 
     def __init__(self, benchmark_comparison_id, benchmark_result, reference_benchmark_result,
-                 difference_in_translational_error, settings, id_=None, **kwargs):
+                 difference_in_translational_error, settings, statistics=None, id_=None, **kwargs):
+        """
+        :param benchmark_comparison_id: The id of the comparison benchmark that produced this result
+        :param benchmark_result: The id of the benchmark result compared
+        :param reference_benchmark_result: The id of the reference benchmark result
+        :param difference_in_translational_error: A map of timestamps to the difference in translational error
+        :param settings: The settings of the comparison
+        :param statistics: The summary statistics of the differences, if previously computed. Computed if None.
+        :param id_: The id of the result, if it exists
+        """
         kwargs['success'] = True
         super().__init__(benchmark_comparison_id=benchmark_comparison_id,
                          benchmark_result=benchmark_result,
@@ -113,14 +138,8 @@ class ATEBenchmarkComparisonResult(core.benchmark_comparison.BenchmarkComparison
         self._trans_error_diff = difference_in_translational_error
         self._settings = settings
 
-        # Compute and cache error statistics
-        error_array = np.array(list(difference_in_translational_error.values()))
-        self._rmse = np.sqrt(np.dot(error_array, error_array) / len(difference_in_translational_error))
-        self._mean = np.mean(error_array)
-        self._median = np.median(error_array)
-        self._std = np.std(error_array)
-        self._min = np.min(error_array)
-        self._max = np.max(error_array)
+        self._timestamps, self._errors = stats.dict_to_arrays(difference_in_translational_error)
+        self._statistics = statistics if statistics is not None else stats.summarise(self._errors)
 
     @property
     def translational_error_difference(self):
@@ -130,39 +149,52 @@ class ATEBenchmarkComparisonResult(core.benchmark_comparison.BenchmarkComparison
     def settings(self):
         return self._settings
 
+    @property
+    def timestamps(self):
+        return self._timestamps
+
+    @property
+    def errors(self):
+        return self._errors
+
+    @property
+    def statistics(self):
+        return self._statistics
+
     @property
     def num_pairs(self):
-        return len(self.translational_error_difference)
+        return len(self._errors)
 
     @property
     def rmse(self):
-        return self._rmse
+        return self._statistics['rmse']
 
     @property
     def mean(self):
-        return self._mean
+        return self._statistics['mean']
 
     @property
     def median(self):
-        return np.median(self.translational_error_difference)
+        return self._statistics['median']
 
     @property
     def std(self):
-        return np.std(self.translational_error_difference)
+        return self._statistics['std']
 
     @property
     def min(self):
-        return np.min(self.translational_error_difference)
+        return self._statistics['min']
 
     @property
     def max(self):
-        return np.max(self.translational_error_difference)
+        return self._statistics['max']
 
     def serialize(self):
         output = super().serialize()
         output['trans_error_diff'] = bson.Binary(pickle.dumps(self.translational_error_difference,
                                                               protocol=pickle.HIGHEST_PROTOCOL))
         output['settings'] = self.settings
+        output['statistics'] = self.statistics
         return output
 
     @classmethod
@@ -171,4 +203,6 @@ class ATEBenchmarkComparisonResult(core.benchmark_comparison.BenchmarkComparison
             kwargs['difference_in_translational_error'] = pickle.loads(serialized_representation['trans_error_diff'])
         if 'settings' in serialized_representation:
             kwargs['settings'] = serialized_representation['settings']
+        if 'statistics' in serialized_representation:
+            kwargs['statistics'] = serialized_representation['statistics']
         return super().deserialize(serialized_representation, db_client, **kwargs)
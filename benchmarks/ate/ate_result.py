@@ -1,7 +1,7 @@
-import numpy as np
 import pickle
 import bson
 import core.benchmark
+import util.summary_statistics as stats
 
 
 class BenchmarkATEResult(core.benchmark.BenchmarkResult):
@@ -13,49 +13,65 @@ class BenchmarkATEResult(core.benchmark.BenchmarkResult):
     Root Mean-Squared Error, in the rmse property.
     """
 
-    def __init__(self, benchmark_id, trial_result_id, translational_error, ate_settings, id_=None, **kwargs):
+    def __init__(self, benchmark_id, trial_result_id, translational_error, ate_settings, statistics=None,
+                 id_=None, **kwargs):
+        """
+        :param benchmark_id: The id of the benchmark that produced this result
+        :param trial_result_id: The id of the trial result measured
+        :param translational_error: A map of timestamps to translational error
+        :param ate_settings: The settings of the benchmark
+        :param statistics: The summary statistics of the errors, if previously computed. Computed if None.
+        :param id_: The id of the result, if it exists
+        """
         kwargs['success'] = True
         super().__init__(benchmark_id=benchmark_id, trial_result_id=trial_result_id, id_=id_, **kwargs)
         self._translational_error = translational_error
         self._ate_settings = ate_settings
 
-        # Compute and cache error statistics
         # We expect translational error to be a map of timestamps to error values as single floats.
-        error_array = np.array(list(translational_error.values()))
-        self._rmse = np.sqrt(np.dot(error_array, error_array) / len(translational_error))
-        self._mean = np.mean(error_array)
-        self._median = np.median(error_array)
-        self._std = np.std(error_array)
-        self._min = np.min(error_array)
-        self._max = np.max(error_array)
+        # Hold them as arrays, and compute the error statistics once.
+        self._timestamps, self._errors = stats.dict_to_arrays(translational_error)
+        self._statistics = statistics if statistics is not None else stats.summarise(self._errors)
 
     @property
     def num_pairs(self):
-        return len(self.translational_error)
+        return len(self._errors)
+
+    @property
+    def timestamps(self):
+        return self._timestamps
+
+    @property
+    def errors(self):
+        return self._errors
+
+    @property
+    def statistics(self):
+        return self._statistics
 
     @property
     def rmse(self):
-        return self._rmse
+        return self._statistics['rmse']
 
     @property
     def mean(self):
-        return self._mean
+        return self._statistics['mean']
 
     @property
     def median(self):
-        return self._median
+        return self._statistics['median']
 
     @property
     def std(self):
-        return self._std
+        return self._statistics['std']
 
     @property
     def min(self):
-        return self._min
+        return self._statistics['min']
 
     @property
     def max(self):
-        return self._max
+        return self._statistics['max']
 
     @property
     def translational_error(self):
@@ -69,6 +85,7 @@ class BenchmarkATEResult(core.benchmark.BenchmarkResult):
         output = super().serialize()
         output['trans_error'] = bson.Binary(pickle.dumps(self.translational_error, protocol=pickle.HIGHEST_PROTOCOL))
         output['settings'] = self.settings
+        output['statistics'] = self.statistics
         return output
 
     @classmethod
@@ -77,4 +94,6 @@ class BenchmarkATEResult(core.benchmark.BenchmarkResult):
             kwargs['translational_error'] = pickle.loads(serialized_representation['trans_error'])
         if 'settings' in serialized_representation:
             kwargs['ate_settings'] = serialized_representation['settings']
+        if 'statistics' in serialized_representation:
+            kwargs['statistics'] = serialized_representation['statistics']
         return super().deserialize(serialized_representation, db_client, **kwargs)
@@ -1,6 +1,7 @@
 import unittest
 import numpy as np
 import copy
+import transforms3d as tf3d
 import util.transform as tf
 import util.associate as ass
 import core.benchmark
@@ -97,6 +98,7 @@ class TestBenchmarkATE(database.tests.test_entity.EntityContract, unittest.TestC
         self.assertEqual(benchmark1.offset, benchmark2.offset)
         self.assertEqual(benchmark1.max_difference, benchmark2.max_difference)
         self.assertEqual(benchmark1.scale, benchmark2.scale)
+        self.assertEqual(benchmark1.align_scale, benchmark2.align_scale)
 
     def test_benchmark_results_returns_a_benchmark_result(self):
         benchmark = ate.BenchmarkATE()
@@ -201,3 +203,89 @@ class TestBenchmarkATE(database.tests.test_entity.EntityContract, unittest.TestC
         benchmark.scale = scale
         result = benchmark.benchmark_results(self.trial_result)
         self.assertLess(result.max, unscaled_result.max)
+
+    def test_align_scale_finds_unknown_scale(self):
+        comp_traj, noise = create_noise(self.trial_result.ground_truth_trajectory, self.random,
+                                        time_noise=0, loc_noise=0)
+        self.trial_result.computed_trajectory = {
+            key: tf.Transform(location=pose.location / 37, rotation=pose.rotation_quat(True), w_first=True)
+            for key, pose in comp_traj.items()}
+
+        benchmark = ate.BenchmarkATE(align_scale=True)
+        result = benchmark.benchmark_results(self.trial_result)
+        for time, error in result.translational_error.items():
+            self.assertAlmostEqual(0, error, places=6)
+
+    def test_benchmark_many_results_is_the_same_as_benchmarking_each(self):
+        trial_results = [self.trial_result]
+        for _ in range(3):
+            comp_traj, _ = create_noise(self.trial_result.ground_truth_trajectory, self.random)
+            # Drop some of the poses, so that each trial matches different ground truth
+            trial_results.append(MockTrialResult(self.trial_result.ground_truth_trajectory,
+                                                 {stamp: pose for stamp, pose in comp_traj.items()
+                                                  if self.random.uniform() > 0.2}))
+        trial_results.append(MockTrialResult(create_random_trajectory(self.random),
+                                             self.trial_result.computed_trajectory))
+
+        benchmark = ate.BenchmarkATE()
+        results = benchmark.benchmark_many_results(trial_results)
+        self.assertEqual(len(trial_results), len(results))
+        self.assertIsInstance(results[-1], core.benchmark.FailedBenchmark)
+        for trial_result, result in zip(trial_results[:-1], results[:-1]):
+            expected = benchmark.benchmark_results(trial_result)
+            self.assertEqual(set(expected.translational_error.keys()), set(result.translational_error.keys()))
+            for time, error in expected.translational_error.items():
+                self.assertAlmostEqual(error, result.translational_error[time])
+
+    def test_benchmark_many_results_separates_datasets_with_the_same_timestamps(self):
+        other_trajectory = {stamp: tf.Transform(location=self.random.uniform(-1000, 1000, 3),
+                                                rotation=self.random.uniform(0, 1, 4))
+                            for stamp in self.trial_result.ground_truth_trajectory.keys()}
+        other_trial_result = MockTrialResult(other_trajectory, copy.deepcopy(other_trajectory))
+
+        benchmark = ate.BenchmarkATE()
+        results = benchmark.benchmark_many_results([self.trial_result, other_trial_result])
+        for trial_result, result in zip([self.trial_result, other_trial_result], results):
+            expected = benchmark.benchmark_results(trial_result)
+            for time, error in expected.translational_error.items():
+                self.assertAlmostEqual(error, result.translational_error[time])
+        for error in results[1].translational_error.values():
+            self.assertAlmostEqual(0, error, places=6)
+
+
+class TestAlign(unittest.TestCase):
+
+    def setUp(self):
+        self.random = np.random.RandomState(5234)
+        self.model = self.random.uniform(-10, 10, (3, 50))
+        self.rot = tf3d.euler.euler2mat(*self.random.uniform(-np.pi, np.pi, 3))
+        self.trans = self.random.uniform(-10, 10, 3)
+
+    def test_align_finds_rigid_transform(self):
+        data = np.dot(self.rot, self.model) + self.trans[:, np.newaxis]
+        rot, trans, trans_error = ate.align(self.model, data)
+        self.assertTrue(np.all(np.isclose(self.rot, rot)))
+        self.assertTrue(np.all(np.isclose(self.trans, trans[:, 0])))
+        self.assertTrue(np.all(np.isclose(0, trans_error)))
+
+    def test_align_trajectories_finds_scale(self):
+        data = 0.13 * np.dot(self.rot, self.model) + self.trans[:, np.newaxis]
+        rot, trans, scale, trans_error = ate.align_trajectories(self.model, data, with_scale=True)
+        self.assertTrue(np.all(np.isclose(self.rot, rot[0])))
+        self.assertTrue(np.all(np.isclose(self.trans, trans[0])))
+        self.assertAlmostEqual(0.13, scale[0])
+        self.assertTrue(np.all(np.isclose(0, trans_error)))
+
+    def test_align_trajectories_batch_is_the_same_as_aligning_each(self):
+        models = self.random.uniform(-10, 10, (4, 3, 50))
+        mask = self.random.uniform(0, 1, (4, 50)) > 0.3
+        data = np.dot(self.rot, self.model) + self.trans[:, np.newaxis]
+        rots, trans, scales, trans_errors = ate.align_trajectories(models, data, mask=mask, with_scale=True)
+        for idx in range(4):
+            rot, tran, scale, trans_error = ate.align_trajectories(models[idx][:, mask[idx]], data[:, mask[idx]],
+                                                                   with_scale=True)
+            self.assertTrue(np.all(np.isclose(rot[0], rots[idx])))
+            self.assertTrue(np.all(np.isclose(tran[0], trans[idx])))
+            self.assertAlmostEqual(scale[0], scales[idx])
+            self.assertTrue(np.all(np.isclose(trans_error[0], trans_errors[idx][mask[idx]])))
+            self.assertTrue(np.all(trans_errors[idx][~mask[idx]] == 0))
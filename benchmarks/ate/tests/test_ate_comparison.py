@@ -80,6 +80,49 @@ class TestATEBenchmarkComparison(entity_test.EntityContract, unittest.TestCase):
             self.assertAlmostEqual(-1 * error, comparison_result.translational_error_difference[time])
 
 
+    def test_compare_many_results_same_as_comparing_each(self):
+        random = np.random.RandomState(2290)
+        ref_error = {random.uniform(0, 600): random.uniform(-100, 100) for _ in range(100)}
+        ref_benchmark_result = ate_res.BenchmarkATEResult(benchmark_id=random.randint(0, 10),
+                                                          trial_result_id=random.randint(10, 20),
+                                                          translational_error=ref_error,
+                                                          ate_settings={})
+        benchmark_results = []
+        for idx in range(5):
+            test_error = {time + random.uniform(-0.005, 0.005): error + random.uniform(-50, 50)
+                          for time, error in ref_error.items() if random.uniform(0, 1) < 0.8}
+            benchmark_results.append(ate_res.BenchmarkATEResult(benchmark_id=random.randint(20, 30),
+                                                                trial_result_id=random.randint(30, 40),
+                                                                translational_error=test_error,
+                                                                ate_settings={}))
+
+        comparison_benchmark = ate_comp.ATEBenchmarkComparison()
+        comparison_results = comparison_benchmark.compare_many_results(benchmark_results, ref_benchmark_result)
+        self.assertEqual(len(benchmark_results), len(comparison_results))
+        for benchmark_result, comparison_result in zip(benchmark_results, comparison_results):
+            expected = comparison_benchmark.compare_results(benchmark_result, ref_benchmark_result)
+            self.assertEqual(benchmark_result.identifier, comparison_result.benchmark_result)
+            self.assertEqual(expected.translational_error_difference,
+                             comparison_result.translational_error_difference)
+            self.assertEqual(expected.statistics, comparison_result.statistics)
+
+    def test_comparison_statistics_match_error_diff(self):
+        random = np.random.RandomState(7221)
+        ref_error = {random.uniform(0, 600): random.uniform(-100, 100) for _ in range(100)}
+        test_error = {time + random.uniform(-0.005, 0.005): error + random.uniform(-50, 50)
+                      for time, error in ref_error.items()}
+        ref_benchmark_result = ate_res.BenchmarkATEResult(benchmark_id=1, trial_result_id=2,
+                                                          translational_error=ref_error, ate_settings={})
+        subject_benchmark_result = ate_res.BenchmarkATEResult(benchmark_id=3, trial_result_id=4,
+                                                              translational_error=test_error, ate_settings={})
+        comparison_result = ate_comp.ATEBenchmarkComparison().compare_results(subject_benchmark_result,
+                                                                              ref_benchmark_result)
+        error_diff = np.array(list(comparison_result.translational_error_difference.values()))
+        self.assertEqual(len(ref_error), comparison_result.num_pairs)
+        self.assertAlmostEqual(np.mean(error_diff), comparison_result.mean)
+        self.assertAlmostEqual(np.median(error_diff), comparison_result.median)
+        self.assertAlmostEqual(np.sqrt(np.mean(error_diff * error_diff)), comparison_result.rmse)
+
 class TestATEBenchmarkComparisonResult(entity_test.EntityContract, unittest.TestCase):
 
     def get_class(self):
@@ -116,6 +159,7 @@ class TestATEBenchmarkComparisonResult(entity_test.EntityContract, unittest.Test
         self.assertEqual(benchmark1.reference_benchmark_result, benchmark2.reference_benchmark_result)
         self.assertEqual(benchmark1.translational_error_difference,
                          benchmark2.translational_error_difference)
+        self.assertEqual(benchmark1.statistics, benchmark2.statistics)
 
     def assert_serialized_equal(self, s_model1, s_model2):
         """
@@ -135,3 +179,33 @@ class TestATEBenchmarkComparisonResult(entity_test.EntityContract, unittest.Test
         self.assertEqual(set(trans_error1.keys()), set(trans_error2.keys()))
         for key in trans_error1:
             self.assertTrue(np.array_equal(trans_error1[key], trans_error2[key]))
+
+    def test_serialize_includes_statistics(self):
+        subject = self.make_instance()
+        s_subject = subject.serialize()
+        self.assertEqual(subject.rmse, s_subject['statistics']['rmse'])
+        self.assertEqual(subject.mean, s_subject['statistics']['mean'])
+        self.assertEqual(subject.median, s_subject['statistics']['median'])
+        self.assertEqual(subject.std, s_subject['statistics']['std'])
+        self.assertEqual(subject.min, s_subject['statistics']['min'])
+        self.assertEqual(subject.max, s_subject['statistics']['max'])
+        self.assertEqual(subject.num_pairs, s_subject['statistics']['count'])
+
+    def test_deserialize_uses_stored_statistics(self):
+        subject = self.make_instance()
+        s_subject = subject.serialize()
+        s_subject['statistics'] = dict(s_subject['statistics'], max=-1.0)
+        deserialized = self.get_class().deserialize(s_subject, self.create_mock_db_client())
+        self.assertEqual(-1.0, deserialized.max)
+
+    def test_deserialize_computes_statistics_when_not_stored(self):
+        subject = self.make_instance()
+        s_subject = subject.serialize()
+        del s_subject['statistics']
+        deserialized = self.get_class().deserialize(s_subject, self.create_mock_db_client())
+        self.assertEqual(subject.statistics, deserialized.statistics)
+
+    def test_median_is_correct(self):
+        subject = self.make_instance()
+        error_diff = np.array(list(subject.translational_error_difference.values()))
+        self.assertEqual(np.median(error_diff), subject.median)
@@ -36,6 +36,7 @@ class TestBenchmarkATEResult(entity_test.EntityContract, unittest.TestCase):
         self.assertEqual(benchmark_result1.trial_result, benchmark_result2.trial_result)
         self.assertEqual(benchmark_result1.translational_error, benchmark_result2.translational_error)
         self.assertEqual(benchmark_result1.settings, benchmark_result2.settings)
+        self.assertEqual(benchmark_result1.statistics, benchmark_result2.statistics)
 
     def assert_serialized_equal(self, s_model1, s_model2):
         """
@@ -87,3 +88,33 @@ class TestBenchmarkATEResult(entity_test.EntityContract, unittest.TestCase):
             if max_ is None or error > max_:
                 max_ = error
         self.assertEqual(max_, subject.max)
+
+    def test_serialize_includes_statistics(self):
+        subject = self.make_instance()
+        s_subject = subject.serialize()
+        self.assertEqual(subject.rmse, s_subject['statistics']['rmse'])
+        self.assertEqual(subject.mean, s_subject['statistics']['mean'])
+        self.assertEqual(subject.median, s_subject['statistics']['median'])
+        self.assertEqual(subject.std, s_subject['statistics']['std'])
+        self.assertEqual(subject.min, s_subject['statistics']['min'])
+        self.assertEqual(subject.max, s_subject['statistics']['max'])
+        self.assertEqual(subject.num_pairs, s_subject['statistics']['count'])
+
+    def test_deserialize_uses_stored_statistics(self):
+        subject = self.make_instance()
+        s_subject = subject.serialize()
+        s_subject['statistics'] = dict(s_subject['statistics'], rmse=-1.0)
+        deserialized = self.get_class().deserialize(s_subject, self.create_mock_db_client())
+        self.assertEqual(-1.0, deserialized.rmse)
+
+    def test_deserialize_computes_statistics_when_not_stored(self):
+        subject = self.make_instance()
+        s_subject = subject.serialize()
+        del s_subject['statistics']
+        deserialized = self.get_class().deserialize(s_subject, self.create_mock_db_client())
+        self.assertEqual(subject.statistics, deserialized.statistics)
+
+    def test_errors_are_arrays(self):
+        subject = self.make_instance()
+        self.assertEqual(list(subject.translational_error.keys()), subject.timestamps.tolist())
+        self.assertEqual(list(subject.translational_error.values()), subject.errors.tolist())
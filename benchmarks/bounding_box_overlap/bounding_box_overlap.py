@@ -1,3 +1,5 @@
+import multiprocessing
+import numpy as np
 import core.benchmark
 import benchmarks.bounding_box_overlap.bounding_box_overlap_result as bbox_result
 
@@ -11,21 +13,31 @@ class BoundingBoxOverlapBenchmark(core.benchmark.Benchmark):
     Final score is F1 score times detection confidence
     """
 
-    def __init__(self, id_=None):
+    def __init__(self, num_processes=1, id_=None):
         """
-        Create a new benchmark instance. No configuration.
+        Create a new benchmark instance. No configuration of the results.
+        :param num_processes: The number of processes to match the bounding boxes in different images with.
         """
         super().__init__(id_=id_)
+        self._num_processes = max(1, int(num_processes))
+
+    @property
+    def num_processes(self):
+        return self._num_processes
+
+    @num_processes.setter
+    def num_processes(self, num_processes):
+        self._num_processes = max(1, int(num_processes))
 
     def serialize(self):
         output = super().serialize()
-        # output['initializing_is_lost'] = self._initializing_is_lost
+        output['num_processes'] = self.num_processes
         return output
 
     @classmethod
     def deserialize(cls, serialized_representation, db_client, **kwargs):
-        # if 'initializing_is_lost' in serialized_representation:
-        #    kwargs['initializing_is_lost'] = serialized_representation['initializing_is_lost']
+        if 'num_processes' in serialized_representation:
+            kwargs['num_processes'] = serialized_representation['num_processes']
         return super().deserialize(serialized_representation, db_client, **kwargs)
 
     @classmethod
@@ -47,58 +59,129 @@ class BoundingBoxOverlapBenchmark(core.benchmark.Benchmark):
         ground_truth_bboxes = trial_result.get_ground_truth_bounding_boxes()
         detected_bboxes = trial_result.get_bounding_boxes()
 
-        results = {}
-        for image_id in ground_truth_bboxes.keys():
-            results[image_id] = [{
-                'overlap': 0,
-                'bounding_box_area': 0,
-                'ground_truth_area': gt_bbox.height * gt_bbox.width,
-                'confidence': 0,
-                'bounding_box_classes': tuple(),
-                'ground_truth_classes': gt_bbox.class_names
-            } for gt_bbox in ground_truth_bboxes[image_id]]
-
-            if image_id in detected_bboxes:
-
-                potential_matches = [(compute_overlap(gt_bbox, bbox), gt_idx, idx)
-                                     for gt_idx, gt_bbox in enumerate(ground_truth_bboxes[image_id])
-                                     for idx, bbox in enumerate(detected_bboxes[image_id])]
-                potential_matches.sort(reverse=True)
-
-                gt_indexes = set(range(len(ground_truth_bboxes[image_id])))
-                bbox_indexes = set(range(len(detected_bboxes[image_id])))
-                for overlap, gt_idx, idx in potential_matches:
-                    if overlap <= 0:
-                        break
-                    if idx in bbox_indexes and gt_idx in gt_indexes:
-                        gt_indexes.remove(gt_idx)
-                        bbox_indexes.remove(idx)
-
-                        bbox = detected_bboxes[image_id][idx]
-
-                        results[image_id][gt_idx]['overlap'] = overlap
-                        results[image_id][gt_idx]['confidence'] = bbox.confidence
-                        results[image_id][gt_idx]['bounding_box_area'] = bbox.width * bbox.height
-                        results[image_id][gt_idx]['bounding_box_classes'] = bbox.class_names
-
-                # Record results for additionally detected bboxes
-                for bbox_index in bbox_indexes:
-                    bbox = detected_bboxes[image_id][bbox_index]
-                    results[image_id].append({
-                        'overlap': 0,
-                        'bounding_box_area': bbox.height * bbox.width,
-                        'ground_truth_area': 0,
-                        'confidence': bbox.confidence,
-                        'bounding_box_classes': bbox.class_names,
-                        'ground_truth_classes': tuple()
-                    })
+        image_ids = list(ground_truth_bboxes.keys())
+        image_bboxes = [(ground_truth_bboxes[image_id], detected_bboxes.get(image_id, [])) for image_id in image_ids]
+        if self.num_processes > 1 and len(image_ids) > 1:
+            with multiprocessing.Pool(processes=min(self.num_processes, len(image_ids))) as pool:
+                image_results = pool.starmap(match_bounding_boxes, image_bboxes,
+                                             chunksize=max(1, len(image_ids) // (4 * self.num_processes)))
+        else:
+            image_results = [match_bounding_boxes(gt_bboxes, bboxes) for gt_bboxes, bboxes in image_bboxes]
 
         return bbox_result.BoundingBoxOverlapBenchmarkResult(benchmark_id=self.identifier,
                                                              trial_result_id=trial_result.identifier,
-                                                             overlaps=results,
+                                                             overlaps=dict(zip(image_ids, image_results)),
                                                              settings={})
 
 
+def match_bounding_boxes(ground_truth_bboxes, detected_bboxes):
+    """
+    Match the detected bounding boxes in an image to the ground truth bounding boxes.
+    The pairs with the greatest overlap are matched first, and each box is only matched once.
+    :param ground_truth_bboxes: The list of ground truth bounding boxes in the image
+    :param detected_bboxes: The list of detected bounding boxes in the image
+    :return: A list of results, one for each ground truth box, followed by one for each unmatched detection
+    """
+    results = [{
+        'overlap': 0,
+        'bounding_box_area': 0,
+        'ground_truth_area': gt_bbox.height * gt_bbox.width,
+        'confidence': 0,
+        'bounding_box_classes': tuple(),
+        'ground_truth_classes': gt_bbox.class_names
+    } for gt_bbox in ground_truth_bboxes]
+    if len(detected_bboxes) <= 0:
+        return results
+
+    overlaps = np.zeros((len(ground_truth_bboxes), len(detected_bboxes)), dtype=np.int64)
+    if len(ground_truth_bboxes) > 0:
+        gt_classes, classes = class_masks(ground_truth_bboxes, detected_bboxes)
+        overlaps = compute_overlaps(bboxes_to_array(ground_truth_bboxes), bboxes_to_array(detected_bboxes))
+        overlaps[np.dot(gt_classes.astype(np.int64), classes.astype(np.int64).T) <= 0] = 0
+
+    # Sort the overlapping pairs by overlap, then ground truth index, then detection index, all descending
+    gt_indexes, indexes = np.nonzero(overlaps > 0)
+    order = np.lexsort((-indexes, -gt_indexes, -overlaps[gt_indexes, indexes]))
+    gt_matched = np.zeros(len(ground_truth_bboxes), dtype=bool)
+    matched = np.zeros(len(detected_bboxes), dtype=bool)
+    remaining = min(len(ground_truth_bboxes), len(detected_bboxes))
+    for gt_idx, idx in zip(gt_indexes[order].tolist(), indexes[order].tolist()):
+        if remaining <= 0:
+            break
+        if not matched[idx] and not gt_matched[gt_idx]:
+            gt_matched[gt_idx] = True
+            matched[idx] = True
+            remaining -= 1
+
+            bbox = detected_bboxes[idx]
+            results[gt_idx]['overlap'] = int(overlaps[gt_idx, idx])
+            results[gt_idx]['confidence'] = bbox.confidence
+            results[gt_idx]['bounding_box_area'] = bbox.width * bbox.height
+            results[gt_idx]['bounding_box_classes'] = bbox.class_names
+
+    # Record results for additionally detected bboxes
+    for bbox_index in np.nonzero(~matched)[0].tolist():
+        bbox = detected_bboxes[bbox_index]
+        results.append({
+            'overlap': 0,
+            'bounding_box_area': bbox.height * bbox.width,
+            'ground_truth_area': 0,
+            'confidence': bbox.confidence,
+            'bounding_box_classes': bbox.class_names,
+            'ground_truth_classes': tuple()
+        })
+    return results
+
+
+def bboxes_to_array(bboxes):
+    """
+    Get the shapes of a list of bounding boxes as an array
+    :param bboxes: A list of bounding boxes
+    :return: An Nx4 integer array of x, y, width, and height
+    """
+    return np.array([(bbox.x, bbox.y, bbox.width, bbox.height) for bbox in bboxes], dtype=np.int64).reshape(-1, 4)
+
+
+def class_masks(bboxes1, bboxes2):
+    """
+    Find which classes each of two lists of bounding boxes belong to, as boolean masks over the same set of classes.
+    Two boxes have a class in common iff the dot product of their masks is greater than 0.
+    :param bboxes1: A list of bounding boxes
+    :param bboxes2: Another list of bounding boxes
+    :return: An NxC and an MxC boolean array, marking the classes of each bounding box
+    """
+    class_ids = {}
+    for bbox in bboxes1:
+        for class_name in bbox.class_names:
+            class_ids.setdefault(class_name, len(class_ids))
+    for bbox in bboxes2:
+        for class_name in bbox.class_names:
+            class_ids.setdefault(class_name, len(class_ids))
+    masks = []
+    for bboxes in (bboxes1, bboxes2):
+        mask = np.zeros((len(bboxes), len(class_ids)), dtype=bool)
+        for idx, bbox in enumerate(bboxes):
+            mask[idx, [class_ids[class_name] for class_name in bbox.class_names]] = True
+        masks.append(mask)
+    return masks[0], masks[1]
+
+
+def compute_overlaps(bboxes1, bboxes2):
+    """
+    Compute the area of overlap between every pair of bounding boxes from two arrays, ignoring the class
+    :param bboxes1: An Nx4 array of x, y, width, height, see bboxes_to_array
+    :param bboxes2: An Mx4 array of x, y, width, height
+    :return: An NxM array of overlapping area
+    """
+    overlap_x = np.maximum(bboxes1[:, np.newaxis, 0], bboxes2[np.newaxis, :, 0])
+    overlap_y = np.maximum(bboxes1[:, np.newaxis, 1], bboxes2[np.newaxis, :, 1])
+    overlap_upper_x = np.minimum(bboxes1[:, np.newaxis, 0] + bboxes1[:, np.newaxis, 2],
+                                 bboxes2[np.newaxis, :, 0] + bboxes2[np.newaxis, :, 2])
+    overlap_upper_y = np.minimum(bboxes1[:, np.newaxis, 1] + bboxes1[:, np.newaxis, 3],
+                                 bboxes2[np.newaxis, :, 1] + bboxes2[np.newaxis, :, 3])
+    return np.maximum(overlap_upper_x - overlap_x, 0) * np.maximum(overlap_upper_y - overlap_y, 0)
+
+
 def compute_overlap(bbox1, bbox2):
     if set(bbox1.class_names).isdisjoint(bbox2.class_names):
         return 0
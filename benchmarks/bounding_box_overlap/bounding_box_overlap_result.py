@@ -1,4 +1,5 @@
 import bson.objectid
+import numpy as np
 import core.benchmark
 
 
@@ -14,6 +15,8 @@ class BoundingBoxOverlapBenchmarkResult(core.benchmark.BenchmarkResult):
         super().__init__(benchmark_id=benchmark_id, trial_result_id=trial_result_id, id_=id_, **kwargs)
         self._overlaps = overlaps
         self._settings = settings
+        self._columns = None
+        self._cache = {}
 
     @property
     def overlaps(self):
@@ -43,14 +46,141 @@ class BoundingBoxOverlapBenchmarkResult(core.benchmark.BenchmarkResult):
         """
         return self._overlaps
 
+    @property
+    def columns(self):
+        """
+        The results for every bounding box as flat arrays, one element per result, in the same order as overlaps.
+        This is built the first time it is needed, and then kept. It has the keys:
+        - 'image_ids': The list of image ids, which 'image' indexes into
+        - 'image': The index of the image each result is for
+        - 'overlap', 'bounding_box_area', 'ground_truth_area', 'confidence': The values from each result
+        - 'classes': The list of all the class names, in the order of the class masks
+        - 'bounding_box_classes', 'ground_truth_classes': NxC boolean masks of the classes of each result
+        :return: A dict of arrays
+        """
+        if self._columns is None:
+            self._columns = make_columns(self.overlaps)
+        return self._columns
+
+    def precisions(self):
+        """
+        Get the precision of every bounding box result, see precision.
+        :return: An array of precision values, in the order of the columns
+        """
+        return _divide_or_zero(self.columns['overlap'], self.columns['bounding_box_area'])
+
+    def recalls(self):
+        """
+        Get the recall of every bounding box result, see recall.
+        :return: An array of recall values, in the order of the columns
+        """
+        return _divide_or_zero(self.columns['overlap'], self.columns['ground_truth_area'])
+
+    def f1_scores(self):
+        """
+        Get the F1 score of every bounding box result, see f1_score.
+        :return: An array of F1 scores, in the order of the columns
+        """
+        if 'f1_scores' not in self._cache:
+            p = self.precisions()
+            r = self.recalls()
+            valid = (p > 0) & (r > 0)
+            scores = np.zeros(len(p))
+            scores[valid] = 2 * p[valid] * r[valid] / (p[valid] + r[valid])
+            self._cache['f1_scores'] = scores
+        return self._cache['f1_scores']
+
+    def ious(self):
+        """
+        Get the intersection over union of every bounding box result
+        :return: An array of IoU values, in the order of the columns
+        """
+        columns = self.columns
+        return _divide_or_zero(columns['overlap'],
+                               columns['bounding_box_area'] + columns['ground_truth_area'] - columns['overlap'])
+
     def scores_by_class(self):
         """
         Get the F1 scores for each class.
-        An example of using map_results.
+        This gives the same result as using map_results with f1_score,
+        for boxes where the detected and ground truth classes are the same.
         :return:
         """
-        return self.map_results(lambda x: set(x['bounding_box_classes']) & set(x['ground_truth_classes']),
-                                f1_score)
+        if 'scores_by_class' not in self._cache:
+            columns = self.columns
+            scores = self.f1_scores()
+            shared_classes = columns['bounding_box_classes'] & columns['ground_truth_classes']
+            self._cache['scores_by_class'] = {class_name: scores[shared_classes[:, class_idx]].tolist()
+                                              for class_idx, class_name in enumerate(columns['classes'])
+                                              if np.any(shared_classes[:, class_idx])}
+        return self._cache['scores_by_class']
+
+    def precision_recall_curves(self, iou_threshold=0.5):
+        """
+        Get the precision/recall curve for each class, ranking the detections by confidence.
+        A detection is a true positive for a class if it matched a ground truth box with that class,
+        with an intersection over union of at least the threshold.
+        :param iou_threshold: The minimum intersection over union for a detection to be correct
+        :return: A map of class names to (precision, recall, confidence) arrays, ordered by decreasing confidence
+        """
+        key = ('precision_recall_curves', iou_threshold)
+        if key not in self._cache:
+            columns = self.columns
+            is_detection = columns['bounding_box_area'] > 0
+            is_ground_truth = columns['ground_truth_area'] > 0
+            correct = self.ious() >= iou_threshold
+            order = np.argsort(-columns['confidence'], kind='mergesort')
+            curves = {}
+            for class_idx, class_name in enumerate(columns['classes']):
+                detections = order[is_detection[order] & columns['bounding_box_classes'][order, class_idx]]
+                num_ground_truth = np.count_nonzero(is_ground_truth & columns['ground_truth_classes'][:, class_idx])
+                true_positives = np.cumsum(correct[detections] & columns['ground_truth_classes'][detections, class_idx])
+                precision_curve = true_positives / np.arange(1, len(detections) + 1)
+                recall_curve = (true_positives / num_ground_truth if num_ground_truth > 0
+                                else np.zeros(len(detections)))
+                curves[class_name] = (precision_curve, recall_curve, columns['confidence'][detections])
+            self._cache[key] = curves
+        return self._cache[key]
+
+    def average_precisions(self, iou_threshold=0.5):
+        """
+        Get the average precision for each class, which is the area under the interpolated precision/recall curve,
+        where precision at each recall is the best precision at that recall or greater.
+        Classes that never appear in the ground truth are left out, since their recall, and so their average
+        precision, is undefined. Scoring them 0 would drag down the mean for every stray detected class.
+        :param iou_threshold: The minimum intersection over union for a detection to be correct
+        :return: A map of class names to average precision
+        """
+        key = ('average_precisions', iou_threshold)
+        if key not in self._cache:
+            columns = self.columns
+            is_ground_truth = columns['ground_truth_area'] > 0
+            num_ground_truth = np.count_nonzero(columns['ground_truth_classes'][is_ground_truth], axis=0)
+            average_precisions = {}
+            for class_idx, class_name in enumerate(columns['classes']):
+                if num_ground_truth[class_idx] <= 0:
+                    continue
+                precision_curve, recall_curve, _ = self.precision_recall_curves(iou_threshold)[class_name]
+                if len(precision_curve) <= 0:
+                    average_precisions[class_name] = 0.0
+                    continue
+                envelope = np.maximum.accumulate(precision_curve[::-1])[::-1]
+                recall_steps = np.diff(np.concatenate(([0.0], recall_curve)))
+                average_precisions[class_name] = float(np.sum(recall_steps * envelope))
+            self._cache[key] = average_precisions
+        return self._cache[key]
+
+    def mean_average_precision(self, iou_thresholds=(0.5,)):
+        """
+        Get the mean average precision over all the classes in the ground truth, and over several IoU thresholds.
+        For instance, the COCO mAP uses thresholds from 0.5 to 0.95 in steps of 0.05.
+        :param iou_thresholds: A threshold or list of thresholds to average over.
+        :return: The mAP, a float
+        """
+        iou_thresholds = np.atleast_1d(iou_thresholds)
+        average_precisions = [ap for threshold in iou_thresholds
+                              for ap in self.average_precisions(float(threshold)).values()]
+        return float(np.mean(average_precisions)) if len(average_precisions) > 0 else 0.0
 
     def map_results(self, key_func, value_func):
         """
@@ -118,6 +248,47 @@ class BoundingBoxOverlapBenchmarkResult(core.benchmark.BenchmarkResult):
         return super().deserialize(serialized_representation, db_client, **kwargs)
 
 
+def make_columns(overlaps):
+    """
+    Turn a map of image ids to lists of bounding box results into flat arrays.
+    See BoundingBoxOverlapBenchmarkResult.columns
+    :param overlaps: The map of image ids to lists of results, see BoundingBoxOverlapBenchmarkResult.overlaps
+    :return: A dict of arrays, one element per result
+    """
+    image_ids = list(overlaps.keys())
+    results = [bbox_result for image_id in image_ids for bbox_result in overlaps[image_id]]
+    class_ids = {}
+    for bbox_result in results:
+        for class_name in bbox_result['bounding_box_classes']:
+            class_ids.setdefault(class_name, len(class_ids))
+        for class_name in bbox_result['ground_truth_classes']:
+            class_ids.setdefault(class_name, len(class_ids))
+    columns = {
+        'image_ids': image_ids,
+        'image': np.repeat(np.arange(len(image_ids)), [len(overlaps[image_id]) for image_id in image_ids]),
+        'classes': sorted(class_ids.keys(), key=lambda class_name: class_ids[class_name])
+    }
+    for key in ('overlap', 'bounding_box_area', 'ground_truth_area', 'confidence'):
+        columns[key] = np.array([bbox_result[key] for bbox_result in results], dtype=np.float64)
+    for key in ('bounding_box_classes', 'ground_truth_classes'):
+        mask = np.zeros((len(results), len(class_ids)), dtype=bool)
+        rows = [idx for idx, bbox_result in enumerate(results) for _ in bbox_result[key]]
+        cols = [class_ids[class_name] for bbox_result in results for class_name in bbox_result[key]]
+        mask[rows, cols] = True
+        columns[key] = mask
+    return columns
+
+
+def _divide_or_zero(numerator, denominator):
+    """
+    Divide two arrays, giving 0 wherever the denominator is not positive
+    """
+    result = np.zeros(len(numerator))
+    valid = denominator > 0
+    result[valid] = numerator[valid] / denominator[valid]
+    return result
+
+
 def precision(bbox_result):
     """
     Compute the precision of a bounding box result,
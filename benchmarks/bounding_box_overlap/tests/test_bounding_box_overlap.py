@@ -1,4 +1,5 @@
 import unittest
+import numpy as np
 import bson.objectid as oid
 import database.tests.test_entity
 import core.benchmark
@@ -43,6 +44,7 @@ class TestBoundingBoxOverlapBenchmark(database.tests.test_entity.EntityContract,
                 not isinstance(benchmark2, bbox_overlap.BoundingBoxOverlapBenchmark)):
             self.fail('object was not a BoundingBoxOverlapBenchmark')
         self.assertEqual(benchmark1.identifier, benchmark2.identifier)
+        self.assertEqual(benchmark1.num_processes, benchmark2.num_processes)
 
     def test_benchmark_results_returns_a_benchmark_result(self):
         trial_result = MockTrialResult(
@@ -252,3 +254,50 @@ class TestBoundingBoxOverlapBenchmark(database.tests.test_entity.EntityContract,
         bbox1 = bbox_trial.BoundingBox({'cup'}, 1, 15, 22, 10, 10)
         bbox2 = bbox_trial.BoundingBox({'cup'}, 1, 190, 197, 10, 10)
         self.assertEqual(0, bbox_overlap.compute_overlap(bbox1, bbox2))
+
+    def test_compute_overlaps_same_as_compute_overlap(self):
+        random = np.random.RandomState(6625)
+        bboxes1 = [bbox_trial.BoundingBox({'cup'}, 1, *random.randint(0, 100, 2), *random.randint(1, 50, 2))
+                   for _ in range(20)]
+        bboxes2 = [bbox_trial.BoundingBox({'cup'}, 1, *random.randint(0, 100, 2), *random.randint(1, 50, 2))
+                   for _ in range(30)]
+        overlaps = bbox_overlap.compute_overlaps(bbox_overlap.bboxes_to_array(bboxes1),
+                                                 bbox_overlap.bboxes_to_array(bboxes2))
+        self.assertEqual((20, 30), overlaps.shape)
+        for idx1, bbox1 in enumerate(bboxes1):
+            for idx2, bbox2 in enumerate(bboxes2):
+                self.assertEqual(bbox_overlap.compute_overlap(bbox1, bbox2), overlaps[idx1, idx2])
+
+    def test_class_masks_mark_shared_classes(self):
+        gt_classes, classes = bbox_overlap.class_masks(
+            [bbox_trial.BoundingBox(('cup',), 1, 0, 0, 10, 10),
+             bbox_trial.BoundingBox(('car', 'cow'), 1, 0, 0, 10, 10)],
+            [bbox_trial.BoundingBox(('cow',), 1, 0, 0, 10, 10), bbox_trial.BoundingBox(('cat',), 1, 0, 0, 10, 10)])
+        self.assertEqual([[False, False], [True, False]], (np.dot(gt_classes, classes.T) > 0).tolist())
+
+    def test_benchmark_only_matches_boxes_of_the_same_class(self):
+        id1 = oid.ObjectId()
+        trial_result = MockTrialResult(
+            gt_bboxes={id1: [bbox_trial.BoundingBox({'cup'}, 1, 15, 22, 100, 100)]},
+            bboxes={id1: [bbox_trial.BoundingBox({'car'}, 1, 15, 22, 100, 100),
+                          bbox_trial.BoundingBox({'cup', 'car'}, 0.5, 25, 32, 50, 50)]})
+        benchmark = bbox_overlap.BoundingBoxOverlapBenchmark()
+        result = benchmark.benchmark_results(trial_result)
+        self.assertEqual(2500, result.overlaps[id1][0]['overlap'])
+        self.assertEqual(0.5, result.overlaps[id1][0]['confidence'])
+        self.assertEqual(('car',), result.overlaps[id1][1]['bounding_box_classes'])
+
+    def test_benchmark_is_the_same_with_multiple_processes(self):
+        random = np.random.RandomState(1351)
+        gt_bboxes = {}
+        bboxes = {}
+        for _ in range(10):
+            image_id = oid.ObjectId()
+            gt_bboxes[image_id] = [bbox_trial.BoundingBox({'cup'}, 1, *random.randint(0, 100, 2),
+                                                          *random.randint(1, 50, 2)) for _ in range(5)]
+            bboxes[image_id] = [bbox_trial.BoundingBox({'cup'}, random.uniform(), *random.randint(0, 100, 2),
+                                                       *random.randint(1, 50, 2)) for _ in range(8)]
+        trial_result = MockTrialResult(gt_bboxes=gt_bboxes, bboxes=bboxes)
+        result = bbox_overlap.BoundingBoxOverlapBenchmark().benchmark_results(trial_result)
+        parallel_result = bbox_overlap.BoundingBoxOverlapBenchmark(num_processes=3).benchmark_results(trial_result)
+        self.assertEqual(result.overlaps, parallel_result.overlaps)
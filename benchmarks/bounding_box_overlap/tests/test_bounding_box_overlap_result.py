@@ -111,3 +111,98 @@ class TestBoundingBoxOverlapBenchmarkResult(database.tests.test_entity.EntityCon
         self.assertIn(41, mapped['cat'])
         self.assertIn(56, mapped['cat'])
         self.assertEqual(2, len(mapped['cat']))
+
+    def test_columns_flatten_overlaps(self):
+        image_id1 = bson.objectid.ObjectId()
+        image_id2 = bson.objectid.ObjectId()
+        subject = overlap_result.BoundingBoxOverlapBenchmarkResult(
+            benchmark_id=1, trial_result_id=2, settings={},
+            overlaps={
+                image_id1: [make_bbox_result(50, 100, 100, 0.5, ('cup',), ('cup',)),
+                            make_bbox_result(0, 20, 0, 0.2, ('car',), ())],
+                image_id2: [make_bbox_result(0, 0, 40, 0, (), ('car', 'cup'))]
+            })
+        columns = subject.columns
+        self.assertEqual([image_id1, image_id2], columns['image_ids'])
+        self.assertEqual([0, 0, 1], columns['image'].tolist())
+        self.assertEqual([50, 0, 0], columns['overlap'].tolist())
+        self.assertEqual([100, 20, 0], columns['bounding_box_area'].tolist())
+        self.assertEqual([100, 0, 40], columns['ground_truth_area'].tolist())
+        self.assertEqual([0.5, 0.2, 0], columns['confidence'].tolist())
+        self.assertEqual(['cup', 'car'], columns['classes'])
+        self.assertEqual([[True, False], [False, True], [False, False]], columns['bounding_box_classes'].tolist())
+        self.assertEqual([[True, False], [False, False], [True, True]], columns['ground_truth_classes'].tolist())
+
+    def test_scores_match_per_result_functions(self):
+        subject = self.make_random_result()
+        results = [bbox_result for img_results in subject.overlaps.values() for bbox_result in img_results]
+        self.assertEqual([overlap_result.precision(x) for x in results], subject.precisions().tolist())
+        self.assertEqual([overlap_result.recall(x) for x in results], subject.recalls().tolist())
+        self.assertEqual([overlap_result.f1_score(x) for x in results], subject.f1_scores().tolist())
+
+    def test_scores_by_class_same_as_map_results(self):
+        subject = self.make_random_result()
+        expected = subject.map_results(lambda x: set(x['bounding_box_classes']) & set(x['ground_truth_classes']),
+                                       overlap_result.f1_score)
+        self.assertEqual(expected, subject.scores_by_class())
+
+    def test_precision_recall_curves(self):
+        subject = overlap_result.BoundingBoxOverlapBenchmarkResult(
+            benchmark_id=1, trial_result_id=2, settings={},
+            overlaps={
+                bson.objectid.ObjectId(): [make_bbox_result(90, 100, 100, 0.9, ('cup',), ('cup',)),
+                                           make_bbox_result(0, 0, 100, 0, (), ('cup',)),
+                                           make_bbox_result(0, 100, 0, 0.8, ('cup',), ())],
+                bson.objectid.ObjectId(): [make_bbox_result(10, 100, 100, 0.7, ('cup',), ('cup',)),
+                                           make_bbox_result(95, 100, 100, 0.6, ('cup',), ('cup',))]
+            })
+        precision, recall, confidence = subject.precision_recall_curves(0.5)['cup']
+        self.assertEqual([0.9, 0.8, 0.7, 0.6], confidence.tolist())
+        self.assertTrue(np.all(np.isclose([1, 1 / 2, 1 / 3, 2 / 4], precision)))
+        self.assertTrue(np.all(np.isclose([1 / 4, 1 / 4, 1 / 4, 2 / 4], recall)))
+        # Interpolated precision is 1 up to recall 0.25, and 0.5 up to recall 0.5
+        self.assertAlmostEqual(0.25 + 0.125, subject.average_precisions(0.5)['cup'])
+        self.assertAlmostEqual(0.25 + 0.125, subject.mean_average_precision())
+        # At higher thresholds, only the last detection is correct, with IoU 95 / 105
+        self.assertAlmostEqual(1 / 16, subject.average_precisions(0.9)['cup'])
+        self.assertAlmostEqual((0.25 + 0.125 + 1 / 16) / 2, subject.mean_average_precision([0.5, 0.9]))
+
+    def test_mean_average_precision_leaves_out_classes_without_ground_truth(self):
+        subject = overlap_result.BoundingBoxOverlapBenchmarkResult(
+            benchmark_id=1, trial_result_id=2, settings={},
+            overlaps={
+                bson.objectid.ObjectId(): [make_bbox_result(90, 100, 100, 0.9, ('cup',), ('cup',)),
+                                           make_bbox_result(0, 100, 0, 0.8, ('car',), ())],
+                bson.objectid.ObjectId(): [make_bbox_result(0, 0, 100, 0, (), ('cat',))]
+            })
+        # 'car' is detected but never in the ground truth, 'cat' is in the ground truth but never detected
+        self.assertEqual({'cup': 1.0, 'cat': 0.0}, subject.average_precisions(0.5))
+        self.assertAlmostEqual(0.5, subject.mean_average_precision())
+
+    def make_random_result(self):
+        random = np.random.RandomState(5512)
+        classes = ['cup', 'car', 'cow', 'cat']
+        overlaps = {}
+        for _ in range(20):
+            results = []
+            for _ in range(random.randint(10)):
+                bbox_area = random.choice([0, random.randint(10, 100)])
+                gt_area = random.choice([0, random.randint(10, 100)])
+                results.append(make_bbox_result(
+                    random.randint(0, min(bbox_area, gt_area) + 1), bbox_area, gt_area, random.uniform(),
+                    tuple(random.choice(classes, random.randint(3), replace=False)) if bbox_area > 0 else (),
+                    tuple(random.choice(classes, random.randint(3), replace=False)) if gt_area > 0 else ()))
+            overlaps[bson.objectid.ObjectId()] = results
+        return overlap_result.BoundingBoxOverlapBenchmarkResult(benchmark_id=1, trial_result_id=2,
+                                                                overlaps=overlaps, settings={})
+
+
+def make_bbox_result(overlap, bbox_area, gt_area, confidence, bbox_classes, gt_classes):
+    return {
+        'overlap': overlap,
+        'bounding_box_area': bbox_area,
+        'ground_truth_area': gt_area,
+        'confidence': confidence,
+        'bounding_box_classes': bbox_classes,
+        'ground_truth_classes': gt_classes
+    }
@@ -77,14 +77,13 @@ class BenchmarkLoopClosure(core.benchmark.Benchmark):
         trivial_index_distance_squared = self.trivial_closure_index_distance * self.trivial_closure_index_distance
 
         poses = trial_result.get_ground_truth_camera_poses()
-        indexes = list(poses.keys())
-        indexes.sort()
+        indexes = set(poses.keys())
         # First, check all the produced matches to see if they were correct
         for idx, closure_index in trial_result.get_loop_closures().items():
             # TODO: Maybe need to resolve differences between closure indexes and pose indexes
             image_location = poses[idx].location
             match_location = poses[closure_index].location
-            indexes.remove(idx)
+            indexes.discard(idx)
 
             diff = match_location - image_location
             square_dist = np.dot(diff, diff)
@@ -100,22 +99,127 @@ class BenchmarkLoopClosure(core.benchmark.Benchmark):
                 matches[idx] = match_res.MatchType.FALSE_POSITIVE
 
         # Now go through all the remaining indexes to make sure there was not a match there
-        for unmatched_idx in indexes:
-            unmatched_pose = poses[unmatched_idx].location
-            found_closure = False
-            for index, pose in poses.items():
-                if index < unmatched_idx - self.trivial_closure_index_distance:
-                    diff = unmatched_pose - pose.location
-                    square_dist = np.dot(diff, diff)
-
-                    if square_dist < threshold_distance_squared:
-                        matches[unmatched_idx] = match_res.MatchType.FALSE_NEGATIVE
-                        found_closure = True
-                        break
-            if not found_closure:
+        all_indexes = sorted(poses.keys())
+        unmatched = np.array([idx in indexes for idx in all_indexes], dtype=bool)
+        found_closures = find_earlier_neighbours(
+            keys=all_indexes,
+            locations=[poses[idx].location for idx in all_indexes],
+            threshold_distance=self.threshold_distance,
+            min_key_distance=self.trivial_closure_index_distance,
+            query_indexes=np.nonzero(unmatched)[0])
+        for unmatched_idx, found_closure in zip((idx for idx in all_indexes if idx in indexes), found_closures):
+            if found_closure:
+                matches[unmatched_idx] = match_res.MatchType.FALSE_NEGATIVE
+            else:
                 matches[unmatched_idx] = match_res.MatchType.TRUE_NEGATIVE
 
         return match_res.MatchBenchmarkResult(benchmark_id=self.identifier,
                                               trial_result_id=trial_result.identifier,
                                               matches=matches,
                                               settings=self.get_settings())
+
+
+# The structured type used to compare whole grid cells at once, when the grid is too big to number the cells
+_CELL_DTYPE = np.dtype([('x', np.int64), ('y', np.int64), ('z', np.int64)])
+
+
+def _cell_keys(cells, origin, dims):
+    """
+    Turn an Nx3 array of integer cell coordinates into a 1D array of comparable cell keys.
+    :param cells: Nx3 int64 array
+    :param origin: The smallest cell coordinates in the grid
+    :param dims: The size of the grid, or None if it is too big to number every cell
+    :return: An int64 array of length N, or a structured array if dims is None
+    """
+    if dims is None:
+        return np.ascontiguousarray(cells, dtype=np.int64).view(_CELL_DTYPE).ravel()
+    cells = cells - origin
+    return (cells[:, 0] * dims[1] + cells[:, 1]) * dims[2] + cells[:, 2]
+
+
+def find_earlier_neighbours(keys, locations, threshold_distance, min_key_distance, query_indexes=None,
+                            chunk_size=65536):
+    """
+    For each query pose, find whether there is another pose with a key more than min_key_distance smaller,
+    that is closer than threshold_distance.
+    The poses are binned into a uniform grid with cells small enough that any two poses in the same cell are
+    closer than the threshold distance, so only the poses in the few cells around each query need to be checked,
+    and any candidate in the same cell as the query is a closure without checking the distance.
+    :param keys: The keys of each pose, in increasing order
+    :param locations: The location of each pose, as a list or Nx3 array
+    :param threshold_distance: The distance within which poses are considered close
+    :param min_key_distance: Poses must have keys less than the query key minus this to be considered
+    :param query_indexes: The indexes of the poses to search around, or None to search around all of them
+    :param chunk_size: The number of queries to search at once, which limits the memory used.
+    :return: A boolean array, true for each query for which an earlier pose was found
+    """
+    keys = np.asarray(keys, dtype=np.float64)
+    locations = np.asarray(locations, dtype=np.float64).reshape((len(keys), 3))
+    if query_indexes is None:
+        query_indexes = np.arange(len(keys))
+    query_indexes = np.asarray(query_indexes, dtype=np.intp)
+    found = np.zeros(len(query_indexes), dtype=bool)
+    if threshold_distance == 0 or len(query_indexes) == 0:
+        return found
+    threshold_distance_squared = threshold_distance * threshold_distance
+    cell_size = abs(threshold_distance) / np.sqrt(3)
+
+    # Bin the poses into the grid, and sort them by cell and then key, so each cell is a contiguous range
+    cells = np.floor(locations / cell_size).astype(np.int64)
+    origin = np.min(cells, axis=0) - 2
+    dims = np.max(cells, axis=0) - origin + 3
+    if np.prod(dims.astype(np.float64)) >= 2 ** 62:
+        dims = None
+    unique_cells, cell_ids = np.unique(_cell_keys(cells, origin, dims), return_inverse=True)
+    cell_ids = cell_ids.ravel()
+    order = np.lexsort((keys, cell_ids))
+    member_locations = locations[order]
+
+    # Number each member by cell and then key, so the candidates in a cell can be found with one search
+    unique_keys = np.unique(keys)
+    stride = len(unique_keys) + 1
+    members = cell_ids[order] * stride + np.searchsorted(unique_keys, keys[order])
+    cell_starts = np.searchsorted(members, np.arange(len(unique_cells)) * stride)
+
+    # The neighbouring cells that could contain poses within the threshold, nearest first
+    offsets = np.array([(x, y, z) for x in range(-2, 3) for y in range(-2, 3) for z in range(-2, 3)], dtype=np.int64)
+    gaps = np.sum(np.maximum(np.abs(offsets) - 1, 0) ** 2, axis=1)
+    offsets = offsets[gaps < 3]
+    offsets = offsets[np.argsort(np.sum(offsets * offsets, axis=1), kind='mergesort')]
+    for chunk_start in range(0, len(query_indexes), chunk_size):
+        chunk = np.arange(chunk_start, min(chunk_start + chunk_size, len(query_indexes)))
+        for offset in offsets:
+            chunk = chunk[~found[chunk]]
+            if len(chunk) <= 0:
+                break
+            queries = query_indexes[chunk]
+
+            # Find the neighbouring cell for each query, if it has anything in it
+            neighbour_cells = _cell_keys(cells[queries] + offset, origin, dims)
+            neighbour_ids = np.searchsorted(unique_cells, neighbour_cells)
+            exists = neighbour_ids < len(unique_cells)
+            exists[exists] = unique_cells[neighbour_ids[exists]] == neighbour_cells[exists]
+            if not np.any(exists):
+                continue
+            chunk_in_cell = chunk[exists]
+            queries = queries[exists]
+            neighbour_ids = neighbour_ids[exists]
+
+            # Within the cell, only poses with small enough keys are candidates
+            limits = neighbour_ids * stride + np.searchsorted(unique_keys, keys[queries] - min_key_distance)
+            starts = cell_starts[neighbour_ids]
+            lengths = np.searchsorted(members, limits) - starts
+            if not np.any(offset):
+                found[chunk_in_cell[lengths > 0]] = True
+                continue
+            if np.sum(lengths) <= 0:
+                continue
+
+            # Check every candidate in the cell
+            candidate_queries = np.repeat(np.arange(len(queries)), lengths)
+            candidates = (np.arange(len(candidate_queries)) - np.repeat(np.cumsum(lengths) - lengths, lengths) +
+                          np.repeat(starts, lengths))
+            diff = member_locations[candidates] - locations[queries[candidate_queries]]
+            close = np.sum(diff * diff, axis=1) < threshold_distance_squared
+            found[chunk_in_cell[candidate_queries[close]]] = True
+    return found
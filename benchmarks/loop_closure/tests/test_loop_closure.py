@@ -217,3 +217,40 @@ class TestBenchmarkLoopClosure(database.tests.test_entity.EntityContract, unitte
             trial_result.loop_closures = {idx: closure}
             result = benchmark.benchmark_results(trial_result)
             self.assertEqual(match_res.MatchType.TRUE_POSITIVE, result.matches[idx])
+
+
+class TestFindEarlierNeighbours(unittest.TestCase):
+
+    def test_finds_earlier_pose_within_threshold(self):
+        keys = [0, 1, 2, 3, 4]
+        locations = [(0, 0, 0), (10, 0, 0), (20, 0, 0), (0.5, 0.5, 0), (30, 0, 0)]
+        self.assertEqual([False, False, False, True, False],
+                         list(lc.find_earlier_neighbours(keys, locations, 1, 2)))
+
+    def test_ignores_trivial_closures(self):
+        keys = [0, 1, 2, 3, 4]
+        locations = [(0, 0, 0), (10, 0, 0), (20, 0, 0), (0.5, 0.5, 0), (30, 0, 0)]
+        self.assertEqual([False, False, False, False, False],
+                         list(lc.find_earlier_neighbours(keys, locations, 1, 3)))
+
+    def test_only_searches_around_queries(self):
+        keys = [0, 1, 2, 3]
+        locations = [(0, 0, 0), (0, 0, 0), (0, 0, 0), (0, 0, 0)]
+        self.assertEqual([True, False], list(lc.find_earlier_neighbours(keys, locations, 1, 0,
+                                                                        query_indexes=[2, 0])))
+
+    def test_same_as_brute_force(self):
+        random = np.random.RandomState(8813)
+        for _ in range(50):
+            num_poses = random.randint(1, 60)
+            keys = np.sort(random.uniform(0, 100, num_poses))
+            locations = random.uniform(-5, 5, (num_poses, 3))
+            threshold = random.uniform(0.1, 4)
+            min_key_distance = random.uniform(0, 10)
+            expected = [any(keys[other] < keys[idx] - min_key_distance and
+                            np.dot(locations[idx] - locations[other], locations[idx] - locations[other]) <
+                            threshold * threshold
+                            for other in range(num_poses))
+                        for idx in range(num_poses)]
+            self.assertEqual(expected, list(lc.find_earlier_neighbours(keys, locations, threshold,
+                                                                       min_key_distance, chunk_size=7)))
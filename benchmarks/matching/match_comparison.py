@@ -1,3 +1,4 @@
+import numpy as np
 import util.associate
 import core.benchmark_comparison
 import benchmarks.matching.matching_result as match_res
@@ -74,44 +75,31 @@ class BenchmarkMatchingComparison(core.benchmark_comparison.BenchmarkComparison)
         :return: MatchingComparison
         :rtype BenchmarkResult:
         """
-        matching_indexes = util.associate.associate(benchmark_result.matches, reference_benchmark_result.matches,
-                                                    self.offset, self.max_difference)
-
-        match_changes = {}
-        base_indexes = list(benchmark_result.matches.keys())
-        ref_indexes = list(reference_benchmark_result.matches.keys())
-
-        # Go through the matched base and reference indexes, and record the changes in match behviour
-        for base_idx, ref_idx in matching_indexes:
-            base_match_type = benchmark_result.matches[base_idx]
-            ref_match_type = reference_benchmark_result.matches[ref_idx]
-            base_indexes.remove(base_idx)
-            ref_indexes.remove(ref_idx)
-            change = get_change_type(ref_match_type, base_match_type)
-            if change is not None:
-                match_changes[ref_idx] = change
-
-        # Add additional transitions for missing indexes
-        for base_idx in base_indexes:
-            base_match_type = benchmark_result.matches[base_idx]
-            if base_match_type is match_res.MatchType.TRUE_POSITIVE:
-                match_changes[base_idx] = match_comp_res.MatchChanges.LOST_TO_TRUE_POSITIVE
-            elif base_match_type is match_res.MatchType.FALSE_POSITIVE:
-                match_changes[base_idx] = match_comp_res.MatchChanges.LOST_TO_FALSE_POSITIVE
-            elif base_match_type is match_res.MatchType.TRUE_NEGATIVE:
-                match_changes[base_idx] = match_comp_res.MatchChanges.LOST_TO_TRUE_NEGATIVE
-            elif base_match_type is match_res.MatchType.FALSE_NEGATIVE:
-                match_changes[base_idx] = match_comp_res.MatchChanges.LOST_TO_FALSE_NEGATIVE
-        for ref_idx in ref_indexes:
-            ref_match_type = reference_benchmark_result.matches[ref_idx]
-            if ref_match_type is match_res.MatchType.TRUE_POSITIVE:
-                match_changes[ref_idx] = match_comp_res.MatchChanges.TRUE_POSITIVE_TO_LOST
-            elif ref_match_type is match_res.MatchType.FALSE_POSITIVE:
-                match_changes[ref_idx] = match_comp_res.MatchChanges.FALSE_POSITIVE_TO_LOST
-            elif ref_match_type is match_res.MatchType.TRUE_NEGATIVE:
-                match_changes[ref_idx] = match_comp_res.MatchChanges.TRUE_NEGATIVE_TO_LOST
-            elif ref_match_type is match_res.MatchType.FALSE_NEGATIVE:
-                match_changes[ref_idx] = match_comp_res.MatchChanges.FALSE_NEGATIVE_TO_LOST
+        base_keys = list(benchmark_result.matches.keys())
+        ref_keys = list(reference_benchmark_result.matches.keys())
+        base_indexes, base_types = get_match_arrays(benchmark_result)
+        ref_indexes, ref_types = get_match_arrays(reference_benchmark_result)
+        matched_base, matched_ref = util.associate.associate_indexes(base_indexes, ref_indexes,
+                                                                     self.offset, self.max_difference)
+
+        # Look up the changes in match behaviour for the matched base and reference indexes,
+        # and additional transitions for the missing indexes, which are keyed by their own index.
+        unmatched_base = np.ones(len(base_keys), dtype=bool)
+        unmatched_base[matched_base] = False
+        unmatched_base = np.nonzero(unmatched_base)[0]
+        unmatched_ref = np.ones(len(ref_keys), dtype=bool)
+        unmatched_ref[matched_ref] = False
+        unmatched_ref = np.nonzero(unmatched_ref)[0]
+        changes = np.concatenate((
+            match_comp_res.CHANGE_TABLE[ref_types[matched_ref], base_types[matched_base]],
+            match_comp_res.CHANGE_TABLE[match_comp_res.LOST, base_types[unmatched_base]],
+            match_comp_res.CHANGE_TABLE[ref_types[unmatched_ref], match_comp_res.LOST]
+        ))
+        keys = ([ref_keys[idx] for idx in matched_ref.tolist()] +
+                [base_keys[idx] for idx in unmatched_base.tolist()] +
+                [ref_keys[idx] for idx in unmatched_ref.tolist()])
+        match_changes = {key: match_comp_res.CHANGES_BY_VALUE[change]
+                         for key, change in zip(keys, changes.tolist())}
 
         return match_comp_res.MatchingComparisonResult(benchmark_comparison_id=self.identifier,
                                                        benchmark_result=benchmark_result.identifier,
@@ -120,50 +108,27 @@ class BenchmarkMatchingComparison(core.benchmark_comparison.BenchmarkComparison)
                                                        settings=self.get_settings())
 
 
+def get_match_arrays(benchmark_result):
+    """
+    Get the match indexes and match types from a benchmark result as arrays.
+    Match benchmark results already hold these, other results with matches are encoded here.
+    :param benchmark_result: A benchmark result with a 'matches' dict
+    :return: An array of the indexes as floats, and a small integer array of the match types
+    """
+    if isinstance(benchmark_result, match_res.MatchBenchmarkResult):
+        return benchmark_result.match_indexes, benchmark_result.match_types
+    return match_res.encode_matches(benchmark_result.matches)
+
+
 def get_change_type(from_, to):
     """
-    Map from one match type to another match type into MatchChanges enum values.
-    really, this is just a dirty great mapping function. It might be more efficient
-    as a dict or a list or something.
-    
+    Map from one match type to another match type into MatchChanges enum values,
+    using the change lookup table.
+
     :param from_: What the match was in the reference result
     :param to: What the match is in the test benchmark result
     :return: An enum value indicating what if any changes occurred to the match type.
     """
-    if from_ is match_res.MatchType.TRUE_POSITIVE:
-        if to is match_res.MatchType.TRUE_POSITIVE:
-            return match_comp_res.MatchChanges.REMAIN_TRUE_POSITIVE
-        elif to is match_res.MatchType.FALSE_POSITIVE:
-            return match_comp_res.MatchChanges.TRUE_POSITIVE_TO_FALSE_POSITIVE
-        elif to is match_res.MatchType.TRUE_NEGATIVE:
-            return match_comp_res.MatchChanges.TRUE_POSITIVE_TO_TRUE_NEGATIVE
-        elif to is match_res.MatchType.FALSE_NEGATIVE:
-            return match_comp_res.MatchChanges.TRUE_POSITIVE_TO_FALSE_NEGATIVE
-    elif from_ is match_res.MatchType.FALSE_POSITIVE:
-        if to is match_res.MatchType.TRUE_POSITIVE:
-            return match_comp_res.MatchChanges.FALSE_POSITIVE_TO_TRUE_POSITIVE
-        elif to is match_res.MatchType.FALSE_POSITIVE:
-            return match_comp_res.MatchChanges.REMAIN_FALSE_POSITIVE
-        elif to is match_res.MatchType.TRUE_NEGATIVE:
-            return match_comp_res.MatchChanges.FALSE_POSITIVE_TO_TRUE_NEGATIVE
-        elif to is match_res.MatchType.FALSE_NEGATIVE:
-            return match_comp_res.MatchChanges.FALSE_POSITIVE_TO_FALSE_NEGATIVE
-    elif from_ is match_res.MatchType.TRUE_NEGATIVE:
-        if to is match_res.MatchType.TRUE_POSITIVE:
-            return match_comp_res.MatchChanges.TRUE_NEGATIVE_TO_TRUE_POSITIVE
-        elif to is match_res.MatchType.FALSE_POSITIVE:
-            return match_comp_res.MatchChanges.TRUE_NEGATIVE_TO_FALSE_POSITIVE
-        elif to is match_res.MatchType.TRUE_NEGATIVE:
-            return match_comp_res.MatchChanges.REMAIN_TRUE_NEGATIVE
-        elif to is match_res.MatchType.FALSE_NEGATIVE:
-            return match_comp_res.MatchChanges.TRUE_NEGATIVE_TO_FALSE_NEGATIVE
-    elif from_ is match_res.MatchType.FALSE_NEGATIVE:
-        if to is match_res.MatchType.TRUE_POSITIVE:
-            return match_comp_res.MatchChanges.FALSE_NEGATIVE_TO_TRUE_POSITIVE
-        elif to is match_res.MatchType.FALSE_POSITIVE:
-            return match_comp_res.MatchChanges.FALSE_NEGATIVE_TO_FALSE_POSITIVE
-        elif to is match_res.MatchType.TRUE_NEGATIVE:
-            return match_comp_res.MatchChanges.FALSE_NEGATIVE_TO_TRUE_NEGATIVE
-        elif to is match_res.MatchType.FALSE_NEGATIVE:
-            return match_comp_res.MatchChanges.REMAIN_FALSE_NEGATIVE
-    return None
+    if not isinstance(from_, match_res.MatchType) or not isinstance(to, match_res.MatchType):
+        return None
+    return match_comp_res.CHANGES_BY_VALUE[match_comp_res.CHANGE_TABLE[from_.value, to.value]]
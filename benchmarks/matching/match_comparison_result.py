@@ -1,7 +1,9 @@
 import enum
+import numpy as np
 import bson
 import pickle
 import core.benchmark_comparison
+import benchmarks.matching.matching_result as match_res
 
 
 # Can we change from True Positive to False Positive? That implies the ground truth is different.
@@ -35,6 +37,33 @@ class MatchChanges(enum.Enum):
     FALSE_NEGATIVE_TO_TRUE_NEGATIVE = 23
 
 
+# Lookup table for the change between two match types, indexed [reference type, compared type].
+# Match types are encoded by their MatchType value, with an additional code LOST for indexes that were not matched.
+LOST = len(match_res.MatchType)
+NO_CHANGE_TYPE = -1
+CHANGE_TABLE = np.array([[change.value if change is not None else NO_CHANGE_TYPE for change in row] for row in [
+    # To: TRUE_POSITIVE, FALSE_POSITIVE, TRUE_NEGATIVE, FALSE_NEGATIVE, LOST
+    [MatchChanges.REMAIN_TRUE_POSITIVE, MatchChanges.TRUE_POSITIVE_TO_FALSE_POSITIVE,
+     MatchChanges.TRUE_POSITIVE_TO_TRUE_NEGATIVE, MatchChanges.TRUE_POSITIVE_TO_FALSE_NEGATIVE,
+     MatchChanges.TRUE_POSITIVE_TO_LOST],
+    [MatchChanges.FALSE_POSITIVE_TO_TRUE_POSITIVE, MatchChanges.REMAIN_FALSE_POSITIVE,
+     MatchChanges.FALSE_POSITIVE_TO_TRUE_NEGATIVE, MatchChanges.FALSE_POSITIVE_TO_FALSE_NEGATIVE,
+     MatchChanges.FALSE_POSITIVE_TO_LOST],
+    [MatchChanges.TRUE_NEGATIVE_TO_TRUE_POSITIVE, MatchChanges.TRUE_NEGATIVE_TO_FALSE_POSITIVE,
+     MatchChanges.REMAIN_TRUE_NEGATIVE, MatchChanges.TRUE_NEGATIVE_TO_FALSE_NEGATIVE,
+     MatchChanges.TRUE_NEGATIVE_TO_LOST],
+    [MatchChanges.FALSE_NEGATIVE_TO_TRUE_POSITIVE, MatchChanges.FALSE_NEGATIVE_TO_FALSE_POSITIVE,
+     MatchChanges.FALSE_NEGATIVE_TO_TRUE_NEGATIVE, MatchChanges.REMAIN_FALSE_NEGATIVE,
+     MatchChanges.FALSE_NEGATIVE_TO_LOST],
+    [MatchChanges.LOST_TO_TRUE_POSITIVE, MatchChanges.LOST_TO_FALSE_POSITIVE,
+     MatchChanges.LOST_TO_TRUE_NEGATIVE, MatchChanges.LOST_TO_FALSE_NEGATIVE,
+     None]
+]], dtype=np.int8)
+
+# The change enum for each change code, for decoding the lookup table
+CHANGES_BY_VALUE = sorted(MatchChanges, key=lambda change: change.value)
+
+
 # Constant sets for different groups of transitions
 NEW_FOUND = frozenset((
     MatchChanges.LOST_TO_TRUE_POSITIVE,
@@ -97,17 +126,38 @@ class MatchingComparisonResult(core.benchmark_comparison.BenchmarkComparisonResu
     """
 
     def __init__(self, benchmark_comparison_id, benchmark_result, reference_benchmark_result,
-                 match_changes, settings, id_=None, **kwargs):
+                 match_changes, settings, change_counts=None, id_=None, **kwargs):
+        """
+        :param benchmark_comparison_id: The id of the comparison benchmark that produced this result
+        :param benchmark_result: The id of the benchmark result compared
+        :param reference_benchmark_result: The id of the reference benchmark result
+        :param match_changes: A map of indexes to MatchChanges
+        :param settings: The settings of the comparison
+        :param change_counts: A map of MatchChanges names to the number of changes of that type,
+        if previously computed. Computed from the match changes if None.
+        :param id_: The id of the result, if it exists
+        """
         kwargs['success'] = True
         super().__init__(benchmark_comparison_id=benchmark_comparison_id, benchmark_result=benchmark_result,
                          reference_benchmark_result=reference_benchmark_result, id_=id_, **kwargs)
         self._match_changes = match_changes
         self._settings = settings
 
+        # Pre-calculate the number of changes of each type, so that counting groups of changes is constant time
+        if change_counts is None:
+            counts = np.bincount(np.fromiter((change.value for change in match_changes.values()), dtype=np.int64,
+                                             count=len(match_changes)), minlength=len(MatchChanges)).tolist()
+            change_counts = {change.name: counts[change.value] for change in MatchChanges}
+        self._change_counts = change_counts
+
     @property
     def match_changes(self):
         return self._match_changes
 
+    @property
+    def change_counts(self):
+        return self._change_counts
+
     @property
     def new_true_negatives(self):
         return self.count_changes_of_types(NEW_TRUE_NEGATIVES)
@@ -149,12 +199,18 @@ class MatchingComparisonResult(core.benchmark_comparison.BenchmarkComparisonResu
         return self.count_changes_of_types(STRANGE_TRANSITIONS)
 
     def count_changes_of_types(self, change_types):
-        return sum(change in change_types for idx, change in self.match_changes.items())
+        """
+        Count the number of changes of any of the given types
+        :param change_types: A collection of MatchChanges
+        :return: The total number of changes of those types
+        """
+        return sum(self._change_counts.get(change.name, 0) for change in change_types)
 
     def serialize(self):
         output = super().serialize()
         output['match_changes'] = bson.Binary(pickle.dumps(self.match_changes, protocol=pickle.HIGHEST_PROTOCOL))
         output['settings'] = self.settings
+        output['change_counts'] = self.change_counts
         return output
 
     @classmethod
@@ -163,4 +219,6 @@ class MatchingComparisonResult(core.benchmark_comparison.BenchmarkComparisonResu
             kwargs['match_changes'] = pickle.loads(serialized_representation['match_changes'])
         if 'settings' in serialized_representation:
             kwargs['settings'] = serialized_representation['settings']
+        if 'change_counts' in serialized_representation:
+            kwargs['change_counts'] = serialized_representation['change_counts']
         return super().deserialize(serialized_representation, db_client, **kwargs)
@@ -1,4 +1,5 @@
 import enum
+import numpy as np
 import pickle
 import bson
 import core.benchmark
@@ -14,6 +15,19 @@ class MatchType(enum.Enum):
     FALSE_NEGATIVE = 3
 
 
+def encode_matches(matches):
+    """
+    Encode a map of indexes to match types as arrays, for vectorised comparison.
+    The match types are encoded as their enum values, in the order of the dict.
+    :param matches: A dict of timestamps or indexes to MatchType
+    :return: An array of the indexes as floats, and a small integer array of the match types
+    """
+    indexes = np.fromiter(matches.keys(), dtype=np.float64, count=len(matches))
+    match_types = np.fromiter((match_type.value for match_type in matches.values()), dtype=np.int8,
+                              count=len(matches))
+    return indexes, match_types
+
+
 class MatchBenchmarkResult(core.benchmark.BenchmarkResult):
     """
     Benchmark results for matching some property in a test.
@@ -31,24 +45,25 @@ class MatchBenchmarkResult(core.benchmark.BenchmarkResult):
         self._matches = matches
         self._settings = settings
         # Pre-calculate total matches of each type
-        self._true_positives = 0
-        self._false_positives = 0
-        self._true_negatives = 0
-        self._false_negatives = 0
-        for index, match_type in matches.items():
-            if match_type == MatchType.TRUE_POSITIVE:
-                self._true_positives += 1
-            elif match_type == MatchType.FALSE_POSITIVE:
-                self._false_positives += 1
-            elif match_type == MatchType.TRUE_NEGATIVE:
-                self._true_negatives += 1
-            elif match_type == MatchType.FALSE_NEGATIVE:
-                self._false_negatives += 1
+        self._indexes, self._match_types = encode_matches(matches)
+        counts = np.bincount(self._match_types, minlength=len(MatchType)).tolist()
+        self._true_positives = counts[MatchType.TRUE_POSITIVE.value]
+        self._false_positives = counts[MatchType.FALSE_POSITIVE.value]
+        self._true_negatives = counts[MatchType.TRUE_NEGATIVE.value]
+        self._false_negatives = counts[MatchType.FALSE_NEGATIVE.value]
 
     @property
     def matches(self):
         return self._matches
 
+    @property
+    def match_indexes(self):
+        return self._indexes
+
+    @property
+    def match_types(self):
+        return self._match_types
+
     @property
     def true_positives(self):
         return self._true_positives
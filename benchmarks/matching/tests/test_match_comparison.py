@@ -1,5 +1,6 @@
 import numpy as np
 import unittest
+import unittest.mock as mock
 import database.tests.test_entity
 import core.benchmark_comparison
 import benchmarks.matching.matching_result as match_res
@@ -150,3 +151,57 @@ class TestMatchComparison(database.tests.test_entity.EntityContract, unittest.Te
         comparison_benchmark = match_comp.BenchmarkMatchingComparison()
         comparison_result = comparison_benchmark.compare_results(comp_benchmark_result, ref_benchmark_result)
         self.assertEqual(expected_changes, comparison_result.match_changes)
+
+    def test_comparison_same_for_results_without_match_arrays(self):
+        random = np.random.RandomState(8291)
+        ref_benchmark_result = match_res.MatchBenchmarkResult(benchmark_id=random.randint(0, 10),
+                                                              trial_result_id=random.randint(10, 20),
+                                                              matches=create_matches(random),
+                                                              settings={})
+        comp_benchmark_result = match_res.MatchBenchmarkResult(benchmark_id=random.randint(0, 10),
+                                                               trial_result_id=random.randint(10, 20),
+                                                               matches=create_matches(random),
+                                                               settings={})
+        mock_ref_result = mock.Mock(spec=['identifier', 'matches'], identifier=ref_benchmark_result.identifier,
+                                    matches=ref_benchmark_result.matches)
+        mock_comp_result = mock.Mock(spec=['identifier', 'matches'], identifier=comp_benchmark_result.identifier,
+                                     matches=comp_benchmark_result.matches)
+        comparison_benchmark = match_comp.BenchmarkMatchingComparison(max_difference=5)
+        comparison_result = comparison_benchmark.compare_results(comp_benchmark_result, ref_benchmark_result)
+        mock_comparison_result = comparison_benchmark.compare_results(mock_comp_result, mock_ref_result)
+        self.assertEqual(comparison_result.match_changes, mock_comparison_result.match_changes)
+
+    def test_comparison_applies_offset(self):
+        ref_benchmark_result = match_res.MatchBenchmarkResult(benchmark_id=1, trial_result_id=2, settings={}, matches={
+            1.0: match_res.MatchType.TRUE_POSITIVE,
+            2.0: match_res.MatchType.FALSE_NEGATIVE
+        })
+        comp_benchmark_result = match_res.MatchBenchmarkResult(benchmark_id=1, trial_result_id=3, settings={}, matches={
+            11.0: match_res.MatchType.TRUE_POSITIVE,
+            12.0: match_res.MatchType.TRUE_POSITIVE
+        })
+        comparison_benchmark = match_comp.BenchmarkMatchingComparison(offset=10, max_difference=0.1)
+        comparison_result = comparison_benchmark.compare_results(comp_benchmark_result, ref_benchmark_result)
+        self.assertEqual({
+            1.0: match_comp_res.MatchChanges.REMAIN_TRUE_POSITIVE,
+            2.0: match_comp_res.MatchChanges.FALSE_NEGATIVE_TO_TRUE_POSITIVE
+        }, comparison_result.match_changes)
+
+
+class TestGetChangeType(unittest.TestCase):
+
+    def test_remaining_the_same_is_unchanged(self):
+        for match_type in match_res.MatchType:
+            change = match_comp.get_change_type(match_type, match_type)
+            self.assertIn(change, match_comp_res.UNCHANGED)
+            self.assertTrue(change.name.endswith(match_type.name))
+
+    def test_change_names_match_types(self):
+        for from_ in match_res.MatchType:
+            for to in match_res.MatchType:
+                if from_ is not to:
+                    self.assertEqual(from_.name + '_TO_' + to.name, match_comp.get_change_type(from_, to).name)
+
+    def test_returns_none_for_unknown_types(self):
+        self.assertIsNone(match_comp.get_change_type(None, match_res.MatchType.TRUE_POSITIVE))
+        self.assertIsNone(match_comp.get_change_type(match_res.MatchType.TRUE_POSITIVE, 'TRUE_POSITIVE'))
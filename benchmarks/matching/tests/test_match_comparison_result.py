@@ -68,6 +68,7 @@ class TestMatchingComparisonResult(entity_test.EntityContract, unittest.TestCase
         self.assertEqual(benchmark_result1.new_missing, benchmark_result2.new_missing)
         self.assertEqual(benchmark_result1.new_found, benchmark_result2.new_found)
         self.assertEqual(benchmark_result1.num_unchanged, benchmark_result2.num_unchanged)
+        self.assertEqual(benchmark_result1.change_counts, benchmark_result2.change_counts)
         self.assertEqual(benchmark_result1.settings, benchmark_result2.settings)
 
     def assert_serialized_equal(self, s_model1, s_model2):
@@ -165,3 +166,29 @@ class TestMatchingComparisonResult(entity_test.EntityContract, unittest.TestCase
                     change is comp_res.MatchChanges.REMAIN_FALSE_NEGATIVE):
                 num_unchanged += 1
         self.assertEqual(num_unchanged, subject.num_unchanged)
+
+    def test_change_counts_are_correct(self):
+        subject = self.make_instance()
+        changes = list(subject.match_changes.values())
+        for change in comp_res.MatchChanges:
+            self.assertEqual(changes.count(change), subject.change_counts[change.name])
+
+    def test_serialize_includes_change_counts(self):
+        subject = self.make_instance()
+        s_subject = subject.serialize()
+        self.assertEqual(subject.change_counts, s_subject['change_counts'])
+
+    def test_deserialize_uses_stored_change_counts(self):
+        subject = self.make_instance()
+        s_subject = subject.serialize()
+        s_subject['change_counts'] = dict(s_subject['change_counts'], REMAIN_TRUE_POSITIVE=1000,
+                                          REMAIN_FALSE_POSITIVE=0, REMAIN_TRUE_NEGATIVE=0, REMAIN_FALSE_NEGATIVE=0)
+        deserialized = self.get_class().deserialize(s_subject, self.create_mock_db_client())
+        self.assertEqual(1000, deserialized.num_unchanged)
+
+    def test_deserialize_computes_change_counts_when_not_stored(self):
+        subject = self.make_instance()
+        s_subject = subject.serialize()
+        del s_subject['change_counts']
+        deserialized = self.get_class().deserialize(s_subject, self.create_mock_db_client())
+        self.assertEqual(subject.change_counts, deserialized.change_counts)
@@ -85,3 +85,8 @@ class TestMatchBenchmarkResult(entity_test.EntityContract, unittest.TestCase):
         subject = self.make_instance()
         self.assertEqual(list(subject.matches.values()).count(match_res.MatchType.FALSE_NEGATIVE),
                          subject.false_negatives)
+
+    def test_match_arrays_are_correct(self):
+        subject = self.make_instance()
+        self.assertEqual(list(subject.matches.keys()), subject.match_indexes.tolist())
+        self.assertEqual([match_type.value for match_type in subject.matches.values()], subject.match_types.tolist())
@@ -39,15 +39,18 @@ This script computes the relative pose error from the ground truth trajectory
 and the estimated trajectory.
 """
 
-import random
+import multiprocessing
 import numpy
 import core.benchmark
+import core.trajectory_cache
+import util.transform as tf
 import benchmarks.rpe.rpe_result
 
 
 class BenchmarkRPE(core.benchmark.Benchmark):
 
-    def __init__(self, max_pairs=10000, fixed_delta=False, delta=1.0, delta_unit='s', offset=0, scale_=1, id_=None):
+    def __init__(self, max_pairs=10000, fixed_delta=False, delta=1.0, delta_unit='s', offset=0, scale_=1, seed=None,
+                 num_processes=1, id_=None):
         """
 
         :param max_pairs: maximum number of pose comparisons (default: 10000, set to zero to disable downsampling
@@ -58,6 +61,8 @@ class BenchmarkRPE(core.benchmark.Benchmark):
         (options: \'s\' for seconds, \'m\' for meters, \'rad\' for radians, \'f\' for frames; default: \'s\')
         :param offset: time offset between ground-truth and estimated trajectory (default: 0.0)
         :param scale_: scaling factor for the estimated trajectory (default: 1.0)
+        :param seed: seed for sampling the pose pairs, so that the sample is reproducible (default: None, unseeded)
+        :param num_processes: number of processes to evaluate the pose pairs with (default: 1)
         """
         super().__init__(id_=id_)
         self._max_pairs = int(max_pairs)
@@ -69,6 +74,8 @@ class BenchmarkRPE(core.benchmark.Benchmark):
             self._delta_unit = 's'
         self._offset = offset
         self._scale = scale_
+        self._seed = int(seed) if seed is not None else None
+        self._num_processes = max(1, int(num_processes))
 
     @property
     def offset(self):
@@ -119,6 +126,22 @@ class BenchmarkRPE(core.benchmark.Benchmark):
         if delta_unit is 's' or delta_unit is 'm' or delta_unit is 'rad' or delta_unit is 'f':
             self._delta_unit = delta_unit
 
+    @property
+    def seed(self):
+        return self._seed
+
+    @seed.setter
+    def seed(self, seed):
+        self._seed = int(seed) if seed is not None else None
+
+    @property
+    def num_processes(self):
+        return self._num_processes
+
+    @num_processes.setter
+    def num_processes(self, num_processes):
+        self._num_processes = max(1, int(num_processes))
+
     def get_settings(self):
         return {
             'offset': self.offset,
@@ -126,7 +149,8 @@ class BenchmarkRPE(core.benchmark.Benchmark):
             'max_pairs': self.max_pairs,
             'fixed_delta': self.fixed_delta,
             'delta': self.delta,
-            'delta_unit': self.delta_unit
+            'delta_unit': self.delta_unit,
+            'seed': self.seed
         }
 
     def serialize(self):
@@ -137,6 +161,8 @@ class BenchmarkRPE(core.benchmark.Benchmark):
         output['fixed_delta'] = self.fixed_delta
         output['delta'] = self.delta
         output['delta_unit'] = self.delta_unit
+        output['seed'] = self.seed
+        output['num_processes'] = self.num_processes
         return output
 
     @classmethod
@@ -153,6 +179,10 @@ class BenchmarkRPE(core.benchmark.Benchmark):
             kwargs['delta'] = serialized_representation['delta']
         if 'delta_unit' in serialized_representation:
             kwargs['delta_unit'] = serialized_representation['delta_unit']
+        if 'seed' in serialized_representation:
+            kwargs['seed'] = serialized_representation['seed']
+        if 'num_processes' in serialized_representation:
+            kwargs['num_processes'] = serialized_representation['num_processes']
         return super().deserialize(serialized_representation, db_client, **kwargs)
 
     @classmethod
@@ -171,30 +201,36 @@ class BenchmarkRPE(core.benchmark.Benchmark):
         :return:
         :rtype BenchmarkResult:
         """
-        ground_truth_traj = trial_result.get_ground_truth_camera_poses()
-        result_traj = trial_result.get_computed_camera_poses()
-
-        ground_truth_traj = {stamp: pose.transform_matrix for stamp, pose in ground_truth_traj.items()}
-        result_traj = {stamp: pose.transform_matrix for stamp, pose in result_traj.items()}
-
-        result = evaluate_trajectory(traj_gt=ground_truth_traj,
-                                     traj_est=result_traj,
-                                     param_max_pairs=int(self.max_pairs),
-                                     param_fixed_delta=self.fixed_delta,
-                                     param_delta=float(self.delta),
-                                     param_delta_unit=self.delta_unit,
-                                     param_offset=float(self.offset),
-                                     param_scale=self.scale)
-        if result is None or len(result) < 2:
+        return self.benchmark_cached_results(core.trajectory_cache.TrajectoryCache(trial_result))
+
+    def benchmark_cached_results(self, trajectory_cache):
+        """
+        Benchmark a trial result using trajectories that have already been loaded.
+        :param trajectory_cache: A TrajectoryCache wrapping the trial result
+        :return:
+        :rtype BenchmarkResult:
+        """
+        trial_result = trajectory_cache.trial_result
+        ground_truth_traj = dict(zip(trajectory_cache.ground_truth_timestamps, trajectory_cache.ground_truth_matrices))
+        result_traj = dict(zip(trajectory_cache.computed_timestamps, trajectory_cache.computed_matrices))
+
+        result = evaluate_trajectory_errors(traj_gt=ground_truth_traj,
+                                            traj_est=result_traj,
+                                            param_max_pairs=int(self.max_pairs),
+                                            param_fixed_delta=self.fixed_delta,
+                                            param_delta=float(self.delta),
+                                            param_delta_unit=self.delta_unit,
+                                            param_offset=float(self.offset),
+                                            param_scale=self.scale,
+                                            param_seed=self.seed,
+                                            param_num_processes=self.num_processes)
+        if result is None or result[3] < 2:
             return core.benchmark.FailedBenchmark(benchmark_id=self.identifier,
                                                   trial_result_id=trial_result.identifier,
                                                   reason="Couldn't find matching timestamp pairs between"
                                                          "groundtruth and estimated trajectory!")
 
-        result = numpy.array(result)
-        gt_post_timestamps = result[:, 3]
-        trans_error = result[:, 4]
-        rot_error = result[:, 5]
+        gt_post_timestamps, trans_error, rot_error, _ = result
         trans_error = dict(zip(gt_post_timestamps, trans_error))
         rot_error = dict(zip(gt_post_timestamps, rot_error))
         return benchmarks.rpe.rpe_result.BenchmarkRPEResult(self.identifier, trial_result.identifier,
@@ -230,6 +266,44 @@ def find_closest_index(L, t):
     return best
 
 
+def find_closest_indexes(L, t):
+    """
+    Find the index of the closest value in a sorted array, for an array of query values.
+    This performs the same binary search as find_closest_index for every query at once,
+    so that ties are resolved in exactly the same way.
+
+    Input:
+    L -- the sorted array
+    t -- array of values to be found
+
+    Output:
+    array of indexes of the closest elements
+    """
+    L = numpy.asarray(L)
+    t = numpy.asarray(t)
+    beginning = numpy.zeros(t.shape, dtype=numpy.intp)
+    end = numpy.full(t.shape, len(L), dtype=numpy.intp)
+    difference = numpy.abs(L[0] - t)
+    best = numpy.zeros(t.shape, dtype=numpy.intp)
+    active = beginning < end
+    while numpy.any(active):
+        middle = (end + beginning) // 2
+        value = L[numpy.minimum(middle, len(L) - 1)]
+        middle_difference = numpy.abs(value - t)
+        closer = active & (middle_difference < difference)
+        difference = numpy.where(closer, middle_difference, difference)
+        best = numpy.where(closer, middle, best)
+        exact = active & (t == value)
+        best = numpy.where(exact, middle, best)
+        go_left = active & ~exact & (value > t)
+        go_right = active & ~exact & ~(value > t)
+        end = numpy.where(go_left, middle, end)
+        beginning = numpy.where(go_right, middle + 1, beginning)
+        active = go_left | go_right
+        active &= beginning < end
+    return best
+
+
 def ominus(a, b):
     """
     Compute the relative 3D transformation between a and b.
@@ -271,18 +345,35 @@ def compute_angle(transform):
     return numpy.arccos(min(1, max(-1, (numpy.trace(transform[0:3, 0:3]) - 1) / 2)))
 
 
+def compute_distances(transforms):
+    """
+    Compute the distance of the translational components of a stack of 4x4 homogeneous matrices.
+    """
+    return numpy.linalg.norm(transforms[:, 0:3, 3], axis=1)
+
+
+def compute_angles(transforms):
+    """
+    Compute the rotation angles from a stack of 4x4 homogeneous matrices.
+    """
+    traces = numpy.trace(transforms[:, 0:3, 0:3], axis1=1, axis2=2)
+    return numpy.arccos(numpy.clip((traces - 1) / 2, -1, 1))
+
+
+def _motion_along_trajectory(traj):
+    """
+    Get the relative motion between each successive pose of a trajectory, as a stack of matrices
+    """
+    matrices = numpy.array([traj[stamp] for stamp in sorted(traj.keys())])
+    return numpy.einsum('kij,kjl->kil', tf.invert_transform_matrices(matrices[1:]), matrices[:-1])
+
+
 def distances_along_trajectory(traj):
     """
     Compute the translational distances along a trajectory.
     """
-    keys = traj.keys()
-    keys.sort()
-    motion = [ominus(traj[keys[i + 1]], traj[keys[i]]) for i in range(len(keys) - 1)]
-    distances = [0]
-    total = 0
-    for t in motion:
-        total += compute_distance(t)
-        distances.append(total)
+    distances = numpy.zeros(len(traj))
+    distances[1:] = numpy.cumsum(compute_distances(_motion_along_trajectory(traj)))
     return distances
 
 
@@ -290,21 +381,170 @@ def rotations_along_trajectory(traj, scale_):
     """
     Compute the angular rotations along a trajectory.
     """
-    keys = traj.keys()
-    keys.sort()
-    motion = [ominus(traj[keys[i + 1]], traj[keys[i]]) for i in range(len(keys) - 1)]
-    distances = [0]
-    total = 0
-    for t in motion:
-        total += compute_angle(t) * scale_
-        distances.append(total)
+    distances = numpy.zeros(len(traj))
+    distances[1:] = numpy.cumsum(compute_angles(_motion_along_trajectory(traj)) * scale_)
     return distances
 
 
+# The maximum number of pose pairs evaluated at once, which bounds the size of the stacks of matrices
+CHUNK_SIZE = 65536
+
+# The evaluation context for worker processes, see _init_worker
+_worker_context = None
+
+
+def _prepare_evaluation(traj_gt, traj_est, param_max_pairs, param_fixed_delta, param_delta,
+                        param_delta_unit, param_offset, param_scale, random_state):
+    """
+    Find everything needed to evaluate the pose pairs of two trajectories, including which pairs to evaluate.
+    When every pair is to be evaluated, the pairs are not listed, they are generated chunk by chunk instead.
+    See evaluate_trajectory for the parameters.
+
+    Output:
+    A dict of the trajectory arrays and the pairs to evaluate, or None if the trajectories do not overlap
+    """
+    stamps_gt = numpy.array(sorted(traj_gt.keys()), dtype=numpy.float64)
+    stamps_est = numpy.array(sorted(traj_est.keys()), dtype=numpy.float64)
+
+    # Find the closest ground truth for each estimate, and the closest estimate back again
+    closest_gt = find_closest_indexes(stamps_gt, stamps_est + param_offset)
+    stamps_est_return = numpy.unique(find_closest_indexes(stamps_est, stamps_gt[closest_gt] - param_offset))
+    if len(stamps_est_return) < 2:
+        return None
+
+    if param_delta_unit == "s":
+        index_est = stamps_est
+    elif param_delta_unit == "m":
+        index_est = distances_along_trajectory(traj_est)
+    elif param_delta_unit == "rad":
+        index_est = rotations_along_trajectory(traj_est, 1)
+    elif param_delta_unit == "deg":
+        index_est = rotations_along_trajectory(traj_est, 180 / numpy.pi)
+    elif param_delta_unit == "f":
+        index_est = numpy.arange(len(traj_est))
+    else:
+        raise Exception("Unknown unit for delta: '%s'" % param_delta_unit)
+
+    pairs_i = None
+    pairs_j = None
+    num_pairs = len(traj_est) * len(traj_est)
+    if not param_fixed_delta:
+        if not (param_max_pairs == 0 or len(traj_est) < numpy.sqrt(param_max_pairs)):
+            pairs = random_state.randint(0, len(traj_est), size=(param_max_pairs, 2))
+            pairs_i, pairs_j = pairs[:, 0], pairs[:, 1]
+    else:
+        pairs_i = numpy.arange(len(traj_est))
+        pairs_j = find_closest_indexes(index_est, index_est + param_delta)
+        keep = pairs_j != len(traj_est) - 1
+        pairs_i, pairs_j = pairs_i[keep], pairs_j[keep]
+        if param_max_pairs != 0 and len(pairs_i) > param_max_pairs:
+            sample = random_state.choice(len(pairs_i), param_max_pairs, replace=False)
+            pairs_i, pairs_j = pairs_i[sample], pairs_j[sample]
+    if pairs_i is not None:
+        num_pairs = len(pairs_i)
+
+    gt_interval = numpy.median(numpy.diff(stamps_gt))
+    matrices_est = numpy.array([traj_est[stamp] for stamp in sorted(traj_est.keys())])
+    matrices_gt = numpy.array([traj_gt[stamp] for stamp in sorted(traj_gt.keys())])
+    return {
+        'stamps_gt': stamps_gt,
+        'stamps_est': stamps_est,
+        'closest_gt': closest_gt,
+        'gt_errors': numpy.abs(stamps_gt[closest_gt] - (stamps_est + param_offset)),
+        'gt_max_time_difference': 2 * gt_interval,
+        'matrices_est': matrices_est,
+        'matrices_gt': matrices_gt,
+        'inverse_est': tf.invert_transform_matrices(matrices_est),
+        'inverse_gt': tf.invert_transform_matrices(matrices_gt),
+        'scale': param_scale,
+        'pairs_i': pairs_i,
+        'pairs_j': pairs_j,
+        'num_pairs': num_pairs
+    }
+
+
+def _evaluate_chunk(context, bounds):
+    """
+    Evaluate one chunk of the pose pairs.
+
+    Input:
+    context -- the evaluation context, from _prepare_evaluation
+    bounds -- the (start, stop) of the chunk within all the pairs
+
+    Output:
+    the estimate indexes of the pairs that were evaluated, and their translation and rotation errors
+    """
+    start, stop = bounds
+    if context['pairs_i'] is None:
+        # Every pair is being evaluated, generate the indexes for just this chunk
+        pairs_i, pairs_j = numpy.divmod(numpy.arange(start, stop, dtype=numpy.intp), len(context['stamps_est']))
+    else:
+        pairs_i = context['pairs_i'][start:stop]
+        pairs_j = context['pairs_j'][start:stop]
+
+    # Discard pairs where either end is too far from the ground truth
+    gt_errors = context['gt_errors']
+    keep = ~((gt_errors[pairs_i] > context['gt_max_time_difference']) |
+             (gt_errors[pairs_j] > context['gt_max_time_difference']))
+    pairs_i, pairs_j = pairs_i[keep], pairs_j[keep]
+    pairs_gt_0 = context['closest_gt'][pairs_i]
+    pairs_gt_1 = context['closest_gt'][pairs_j]
+
+    # error44 = ominus(scale(ominus(est_1, est_0), param_scale), ominus(gt_1, gt_0))
+    motion_est = numpy.matmul(context['inverse_est'][pairs_j], context['matrices_est'][pairs_i])
+    motion_est[:, 0:3, 3] *= context['scale']
+    motion_gt = numpy.matmul(context['inverse_gt'][pairs_gt_1], context['matrices_gt'][pairs_gt_0])
+    error44 = numpy.matmul(tf.invert_transform_matrices(motion_est), motion_gt)
+    return pairs_i, pairs_j, compute_distances(error44), compute_angles(error44)
+
+
+def _init_worker(context):
+    """
+    Set the evaluation context for a worker process, so that it is only sent to each process once
+    """
+    global _worker_context
+    _worker_context = context
+
+
+def _evaluate_chunk_in_worker(bounds):
+    """
+    Evaluate a chunk of pose pairs in a worker process, see _evaluate_chunk
+    """
+    return _evaluate_chunk(_worker_context, bounds)
+
+
+def _evaluate_chunks(context, chunk_size, num_processes):
+    """
+    Evaluate all the pose pairs in fixed-size chunks, optionally spread across a pool of processes.
+    The chunks are always produced in order, so that the results do not depend on the number of processes.
+
+    Input:
+    context -- the evaluation context, from _prepare_evaluation
+    chunk_size -- the maximum number of pairs to evaluate at once
+    num_processes -- the number of processes to use, 1 evaluates everything in this process
+
+    Output:
+    a generator of chunk results, see _evaluate_chunk
+    """
+    chunk_size = max(1, int(chunk_size))
+    bounds = [(start, min(start + chunk_size, context['num_pairs']))
+              for start in range(0, context['num_pairs'], chunk_size)]
+    if num_processes > 1 and len(bounds) > 1:
+        with multiprocessing.Pool(processes=min(num_processes, len(bounds)),
+                                  initializer=_init_worker, initargs=(context,)) as pool:
+            for chunk_result in pool.imap(_evaluate_chunk_in_worker, bounds):
+                yield chunk_result
+    else:
+        for chunk_bounds in bounds:
+            yield _evaluate_chunk(context, chunk_bounds)
+
+
 def evaluate_trajectory(traj_gt, traj_est, param_max_pairs=10000, param_fixed_delta=False, param_delta=1.00,
-                        param_delta_unit="s", param_offset=0.00, param_scale=1.00):
+                        param_delta_unit="s", param_offset=0.00, param_scale=1.00, param_seed=None,
+                        param_chunk_size=CHUNK_SIZE, param_num_processes=1):
     """
     Compute the relative pose error between two trajectories.
+    The pairs are evaluated in chunks, as stacks of matrices.
 
     Input:
     traj_gt -- the first trajectory (ground truth)
@@ -321,75 +561,69 @@ def evaluate_trajectory(traj_gt, traj_est, param_max_pairs=10000, param_fixed_de
                         "f": frames
     param_offset -- time offset between two trajectories (to model the delay)
     param_scale -- scale to be applied to the second trajectory
+    param_seed -- seed for choosing the sampled pairs, None for a different sample each time
+    param_chunk_size -- the maximum number of pairs to evaluate at once
+    param_num_processes -- the number of processes to evaluate the chunks with
 
     Output:
-    list of compared poses and the resulting translation and rotation error
-    """
-    stamps_gt = list(traj_gt.keys())
-    stamps_est = list(traj_est.keys())
-    stamps_gt.sort()
-    stamps_est.sort()
-
-    stamps_est_return = []
-    for t_est in stamps_est:
-        t_gt = stamps_gt[find_closest_index(stamps_gt, t_est + param_offset)]
-        t_est_return = stamps_est[find_closest_index(stamps_est, t_gt - param_offset)]
-        # t_gt_return = stamps_gt[find_closest_index(stamps_gt, t_est_return + param_offset)]
-        if t_est_return not in stamps_est_return:
-            stamps_est_return.append(t_est_return)
-    if len(stamps_est_return) < 2:
+    array of compared poses and the resulting translation and rotation error,
+    each row is (stamp_est_0, stamp_est_1, stamp_gt_0, stamp_gt_1, trans, rot)
+    """
+    context = _prepare_evaluation(traj_gt, traj_est, param_max_pairs, param_fixed_delta, param_delta,
+                                  param_delta_unit, param_offset, param_scale, numpy.random.RandomState(param_seed))
+    if context is None:
         return None
+    stamps_est = context['stamps_est']
+    stamps_gt = context['stamps_gt']
+    closest_gt = context['closest_gt']
+
+    result = numpy.empty((context['num_pairs'], 6))
+    count = 0
+    for pairs_i, pairs_j, trans, rot in _evaluate_chunks(context, param_chunk_size, param_num_processes):
+        rows = slice(count, count + len(pairs_i))
+        result[rows, 0] = stamps_est[pairs_i]
+        result[rows, 1] = stamps_est[pairs_j]
+        result[rows, 2] = stamps_gt[closest_gt[pairs_i]]
+        result[rows, 3] = stamps_gt[closest_gt[pairs_j]]
+        result[rows, 4] = trans
+        result[rows, 5] = rot
+        count += len(pairs_i)
+    return result[:count]
+
+
+def evaluate_trajectory_errors(traj_gt, traj_est, param_max_pairs=10000, param_fixed_delta=False, param_delta=1.00,
+                               param_delta_unit="s", param_offset=0.00, param_scale=1.00, param_seed=None,
+                               param_chunk_size=CHUNK_SIZE, param_num_processes=1):
+    """
+    Compute the relative pose error between two trajectories, keeping only one error for each ground truth pose.
+    This is the error of the last evaluated pair ending at that pose, the same one that remains if the output of
+    evaluate_trajectory is collected into a map by the second ground truth timestamp.
+    Unlike evaluate_trajectory, the memory used does not grow with the number of pairs,
+    so every pair in long trajectories can be evaluated.
 
-    if param_delta_unit == "s":
-        index_est = list(traj_est.keys())
-        index_est.sort()
-    elif param_delta_unit == "m":
-        index_est = distances_along_trajectory(traj_est)
-    elif param_delta_unit == "rad":
-        index_est = rotations_along_trajectory(traj_est, 1)
-    elif param_delta_unit == "deg":
-        index_est = rotations_along_trajectory(traj_est, 180 / numpy.pi)
-    elif param_delta_unit == "f":
-        index_est = range(len(traj_est))
-    else:
-        raise Exception("Unknown unit for delta: '%s'" % param_delta_unit)
+    Input:
+    see evaluate_trajectory
 
-    if not param_fixed_delta:
-        if param_max_pairs == 0 or len(traj_est) < numpy.sqrt(param_max_pairs):
-            pairs = [(i, j) for i in range(len(traj_est)) for j in range(len(traj_est))]
-        else:
-            pairs = [(random.randint(0, len(traj_est) - 1), random.randint(0, len(traj_est) - 1))
-                     for _ in range(param_max_pairs)]
-    else:
-        pairs = []
-        for i in range(len(traj_est)):
-            j = find_closest_index(index_est, index_est[i] + param_delta)
-            if j != len(traj_est) - 1:
-                pairs.append((i, j))
-        if param_max_pairs != 0 and len(pairs) > param_max_pairs:
-            pairs = random.sample(pairs, param_max_pairs)
-
-    gt_interval = numpy.median([s - t for s, t in zip(stamps_gt[1:], stamps_gt[:-1])])
-    gt_max_time_difference = 2 * gt_interval
-
-    result = []
-    for i, j in pairs:
-        stamp_est_0 = stamps_est[i]
-        stamp_est_1 = stamps_est[j]
-
-        stamp_gt_0 = stamps_gt[find_closest_index(stamps_gt, stamp_est_0 + param_offset)]
-        stamp_gt_1 = stamps_gt[find_closest_index(stamps_gt, stamp_est_1 + param_offset)]
-
-        if (abs(stamp_gt_0 - (stamp_est_0 + param_offset)) > gt_max_time_difference or
-                abs(stamp_gt_1 - (stamp_est_1 + param_offset)) > gt_max_time_difference):
-            continue
-
-        error44 = ominus(scale(
-            ominus(traj_est[stamp_est_1], traj_est[stamp_est_0]), param_scale),
-            ominus(traj_gt[stamp_gt_1], traj_gt[stamp_gt_0]))
-
-        trans = compute_distance(error44)
-        rot = compute_angle(error44)
-
-        result.append([stamp_est_0, stamp_est_1, stamp_gt_0, stamp_gt_1, trans, rot])
-    return result
+    Output:
+    the ground truth timestamps, and the translation and rotation error of the pair ending at each,
+    and the total number of pairs evaluated, or None if the trajectories do not overlap
+    """
+    context = _prepare_evaluation(traj_gt, traj_est, param_max_pairs, param_fixed_delta, param_delta,
+                                  param_delta_unit, param_offset, param_scale, numpy.random.RandomState(param_seed))
+    if context is None:
+        return None
+    num_gt = len(context['stamps_gt'])
+    trans_error = numpy.zeros(num_gt)
+    rot_error = numpy.zeros(num_gt)
+    found = numpy.zeros(num_gt, dtype=bool)
+    num_pairs = 0
+    for pairs_i, pairs_j, trans, rot in _evaluate_chunks(context, param_chunk_size, param_num_processes):
+        # Find the last pair in the chunk for each ground truth pose, which overrides all the earlier ones
+        pairs_gt_1 = context['closest_gt'][pairs_j][::-1]
+        pairs_gt_1, last = numpy.unique(pairs_gt_1, return_index=True)
+        last = len(pairs_j) - 1 - last
+        trans_error[pairs_gt_1] = trans[last]
+        rot_error[pairs_gt_1] = rot[last]
+        found[pairs_gt_1] = True
+        num_pairs += len(pairs_j)
+    return context['stamps_gt'][found], trans_error[found], rot_error[found], num_pairs
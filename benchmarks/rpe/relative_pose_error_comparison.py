@@ -1,8 +1,9 @@
-import numpy as np
 import pickle
 import bson
+import numpy as np
 import util.associate as ass
 import core.benchmark_comparison
+import util.summary_statistics as stats
 
 
 class RPEBenchmarkComparison(core.benchmark_comparison.BenchmarkComparison):
@@ -85,21 +86,54 @@ class RPEBenchmarkComparison(core.benchmark_comparison.BenchmarkComparison):
         :param reference_benchmark_result: 
         :return: 
         """
-        matches = ass.associate(benchmark_result.translational_error, reference_benchmark_result.translational_error,
-                                offset=self.offset, max_difference=self.max_difference)
-        trans_error_diff = {}
-        rot_error_diff = {}
-        for result_stamp, ref_stamp in matches:
-            trans_error_diff[ref_stamp] = (reference_benchmark_result.translational_error[ref_stamp] -
-                                           benchmark_result.translational_error[result_stamp])
-            rot_error_diff[ref_stamp] = (reference_benchmark_result.rotational_error[ref_stamp] -
-                                         benchmark_result.rotational_error[result_stamp])
-        return RPEBenchmarkComparisonResult(benchmark_comparison_id=self.identifier,
-                                            benchmark_result=benchmark_result.identifier,
-                                            reference_benchmark_result=reference_benchmark_result.identifier,
-                                            difference_in_translational_error=trans_error_diff,
-                                            difference_in_rotational_error=rot_error_diff,
-                                            settings=self.get_settings())
+        return self.compare_many_results([benchmark_result], reference_benchmark_result)[0]
+
+    def compare_many_results(self, benchmark_results, reference_benchmark_result):
+        """
+        Compare several Relative Pose Error results with the same reference result.
+        Errors are compared as arrays, and the reference is only read once.
+        :param benchmark_results: A list of RPE results
+        :param reference_benchmark_result: The reference RPE result
+        :return: A list of RPEBenchmarkComparisonResult, in the same order as the benchmark results
+        """
+        ref_timestamps = reference_benchmark_result.trans_timestamps
+        ref_trans_errors = reference_benchmark_result.trans_errors
+        comparison_results = []
+        for benchmark_result in benchmark_results:
+            result_indexes, ref_indexes = ass.associate_indexes(benchmark_result.trans_timestamps, ref_timestamps,
+                                                                offset=self.offset,
+                                                                max_difference=self.max_difference)
+            stamps = ref_timestamps[ref_indexes].tolist()
+            trans_error_diff = ref_trans_errors[ref_indexes] - benchmark_result.trans_errors[result_indexes]
+            rot_error_diff = (_get_rotational_errors(reference_benchmark_result, ref_indexes) -
+                              _get_rotational_errors(benchmark_result, result_indexes))
+            statistics = stats.summarise(trans_error_diff, prefix='trans_')
+            statistics.update(stats.summarise(rot_error_diff, prefix='rot_'))
+            comparison_results.append(RPEBenchmarkComparisonResult(
+                benchmark_comparison_id=self.identifier,
+                benchmark_result=benchmark_result.identifier,
+                reference_benchmark_result=reference_benchmark_result.identifier,
+                difference_in_translational_error=dict(zip(stamps, trans_error_diff.tolist())),
+                difference_in_rotational_error=dict(zip(stamps, rot_error_diff.tolist())),
+                settings=self.get_settings(),
+                statistics=statistics
+            ))
+        return comparison_results
+
+
+def _get_rotational_errors(benchmark_result, indexes):
+    """
+    Get the rotational errors of an RPE result at some of its translational timestamps.
+    They are almost always measured together, in which case the rotational error array is indexed directly,
+    otherwise they are looked up by timestamp.
+    :param benchmark_result: An RPE result
+    :param indexes: Indexes into the translational timestamps
+    :return: An array of rotational errors, one for each index
+    """
+    if np.array_equal(benchmark_result.trans_timestamps, benchmark_result.rot_timestamps):
+        return benchmark_result.rot_errors[indexes]
+    return np.array([benchmark_result.rotational_error[stamp]
+                     for stamp in benchmark_result.trans_timestamps[indexes].tolist()], dtype=np.float64)
 
 
 class RPEBenchmarkComparisonResult(core.benchmark_comparison.BenchmarkComparisonResult):
@@ -109,7 +143,18 @@ class RPEBenchmarkComparisonResult(core.benchmark_comparison.BenchmarkComparison
     """
 
     def __init__(self, benchmark_comparison_id, benchmark_result, reference_benchmark_result,
-                 difference_in_translational_error, difference_in_rotational_error, settings, id_=None, **kwargs):
+                 difference_in_translational_error, difference_in_rotational_error, settings, statistics=None,
+                 id_=None, **kwargs):
+        """
+        :param benchmark_comparison_id: The id of the comparison benchmark that produced this result
+        :param benchmark_result: The id of the benchmark result compared
+        :param reference_benchmark_result: The id of the reference benchmark result
+        :param difference_in_translational_error: A map of timestamps to the difference in translational error
+        :param difference_in_rotational_error: A map of timestamps to the difference in rotational error
+        :param settings: The settings of the comparison
+        :param statistics: The summary statistics of the differences, if previously computed. Computed if None.
+        :param id_: The id of the result, if it exists
+        """
         kwargs['success'] = True
         super().__init__(benchmark_comparison_id=benchmark_comparison_id,
                          benchmark_result=benchmark_result,
@@ -119,73 +164,88 @@ class RPEBenchmarkComparisonResult(core.benchmark_comparison.BenchmarkComparison
         self._rot_error_diff = difference_in_rotational_error
         self._settings = settings
 
+        self._trans_timestamps, self._trans_errors = stats.dict_to_arrays(difference_in_translational_error)
+        self._rot_timestamps, self._rot_errors = stats.dict_to_arrays(difference_in_rotational_error)
+        if statistics is None:
+            statistics = stats.summarise(self._trans_errors, prefix='trans_')
+            statistics.update(stats.summarise(self._rot_errors, prefix='rot_'))
+        self._statistics = statistics
+
+    @property
+    def statistics(self):
+        return self._statistics
+
     @property
     def translational_error_difference(self):
         return self._trans_error_diff
 
+    @property
+    def trans_timestamps(self):
+        return self._trans_timestamps
+
+    @property
+    def trans_errors(self):
+        return self._trans_errors
+
     @property
     def trans_rmse(self):
-        trans_error = np.array(list(self.translational_error_difference.values()))
-        return np.sqrt(np.dot(trans_error, trans_error) / len(trans_error))
+        return self._statistics['trans_rmse']
 
     @property
     def trans_mean(self):
-        trans_error = np.array(list(self.translational_error_difference.values()))
-        return np.mean(trans_error)
+        return self._statistics['trans_mean']
 
     @property
     def trans_median(self):
-        trans_error = np.array(list(self.translational_error_difference.values()))
-        return np.median(trans_error)
+        return self._statistics['trans_median']
 
     @property
     def trans_std(self):
-        trans_error = np.array(list(self.translational_error_difference.values()))
-        return np.std(trans_error)
+        return self._statistics['trans_std']
 
     @property
     def trans_min(self):
-        trans_error = np.array(list(self.translational_error_difference.values()))
-        return np.min(trans_error)
+        return self._statistics['trans_min']
 
     @property
     def trans_max(self):
-        trans_error = np.array(list(self.translational_error_difference.values()))
-        return np.max(trans_error)
+        return self._statistics['trans_max']
 
     @property
     def rotational_error_difference(self):
         return self._rot_error_diff
 
+    @property
+    def rot_timestamps(self):
+        return self._rot_timestamps
+
+    @property
+    def rot_errors(self):
+        return self._rot_errors
+
     @property
     def rot_rmse(self):
-        rot_error = np.array(list(self.rotational_error_difference.values()))
-        return np.sqrt(np.dot(rot_error, rot_error) / len(rot_error))
+        return self._statistics['rot_rmse']
 
     @property
     def rot_mean(self):
-        rot_error = np.array(list(self.rotational_error_difference.values()))
-        return np.mean(rot_error)
+        return self._statistics['rot_mean']
 
     @property
     def rot_median(self):
-        rot_error = np.array(list(self.rotational_error_difference.values()))
-        return np.median(rot_error)
+        return self._statistics['rot_median']
 
     @property
     def rot_std(self):
-        rot_error = np.array(list(self.rotational_error_difference.values()))
-        return np.std(rot_error)
+        return self._statistics['rot_std']
 
     @property
     def rot_min(self):
-        rot_error = np.array(list(self.rotational_error_difference.values()))
-        return np.min(rot_error)
+        return self._statistics['rot_min']
 
     @property
     def rot_max(self):
-        rot_error = np.array(list(self.rotational_error_difference.values()))
-        return np.max(rot_error)
+        return self._statistics['rot_max']
 
     @property
     def settings(self):
@@ -198,6 +258,7 @@ class RPEBenchmarkComparisonResult(core.benchmark_comparison.BenchmarkComparison
         output['rot_error_diff'] = bson.Binary(pickle.dumps(self.rotational_error_difference,
                                                             protocol=pickle.HIGHEST_PROTOCOL))
         output['settings'] = self.settings
+        output['statistics'] = self.statistics
         return output
 
     @classmethod
@@ -208,4 +269,6 @@ class RPEBenchmarkComparisonResult(core.benchmark_comparison.BenchmarkComparison
             kwargs['difference_in_rotational_error'] = pickle.loads(serialized_representation['rot_error_diff'])
         if 'settings' in serialized_representation:
             kwargs['settings'] = serialized_representation['settings']
+        if 'statistics' in serialized_representation:
+            kwargs['statistics'] = serialized_representation['statistics']
         return super().deserialize(serialized_representation, db_client, **kwargs)
@@ -1,7 +1,7 @@
-import numpy as np
 import pickle
 import bson
 import core.benchmark
+import util.summary_statistics as stats
 
 
 class BenchmarkRPEResult(core.benchmark.BenchmarkResult):
@@ -14,7 +14,16 @@ class BenchmarkRPEResult(core.benchmark.BenchmarkResult):
     """
 
     def __init__(self, benchmark_id, trial_result_id, translational_error,
-                 rotational_error, rpe_settings, id_=None, **kwargs):
+                 rotational_error, rpe_settings, statistics=None, id_=None, **kwargs):
+        """
+        :param benchmark_id: The id of the benchmark that produced this result
+        :param trial_result_id: The id of the trial result measured
+        :param translational_error: A map of timestamps to translational error
+        :param rotational_error: A map of timestamps to rotational error
+        :param rpe_settings: The settings of the benchmark
+        :param statistics: The summary statistics of the errors, if previously computed. Computed if None.
+        :param id_: The id of the result, if it exists
+        """
         kwargs['success'] = True
         super().__init__(benchmark_id=benchmark_id, trial_result_id=trial_result_id, id_=id_, **kwargs)
 
@@ -22,69 +31,84 @@ class BenchmarkRPEResult(core.benchmark.BenchmarkResult):
         self._rot_error = rotational_error
         self._rpe_settings = rpe_settings
 
+        self._trans_timestamps, self._trans_errors = stats.dict_to_arrays(translational_error)
+        self._rot_timestamps, self._rot_errors = stats.dict_to_arrays(rotational_error)
+        if statistics is None:
+            statistics = stats.summarise(self._trans_errors, prefix='trans_')
+            statistics.update(stats.summarise(self._rot_errors, prefix='rot_'))
+        self._statistics = statistics
+
+    @property
+    def statistics(self):
+        return self._statistics
+
+    @property
+    def trans_timestamps(self):
+        return self._trans_timestamps
+
+    @property
+    def trans_errors(self):
+        return self._trans_errors
+
     @property
     def trans_rmse(self):
-        trans_error = np.array(list(self.translational_error.values()))
-        return np.sqrt(np.dot(trans_error, trans_error) / len(trans_error))
+        return self._statistics['trans_rmse']
 
     @property
     def trans_mean(self):
-        trans_error = np.array(list(self.translational_error.values()))
-        return np.mean(trans_error)
+        return self._statistics['trans_mean']
 
     @property
     def trans_median(self):
-        trans_error = np.array(list(self.translational_error.values()))
-        return np.median(trans_error)
+        return self._statistics['trans_median']
 
     @property
     def trans_std(self):
-        trans_error = np.array(list(self.translational_error.values()))
-        return np.std(trans_error)
+        return self._statistics['trans_std']
 
     @property
     def trans_min(self):
-        trans_error = np.array(list(self.translational_error.values()))
-        return np.min(trans_error)
+        return self._statistics['trans_min']
 
     @property
     def trans_max(self):
-        trans_error = np.array(list(self.translational_error.values()))
-        return np.max(trans_error)
+        return self._statistics['trans_max']
 
     @property
     def translational_error(self):
         return self._trans_error
 
+    @property
+    def rot_timestamps(self):
+        return self._rot_timestamps
+
+    @property
+    def rot_errors(self):
+        return self._rot_errors
+
     @property
     def rot_rmse(self):
-        rot_error = np.array(list(self.rotational_error.values()))
-        return np.sqrt(np.dot(rot_error, rot_error)) / len(rot_error)
+        return self._statistics['rot_rmse']
 
     @property
     def rot_mean(self):
-        rot_error = np.array(list(self.rotational_error.values()))
-        return np.mean(rot_error)
+        return self._statistics['rot_mean']
 
     @property
     def rot_median(self):
-        rot_error = np.array(list(self.rotational_error.values()))
-        return np.median(rot_error)
+        return self._statistics['rot_median']
 
     @property
     def rot_std(self):
-        rot_error = np.array(list(self.rotational_error.values()))
-        return np.std(rot_error)
+        return self._statistics['rot_std']
 
     @property
     def rot_min(self):
-        rot_error = np.array(list(self.rotational_error.values()))
-        return np.min(rot_error)
+        return self._statistics['rot_min']
 
     @property
     def rot_max(self):
-        rot_error = np.array(list(self.rotational_error.values()))
-        return np.max(rot_error)
+        return self._statistics['rot_max']
 
     @property
     def rotational_error(self):
@@ -100,6 +124,7 @@ class BenchmarkRPEResult(core.benchmark.BenchmarkResult):
                                                                  protocol=pickle.HIGHEST_PROTOCOL))
         output['rot_error'] = bson.Binary(pickle.dumps(self.rotational_error, protocol=pickle.HIGHEST_PROTOCOL))
         output['settings'] = self.settings
+        output['statistics'] = self.statistics
         return output
 
     @classmethod
@@ -110,4 +135,6 @@ class BenchmarkRPEResult(core.benchmark.BenchmarkResult):
             kwargs['rotational_error'] = pickle.loads(serialized_representation['rot_error'])
         if 'settings' in serialized_representation:
             kwargs['rpe_settings'] = serialized_representation['settings']
+        if 'statistics' in serialized_representation:
+            kwargs['statistics'] = serialized_representation['statistics']
         return super().deserialize(serialized_representation, db_client, **kwargs)
@@ -102,6 +102,8 @@ class TestBenchmarkRPE(database.tests.test_entity.EntityContract, unittest.TestC
         self.assertEqual(benchmark1.fixed_delta, benchmark2.fixed_delta)
         self.assertEqual(benchmark1.delta, benchmark2.delta)
         self.assertEqual(benchmark1.delta_unit, benchmark2.delta_unit)
+        self.assertEqual(benchmark1.seed, benchmark2.seed)
+        self.assertEqual(benchmark1.num_processes, benchmark2.num_processes)
 
     def test_benchmark_results_returns_a_benchmark_result(self):
         benchmark = rpe.BenchmarkRPE()
@@ -195,3 +197,89 @@ class TestBenchmarkRPE(database.tests.test_entity.EntityContract, unittest.TestC
         result = benchmark.benchmark_results(self.trial_result)
         self.assertLess(result.trans_max, unscaled_result.trans_max)
         # We don't test rotation error, it isn't affected by scale
+
+
+class TestEvaluateTrajectory(unittest.TestCase):
+
+    def setUp(self):
+        self.random = np.random.RandomState(4571)
+        self.traj_gt = {stamp: pose.transform_matrix for stamp, pose
+                        in create_random_trajectory(self.random, duration=10, length=40).items()}
+        self.traj_est = {stamp: pose.transform_matrix for stamp, pose
+                         in create_noise(create_random_trajectory(self.random, duration=10, length=40),
+                                         self.random)[0].items()}
+
+    def test_find_closest_indexes_matches_find_closest_index(self):
+        values = np.sort(self.random.uniform(0, 100, 57))
+        # Include exact matches and values exactly halfway between elements
+        queries = np.concatenate((self.random.uniform(-10, 110, 200), values[:10],
+                                  (values[1:11] + values[:10]) / 2))
+        result = rpe.find_closest_indexes(values, queries)
+        for idx, query in enumerate(queries):
+            self.assertEqual(rpe.find_closest_index(values, query), result[idx])
+
+    def test_find_closest_indexes_resolves_ties_like_find_closest_index(self):
+        values = np.arange(20)
+        queries = np.arange(20) + 0.5
+        result = rpe.find_closest_indexes(values, queries)
+        for idx, query in enumerate(queries):
+            self.assertEqual(rpe.find_closest_index(values, query), result[idx])
+
+    def test_evaluate_trajectory_computes_error_for_each_pair(self):
+        result = rpe.evaluate_trajectory(self.traj_gt, self.traj_est, param_max_pairs=0, param_scale=1.5)
+        self.assertEqual(6, result.shape[1])
+        for stamp_est_0, stamp_est_1, stamp_gt_0, stamp_gt_1, trans, rot in result:
+            error44 = rpe.ominus(rpe.scale(rpe.ominus(self.traj_est[stamp_est_1], self.traj_est[stamp_est_0]), 1.5),
+                                 rpe.ominus(self.traj_gt[stamp_gt_1], self.traj_gt[stamp_gt_0]))
+            self.assertAlmostEqual(rpe.compute_distance(error44), trans, places=10)
+            self.assertAlmostEqual(rpe.compute_angle(error44), rot, places=6)
+
+    def test_evaluate_trajectory_uses_closest_ground_truth(self):
+        stamps_gt = sorted(self.traj_gt.keys())
+        result = rpe.evaluate_trajectory(self.traj_gt, self.traj_est, param_max_pairs=0, param_offset=0.1)
+        for stamp_est_0, stamp_est_1, stamp_gt_0, stamp_gt_1, _, _ in result:
+            self.assertEqual(stamps_gt[rpe.find_closest_index(stamps_gt, stamp_est_0 + 0.1)], stamp_gt_0)
+            self.assertEqual(stamps_gt[rpe.find_closest_index(stamps_gt, stamp_est_1 + 0.1)], stamp_gt_1)
+
+    def test_evaluate_trajectory_fixed_delta_pairs_are_delta_apart(self):
+        stamps_est = sorted(self.traj_est.keys())
+        result = rpe.evaluate_trajectory(self.traj_gt, self.traj_est, param_fixed_delta=True,
+                                         param_delta=2, param_delta_unit='f')
+        self.assertGreater(len(result), 0)
+        for stamp_est_0, stamp_est_1, _, _, _, _ in result:
+            self.assertEqual(stamps_est.index(stamp_est_0) + 2, stamps_est.index(stamp_est_1))
+
+    def test_evaluate_trajectory_is_the_same_in_chunks(self):
+        result = rpe.evaluate_trajectory(self.traj_gt, self.traj_est, param_max_pairs=0)
+        chunked_result = rpe.evaluate_trajectory(self.traj_gt, self.traj_est, param_max_pairs=0,
+                                                 param_chunk_size=7)
+        self.assertTrue(np.array_equal(result, chunked_result))
+
+    def test_evaluate_trajectory_is_the_same_with_multiple_processes(self):
+        result = rpe.evaluate_trajectory(self.traj_gt, self.traj_est, param_max_pairs=0, param_chunk_size=100)
+        parallel_result = rpe.evaluate_trajectory(self.traj_gt, self.traj_est, param_max_pairs=0,
+                                                  param_chunk_size=100, param_num_processes=3)
+        self.assertTrue(np.array_equal(result, parallel_result))
+
+    def test_evaluate_trajectory_sample_is_reproducible_with_seed(self):
+        result1 = rpe.evaluate_trajectory(self.traj_gt, self.traj_est, param_max_pairs=100, param_seed=1553)
+        result2 = rpe.evaluate_trajectory(self.traj_gt, self.traj_est, param_max_pairs=100, param_seed=1553)
+        self.assertTrue(np.array_equal(result1, result2))
+        result3 = rpe.evaluate_trajectory(self.traj_gt, self.traj_est, param_max_pairs=100, param_seed=1554)
+        self.assertFalse(np.array_equal(result1, result3))
+
+    def test_evaluate_trajectory_errors_keeps_last_pair_for_each_ground_truth(self):
+        result = rpe.evaluate_trajectory(self.traj_gt, self.traj_est, param_max_pairs=0)
+        trans_error = dict(zip(result[:, 3], result[:, 4]))
+        rot_error = dict(zip(result[:, 3], result[:, 5]))
+        stamps, chunk_trans, chunk_rot, num_pairs = rpe.evaluate_trajectory_errors(
+            self.traj_gt, self.traj_est, param_max_pairs=0, param_chunk_size=11)
+        self.assertEqual(len(result), num_pairs)
+        self.assertEqual(set(trans_error.keys()), set(stamps))
+        for idx, stamp in enumerate(stamps):
+            self.assertEqual(trans_error[stamp], chunk_trans[idx])
+            self.assertEqual(rot_error[stamp], chunk_rot[idx])
+
+    def test_distances_along_trajectory(self):
+        trajectory = {float(idx): tf.Transform(location=(idx * idx, 0, 0)).transform_matrix for idx in range(5)}
+        self.assertTrue(np.all(np.isclose([0, 1, 4, 9, 16], rpe.distances_along_trajectory(trajectory))))
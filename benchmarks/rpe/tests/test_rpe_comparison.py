@@ -48,6 +48,7 @@ class TestRPEBenchmarkComparisonResult(entity_test.EntityContract, unittest.Test
                          benchmark_result2.translational_error_difference)
         self.assertEqual(benchmark_result1.rotational_error_difference,
                          benchmark_result2.rotational_error_difference)
+        self.assertEqual(benchmark_result1.statistics, benchmark_result2.statistics)
 
     def assert_serialized_equal(self, s_model1, s_model2):
         """
@@ -74,6 +75,36 @@ class TestRPEBenchmarkComparisonResult(entity_test.EntityContract, unittest.Test
         for key in rot_error1:
             self.assertTrue(np.array_equal(rot_error1[key], rot_error2[key]))
 
+    def test_serialize_includes_statistics(self):
+        subject = self.make_instance()
+        s_subject = subject.serialize()
+        self.assertEqual(subject.trans_rmse, s_subject['statistics']['trans_rmse'])
+        self.assertEqual(subject.trans_mean, s_subject['statistics']['trans_mean'])
+        self.assertEqual(subject.trans_median, s_subject['statistics']['trans_median'])
+        self.assertEqual(subject.trans_std, s_subject['statistics']['trans_std'])
+        self.assertEqual(subject.trans_min, s_subject['statistics']['trans_min'])
+        self.assertEqual(subject.trans_max, s_subject['statistics']['trans_max'])
+        self.assertEqual(subject.rot_rmse, s_subject['statistics']['rot_rmse'])
+        self.assertEqual(subject.rot_mean, s_subject['statistics']['rot_mean'])
+        self.assertEqual(subject.rot_median, s_subject['statistics']['rot_median'])
+        self.assertEqual(subject.rot_std, s_subject['statistics']['rot_std'])
+        self.assertEqual(subject.rot_min, s_subject['statistics']['rot_min'])
+        self.assertEqual(subject.rot_max, s_subject['statistics']['rot_max'])
+
+    def test_deserialize_uses_stored_statistics(self):
+        subject = self.make_instance()
+        s_subject = subject.serialize()
+        s_subject['statistics'] = dict(s_subject['statistics'], trans_mean=-1.0)
+        deserialized = self.get_class().deserialize(s_subject, self.create_mock_db_client())
+        self.assertEqual(-1.0, deserialized.trans_mean)
+
+    def test_deserialize_computes_statistics_when_not_stored(self):
+        subject = self.make_instance()
+        s_subject = subject.serialize()
+        del s_subject['statistics']
+        deserialized = self.get_class().deserialize(s_subject, self.create_mock_db_client())
+        self.assertEqual(subject.statistics, deserialized.statistics)
+
 
 class TestRPEBenchmarkComparison(entity_test.EntityContract, unittest.TestCase):
 
@@ -152,3 +183,38 @@ class TestRPEBenchmarkComparison(entity_test.EntityContract, unittest.TestCase):
         for time, error in added_rot_error.items():
             self.assertIn(time, comparison_result.translational_error_difference)
             self.assertAlmostEqual(-1 * error, comparison_result.rotational_error_difference[time])
+
+    def test_compare_many_results_same_as_comparing_each(self):
+        random = np.random.RandomState(40311)
+        ref_trans_error = {random.uniform(0, 600): random.uniform(-100, 100) for _ in range(100)}
+        ref_rot_error = {time: random.uniform(-np.pi / 2, np.pi / 2) for time in ref_trans_error}
+        ref_benchmark_result = rpe_res.BenchmarkRPEResult(benchmark_id=random.randint(0, 10),
+                                                          trial_result_id=random.randint(10, 20),
+                                                          translational_error=ref_trans_error,
+                                                          rotational_error=ref_rot_error,
+                                                          rpe_settings={})
+        benchmark_results = []
+        for idx in range(5):
+            test_trans_error = {}
+            test_rot_error = {}
+            for time in ref_trans_error:
+                if random.uniform(0, 1) < 0.8:
+                    noisy_time = time + random.uniform(-0.005, 0.005)
+                    test_trans_error[noisy_time] = ref_trans_error[time] + random.uniform(-50, 50)
+                    test_rot_error[noisy_time] = ref_rot_error[time] + random.uniform(-np.pi / 6, np.pi / 6)
+            benchmark_results.append(rpe_res.BenchmarkRPEResult(benchmark_id=random.randint(20, 30),
+                                                                trial_result_id=random.randint(30, 40),
+                                                                translational_error=test_trans_error,
+                                                                rotational_error=test_rot_error,
+                                                                rpe_settings={}))
+
+        comparison_benchmark = rpe_comp.RPEBenchmarkComparison()
+        comparison_results = comparison_benchmark.compare_many_results(benchmark_results, ref_benchmark_result)
+        self.assertEqual(len(benchmark_results), len(comparison_results))
+        for benchmark_result, comparison_result in zip(benchmark_results, comparison_results):
+            expected = comparison_benchmark.compare_results(benchmark_result, ref_benchmark_result)
+            self.assertEqual(benchmark_result.identifier, comparison_result.benchmark_result)
+            self.assertEqual(expected.translational_error_difference,
+                             comparison_result.translational_error_difference)
+            self.assertEqual(expected.rotational_error_difference, comparison_result.rotational_error_difference)
+            self.assertEqual(expected.statistics, comparison_result.statistics)
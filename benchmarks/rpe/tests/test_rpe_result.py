@@ -38,6 +38,7 @@ class TestBenchmarkRPEResult(entity_test.EntityContract, unittest.TestCase):
         self.assertEqual(benchmark_result1.translational_error, benchmark_result2.translational_error)
         self.assertEqual(benchmark_result1.rotational_error, benchmark_result2.rotational_error)
         self.assertEqual(benchmark_result1.settings, benchmark_result2.settings)
+        self.assertEqual(benchmark_result1.statistics, benchmark_result2.statistics)
 
     def assert_serialized_equal(self, s_model1, s_model2):
         """
@@ -125,3 +126,38 @@ class TestBenchmarkRPEResult(entity_test.EntityContract, unittest.TestCase):
             if max_ is None or error > max_:
                 max_ = error
         self.assertEqual(max_, subject.rot_max)
+
+    def test_serialize_includes_statistics(self):
+        subject = self.make_instance()
+        s_subject = subject.serialize()
+        self.assertEqual(subject.trans_rmse, s_subject['statistics']['trans_rmse'])
+        self.assertEqual(subject.trans_mean, s_subject['statistics']['trans_mean'])
+        self.assertEqual(subject.trans_median, s_subject['statistics']['trans_median'])
+        self.assertEqual(subject.trans_std, s_subject['statistics']['trans_std'])
+        self.assertEqual(subject.trans_min, s_subject['statistics']['trans_min'])
+        self.assertEqual(subject.trans_max, s_subject['statistics']['trans_max'])
+        self.assertEqual(subject.rot_rmse, s_subject['statistics']['rot_rmse'])
+        self.assertEqual(subject.rot_mean, s_subject['statistics']['rot_mean'])
+        self.assertEqual(subject.rot_median, s_subject['statistics']['rot_median'])
+        self.assertEqual(subject.rot_std, s_subject['statistics']['rot_std'])
+        self.assertEqual(subject.rot_min, s_subject['statistics']['rot_min'])
+        self.assertEqual(subject.rot_max, s_subject['statistics']['rot_max'])
+
+    def test_deserialize_uses_stored_statistics(self):
+        subject = self.make_instance()
+        s_subject = subject.serialize()
+        s_subject['statistics'] = dict(s_subject['statistics'], rot_median=-1.0)
+        deserialized = self.get_class().deserialize(s_subject, self.create_mock_db_client())
+        self.assertEqual(-1.0, deserialized.rot_median)
+
+    def test_deserialize_computes_statistics_when_not_stored(self):
+        subject = self.make_instance()
+        s_subject = subject.serialize()
+        del s_subject['statistics']
+        deserialized = self.get_class().deserialize(s_subject, self.create_mock_db_client())
+        self.assertEqual(subject.statistics, deserialized.statistics)
+
+    def test_rot_rmse_is_correct(self):
+        subject = self.make_instance()
+        rot_error = np.array(list(subject.rotational_error.values()))
+        self.assertAlmostEqual(np.sqrt(np.mean(rot_error * rot_error)), subject.rot_rmse)
@@ -127,3 +127,16 @@ class TestTrackingBenchmark(database.tests.test_entity.EntityContract, unittest.
         self.assertEqual(0, result.lost_intervals[3].duration)
         self.assertEqual(0, result.lost_intervals[3].distance)
         self.assertEqual(1, result.lost_intervals[3].frames)
+
+    def test_benchmark_measures_total_distance_of_whole_trajectory(self):
+        benchmark = tracking.TrackingBenchmark()
+        result = benchmark.benchmark_results(self.trial_result)
+        self.assertEqual(60 / 100, result.fraction_distance_lost)
+
+    def test_find_lost_runs(self):
+        starts, ends = tracking.find_lost_runs([True, False, False, True, True, False, True])
+        self.assertEqual([0, 3, 6], list(starts))
+        self.assertEqual([1, 5, 7], list(ends))
+        starts, ends = tracking.find_lost_runs([False, False])
+        self.assertEqual(0, len(starts))
+        self.assertEqual(0, len(ends))
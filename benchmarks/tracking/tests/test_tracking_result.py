@@ -4,7 +4,6 @@ import pickle
 import util.dict_utils as du
 import database.tests.test_entity as entity_test
 import benchmarks.tracking.tracking_result as track_res
-import benchmarks.tracking.tracking_benchmark as track_bench
 
 
 class TestTrackingBenchmarkResult(entity_test.EntityContract, unittest.TestCase):
@@ -19,10 +18,10 @@ class TestTrackingBenchmarkResult(entity_test.EntityContract, unittest.TestCase)
             'settings': {}
         })
         if 'lost_intervals' not in kwargs:
-            kwargs['lost_intervals'] = [track_bench.LostInterval(start_time=np.random.uniform(i, i + 0.49),
-                                                                 end_time=np.random.uniform(i + 0.5, i + 1),
-                                                                 distance=np.random.uniform(0, 1000),
-                                                                 num_frames=np.random.randint(0, 100))
+            kwargs['lost_intervals'] = [track_res.LostInterval(start_time=np.random.uniform(i, i + 0.49),
+                                                               end_time=np.random.uniform(i + 0.5, i + 1),
+                                                               distance=np.random.uniform(0, 1000),
+                                                               num_frames=np.random.randint(0, 100))
                                         for i in range(50)]
         if 'total_distance' not in kwargs:
             kwargs['total_distance'] = np.sum(np.array([i.distance for i in kwargs['lost_intervals']])) + 10000
@@ -62,6 +61,7 @@ class TestTrackingBenchmarkResult(entity_test.EntityContract, unittest.TestCase)
         self.assertEqual(benchmark_result1.fraction_time_lost, benchmark_result2.fraction_time_lost)
         self.assertEqual(benchmark_result1.fraction_frames_lost, benchmark_result2.fraction_frames_lost)
         self.assertEqual(benchmark_result1.settings, benchmark_result2.settings)
+        self.assertEqual(benchmark_result1.statistics, benchmark_result2.statistics)
 
     def assert_serialized_equal(self, s_model1, s_model2):
         """
@@ -171,3 +171,83 @@ class TestTrackingBenchmarkResult(entity_test.EntityContract, unittest.TestCase)
     def test_total_frames_lost_is_correct(self):
         subject = self.make_instance()
         self.assertEqual(sum([interval.frames for interval in subject.lost_intervals]), subject.total_frames_lost)
+
+    def test_intervals_can_be_given_as_arrays(self):
+        subject = self.make_instance()
+        array_subject = track_res.TrackingBenchmarkResult(
+            benchmark_id=subject.benchmark,
+            trial_result_id=subject.trial_result,
+            lost_intervals=None,
+            start_times=[interval.start_time for interval in subject.lost_intervals],
+            end_times=[interval.end_time for interval in subject.lost_intervals],
+            distances=[interval.distance for interval in subject.lost_intervals],
+            frames=[interval.frames for interval in subject.lost_intervals],
+            total_distance=10000, total_time=10, total_frames=10000, settings={})
+        self.assertEqual(subject.times_lost, array_subject.times_lost)
+        self.assertEqual(subject.mean_distance, array_subject.mean_distance)
+        self.assertEqual(subject.median_time, array_subject.median_time)
+        self.assertEqual(subject.max_frames_lost, array_subject.max_frames_lost)
+        for interval1, interval2 in zip(subject.lost_intervals, array_subject.lost_intervals):
+            self.assertEqual(interval1.start_time, interval2.start_time)
+            self.assertEqual(interval1.end_time, interval2.end_time)
+            self.assertEqual(interval1.distance, interval2.distance)
+            self.assertEqual(interval1.frames, interval2.frames)
+
+    def test_serialize_includes_statistics(self):
+        subject = self.make_instance()
+        s_subject = subject.serialize()
+        self.assertEqual(subject.times_lost, s_subject['statistics']['times_lost'])
+        self.assertEqual(subject.mean_distance, s_subject['statistics']['mean_distance'])
+        self.assertEqual(subject.median_distance, s_subject['statistics']['median_distance'])
+        self.assertEqual(subject.std_distance, s_subject['statistics']['std_distance'])
+        self.assertEqual(subject.min_distance, s_subject['statistics']['min_distance'])
+        self.assertEqual(subject.max_distance, s_subject['statistics']['max_distance'])
+        self.assertEqual(subject.mean_time, s_subject['statistics']['mean_time'])
+        self.assertEqual(subject.median_time, s_subject['statistics']['median_time'])
+        self.assertEqual(subject.std_time, s_subject['statistics']['std_time'])
+        self.assertEqual(subject.min_time, s_subject['statistics']['min_time'])
+        self.assertEqual(subject.max_time, s_subject['statistics']['max_time'])
+        self.assertEqual(subject.mean_frames_lost, s_subject['statistics']['mean_frames_lost'])
+        self.assertEqual(subject.median_frames_lost, s_subject['statistics']['median_frames_lost'])
+        self.assertEqual(subject.std_frames_lost, s_subject['statistics']['std_frames_lost'])
+        self.assertEqual(subject.min_frames_lost, s_subject['statistics']['min_frames_lost'])
+        self.assertEqual(subject.max_frames_lost, s_subject['statistics']['max_frames_lost'])
+        self.assertEqual(subject.total_distance_lost, s_subject['statistics']['total_distance_lost'])
+        self.assertEqual(subject.fraction_distance_lost, s_subject['statistics']['fraction_distance_lost'])
+        self.assertEqual(subject.total_time_lost, s_subject['statistics']['total_time_lost'])
+        self.assertEqual(subject.fraction_time_lost, s_subject['statistics']['fraction_time_lost'])
+        self.assertEqual(subject.total_frames_lost, s_subject['statistics']['total_frames_lost'])
+        self.assertEqual(subject.fraction_frames_lost, s_subject['statistics']['fraction_frames_lost'])
+
+    def test_deserialize_uses_stored_statistics(self):
+        subject = self.make_instance()
+        s_subject = subject.serialize()
+        s_subject['statistics'] = dict(s_subject['statistics'], fraction_time_lost=-1.0)
+        deserialized = self.get_class().deserialize(s_subject, self.create_mock_db_client())
+        self.assertEqual(-1.0, deserialized.fraction_time_lost)
+
+    def test_deserialize_computes_statistics_when_not_stored(self):
+        subject = self.make_instance()
+        s_subject = subject.serialize()
+        del s_subject['statistics']
+        deserialized = self.get_class().deserialize(s_subject, self.create_mock_db_client())
+        self.assertEqual(subject.statistics, deserialized.statistics)
+
+    def test_deserialize_loads_intervals_stored_from_the_benchmark_module(self):
+        # LostInterval used to be defined in tracking_benchmark, so older results refer to it there
+        subject = self.make_instance()
+        s_subject = subject.serialize()
+        s_subject['intervals'] = pickle.dumps(subject.lost_intervals, protocol=2).replace(
+            b'benchmarks.tracking.tracking_result\nLostInterval',
+            b'benchmarks.tracking.tracking_benchmark\nLostInterval')
+        deserialized = self.get_class().deserialize(s_subject, self.create_mock_db_client())
+        self.assertEqual(subject.times_lost, deserialized.times_lost)
+        self.assertEqual(subject.lost_intervals[0].distance, deserialized.lost_intervals[0].distance)
+
+    def test_statistics_handle_never_lost(self):
+        subject = self.make_instance(lost_intervals=[])
+        self.assertEqual(0, subject.times_lost)
+        self.assertIsNone(subject.mean_distance)
+        self.assertIsNone(subject.max_time)
+        self.assertEqual(0, subject.total_frames_lost)
+        self.assertEqual(0, subject.fraction_frames_lost)
@@ -1,41 +1,12 @@
 import numpy as np
 import core.benchmark
+import core.trajectory_cache
 import trials.slam.tracking_state
 import benchmarks.tracking.tracking_result
 
 
-class LostInterval:
-    """
-    An interval during which the system was lost.
-    This is basically just a struct storing information about the interval
-    """
-    __slots__ = ['_start_time', '_end_time', '_distance', '_num_frames']
-
-    def __init__(self, start_time, end_time, distance, num_frames):
-        self._start_time = start_time
-        self._end_time = end_time
-        self._distance = distance
-        self._num_frames = num_frames
-
-    @property
-    def start_time(self):
-        return self._start_time
-
-    @property
-    def end_time(self):
-        return self._end_time
-
-    @property
-    def duration(self):
-        return self.end_time - self.start_time
-
-    @property
-    def distance(self):
-        return self._distance
-
-    @property
-    def frames(self):
-        return self._num_frames
+# LostInterval lives with the result that stores it, this name is kept so that stored results still unpickle
+LostInterval = benchmarks.tracking.tracking_result.LostInterval
 
 
 class TrackingBenchmark(core.benchmark.Benchmark):
@@ -93,59 +64,49 @@ class TrackingBenchmark(core.benchmark.Benchmark):
         :return:
         :rtype BenchmarkResult:
         """
-        ground_truth_traj = trial_result.get_ground_truth_camera_poses()
-        states = trial_result.get_tracking_states()
-
-        timestamps = list(ground_truth_traj.keys())
-        timestamps.sort()
-
-        currently_lost = False
-        lost_start = 0
-        lost_distance = 0
-        prev_location = None
-        total_distance = 0
-        num_frames = 0
-        lost_intervals = []
-
-        for timestamp in timestamps:
-            pose = ground_truth_traj[timestamp]
-            distance = 0
-            if prev_location is not None:
-                distance = pose.location - prev_location
-                distance = np.sqrt(np.dot(distance, distance))
-                prev_location = pose.location
-                total_distance += distance
-
-            if self.is_lost(states[timestamp]):
-                if currently_lost:
-                    if distance is not None:
-                        lost_distance += distance
-                    prev_location = pose.location
-                    num_frames += 1
-                else:
-                    currently_lost = True
-                    lost_start = timestamp
-                    lost_distance = 0
-                    num_frames = 1
-                    prev_location = pose.location
-            elif currently_lost:
-                currently_lost = False
-                lost_distance += distance
-                lost_intervals.append(LostInterval(start_time=lost_start,
-                                                   end_time=timestamp,
-                                                   distance=lost_distance,
-                                                   num_frames=num_frames))
-        # We're still lost at the end, add the final distance
-        if currently_lost:
-            lost_intervals.append(LostInterval(start_time=lost_start,
-                                               end_time=timestamps[-1],
-                                               distance=lost_distance,
-                                               num_frames=num_frames))
-
-        return benchmarks.tracking.tracking_result.TrackingBenchmarkResult(benchmark_id=self.identifier,
-                                                                           trial_result_id=trial_result.identifier,
-                                                                           lost_intervals=lost_intervals,
-                                                                           total_distance=total_distance,
-                                                                           total_time=timestamps[-1],
-                                                                           total_frames=len(timestamps),
-                                                                           settings=self.get_settings())
+        return self.benchmark_cached_results(core.trajectory_cache.TrajectoryCache(trial_result))
+
+    def benchmark_cached_results(self, trajectory_cache):
+        """
+        Benchmark a trajectory that has already been loaded
+        :param trajectory_cache: A TrajectoryCache wrapping the trial result
+        :return:
+        :rtype BenchmarkResult:
+        """
+        trial_result = trajectory_cache.trial_result
+        states = trajectory_cache.tracking_states
+        timestamps = trajectory_cache.ground_truth_timestamps
+        locations = trajectory_cache.ground_truth_locations
+        lost = np.array([self.is_lost(states[timestamp]) for timestamp in timestamps.tolist()], dtype=bool)
+
+        # The distance travelled up to each frame
+        steps = np.zeros(len(timestamps))
+        steps[1:] = np.linalg.norm(np.diff(locations, axis=0), axis=1)
+        distances = np.cumsum(steps)
+
+        start_frames, end_frames = find_lost_runs(lost)
+        # Each interval ends at the first frame where the system is no longer lost, or the last frame
+        last_frames = np.minimum(end_frames, len(timestamps) - 1)
+
+        return benchmarks.tracking.tracking_result.TrackingBenchmarkResult(
+            benchmark_id=self.identifier,
+            trial_result_id=trial_result.identifier,
+            lost_intervals=None,
+            start_times=timestamps[start_frames],
+            end_times=timestamps[last_frames],
+            distances=distances[last_frames] - distances[start_frames],
+            frames=end_frames - start_frames,
+            total_distance=float(distances[-1]) if len(distances) > 0 else 0,
+            total_time=float(timestamps[-1]),
+            total_frames=len(timestamps),
+            settings=self.get_settings())
+
+
+def find_lost_runs(lost):
+    """
+    Find the runs of consecutive lost frames, by run-length encoding the lost flags.
+    :param lost: A boolean array, true for each frame where the system is lost
+    :return: Two arrays, the index of the first frame of each run, and the index after the last frame of each run
+    """
+    changes = np.diff(np.concatenate(([0], np.asarray(lost, dtype=np.int8), [0])))
+    return np.nonzero(changes > 0)[0], np.nonzero(changes < 0)[0]
@@ -2,6 +2,41 @@ import numpy as np
 import pickle
 import bson
 import core.benchmark
+import util.summary_statistics as stats
+
+
+class LostInterval:
+    """
+    An interval during which the system was lost.
+    This is basically just a struct storing information about the interval
+    """
+    __slots__ = ['_start_time', '_end_time', '_distance', '_num_frames']
+
+    def __init__(self, start_time, end_time, distance, num_frames):
+        self._start_time = start_time
+        self._end_time = end_time
+        self._distance = distance
+        self._num_frames = num_frames
+
+    @property
+    def start_time(self):
+        return self._start_time
+
+    @property
+    def end_time(self):
+        return self._end_time
+
+    @property
+    def duration(self):
+        return self.end_time - self.start_time
+
+    @property
+    def distance(self):
+        return self._distance
+
+    @property
+    def frames(self):
+        return self._num_frames
 
 
 class TrackingBenchmarkResult(core.benchmark.BenchmarkResult):
@@ -13,123 +48,187 @@ class TrackingBenchmarkResult(core.benchmark.BenchmarkResult):
     """
 
     def __init__(self, benchmark_id, trial_result_id, lost_intervals, total_distance, total_time, total_frames,
-                 settings, id_=None, **kwargs):
+                 settings, start_times=None, end_times=None, distances=None, frames=None, statistics=None,
+                 id_=None, **kwargs):
+        """
+        Create the result. The lost intervals can either be given as a list of LostInterval objects,
+        or as arrays of their properties, in which case lost_intervals should be None.
+        :param benchmark_id: The id of the benchmark that produced this result
+        :param trial_result_id: The id of the trial result this is measuring
+        :param lost_intervals: A list of LostInterval objects, or None if the arrays are given
+        :param total_distance: The total distance travelled over the trajectory
+        :param total_time: The total time of the trajectory
+        :param total_frames: The total number of frames in the trajectory
+        :param settings: The settings of the benchmark
+        :param start_times: The start time of each lost interval
+        :param end_times: The end time of each lost interval
+        :param distances: The distance travelled during each lost interval
+        :param frames: The number of frames in each lost interval
+        :param statistics: The summary statistics of the lost intervals, if previously computed. Computed if None.
+        :param id_: The id of the result, if it exists
+        """
         kwargs['success'] = True
         super().__init__(benchmark_id=benchmark_id, trial_result_id=trial_result_id, id_=id_, **kwargs)
-        self._lost_intervals = lost_intervals
+        self._lost_intervals = None
+        if lost_intervals is not None:
+            self._lost_intervals = list(lost_intervals)
+            start_times = [interval.start_time for interval in self._lost_intervals]
+            end_times = [interval.end_time for interval in self._lost_intervals]
+            distances = [interval.distance for interval in self._lost_intervals]
+            frames = [interval.frames for interval in self._lost_intervals]
+        self._start_times = np.array(start_times if start_times is not None else [])
+        self._end_times = np.array(end_times if end_times is not None else [])
+        self._distances = np.array(distances if distances is not None else [])
+        self._frames = np.array(frames if frames is not None else [], dtype=np.int64)
+        self._durations = self._end_times - self._start_times
         self._total_distance = total_distance
         self._total_time = total_time
         self._total_frames = total_frames
         self._settings = settings
+        self._statistics = statistics if statistics is not None else self._compute_statistics()
 
     @property
     def lost_intervals(self):
+        if self._lost_intervals is None:
+            self._lost_intervals = [LostInterval(
+                start_time=start_time, end_time=end_time, distance=distance, num_frames=num_frames)
+                for start_time, end_time, distance, num_frames in zip(
+                    self._start_times.tolist(), self._end_times.tolist(),
+                    self._distances.tolist(), self._frames.tolist())]
         return self._lost_intervals
 
     @property
     def times_lost(self):
-        return len(self._lost_intervals)
+        return len(self._start_times)
+
+    @property
+    def start_times(self):
+        return self._start_times
+
+    @property
+    def end_times(self):
+        return self._end_times
 
     @property
     def distances(self):
-        return np.array([interval.distance for interval in self.lost_intervals])
+        return self._distances
 
     @property
     def mean_distance(self):
-        return np.mean(self.distances)
+        return self._statistics['mean_distance']
 
     @property
     def median_distance(self):
-        return np.median(self.distances)
+        return self._statistics['median_distance']
 
     @property
     def std_distance(self):
-        return np.std(self.distances)
+        return self._statistics['std_distance']
 
     @property
     def min_distance(self):
-        return np.min(self.distances)
+        return self._statistics['min_distance']
 
     @property
     def max_distance(self):
-        return np.max(self.distances)
+        return self._statistics['max_distance']
 
     @property
     def total_distance_lost(self):
-        return np.sum(self.distances)
+        return self._statistics['total_distance_lost']
 
     @property
     def fraction_distance_lost(self):
-        return self.total_distance_lost / self._total_distance
+        return self._statistics['fraction_distance_lost']
 
     @property
     def durations(self):
-        return np.array([interval.duration for interval in self.lost_intervals])
+        return self._durations
 
     @property
     def mean_time(self):
-        return np.mean(self.durations)
+        return self._statistics['mean_time']
 
     @property
     def median_time(self):
-        return np.median(self.durations)
+        return self._statistics['median_time']
 
     @property
     def std_time(self):
-        return np.std(self.durations)
+        return self._statistics['std_time']
 
     @property
     def min_time(self):
-        return np.min(self.durations)
+        return self._statistics['min_time']
 
     @property
     def max_time(self):
-        return np.max(self.durations)
+        return self._statistics['max_time']
 
     @property
     def total_time_lost(self):
-        return np.sum(self.durations)
+        return self._statistics['total_time_lost']
 
     @property
     def fraction_time_lost(self):
-        return self.total_time_lost / self._total_time
+        return self._statistics['fraction_time_lost']
 
     @property
     def frames_lost(self):
-        return np.array([interval.frames for interval in self.lost_intervals])
+        return self._frames
 
     @property
     def mean_frames_lost(self):
-        return np.mean(self.frames_lost)
+        return self._statistics['mean_frames_lost']
 
     @property
     def median_frames_lost(self):
-        return np.median(self.frames_lost)
+        return self._statistics['median_frames_lost']
 
     @property
     def std_frames_lost(self):
-        return np.std(self.frames_lost)
+        return self._statistics['std_frames_lost']
 
     @property
     def min_frames_lost(self):
-        return np.min(self.frames_lost)
+        return self._statistics['min_frames_lost']
 
     @property
     def max_frames_lost(self):
-        return np.max(self.frames_lost)
+        return self._statistics['max_frames_lost']
 
     @property
     def total_frames_lost(self):
-        return np.sum(self.frames_lost)
+        return self._statistics['total_frames_lost']
 
     @property
     def fraction_frames_lost(self):
-        return self.total_frames_lost / self._total_frames
+        return self._statistics['fraction_frames_lost']
 
     @property
     def settings(self):
         return self._settings
 
+    @property
+    def statistics(self):
+        return self._statistics
+
+    def _compute_statistics(self):
+        """
+        Summarise the lost intervals relative to distance, duration and number of frames.
+        Keys are the names of the properties that read them.
+        :return: A dict of statistic names to values
+        """
+        statistics = {'times_lost': len(self._start_times)}
+        for values, name, suffix, total in [(self._distances, 'distance', '_distance', self._total_distance),
+                                            (self._durations, 'time', '_time', self._total_time),
+                                            (self._frames, 'frames', '_frames_lost', self._total_frames)]:
+            statistics.update(stats.summarise(values, suffix=suffix))
+            total_lost = values.sum().item()
+            statistics['total_' + name + '_lost'] = total_lost
+            statistics['fraction_' + name + '_lost'] = float(total_lost / total) if total else None
+        return statistics
+
     def serialize(self):
         output = super().serialize()
         output['intervals'] = bson.Binary(pickle.dumps(self.lost_intervals, protocol=pickle.HIGHEST_PROTOCOL))
@@ -137,6 +236,7 @@ class TrackingBenchmarkResult(core.benchmark.BenchmarkResult):
         output['total_time'] = self._total_time
         output['total_frames'] = self._total_frames
         output['settings'] = self.settings
+        output['statistics'] = self.statistics
         return output
 
     @classmethod
@@ -151,4 +251,6 @@ class TrackingBenchmarkResult(core.benchmark.BenchmarkResult):
             kwargs['total_frames'] = serialized_representation['total_frames']
         if 'settings' in serialized_representation:
             kwargs['settings'] = serialized_representation['settings']
+        if 'statistics' in serialized_representation:
+            kwargs['statistics'] = serialized_representation['statistics']
         return super().deserialize(serialized_representation, db_client, **kwargs)
@@ -0,0 +1,160 @@
+import unittest
+import numpy as np
+import util.transform as tf
+import database.tests.test_entity
+import core.benchmark
+import benchmarks.trajectory_drift.trajectory_drift as drift
+
+
+def create_random_path(random_state, length=300):
+    """
+    Make a wandering path of transforms, so that the distance along the path grows steadily
+    """
+    locations = np.cumsum(random_state.uniform(-2, 2, (length, 3)) + np.array([3, 0, 0]), axis=0)
+    return [tf.Transform(location=location, rotation=random_state.uniform(-1, 1, 4)) for location in locations]
+
+
+def _kitti_sequence_errors(poses_gt, poses_result, segment_lengths, step_size):
+    """
+    A direct port of calcSequenceErrors from the KITTI devkit, as a reference for the expected errors
+    """
+    dist = [0]
+    for i in range(1, len(poses_gt)):
+        dist.append(dist[i - 1] + np.linalg.norm(poses_gt[i - 1][0:3, 3] - poses_gt[i][0:3, 3]))
+    err = []
+    for first_frame in range(0, len(poses_gt), step_size):
+        for seg_len in segment_lengths:
+            last_frame = -1
+            for i in range(first_frame, len(dist)):
+                if dist[i] > dist[first_frame] + seg_len:
+                    last_frame = i
+                    break
+            if last_frame == -1:
+                continue
+            pose_delta_gt = np.dot(np.linalg.inv(poses_gt[first_frame]), poses_gt[last_frame])
+            pose_delta_result = np.dot(np.linalg.inv(poses_result[first_frame]), poses_result[last_frame])
+            pose_error = np.dot(np.linalg.inv(pose_delta_result), pose_delta_gt)
+            d = 0.5 * (np.trace(pose_error[0:3, 0:3]) - 1.0)
+            err.append({
+                'first_frame': first_frame,
+                'r_err': np.arccos(max(min(d, 1.0), -1.0)) / seg_len,
+                't_err': np.linalg.norm(pose_error[0:3, 3]) / seg_len,
+                'len': seg_len,
+                'speed': seg_len / (0.1 * (last_frame - first_frame + 1))
+            })
+    return err
+
+
+class MockTrialResult:
+
+    def __init__(self, gt_trajectory, comp_trajectory):
+        self._gt_traj = gt_trajectory
+        self._comp_traj = comp_trajectory
+
+    @property
+    def identifier(self):
+        return 'ThisIsAMockTrialResult'
+
+    def get_ground_truth_camera_poses(self):
+        return self._gt_traj
+
+    def get_computed_camera_poses(self):
+        return self._comp_traj
+
+
+class TestBenchmarkTrajectoryDrift(database.tests.test_entity.EntityContract, unittest.TestCase):
+
+    def setUp(self):
+        self.random = np.random.RandomState(6733)
+        path = create_random_path(self.random)
+        self.gt_trajectory = {idx * 0.1: pose for idx, pose in enumerate(path)}
+        self.comp_trajectory = {
+            idx * 0.1 + 0.001: tf.Transform(location=pose.location + self.random.uniform(-1, 1, 3),
+                                            rotation=pose.rotation_quat(w_first=True), w_first=True)
+            for idx, pose in enumerate(path)
+        }
+        self.trial_result = MockTrialResult(self.gt_trajectory, self.comp_trajectory)
+
+    def get_class(self):
+        return drift.BenchmarkTrajectoryDrift
+
+    def make_instance(self, *args, **kwargs):
+        return drift.BenchmarkTrajectoryDrift(*args, **kwargs)
+
+    def assert_models_equal(self, benchmark1, benchmark2):
+        """
+        Helper to assert that two benchmarks are equal
+        :param benchmark1: BenchmarkTrajectoryDrift
+        :param benchmark2: BenchmarkTrajectoryDrift
+        :return:
+        """
+        if (not isinstance(benchmark1, drift.BenchmarkTrajectoryDrift) or
+                not isinstance(benchmark2, drift.BenchmarkTrajectoryDrift)):
+            self.fail('object was not a BenchmarkTrajectoryDrift')
+        self.assertEqual(benchmark1.identifier, benchmark2.identifier)
+        self.assertEqual(benchmark1.get_settings()['segment_lengths'], benchmark2.get_settings()['segment_lengths'])
+        self.assertEqual(benchmark1.get_settings()['step_size'], benchmark2.get_settings()['step_size'])
+
+    def test_serialize_and_deserialize_keeps_step_size(self):
+        benchmark = drift.BenchmarkTrajectoryDrift(step_size=3)
+        s_benchmark = benchmark.serialize()
+        self.assertEqual(3, drift.BenchmarkTrajectoryDrift.deserialize(s_benchmark, None).get_settings()['step_size'])
+
+    def test_benchmark_results_returns_a_benchmark_result(self):
+        benchmark = drift.BenchmarkTrajectoryDrift()
+        result = benchmark.benchmark_results(self.trial_result)
+        self.assertIsInstance(result, core.benchmark.BenchmarkResult)
+        self.assertNotIsInstance(result, core.benchmark.FailedBenchmark)
+        self.assertEqual(benchmark.identifier, result.benchmark)
+        self.assertEqual(self.trial_result.identifier, result.trial_result)
+        self.assertGreater(len(result.raw_errors), 0)
+
+    def test_benchmark_results_fails_for_no_matching_timestaps(self):
+        self.trial_result = MockTrialResult(self.gt_trajectory, {stamp + 10000: pose for stamp, pose
+                                                                 in self.comp_trajectory.items()})
+        benchmark = drift.BenchmarkTrajectoryDrift()
+        result = benchmark.benchmark_results(self.trial_result)
+        self.assertIsInstance(result, core.benchmark.FailedBenchmark)
+
+    def test_benchmark_results_estimates_no_error_for_identical_trajectory(self):
+        self.trial_result = MockTrialResult(self.gt_trajectory, self.gt_trajectory)
+        benchmark = drift.BenchmarkTrajectoryDrift()
+        result = benchmark.benchmark_results(self.trial_result)
+        for error in result.translational_error:
+            self.assertAlmostEqual(0, error)
+        for error in result.rotational_error:
+            self.assertAlmostEqual(0, error, places=6)
+
+
+class TestCalcSequenceErrors(unittest.TestCase):
+
+    def setUp(self):
+        self.random = np.random.RandomState(1654)
+        path = create_random_path(self.random)
+        self.poses_gt = [pose.transform_matrix for pose in path]
+        self.poses_result = [tf.Transform(location=pose.location + self.random.uniform(-1, 1, 3),
+                                          rotation=pose.rotation_quat(w_first=True) + self.random.uniform(-0.1, 0.1, 4),
+                                          w_first=True).transform_matrix for pose in path]
+
+    def test_trajectory_distances(self):
+        poses = [tf.Transform(location=(idx * idx, 0, 0)).transform_matrix for idx in range(5)]
+        self.assertTrue(np.all(np.isclose([0, 1, 4, 9, 16], drift.trajectory_distances(poses))))
+
+    def test_last_frame_from_segment_length(self):
+        dist = [0, 1, 4, 9, 16]
+        self.assertEqual(2, drift.last_frame_from_segment_length(dist, 0, 1))
+        self.assertEqual(3, drift.last_frame_from_segment_length(dist, 1, 4))
+        self.assertEqual(-1, drift.last_frame_from_segment_length(dist, 2, 12))
+
+    def test_same_as_kitti_devkit(self):
+        segment_lengths = [100, 200, 300, 400]
+        errors = drift.calc_sequence_errors(self.poses_gt, self.poses_result, segment_lengths, step_size=3)
+        expected = _kitti_sequence_errors(self.poses_gt, self.poses_result, segment_lengths, step_size=3)
+        self.assertGreater(len(expected), 0)
+        self.assertEqual(len(expected), len(errors))
+        for expected_err, err in zip(expected, errors):
+            self.assertEqual(expected_err['first_frame'], err['first_frame'])
+            self.assertEqual(expected_err['len'], err['len'])
+            self.assertAlmostEqual(expected_err['speed'], err['speed'])
+            self.assertAlmostEqual(expected_err['t_err'], err['t_err'])
+            self.assertAlmostEqual(expected_err['r_err'], err['r_err'], places=6)
@@ -0,0 +1,84 @@
+import numpy as np
+import unittest
+import util.dict_utils as du
+import database.tests.test_entity as entity_test
+import benchmarks.trajectory_drift.trajectory_drift_result as drift_res
+
+
+class TestTrajectoryDriftBenchmarkResult(entity_test.EntityContract, unittest.TestCase):
+
+    def get_class(self):
+        return drift_res.TrajectoryDriftBenchmarkResult
+
+    def make_instance(self, *args, **kwargs):
+        kwargs = du.defaults(kwargs, {
+            'benchmark_id': np.random.randint(0, 10),
+            'trial_result_id': np.random.randint(10, 20),
+            'errors': [{
+                'first_frame': idx,
+                'r_err': np.random.uniform(0, 0.1),
+                't_err': np.random.uniform(0, 0.5),
+                'len': 100.0,
+                'speed': np.random.uniform(0, 10)
+            } for idx in range(100)],
+            'settings': {}
+        })
+        return drift_res.TrajectoryDriftBenchmarkResult(*args, **kwargs)
+
+    def assert_models_equal(self, benchmark_result1, benchmark_result2):
+        """
+        Helper to assert that two benchmark results are equal
+        :param benchmark_result1: TrajectoryDriftBenchmarkResult
+        :param benchmark_result2: TrajectoryDriftBenchmarkResult
+        :return:
+        """
+        if (not isinstance(benchmark_result1, drift_res.TrajectoryDriftBenchmarkResult) or
+                not isinstance(benchmark_result2, drift_res.TrajectoryDriftBenchmarkResult)):
+            self.fail('object was not a TrajectoryDriftBenchmarkResult')
+        self.assertEqual(benchmark_result1.identifier, benchmark_result2.identifier)
+        self.assertEqual(benchmark_result1.success, benchmark_result2.success)
+        self.assertEqual(benchmark_result1.benchmark, benchmark_result2.benchmark)
+        self.assertEqual(benchmark_result1.trial_result, benchmark_result2.trial_result)
+        self.assertEqual(benchmark_result1.raw_errors, benchmark_result2.raw_errors)
+        self.assertEqual(benchmark_result1.settings, benchmark_result2.settings)
+        self.assertEqual(benchmark_result1.statistics, benchmark_result2.statistics)
+
+    def test_trans_statistics_are_correct(self):
+        subject = self.make_instance()
+        trans_error = np.array([err['t_err'] for err in subject.raw_errors])
+        self.assertAlmostEqual(np.sqrt(np.mean(trans_error * trans_error)), subject.trans_rmse)
+        self.assertEqual(np.mean(trans_error), subject.trans_mean)
+        self.assertEqual(np.median(trans_error), subject.trans_median)
+        self.assertEqual(np.std(trans_error), subject.trans_std)
+        self.assertEqual(np.min(trans_error), subject.trans_min)
+        self.assertEqual(np.max(trans_error), subject.trans_max)
+
+    def test_rot_statistics_are_correct(self):
+        subject = self.make_instance()
+        rot_error = np.array([err['r_err'] for err in subject.raw_errors])
+        self.assertAlmostEqual(np.sqrt(np.mean(rot_error * rot_error)), subject.rot_rmse)
+        self.assertEqual(np.mean(rot_error), subject.rot_mean)
+        self.assertEqual(np.median(rot_error), subject.rot_median)
+        self.assertEqual(np.std(rot_error), subject.rot_std)
+        self.assertEqual(np.min(rot_error), subject.rot_min)
+        self.assertEqual(np.max(rot_error), subject.rot_max)
+
+    def test_errors_are_arrays(self):
+        subject = self.make_instance()
+        self.assertEqual([err['t_err'] for err in subject.raw_errors], subject.trans_errors.tolist())
+        self.assertEqual([err['r_err'] for err in subject.raw_errors], subject.rot_errors.tolist())
+
+    def test_serialize_includes_statistics(self):
+        subject = self.make_instance()
+        s_subject = subject.serialize()
+        self.assertEqual(subject.trans_rmse, s_subject['statistics']['trans_rmse'])
+        self.assertEqual(subject.trans_median, s_subject['statistics']['trans_median'])
+        self.assertEqual(subject.rot_rmse, s_subject['statistics']['rot_rmse'])
+        self.assertEqual(subject.rot_median, s_subject['statistics']['rot_median'])
+
+    def test_deserialize_computes_statistics_when_not_stored(self):
+        subject = self.make_instance()
+        s_subject = subject.serialize()
+        del s_subject['statistics']
+        deserialized = self.get_class().deserialize(s_subject, self.create_mock_db_client())
+        self.assertEqual(subject.statistics, deserialized.statistics)
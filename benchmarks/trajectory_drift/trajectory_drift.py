@@ -1,6 +1,7 @@
 import numpy as np
 import core.benchmark
-import util.associate
+import core.trajectory_cache
+import util.transform as tf
 import benchmarks.trajectory_drift.trajectory_drift_result as drif_result
 
 
@@ -34,12 +35,15 @@ class BenchmarkTrajectoryDrift(core.benchmark.Benchmark):
     def serialize(self):
         output = super().serialize()
         output['segment_lengths'] = self._segment_lengths
+        output['step_size'] = self._step_size
         return output
 
     @classmethod
     def deserialize(cls, serialized_representation, db_client, **kwargs):
         if 'segment_lengths' in serialized_representation:
             kwargs['segment_lengths'] = serialized_representation['segment_lengths']
+        if 'step_size' in serialized_representation:
+            kwargs['step_size'] = serialized_representation['step_size']
         return super().deserialize(serialized_representation, db_client, **kwargs)
 
     @classmethod
@@ -58,23 +62,28 @@ class BenchmarkTrajectoryDrift(core.benchmark.Benchmark):
         :return:
         :rtype BenchmarkResult:
         """
-        ground_truth_traj = trial_result.get_ground_truth_camera_poses()
-        result_traj = trial_result.get_computed_camera_poses()
-
-        ground_truth_traj = {stamp: pose.transform_matrix for stamp, pose in ground_truth_traj.items()}
-        result_traj = {stamp: pose.transform_matrix for stamp, pose in result_traj.items()}
+        return self.benchmark_cached_results(core.trajectory_cache.TrajectoryCache(trial_result))
 
+    def benchmark_cached_results(self, trajectory_cache):
+        """
+        Benchmark a trial result using trajectories that have already been loaded.
+        :param trajectory_cache: A TrajectoryCache wrapping the trial result
+        :return:
+        :rtype BenchmarkResult:
+        """
+        trial_result = trajectory_cache.trial_result
         # TODO: Configure association?
-        matches = util.associate.associate(ground_truth_traj, result_traj, offset=0, max_difference=1)
-        if matches is None or len(matches) < 2:
+        gt_indexes, result_indexes = trajectory_cache.associate(offset=0, max_difference=1)
+        if len(gt_indexes) < 2:
             return core.benchmark.FailedBenchmark(benchmark_id=self.identifier,
                                                   trial_result_id=trial_result.identifier,
                                                   reason="Couldn't find matching timestamp pairs between"
                                                          "groundtruth and estimated trajectory!")
 
-        gt_poses = [ground_truth_traj[match[0]].transform_matrix for match in matches]
-        result_poses = [result_traj[match[1]].transform_matrix for match in matches]
-        errors = calc_sequence_errors(gt_poses, result_poses, segment_lengths=self._segment_lengths, step_size=10)
+        gt_poses = trajectory_cache.ground_truth_matrices[gt_indexes]
+        result_poses = trajectory_cache.computed_matrices[result_indexes]
+        errors = calc_sequence_errors(gt_poses, result_poses, segment_lengths=self._segment_lengths,
+                                      step_size=self._step_size)
 
         return drif_result.TrajectoryDriftBenchmarkResult(benchmark_id=self.identifier,
                                                           trial_result_id=trial_result.identifier,
@@ -85,68 +94,63 @@ def calc_sequence_errors(poses_gt, poses_result, segment_lengths, step_size=10):
     """
     Find the error in a list of computed poses, over different segment lengths
     Based on "calcSequenceErrors" in "evaluate_odometry.cpp" ln 81
-    :param poses_gt: The list of ground truth poses, in order. Must be a list and not frames
-    :param poses_result: The list of computed poses, in order. Must be a list of the same length as poses_gt
+    All the segments are found and evaluated at once, rather than one start frame at a time.
+    :param poses_gt: The ground truth poses as 4x4 matrices, in order. Either a list or an Nx4x4 array
+    :param poses_result: The computed poses as 4x4 matrices, in order. Must be the same length as poses_gt
     :param segment_lengths: The list of segment lengths to test
     :param step_size: The step size between start frames when choosing segments. Default 10.
     :return: A list of dictionaries containing the computed rotational and translational errors
     """
-    err = []    # error vector
-    dist = trajectory_distances(poses_gt)    # pre - compute distances from ground truth as reference)
-
-    # for all start positions do
-    for first_frame in range(0, len(poses_gt), step_size):
-        # for all segment lengths do
-        for i in range(0, len(segment_lengths)):
-            # current length
-            seg_len = segment_lengths[i]
-
-            # compute last frame
-            last_frame = last_frame_from_segment_length(dist, first_frame, seg_len)
-
-            # continue, if sequence not long enough
-            if last_frame <= -1:
-                    continue
-
-            # compute rotational and translational errors
-            pose_delta_gt = np.linalg.inv(poses_gt[first_frame]) * poses_gt[last_frame]
-            pose_delta_result = np.linalg.inv(poses_result[first_frame]) * poses_result[last_frame]
-            pose_error = np.linalg.inv(pose_delta_result) * pose_delta_gt
-            r_err = rotation_error(pose_error)
-            t_err = translation_error(pose_error)
-
-            # compute speed
-            num_frames = last_frame - first_frame + 1
-            speed = seg_len / (0.1 * num_frames)
-
-            # write to file
-            err.append({
-                'first_frame': first_frame,
-                'r_err': r_err / seg_len,
-                't_err': t_err / seg_len,
-                'len': seg_len,
-                'speed': speed
-            })
-
-    # return error vector
-    return err
+    poses_gt = np.asarray(poses_gt, dtype=np.float64)
+    poses_result = np.asarray(poses_result, dtype=np.float64)
+    dist = trajectory_distances(poses_gt)    # pre - compute distances from ground truth as reference
+
+    # Every combination of start frame and segment length, ordered by start frame
+    first_frames, seg_lens = np.meshgrid(np.arange(0, len(poses_gt), step_size),
+                                         np.asarray(segment_lengths), indexing='ij')
+    first_frames = first_frames.ravel()
+    seg_lens = seg_lens.ravel()
+
+    # compute last frames, skipping segments where the sequence is not long enough
+    last_frames = last_frames_from_segment_lengths(dist, first_frames, seg_lens)
+    valid = last_frames > -1
+    first_frames = first_frames[valid]
+    last_frames = last_frames[valid]
+    seg_lens = seg_lens[valid]
+
+    # compute rotational and translational errors
+    pose_delta_gt = np.matmul(tf.invert_transform_matrices(poses_gt[first_frames]), poses_gt[last_frames])
+    pose_delta_result = np.matmul(tf.invert_transform_matrices(poses_result[first_frames]),
+                                  poses_result[last_frames])
+    pose_error = np.matmul(tf.invert_transform_matrices(pose_delta_result), pose_delta_gt)
+    r_err = rotation_error(pose_error)
+    t_err = translation_error(pose_error)
+
+    # compute speed
+    num_frames = last_frames - first_frames + 1
+    speed = seg_lens / (0.1 * num_frames)
+
+    return [{
+        'first_frame': first_frame,
+        'r_err': r,
+        't_err': t,
+        'len': seg_len,
+        'speed': v
+    } for first_frame, r, t, seg_len, v in zip(first_frames.tolist(), (r_err / seg_lens).tolist(),
+                                               (t_err / seg_lens).tolist(), seg_lens.tolist(), speed.tolist())]
 
 
 def trajectory_distances(poses):
     """
     Compute the distance along the trajectory for each recorded pose.
     Based on "trajectoryDistances" in "evaluate_odometry.cpp" ln 45
-    :param poses: A list of poses in the order they occurred
-    :return: A list of the total trajectory length for each pose in the provided length
+    :param poses: The poses as 4x4 matrices in the order they occurred, either a list or an Nx4x4 array
+    :return: An array of the total trajectory length for each pose in the provided length
     """
-    dist = [0]
-    for i in range(1, len(poses)):
-        p1 = poses[i-1]
-        p2 = poses[i]
-        dx = p1.val[0][3]-p2.val[0][3]
-        dy = p1.val[1][3]-p2.val[1][3]
-        dz = p1.val[2][3]-p2.val[2][3]
-        dist.append(dist[i-1] + np.sqrt(dx * dx + dy * dy + dz * dz))
+    poses = np.asarray(poses, dtype=np.float64)
+    dist = np.zeros(len(poses))
+    if len(poses) > 1:
+        dist[1:] = np.cumsum(np.linalg.norm(np.diff(poses[:, 0:3, 3], axis=0), axis=1))
     return dist
 
 
@@ -160,34 +164,49 @@ def last_frame_from_segment_length(dist, first_frame, seg_len):
     :param seg_len:
     :return: The index of the last frame, or -1 if there is not enough distance left in teh trajectory.
     """
-    for i in range(first_frame, len(dist)):
-        if dist[i] > dist[first_frame] + seg_len:
-            return i
-    return -1
+    return int(last_frames_from_segment_lengths(dist, np.array([first_frame]), np.array([seg_len]))[0])
+
+
+def last_frames_from_segment_lengths(dist, first_frames, seg_lens):
+    """
+    Find the last frame for many segments at once, see last_frame_from_segment_length.
+    Since the distance along the trajectory never decreases, this is a binary search.
+    :param dist: An array of distances through the trajectory at each frame. See "trajectory_distances", above.
+    :param first_frames: An array of the first frame of each segment
+    :param seg_lens: An array of the length of each segment
+    :return: An array of the last frame of each segment, -1 where there is not enough distance left.
+    """
+    dist = np.asarray(dist)
+    last_frames = np.searchsorted(dist, dist[first_frames] + seg_lens, side='right')
+    last_frames = np.maximum(last_frames, first_frames)
+    last_frames[last_frames >= len(dist)] = -1
+    return last_frames
 
 
 def rotation_error(pose_error):
     """
-    Compute the rotation error for a given error matrix.
+    Compute the rotation error for a given error matrix, or a stack of error matrices.
     Based on "rotationError" in "evaluate_odometry.cpp" ln 66
     :param pose_error:
-    :return: floating point rotation error for this pose error matrix
+    :return: floating point rotation error for this pose error matrix, or an array for a stack of matrices
     """
-    a = pose_error[0][0]
-    b = pose_error[1][1]
-    c = pose_error[2][2]
+    pose_error = np.asarray(pose_error)
+    a = pose_error[..., 0, 0]
+    b = pose_error[..., 1, 1]
+    c = pose_error[..., 2, 2]
     d = 0.5 * (a + b + c - 1.0)
-    return np.arccos(max(min(d, 1.0), -1.0))
+    return np.arccos(np.clip(d, -1.0, 1.0))
 
 
 def translation_error(pose_error):
     """
-    Compute the translation error for a given error matrix
+    Compute the translation error for a given error matrix, or a stack of error matrices
     Based on "translationError" in "evaluate_odometry.cpp" ln 74
     :param pose_error:
     :return:
     """
-    dx = pose_error[0][3]
-    dy = pose_error[1][3]
-    dz = pose_error[2][3]
+    pose_error = np.asarray(pose_error)
+    dx = pose_error[..., 0, 3]
+    dy = pose_error[..., 1, 3]
+    dz = pose_error[..., 2, 3]
     return np.sqrt(dx * dx + dy * dy + dz * dz)
@@ -1,5 +1,6 @@
 import numpy as np
 import core.benchmark
+import util.summary_statistics as stats
 
 
 class TrajectoryDriftBenchmarkResult(core.benchmark.BenchmarkResult):
@@ -7,83 +8,98 @@ class TrajectoryDriftBenchmarkResult(core.benchmark.BenchmarkResult):
     Results from measuring the trajectory drift as is done for the KITTI benchmark.
     """
 
-    def __init__(self, benchmark_id, trial_result_id, errors, settings, id_=None, **kwargs):
+    def __init__(self, benchmark_id, trial_result_id, errors, settings, statistics=None, id_=None, **kwargs):
+        """
+        :param benchmark_id: The id of the benchmark that produced this result
+        :param trial_result_id: The id of the trial result measured
+        :param errors: A list of dicts of the error for each sequence, as produced by calc_sequence_errors
+        :param settings: The settings of the benchmark
+        :param statistics: The summary statistics of the errors, if previously computed. Computed if None.
+        :param id_: The id of the result, if it exists
+        """
         kwargs['success'] = True
         super().__init__(benchmark_id=benchmark_id, trial_result_id=trial_result_id, id_=id_, **kwargs)
         self._errors = errors
         self._settings = settings
 
+        self._trans_errors = np.fromiter((err['t_err'] for err in errors), dtype=np.float64, count=len(errors))
+        self._rot_errors = np.fromiter((err['r_err'] for err in errors), dtype=np.float64, count=len(errors))
+        if statistics is None:
+            statistics = stats.summarise(self._trans_errors, prefix='trans_')
+            statistics.update(stats.summarise(self._rot_errors, prefix='rot_'))
+        self._statistics = statistics
+
     @property
     def raw_errors(self):
         return self._errors
 
+    @property
+    def statistics(self):
+        return self._statistics
+
+    @property
+    def trans_errors(self):
+        return self._trans_errors
+
     @property
     def trans_rmse(self):
-        trans_error = np.array(list(self.translational_error))
-        return np.sqrt(np.dot(trans_error, trans_error) / len(trans_error))
+        return self._statistics['trans_rmse']
 
     @property
     def trans_mean(self):
-        trans_error = np.array(list(self.translational_error))
-        return np.mean(trans_error)
+        return self._statistics['trans_mean']
 
     @property
     def trans_median(self):
-        trans_error = np.array(list(self.translational_error))
-        return np.median(trans_error)
+        return self._statistics['trans_median']
 
     @property
     def trans_std(self):
-        trans_error = np.array(list(self.translational_error))
-        return np.std(trans_error)
+        return self._statistics['trans_std']
 
     @property
     def trans_min(self):
-        trans_error = np.array(list(self.translational_error))
-        return np.min(trans_error)
+        return self._statistics['trans_min']
 
     @property
     def trans_max(self):
-        trans_error = np.array(list(self.translational_error))
-        return np.max(trans_error)
+        return self._statistics['trans_max']
 
     @property
     def translational_error(self):
-        return [err['t_err'] for err in self.raw_errors]
+        return self._trans_errors.tolist()
+
+    @property
+    def rot_errors(self):
+        return self._rot_errors
 
     @property
     def rot_rmse(self):
-        rot_error = np.array(list(self.rotational_error))
-        return np.sqrt(np.dot(rot_error, rot_error)) / len(rot_error)
+        return self._statistics['rot_rmse']
 
     @property
     def rot_mean(self):
-        rot_error = np.array(list(self.rotational_error))
-        return np.mean(rot_error)
+        return self._statistics['rot_mean']
 
     @property
     def rot_median(self):
-        rot_error = np.array(list(self.rotational_error))
-        return np.median(rot_error)
+        return self._statistics['rot_median']
 
     @property
     def rot_std(self):
-        rot_error = np.array(list(self.rotational_error))
-        return np.std(rot_error)
+        return self._statistics['rot_std']
 
     @property
     def rot_min(self):
-        rot_error = np.array(list(self.rotational_error))
-        return np.min(rot_error)
+        return self._statistics['rot_min']
 
     @property
     def rot_max(self):
-        rot_error = np.array(list(self.rotational_error))
-        return np.max(rot_error)
+        return self._statistics['rot_max']
 
     @property
     def rotational_error(self):
-        return [err['r_err'] for err in self.raw_errors]
+        return self._rot_errors.tolist()
 
     @property
     def settings(self):
@@ -93,6 +109,7 @@ class TrajectoryDriftBenchmarkResult(core.benchmark.BenchmarkResult):
         output = super().serialize()
         output['errors'] = self.raw_errors
         output['settings'] = self.settings
+        output['statistics'] = self.statistics
         return output
 
     @classmethod
@@ -101,4 +118,6 @@ class TrajectoryDriftBenchmarkResult(core.benchmark.BenchmarkResult):
             kwargs['errors'] = serialized_representation['errors']
         if 'settings' in serialized_representation:
             kwargs['settings'] = serialized_representation['settings']
+        if 'statistics' in serialized_representation:
+            kwargs['statistics'] = serialized_representation['statistics']
         return super().deserialize(serialized_representation, db_client, **kwargs)
@@ -1,5 +1,6 @@
 import abc
 import database.entity
+import core.trajectory_cache
 
 
 class Benchmark(database.entity.Entity, metaclass=abc.ABCMeta):
@@ -42,6 +43,32 @@ class Benchmark(database.entity.Entity, metaclass=abc.ABCMeta):
         """
         pass
 
+    def benchmark_cached_results(self, trajectory_cache):
+        """
+        Benchmark the result of a particular trial, using trajectories that have already been loaded,
+        and which may be shared with other benchmarks measuring the same trial.
+        By default, this benchmarks the trial result directly,
+        benchmarks that measure the trajectories should override it to use the cache.
+
+        :param trajectory_cache: A TrajectoryCache wrapping the trial result
+        :return: A BenchmarkResult object containing either the results, or a FailedBenchmark explaining the error
+        :rtype: BenchmarkResult
+        """
+        return self.benchmark_results(trajectory_cache.trial_result)
+
+
+def benchmark_trial(trial_result, benchmarks):
+    """
+    Benchmark a single trial result with several benchmarks, in one pass.
+    The trajectories are loaded, converted, and associated only once, and shared between all the benchmarks.
+
+    :param trial_result: The trial result to measure
+    :param benchmarks: A list of benchmarks, which must all be appropriate for the trial result
+    :return: A list of BenchmarkResults, in the same order as the benchmarks
+    """
+    trajectory_cache = core.trajectory_cache.TrajectoryCache(trial_result)
+    return [benchmark.benchmark_cached_results(trajectory_cache) for benchmark in benchmarks]
+
 
 class BenchmarkResult(database.entity.Entity):
     """
@@ -50,6 +50,19 @@ class BenchmarkComparison(database.entity.Entity, metaclass=abc.ABCMeta):
         """
         pass
 
+    def compare_many_results(self, benchmark_results, reference_benchmark_result):
+        """
+        Compare several benchmark results against the same reference result.
+        By default this just compares each in turn, comparisons that can share work on the reference
+        should override it.
+
+        :param benchmark_results: A list of BenchmarkResults to compare
+        :param reference_benchmark_result: The reference BenchmarkResult
+        :return: A list of comparison results, in the same order as the benchmark results
+        """
+        return [self.compare_results(benchmark_result, reference_benchmark_result)
+                for benchmark_result in benchmark_results]
+
 
 class BenchmarkComparisonResult(database.entity.Entity):
     """
@@ -1,7 +1,11 @@
 import unittest
+import unittest.mock as mock
+import numpy as np
+import util.transform as tf
 import util.dict_utils as du
 import database.tests.test_entity as entity_test
 import core.benchmark
+import core.trajectory_cache
 
 
 class TestBenchmarkResult(entity_test.EntityContract, unittest.TestCase):
@@ -57,3 +61,62 @@ class TestFailedBenchmark(entity_test.EntityContract, unittest.TestCase):
         self.assertEqual(benchmark_result1.reason, benchmark_result2.reason)
         self.assertEqual(benchmark_result1.benchmark, benchmark_result2.benchmark)
         self.assertEqual(benchmark_result1.trial_result, benchmark_result2.trial_result)
+
+
+class TestBenchmarkTrial(unittest.TestCase):
+
+    def setUp(self):
+        random = np.random.RandomState(5522)
+        self.gt_trajectory = {}
+        self.computed_trajectory = {}
+        for idx in range(100):
+            location = random.uniform(-100, 100, 3)
+            rotation = random.uniform(-1, 1, 4)
+            self.gt_trajectory[idx * 0.1] = tf.Transform(location=location, rotation=rotation)
+            self.computed_trajectory[idx * 0.1 + 0.001] = tf.Transform(location=location + random.uniform(-1, 1, 3),
+                                                                       rotation=rotation)
+        self.trial_result = mock.Mock()
+        self.trial_result.identifier = 'ThisIsAMockTrialResult'
+        self.trial_result.get_ground_truth_camera_poses.side_effect = lambda: self.gt_trajectory
+        self.trial_result.get_computed_camera_poses.side_effect = lambda: self.computed_trajectory
+        self.trial_result.get_tracking_states.return_value = {}
+
+    def test_default_benchmark_cached_results_calls_benchmark_results(self):
+        benchmark = mock.create_autospec(core.benchmark.Benchmark)
+        trajectory_cache = core.trajectory_cache.TrajectoryCache(self.trial_result)
+        result = core.benchmark.Benchmark.benchmark_cached_results(benchmark, trajectory_cache)
+        self.assertTrue(benchmark.benchmark_results.called)
+        self.assertEqual(mock.call(self.trial_result), benchmark.benchmark_results.call_args)
+        self.assertEqual(benchmark.benchmark_results.return_value, result)
+
+    def test_shares_cache_between_benchmarks(self):
+        benchmarks = [mock.create_autospec(core.benchmark.Benchmark) for _ in range(3)]
+        results = core.benchmark.benchmark_trial(self.trial_result, benchmarks)
+        self.assertEqual([benchmark.benchmark_cached_results.return_value for benchmark in benchmarks], results)
+        trajectory_cache = benchmarks[0].benchmark_cached_results.call_args[0][0]
+        self.assertIsInstance(trajectory_cache, core.trajectory_cache.TrajectoryCache)
+        self.assertEqual(self.trial_result, trajectory_cache.trial_result)
+        for benchmark in benchmarks:
+            self.assertIs(trajectory_cache, benchmark.benchmark_cached_results.call_args[0][0])
+
+    def test_matches_benchmarking_separately_and_loads_trajectories_once(self):
+        import benchmarks.ate.absolute_trajectory_error as ate
+        import benchmarks.rpe.relative_pose_error as rpe
+        import benchmarks.trajectory_drift.trajectory_drift as drift
+        benchmarks = [
+            ate.BenchmarkATE(),
+            rpe.BenchmarkRPE(seed=1234),
+            drift.BenchmarkTrajectoryDrift(segment_lengths=[1, 2, 5], step_size=5)
+        ]
+        expected = [benchmark.benchmark_results(self.trial_result) for benchmark in benchmarks]
+        self.trial_result.get_ground_truth_camera_poses.reset_mock()
+        self.trial_result.get_computed_camera_poses.reset_mock()
+
+        results = core.benchmark.benchmark_trial(self.trial_result, benchmarks)
+        self.assertEqual(1, self.trial_result.get_ground_truth_camera_poses.call_count)
+        self.assertEqual(1, self.trial_result.get_computed_camera_poses.call_count)
+        self.assertEqual(len(expected), len(results))
+        for expected_result, result in zip(expected, results):
+            self.assertEqual(type(expected_result), type(result))
+            self.assertNotIsInstance(result, core.benchmark.FailedBenchmark)
+            self.assertEqual(expected_result.statistics, result.statistics)
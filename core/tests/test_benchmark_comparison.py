@@ -1,4 +1,5 @@
 import unittest
+import unittest.mock as mock
 import util.dict_utils as du
 import database.tests.test_entity as entity_test
 import core.benchmark_comparison
@@ -33,3 +34,15 @@ class TestBenchmarkComparisonResult(entity_test.EntityContract, unittest.TestCas
         self.assertEqual(benchmark_result1.comparison_id, benchmark_result2.comparison_id)
         self.assertEqual(benchmark_result1.benchmark_result, benchmark_result2.benchmark_result)
         self.assertEqual(benchmark_result1.reference_benchmark_result, benchmark_result2.reference_benchmark_result)
+
+
+class TestBenchmarkComparison(unittest.TestCase):
+
+    def test_compare_many_results_compares_each_result(self):
+        subject = mock.create_autospec(core.benchmark_comparison.BenchmarkComparison)
+        subject.compare_results.side_effect = lambda result, reference: (result, reference)
+        results = [mock.Mock() for _ in range(4)]
+        reference = mock.Mock()
+        comparisons = core.benchmark_comparison.BenchmarkComparison.compare_many_results(subject, results, reference)
+        self.assertEqual([(result, reference) for result in results], comparisons)
+
@@ -0,0 +1,85 @@
+import unittest
+import unittest.mock as mock
+import numpy as np
+import util.transform as tf
+import util.associate as ass
+import trials.slam.tracking_state
+import core.trajectory_cache
+
+
+def create_trajectory(random_state, length=50):
+    return {random_state.uniform(0, 100): tf.Transform(location=random_state.uniform(-100, 100, 3),
+                                                       rotation=random_state.uniform(-1, 1, 4))
+            for _ in range(length)}
+
+
+class TestTrajectoryCache(unittest.TestCase):
+
+    def setUp(self):
+        self.random = np.random.RandomState(2874)
+        self.gt_trajectory = create_trajectory(self.random)
+        self.computed_trajectory = create_trajectory(self.random)
+        self.trial_result = mock.Mock()
+        self.trial_result.get_ground_truth_camera_poses.return_value = self.gt_trajectory
+        self.trial_result.get_computed_camera_poses.return_value = self.computed_trajectory
+        self.trial_result.get_tracking_states.return_value = {
+            stamp: trials.slam.tracking_state.TrackingState.OK for stamp in self.gt_trajectory.keys()}
+
+    def test_loads_nothing_until_needed(self):
+        core.trajectory_cache.TrajectoryCache(self.trial_result)
+        self.assertFalse(self.trial_result.get_ground_truth_camera_poses.called)
+        self.assertFalse(self.trial_result.get_computed_camera_poses.called)
+        self.assertFalse(self.trial_result.get_tracking_states.called)
+
+    def test_loads_each_trajectory_once(self):
+        subject = core.trajectory_cache.TrajectoryCache(self.trial_result)
+        for _ in range(3):
+            _ = subject.ground_truth_timestamps
+            _ = subject.ground_truth_matrices
+            _ = subject.computed_locations
+            _ = subject.tracking_states
+            subject.associate(0, 1)
+        self.assertEqual(1, self.trial_result.get_ground_truth_camera_poses.call_count)
+        self.assertEqual(1, self.trial_result.get_computed_camera_poses.call_count)
+        self.assertEqual(1, self.trial_result.get_tracking_states.call_count)
+
+    def test_trajectories_are_sorted_by_timestamp(self):
+        subject = core.trajectory_cache.TrajectoryCache(self.trial_result)
+        gt_stamps = sorted(self.gt_trajectory.keys())
+        self.assertEqual(gt_stamps, subject.ground_truth_timestamps.tolist())
+        for idx, stamp in enumerate(gt_stamps):
+            self.assertTrue(np.array_equal(self.gt_trajectory[stamp].location, subject.ground_truth_locations[idx]))
+            self.assertTrue(np.allclose(self.gt_trajectory[stamp].transform_matrix, subject.ground_truth_matrices[idx]))
+        computed_stamps = sorted(self.computed_trajectory.keys())
+        self.assertEqual(computed_stamps, subject.computed_timestamps.tolist())
+        for idx, stamp in enumerate(computed_stamps):
+            self.assertTrue(np.array_equal(self.computed_trajectory[stamp].location, subject.computed_locations[idx]))
+            self.assertTrue(np.allclose(self.computed_trajectory[stamp].transform_matrix,
+                                        subject.computed_matrices[idx]))
+
+    def test_associate_same_as_associate_indexes(self):
+        subject = core.trajectory_cache.TrajectoryCache(self.trial_result)
+        gt_indexes, computed_indexes = subject.associate(0.5, 2)
+        expected_gt, expected_computed = ass.associate_indexes(sorted(self.gt_trajectory.keys()),
+                                                               sorted(self.computed_trajectory.keys()), 0.5, 2)
+        self.assertEqual(expected_gt.tolist(), gt_indexes.tolist())
+        self.assertEqual(expected_computed.tolist(), computed_indexes.tolist())
+
+    def test_associate_is_cached_by_offset_and_max_difference(self):
+        subject = core.trajectory_cache.TrajectoryCache(self.trial_result)
+        with mock.patch('core.trajectory_cache.ass.associate_indexes',
+                        wraps=ass.associate_indexes) as mock_associate:
+            first = subject.associate(0, 1)
+            self.assertIs(first, subject.associate(0, 1))
+            self.assertEqual(1, mock_associate.call_count)
+            subject.associate(0, 0.02)
+            subject.associate(1, 1)
+            self.assertEqual(3, mock_associate.call_count)
+
+    def test_handles_missing_trajectory(self):
+        self.trial_result.get_computed_camera_poses.return_value = None
+        subject = core.trajectory_cache.TrajectoryCache(self.trial_result)
+        self.assertEqual(0, len(subject.computed_timestamps))
+        self.assertEqual((0, 4, 4), subject.computed_matrices.shape)
+        gt_indexes, computed_indexes = subject.associate(0, 1)
+        self.assertEqual(0, len(gt_indexes))
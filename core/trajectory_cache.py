@@ -0,0 +1,143 @@
+import numpy as np
+import util.transform as tf
+import util.associate as ass
+
+
+class TrajectoryCache:
+    """
+    Trajectories of a single trial result, loaded and converted to arrays only once,
+    so that they can be shared between several benchmarks measuring that trial.
+    Everything is computed lazily, the first time it is asked for, so benchmarks only pay for what they use.
+    Trajectories are ordered by timestamp.
+    """
+
+    def __init__(self, trial_result):
+        """
+        :param trial_result: The trial result to load trajectories from
+        """
+        self._trial_result = trial_result
+        self._ground_truth = None
+        self._computed = None
+        self._tracking_states = None
+        self._associations = {}
+
+    @property
+    def trial_result(self):
+        return self._trial_result
+
+    @property
+    def ground_truth_trajectory(self):
+        """
+        The ground truth trajectory, as returned by the trial result
+        :return: A map of timestamps to Transforms
+        """
+        return self._get_ground_truth()['trajectory']
+
+    @property
+    def ground_truth_timestamps(self):
+        """
+        :return: The ground truth timestamps, sorted, as an array
+        """
+        return self._get_ground_truth()['timestamps']
+
+    @property
+    def ground_truth_locations(self):
+        """
+        :return: The ground truth locations, as an Nx3 array
+        """
+        return self._get_ground_truth()['locations']
+
+    @property
+    def ground_truth_matrices(self):
+        """
+        :return: The ground truth poses as homogeneous transformation matrices, an Nx4x4 array
+        """
+        return self._get_matrices(self._get_ground_truth())
+
+    @property
+    def computed_trajectory(self):
+        """
+        The computed trajectory, as returned by the trial result
+        :return: A map of timestamps to Transforms
+        """
+        return self._get_computed()['trajectory']
+
+    @property
+    def computed_timestamps(self):
+        """
+        :return: The computed timestamps, sorted, as an array
+        """
+        return self._get_computed()['timestamps']
+
+    @property
+    def computed_locations(self):
+        """
+        :return: The computed locations, as an Nx3 array
+        """
+        return self._get_computed()['locations']
+
+    @property
+    def computed_matrices(self):
+        """
+        :return: The computed poses as homogeneous transformation matrices, an Nx4x4 array
+        """
+        return self._get_matrices(self._get_computed())
+
+    @property
+    def tracking_states(self):
+        """
+        :return: The tracking states from the trial result, a map of timestamps to TrackingState
+        """
+        if self._tracking_states is None:
+            self._tracking_states = self._trial_result.get_tracking_states()
+        return self._tracking_states
+
+    def associate(self, offset, max_difference):
+        """
+        Associate the ground truth and computed timestamps, see util.associate.associate_indexes.
+        The association is cached for each combination of offset and max difference.
+        :param offset: Time offset added to the computed timestamps
+        :param max_difference: The maximum difference between matched timestamps
+        :return: Two integer arrays of matched indexes into the ground truth and computed trajectories,
+        ordered by ground truth timestamp.
+        """
+        key = (offset, max_difference)
+        if key not in self._associations:
+            self._associations[key] = ass.associate_indexes(self.ground_truth_timestamps, self.computed_timestamps,
+                                                            offset, max_difference)
+        return self._associations[key]
+
+    def _get_ground_truth(self):
+        if self._ground_truth is None:
+            self._ground_truth = _load_trajectory(self._trial_result.get_ground_truth_camera_poses())
+        return self._ground_truth
+
+    def _get_computed(self):
+        if self._computed is None:
+            self._computed = _load_trajectory(self._trial_result.get_computed_camera_poses())
+        return self._computed
+
+    @staticmethod
+    def _get_matrices(loaded):
+        if loaded['matrices'] is None:
+            loaded['matrices'] = tf.transform_matrices(loaded['locations'], loaded['quaternions'])
+        return loaded['matrices']
+
+
+def _load_trajectory(trajectory):
+    """
+    Convert a trajectory to arrays, in timestamp order
+    :param trajectory: A map of timestamps to Transforms
+    :return: A dict of the trajectory, its timestamps, locations, quaternions and matrices, which are built later
+    """
+    if trajectory is None:
+        trajectory = {}
+    timestamps = sorted(trajectory.keys())
+    locations, quaternions = tf.transforms_to_arrays(trajectory[stamp] for stamp in timestamps)
+    return {
+        'trajectory': trajectory,
+        'timestamps': np.array(timestamps, dtype=np.float64),
+        'locations': locations,
+        'quaternions': quaternions,
+        'matrices': None
+    }
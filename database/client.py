@@ -40,6 +40,7 @@ class DatabaseClient:
                     'results_collection': <collection name for benchmark results>
                     'experiments_collection': <collection name for experiments>
                     'tasks_collection': <collection name for tasks>
+                    'task_stats_collection': <collection name for aggregated task resource usage>
                 }
             }
         }
@@ -67,7 +68,8 @@ class DatabaseClient:
                 'benchmarks_collection': 'benchmarks',
                 'results_collection': 'results',
                 'experiments_collection': 'experiments',
-                'tasks_collection': 'tasks'
+                'tasks_collection': 'tasks',
+                'task_stats_collection': 'task_stats'
             }
         }, modify_base=False)
 
@@ -85,6 +87,7 @@ class DatabaseClient:
         self._results_collection_name = db_config['collections']['results_collection']
         self._experiments_collection_name = db_config['collections']['experiments_collection']
         self._tasks_collection_name = db_config['collections']['tasks_collection']
+        self._task_stats_collection_name = db_config['collections']['task_stats_collection']
 
         self._mongo_client = pymongo.MongoClient(**conn_kwargs)
         self._database = self._mongo_client[db_name]
@@ -130,6 +133,10 @@ class DatabaseClient:
     def tasks_collection(self):
         return self._database[self._tasks_collection_name]
 
+    @property
+    def task_stats_collection(self):
+        return self._database[self._task_stats_collection_name]
+
     @property
     def grid_fs(self):
         return self._gridfs
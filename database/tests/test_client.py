@@ -241,6 +241,25 @@ class TestDatabaseClient(unittest.TestCase):
         self.assertTrue(database_instance.__getitem__.called)
         self.assertIn(mock.call(collection_name), database_instance.__getitem__.call_args_list)
 
+    @mock.patch('database.client.os.makedirs', autospec=os.makedirs)
+    @mock.patch('database.client.gridfs.GridFS', autospec=gridfs.GridFS)
+    @mock.patch('database.client.pymongo.MongoClient', autospec=pymongo.MongoClient)
+    def test_can_configure_task_stats_collection(self, mock_mongoclient, *_):
+        database_instance = mock.create_autospec(pymongo.database.Database)
+        mock_mongoclient.return_value.__getitem__.return_value = database_instance
+
+        collection_name = 'test_collection_name_' + str(random.uniform(-10000, 10000))
+        db_client = database.client.DatabaseClient({
+            'database_config': {
+                'collections': {
+                    'task_stats_collection': collection_name
+                }
+            }
+        })
+        _ = db_client.task_stats_collection     # Collection is retrieved lazily, so we actually have to ask for it
+        self.assertTrue(database_instance.__getitem__.called)
+        self.assertIn(mock.call(collection_name), database_instance.__getitem__.call_args_list)
+
     @mock.patch('database.client.os.makedirs', autospec=os.makedirs)
     @mock.patch('database.client.gridfs.GridFS', autospec=gridfs.GridFS)
     @mock.patch('database.client.pymongo.MongoClient', autospec=pymongo.MongoClient)
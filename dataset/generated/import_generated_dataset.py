@@ -14,6 +14,7 @@ import dataset.generated.metadata_patch as metadata_patch
 import metadata.image_metadata as imeta
 import metadata.camera_intrinsics as intrins
 import util.dict_utils as du
+import util.transform as tf
 import util.unreal_transform as ue_tf
 
 
@@ -62,16 +63,11 @@ def parse_transform(location, rotation):
     :param rotation: dict containing W, Z, Y, and Z
     :return: a Transform object, in a sane coordinate frame and scaled to meters
     """
-    ue_camera_pose = ue_tf.UnrealTransform(location=(location['X'],
-                                                     location['Y'],
-                                                     location['Z']),
-                                           rotation=ue_tf.quat2euler(
-                                               w=rotation['W'],
-                                               x=rotation['X'],
-                                               y=rotation['Y'],
-                                               z=rotation['Z'],
-                                           ))
-    return ue_tf.transform_from_unreal(ue_camera_pose)
+    # Going via the Unreal Euler angles keeps the quaternion sign consistent with other imported poses
+    ue_rotation = ue_tf.quat2euler_array((rotation['W'], rotation['X'], rotation['Y'], rotation['Z']))
+    locations, quaternions = ue_tf.transform_from_unreal_array((location['X'], location['Y'], location['Z']),
+                                                               ue_rotation)
+    return tf.Transform(location=locations[0], rotation=quaternions[0], w_first=True)
 
 
 def sanitize_additional_metadata(metadata):
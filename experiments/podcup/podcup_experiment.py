@@ -11,7 +11,6 @@ import dataset.pod_cup.import_podcup_dataset as pod_dataset
 import training.epoch_trainer
 import systems.deep_learning.keras_frcnn_trainee as train_frcnn
 import benchmarks.bounding_box_overlap.bounding_box_overlap as bench_bbox_overlap
-import benchmarks.bounding_box_overlap.bounding_box_overlap_result as overlap_result
 
 
 class PodCupExperiment(batch_analysis.experiment.Experiment):
@@ -124,18 +123,6 @@ class PodCupExperiment(batch_analysis.experiment.Experiment):
         return benchmarks
 
     def plot_results(self, db_client):
-
-        for result_id in self.results_ids:
-            result = dh.load_object(db_client, db_client.results_collection, result_id)
-            if result is not None:
-                precision, recall, f1score, log_gt_area, iou = result.list_results(
-                    overlap_result.precision,
-                    overlap_result.recall,
-                    overlap_result.f1_score,
-                    lambda x: np.log(x['ground_truth_area']) if x['ground_truth_area'] > 0 else 0,
-                    lambda x: x['overlap'] / (x['bounding_box_area'] + x['ground_truth_area'] - x['overlap'])
-                )
-
         figure = pyplot.figure(figsize=(14, 10), dpi=80)
         ax_pr = figure.add_subplot(111)
         ax_pr.set_xlabel('precision')
@@ -164,32 +151,26 @@ class PodCupExperiment(batch_analysis.experiment.Experiment):
             s_result = db_client.results_collection.find_one({'_id': result_id})
             result = db_client.deserialize_entity(s_result)
             name = self.get_name(result, db_client)
-            precision, recall, f1score, gt_area, iou = result.list_results(
-                overlap_result.precision, overlap_result.recall, overlap_result.f1_score,
-                lambda x: np.log(x['ground_truth_area']) if x['ground_truth_area'] > 0 else 0,
-                lambda x: x['overlap'] / (x['bounding_box_area'] + x['ground_truth_area'] - x['overlap']))
-
-            boxplot_stuff.append(iou)
+            columns = result.columns
+            precision = result.precisions()
+            recall = result.recalls()
+            gt_area = np.zeros(len(columns['ground_truth_area']))
+            has_gt = columns['ground_truth_area'] > 0
+            gt_area[has_gt] = np.log(columns['ground_truth_area'][has_gt])
+
+            boxplot_stuff.append(result.ious())
             boxplot_labels.append(name)
 
-            ax_pr.scatter(precision, recall, label=name)
-            x, y = prune_zero_points(gt_area, precision)
-            ax_p_area.scatter(x, y, label=name)
-            x, y = prune_zero_points(gt_area, recall)
-            ax_r_area.scatter(x, y, label=name)
+            ax_pr.scatter(precision, recall, label='{0} (mAP {1:.3f})'.format(name, result.mean_average_precision()))
+            nonzero = (gt_area != 0) & (precision != 0)
+            ax_p_area.scatter(gt_area[nonzero], precision[nonzero], label=name)
+            nonzero = (gt_area != 0) & (recall != 0)
+            ax_r_area.scatter(gt_area[nonzero], recall[nonzero], label=name)
 
             # Count false positives
             false_labels.append(name)
-            false_positives = 0
-            false_negatives = 0
-            for bbox_results in result.overlaps.values():
-                for bbox_result in bbox_results:
-                    if bbox_result['ground_truth_area'] == 0:
-                        false_positives += 1
-                    if bbox_result['bounding_box_area'] == 0:
-                        false_negatives += 1
-            fp_values.append(false_positives)
-            fn_values.append(false_negatives)
+            fp_values.append(np.count_nonzero(columns['ground_truth_area'] == 0))
+            fn_values.append(np.count_nonzero(columns['bounding_box_area'] == 0))
 
         ax_pr.legend()
         ax_p_area.legend()
@@ -248,12 +229,3 @@ def fix_line_order(x, y):
     points = list(zip(list(x), list(y)))
     points.sort()
     return [point[0] for point in points], [point[1] for point in points]
-
-
-def prune_zero_points(x, y, prune_x=True, prune_y=True, sort=False):
-    points = list(zip(x, y))
-    points = [(x_val, y_val) for x_val, y_val in points
-              if (not prune_x or x_val != 0) and (not prune_y or y_val != 0)]
-    if sort:
-        points.sort()
-    return [point[0] for point in points], [point[1] for point in points]
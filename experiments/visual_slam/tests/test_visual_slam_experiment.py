@@ -6,6 +6,10 @@ import util.dict_utils as du
 import database.client
 import database.tests.test_entity as entity_test
 import batch_analysis.experiment as ex
+import batch_analysis.task
+import batch_analysis.task_manager
+import batch_analysis.tasks.run_system_task as run_system_task
+import batch_analysis.tasks.benchmark_trial_task as benchmark_trial_task
 import experiments.visual_slam.visual_slam_experiment as vse
 
 
@@ -59,3 +63,35 @@ class TestVisualSlamExperiment(entity_test.EntityContract, unittest.TestCase):
 
     def test_constructor_works_with_minimal_arguments(self):
         vse.VisualSlamExperiment()
+
+    def test_schedule_tasks_creates_benchmarks_waiting_on_unfinished_trials(self):
+        system_id = oid.ObjectId()
+        image_source_id = oid.ObjectId()
+        benchmark_ids = [oid.ObjectId(), oid.ObjectId()]
+        run_task = run_system_task.RunSystemTask(system_id, image_source_id, id_=oid.ObjectId())
+        objects = {system_id: mock.Mock(identifier=system_id), image_source_id: mock.Mock(identifier=image_source_id)}
+        objects.update({benchmark_id: mock.Mock(identifier=benchmark_id) for benchmark_id in benchmark_ids})
+
+        mock_task_manager = mock.create_autospec(batch_analysis.task_manager.TaskManager)
+        mock_task_manager.get_run_system_task.return_value = run_task
+        mock_task_manager.get_benchmark_task.side_effect = \
+            lambda trial_result_id, benchmark_id, dependencies=None, **kwargs: benchmark_trial_task.BenchmarkTrialTask(
+                trial_result_id, benchmark_id, dependencies=dependencies,
+                state=batch_analysis.task.JobState.WAITING if dependencies else batch_analysis.task.JobState.UNSTARTED)
+        mock_db_client = mock.create_autospec(database.client.DatabaseClient)
+
+        subject = vse.VisualSlamExperiment(libviso_system=system_id, benchmark_rpe=benchmark_ids[0],
+                                           benchmark_trajectory_drift=benchmark_ids[1],
+                                           real_world_datasets=[image_source_id])
+        with mock.patch('experiments.visual_slam.visual_slam_experiment.dh.load_object', autospec=True,
+                        side_effect=lambda db_client, collection, id_: objects[id_]):
+            subject.schedule_tasks(mock_task_manager, mock_db_client)
+
+        self.assertIn(mock.call(run_task), mock_task_manager.do_task.call_args_list)
+        scheduled_benchmarks = [args[0] for args, _ in mock_task_manager.do_task.call_args_list
+                                if isinstance(args[0], benchmark_trial_task.BenchmarkTrialTask)]
+        self.assertEqual(set(benchmark_ids), {task.benchmark for task in scheduled_benchmarks})
+        for task in scheduled_benchmarks:
+            self.assertTrue(task.is_waiting)
+            self.assertEqual({'trial_result_id': run_task.identifier}, task.dependencies)
+        self.assertTrue(mock_task_manager.save_pending_tasks.called)
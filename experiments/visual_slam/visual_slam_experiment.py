@@ -11,6 +11,7 @@ import util.dict_utils as du
 import core.sequence_type
 import metadata.image_metadata as imeta
 import batch_analysis.experiment
+import batch_analysis.task
 import systems.visual_odometry.libviso2.libviso2 as libviso2
 import systems.slam.orbslam2 as orbslam2
 import benchmarks.rpe.relative_pose_error as rpe
@@ -173,6 +174,7 @@ class VisualSlamExperiment(batch_analysis.experiment.Experiment):
         self._real_world_datasets = set(real_world_datasets) if real_world_datasets is not None else set()
         self._trial_list = trial_list if trial_list is not None else []
         self._result_list = result_list if result_list is not None else []
+        self._image_source_cache = {}
 
     def do_imports(self, task_manager, db_client):
         """
@@ -363,7 +365,16 @@ class VisualSlamExperiment(batch_analysis.experiment.Experiment):
         for group in self._trajectory_groups:
             datasets = datasets | group.get_all_dataset_ids()
 
+        # Load all the tasks we're about to ask for at once, rather than one at a time
+        task_manager.prefetch_tasks(
+            batch_analysis.task.TaskType.TEST_SYSTEM,
+            system_id=[self._libviso_system] + list(self._orbslam_systems),
+            image_source_id=list(datasets)
+        )
+
         # Schedule trials
+        run_task_ids = {}       # The run system task that produced each trial, to find benchmarks waiting on it
+        unfinished_run_tasks = []
         for image_source_id in datasets:
             image_source = self._load_image_source(db_client, image_source_id)
             # Libviso2
@@ -374,6 +385,7 @@ class VisualSlamExperiment(batch_analysis.experiment.Experiment):
                     expected_duration='4:00:00'
                 )
                 if task.is_finished:
+                    run_task_ids[task.result] = task.identifier
                     found = False
                     for _, _, trial_result_id in self._trial_list:
                         if trial_result_id == task.result:
@@ -385,6 +397,7 @@ class VisualSlamExperiment(batch_analysis.experiment.Experiment):
                         self._add_to_list('trial_list', [trial_tuple])
                 else:
                     task_manager.do_task(task)
+                    unfinished_run_tasks.append(task)
 
             # ORBSLAM2
             for orbslam_system in orbslam_systems:
@@ -395,6 +408,7 @@ class VisualSlamExperiment(batch_analysis.experiment.Experiment):
                         expected_duration='4:00:00'
                     )
                     if task.is_finished:
+                        run_task_ids[task.result] = task.identifier
                         found = False
                         for _, _, trial_result_id in self._trial_list:
                             if trial_result_id == task.result:
@@ -406,17 +420,34 @@ class VisualSlamExperiment(batch_analysis.experiment.Experiment):
                             self._add_to_list('trial_list', [trial_tuple])
                     else:
                         task_manager.do_task(task)
+                        unfinished_run_tasks.append(task)
 
-        # Benchmark results
+        # Benchmark results. All the tasks for these benchmarks are loaded, including those waiting on trials
+        task_manager.prefetch_tasks(
+            batch_analysis.task.TaskType.BENCHMARK_RESULT,
+            benchmark_id=[benchmark.identifier for benchmark in benchmarks]
+        )
         for image_source_id, system_id, trial_result_id in self._trial_list:
             trial_result = dh.load_object(db_client, db_client.trials_collection, trial_result_id)
             for benchmark in benchmarks:
                 if benchmark.is_trial_appropriate(trial_result):
-                    task = task_manager.get_benchmark_task(
-                        trial_result_id=trial_result.identifier,
-                        benchmark_id=benchmark.identifier,
-                        expected_duration='4:00:00'
-                    )
+                    task = None
+                    if trial_result_id in run_task_ids:
+                        # The benchmark may have been created before the trial finished, waiting on it
+                        task = task_manager.get_benchmark_task(
+                            trial_result_id=trial_result_id,
+                            benchmark_id=benchmark.identifier,
+                            expected_duration='4:00:00',
+                            dependencies={'trial_result_id': run_task_ids[trial_result_id]}
+                        )
+                        if task.identifier is None:
+                            task = None
+                    if task is None:
+                        task = task_manager.get_benchmark_task(
+                            trial_result_id=trial_result.identifier,
+                            benchmark_id=benchmark.identifier,
+                            expected_duration='4:00:00'
+                        )
                     if task.is_finished:
                         found = False
                         for _, _, _, benchmark_id in self._result_list:
@@ -430,6 +461,23 @@ class VisualSlamExperiment(batch_analysis.experiment.Experiment):
                     else:
                         task_manager.do_task(task)
 
+        # Create the benchmarks for unfinished trials now, waiting on the trials,
+        # so that they start as soon as each trial finishes, rather than the next time the experiment is scheduled.
+        # Every system in this experiment produces trajectories, which both benchmarks can assess.
+        for run_task in unfinished_run_tasks:
+            if run_task.identifier is not None:
+                for benchmark in benchmarks:
+                    task = task_manager.get_benchmark_task(
+                        trial_result_id=None,
+                        benchmark_id=benchmark.identifier,
+                        expected_duration='4:00:00',
+                        dependencies={'trial_result_id': run_task.identifier}
+                    )
+                    task_manager.do_task(task)
+
+        # Save all the new tasks together
+        task_manager.save_pending_tasks()
+
     def plot_results(self, db_client):
         """
         Plot the results for this experiment.
@@ -7,31 +7,88 @@ import bson.objectid
 import config.global_configuration as global_conf
 import database.client
 import util.database_helpers as dh
+import batch_analysis.task_manager
+import batch_analysis.task_lease
+import batch_analysis.task_profile
+import batch_analysis.resource_estimator
 
 
 def main(*args):
     """
-    Run a particular task.
-    :args: Only argument is the id of the task to run
+    Run a particular task, or several tasks one after another.
+    Running several tasks in one process saves loading the configuration and connecting to the database for each.
+    :args: The ids of the tasks to run
     :return:
     """
     if len(args) >= 1:
-        task_id = bson.objectid.ObjectId(args[0])
+        task_ids = [bson.objectid.ObjectId(arg) for arg in args]
 
         config = global_conf.load_global_config('config.yml')
         logging.config.dictConfig(config['logging'])
+        batch_analysis.task_profile.register_database_monitor()
         db_client = database.client.DatabaseClient(config=config)
 
-        task = dh.load_object(db_client, db_client.tasks_collection, task_id)
-        if task is not None:
-            try:
-                task.run_task(db_client)
-            except Exception:
-                logging.getLogger(__name__).error("Exception occurred while running {0}: {1}".format(
-                    type(task).__name__, traceback.format_exc()
-                ))
-                task.mark_job_failed()
-            task.save_updates(db_client.tasks_collection)
+        for task_id in task_ids:
+            task = dh.load_object(db_client, db_client.tasks_collection, task_id)
+            if task is not None:
+                run_loaded_task(task, db_client)
+
+
+def run_loaded_task(task, db_client, lease_duration=batch_analysis.task_lease.DEFAULT_LEASE_DURATION):
+    """
+    Run a task that has already been loaded, and save the changes to it.
+    The task is marked as failed if it raises an exception.
+    While it runs, the lease on the task is renewed in the background, so that it is not reclaimed.
+    The resources used by the task are profiled, and stored both on the task and in the task stats.
+    If the task finishes, any tasks waiting on it are released, so that they can start straight away.
+    :param task: The task to run
+    :param db_client: The database client
+    :param lease_duration: The length of the lease on the task, in seconds. Default 600.
+    :return: void
+    """
+    heartbeat = batch_analysis.task_lease.LeaseHeartbeat(db_client.tasks_collection, task.identifier,
+                                                         lease_duration=lease_duration)
+    heartbeat.start()
+    profiler = batch_analysis.task_profile.TaskProfiler(db_client)
+    profiler.start()
+    try:
+        task.run_task(db_client)
+    except Exception:
+        logging.getLogger(__name__).error("Exception occurred while running {0}: {1}".format(
+            type(task).__name__, traceback.format_exc()
+        ))
+        task.mark_job_failed()
+    finally:
+        profiler.stop()
+        heartbeat.stop()
+    profiler.profile['prediction_error'] = batch_analysis.resource_estimator.get_prediction_error(
+        task, profiler.profile)
+    task.record_profile(profiler.profile)
+    task.save_updates(db_client.tasks_collection)
+    record_stats(task, profiler.profile, db_client)
+    if task.is_finished:
+        task_manager = batch_analysis.task_manager.TaskManager(db_client.tasks_collection, db_client)
+        num_released = task_manager.release_dependents(task.identifier)
+        if num_released > 0:
+            logging.getLogger(__name__).info("Released {0} tasks waiting on {1}".format(
+                num_released, task.identifier))
+
+
+def record_stats(task, profile, db_client):
+    """
+    Add the profile of a task to the aggregate statistics for tasks in the same group.
+    Failing to record the statistics will not affect the task.
+    :param task: The task that was run
+    :param profile: The profile of the task
+    :param db_client: The database client
+    :return: void
+    """
+    task_type, group_id = batch_analysis.task_profile.get_task_group(task)
+    try:
+        batch_analysis.task_profile.record_task_stats(db_client.task_stats_collection, task_type, group_id, profile)
+    except Exception:
+        logging.getLogger(__name__).warning("Could not record stats for task {0}: {1}".format(
+            task.identifier, traceback.format_exc()))
 
 
 if __name__ == '__main__':
@@ -0,0 +1,34 @@
+import sys
+import logging
+import logging.config
+
+import config.global_configuration as global_conf
+import database.client
+import batch_analysis.task_worker
+import batch_analysis.task_profile
+
+
+def main(*args):
+    """
+    Run a worker, which claims and runs tasks until there are none left.
+    The worker is configured by 'worker_config' in the global configuration, see TaskWorker.
+    If the scheduler is running as well, set 'push_tasks' to False in its 'scheduler_config',
+    so that it leaves the tasks for the workers.
+    :args: Optionally, the number of seconds to wait for new tasks before stopping. By default, run forever.
+    :return:
+    """
+    idle_timeout = float(args[0]) if len(args) >= 1 else None
+
+    config = global_conf.load_global_config('config.yml')
+    logging.config.dictConfig(config['logging'])
+    batch_analysis.task_profile.register_database_monitor()
+    db_client = database.client.DatabaseClient(config=config)
+
+    worker_config = config['worker_config'] if 'worker_config' in config else {}
+    worker = batch_analysis.task_worker.TaskWorker(db_client, worker_config)
+    num_run = worker.run(idle_timeout=idle_timeout)
+    logging.getLogger(__name__).info("Worker {0} finished after running {1} tasks".format(worker.node_id, num_run))
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
@@ -1,10 +1,12 @@
 import unittest
+import unittest.mock as mock
 import numpy as np
 import pickle
 import core.sequence_type
 import database.tests.test_entity
 import util.dict_utils as du
 import util.transform as tf
+import simulation.simulator
 import simulation.controllers.trajectory_follow_controller as follow
 
 
@@ -43,6 +45,15 @@ class TestTrajectoryFollowController(database.tests.test_entity.EntityContract,
         traj2 = pickle.loads(s_model2['trajectory'])
         self._assertTrajectoryEqual(traj1, traj2)
 
+    def test_begin_prepares_trajectory_poses(self):
+        subject = self.make_instance()
+        mock_simulator = mock.create_autospec(simulation.simulator.Simulator)
+        subject.set_simulator(mock_simulator)
+        subject.begin()
+        self.assertTrue(mock_simulator.prepare_camera_poses.called)
+        self.assertEqual(set(subject._trajectory.values()),
+                         set(mock_simulator.prepare_camera_poses.call_args[0][0]))
+
     def _assertTrajectoryEqual(self, traj1, traj2):
         self.assertEqual(list(traj1.keys()).sort(), list(traj2.keys()).sort())
         for time in traj1.keys():
@@ -129,6 +129,8 @@ class TrajectoryFollowController(simulation.controller.Controller, database.enti
         if self._simulator is None:
             return False
         self._simulator.begin()
+        # We know the whole trajectory up front, let the simulator convert it in one batch
+        self._simulator.prepare_camera_poses(self._trajectory.values())
         self._current_index = 0
 
     def get(self, index):
@@ -39,6 +39,16 @@ class Simulator(core.image_source.ImageSource, metaclass=abc.ABCMeta):
         """
         pass
 
+    def prepare_camera_poses(self, poses):
+        """
+        Give the simulator advance notice of a collection of poses that will be passed to set_camera_pose,
+        so that any conversion to the simulator's own coordinate frame can be done all at once.
+        Does nothing by default, simulators that need to convert poses should override this.
+        :param poses: An iterable of pose objects
+        :return:
+        """
+        pass
+
     @abc.abstractmethod
     def move_camera_to(self, pose):
         """
@@ -375,6 +375,32 @@ class TestUnrealCVSimulator(database.tests.test_entity.EntityContract, unittest.
                                                                               ue_pose.roll))),
                       mock_client_instance.request.call_args_list)
 
+    @mock.patch('simulation.unrealcv.unrealcv_simulator.open', mock.mock_open(), create=True)
+    @mock.patch('simulation.unrealcv.unrealcv_simulator.time.sleep', autospec=time.sleep)
+    @mock.patch('simulation.unrealcv.unrealcv_simulator.subprocess', autospec=subprocess)
+    @mock.patch('simulation.unrealcv.unrealcv_simulator.cv2', autospec=cv2)
+    @mock.patch('simulation.unrealcv.unrealcv_simulator.unrealcv.Client', autospec=ClientPatch)
+    def test_set_camera_pose_uses_prepared_poses(self, mock_client, mock_cv2, *_):
+        mock_cv2.imread.side_effect = make_mock_image
+        mock_client_instance = make_mock_unrealcv_client()
+        mock_client.return_value = mock_client_instance
+        subject = uecvsim.UnrealCVSimulator('temp/test_project/test.sh', 'sim-world')
+        subject.begin()
+
+        poses = [tf.Transform((17, -21, 3), (0.1, 0.7, -0.3, 0.5)),
+                 tf.Transform((-175, 29, -870), (0.3, -0.2, -0.8, 0.6))]
+        ue_poses = [uetf.transform_to_unreal(pose) for pose in poses]
+        subject.prepare_camera_poses(poses)
+        with mock.patch('simulation.unrealcv.unrealcv_simulator.uetf.transform_to_unreal') as mock_to_unreal:
+            for pose, ue_pose in zip(poses, ue_poses):
+                mock_client_instance.request.reset_mock()
+                subject.set_camera_pose(pose)
+                self.assertFalse(mock_to_unreal.called)
+                self.assertEqual(subject.current_pose, pose)
+                location_call = mock_client_instance.request.call_args_list[0][0][0].split(' ')
+                self.assertEqual("/camera/0/location", location_call[1])
+                self.assertTrue(np.all(np.isclose(ue_pose.location, [float(v) for v in location_call[2:]])))
+
     @mock.patch('simulation.unrealcv.unrealcv_simulator.open', mock.mock_open(), create=True)
     @mock.patch('simulation.unrealcv.unrealcv_simulator.time.sleep', autospec=time.sleep)
     @mock.patch('simulation.unrealcv.unrealcv_simulator.subprocess', autospec=subprocess)
@@ -105,6 +105,7 @@ class UnrealCVSimulator(simulation.simulator.Simulator, database.entity.Entity):
         self._client = None
         self._simulator_process = None
         self._current_pose = None
+        self._prepared_poses = {}
 
     @property
     def is_depth_available(self):
@@ -292,6 +293,7 @@ class UnrealCVSimulator(simulation.simulator.Simulator, database.entity.Entity):
             self._simulator_process = None
 
         self._current_pose = None
+        self._prepared_poses = {}
 
     @property
     def current_pose(self):
@@ -301,6 +303,16 @@ class UnrealCVSimulator(simulation.simulator.Simulator, database.entity.Entity):
         """
         return self._current_pose
 
+    def prepare_camera_poses(self, poses):
+        """
+        Convert a collection of poses to the unreal coordinate frame all at once,
+        so that subsequent calls to set_camera_pose with those poses don't have to.
+        :param poses: An iterable of Transform objects
+        :return:
+        """
+        poses = [pose for pose in poses if isinstance(pose, tf.Transform)]
+        self._prepared_poses = dict(zip(poses, uetf.transforms_to_unreal(poses)))
+
     def set_camera_pose(self, pose):
         """
         Set the camera pose in the simulator
@@ -310,6 +322,9 @@ class UnrealCVSimulator(simulation.simulator.Simulator, database.entity.Entity):
         if self._client is not None:
             if isinstance(pose, uetf.UnrealTransform):
                 self._current_pose = uetf.transform_from_unreal(pose)
+            elif pose in self._prepared_poses:
+                self._current_pose = pose
+                pose = self._prepared_poses[pose]
             else:
                 self._current_pose = pose
                 pose = uetf.transform_to_unreal(pose)
@@ -1,4 +1,6 @@
 import unittest
+import unittest.mock as mock
+import numpy as np
 import bson.objectid
 import util.dict_utils as du
 import database.tests.test_entity
@@ -52,3 +54,35 @@ class TestLibVisO(database.tests.test_entity.EntityContract, unittest.TestCase):
         self.assertEqual(system1.settings, system2.settings)
         self.assertEqual(system1.frame_deltas, system2.frame_deltas)
         self.assertEqual(system1.ground_truth_trajectory, system2.ground_truth_trajectory)
+
+    def test_get_computed_camera_poses_chains_frame_deltas(self):
+        subject = self.make_instance()
+        current_pose = tf.Transform()
+        expected = {}
+        for stamp in sorted(subject.frame_deltas.keys()):
+            current_pose = current_pose.find_independent(subject.frame_deltas[stamp])
+            expected[stamp] = current_pose
+        computed = subject.get_computed_camera_poses()
+        self.assertEqual(set(expected.keys()), set(computed.keys()))
+        for stamp, pose in expected.items():
+            self.assertTrue(np.all(np.isclose(pose.location, computed[stamp].location)))
+            self.assertTrue(np.all(np.isclose(pose.rotation_quat(True), computed[stamp].rotation_quat(True))))
+
+    def test_get_computed_camera_poses_is_cached(self):
+        subject = self.make_instance()
+        with mock.patch('util.transform.accumulate_poses', wraps=tf.accumulate_poses) as mock_accumulate:
+            poses1 = subject.get_computed_camera_poses()
+            poses2 = subject.get_computed_camera_poses()
+        self.assertEqual(1, mock_accumulate.call_count)
+        self.assertEqual(poses1, poses2)
+
+    def test_changing_frame_deltas_invalidates_computed_poses(self):
+        subject = self.make_instance()
+        subject.get_computed_camera_poses()
+        subject.frame_deltas = {
+            1.0: tf.Transform((1, 2, 3)),
+            2.0: tf.Transform((1, 0, 0))
+        }
+        computed = subject.get_computed_camera_poses()
+        self.assertEqual({1.0, 2.0}, set(computed.keys()))
+        self.assertTrue(np.all(np.isclose((2, 2, 3), computed[2.0].location)))
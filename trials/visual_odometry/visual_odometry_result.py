@@ -17,6 +17,7 @@ class VisualOdometryResult(core.trial_result.TrialResult):
                          system_settings=system_settings, id_=id_, **kwargs)
         self._frame_deltas = frame_deltas
         self._ground_truth_trajectory = ground_truth_trajectory
+        self._computed_poses = None
 
     @property
     def frame_deltas(self):
@@ -27,6 +28,17 @@ class VisualOdometryResult(core.trial_result.TrialResult):
         """
         return self._frame_deltas
 
+    @frame_deltas.setter
+    def frame_deltas(self, frame_deltas):
+        """
+        Replace the frame deltas, which invalidates the cached computed trajectory.
+        Use this rather than modifying the frame deltas dict in place.
+        :param frame_deltas: A new map of timestamp to relative pose
+        :return:
+        """
+        self._frame_deltas = frame_deltas
+        self._computed_poses = None
+
     @property
     def ground_truth_trajectory(self):
         """
@@ -49,16 +61,16 @@ class VisualOdometryResult(core.trial_result.TrialResult):
         Get the computed poses, as a map from timestamp to absolute pose
         This assumes that the first frame is the origin, and builds
         the trajectory from there, assuming
+        The trajectory is integrated once and cached, until the frame deltas are replaced.
         :return:
         """
-        pairs = [(timestamp, pose) for timestamp, pose in self.frame_deltas.items()]
-        pairs.sort()
-        current_pose = tf.Transform()
-        computed_poses = {}
-        for timestamp, delta in pairs:
-            current_pose = current_pose.find_independent(delta)
-            computed_poses[timestamp] = current_pose
-        return computed_poses
+        if self._computed_poses is None:
+            timestamps = sorted(self.frame_deltas.keys())
+            locations, quaternions = tf.transforms_to_arrays(self.frame_deltas[stamp] for stamp in timestamps)
+            locations, quaternions = tf.accumulate_poses(locations, quaternions)
+            self._computed_poses = dict(zip(timestamps, tf.arrays_to_transforms(locations, quaternions)))
+        # Return a copy, so that callers cannot modify the cache. Transforms are immutable.
+        return dict(self._computed_poses)
 
     def serialize(self):
         serialized = super().serialize()
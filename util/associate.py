@@ -48,14 +48,18 @@ the depth.txt file, and joins them by finding the best matches.
 """
 
 
+import heapq
+import numpy as np
+
+
 def associate(first_list, second_list, offset, max_difference):
     """
     Associate two dictionaries of (stamp,data). As the time stamps never match exactly, we aim
     to find the closest match for every input tuple.
 
     Input:
-    first_list -- first dictionary of (stamp,data) tuples
-    second_list -- second dictionary of (stamp,data) tuples
+    first_list -- first dictionary of (stamp,data) tuples, or a sequence or numpy array of stamps
+    second_list -- second dictionary of (stamp,data) tuples, or a sequence or numpy array of stamps
     offset -- time offset between both dictionaries (e.g., to model the delay between the sensors)
     max_difference -- search radius for candidate generation
 
@@ -63,19 +67,91 @@ def associate(first_list, second_list, offset, max_difference):
     matches -- list of matched tuples ((stamp1,data1),(stamp2,data2))
 
     """
-    first_keys = list(first_list.keys())  # copy both keys lists, so we can remove from them later
-    second_keys = list(second_list.keys())
-    potential_matches = [(abs(a - (b + offset)), a, b)
-                         for a in first_keys
-                         for b in second_keys
-                         if abs(a - (b + offset)) < max_difference]
-    potential_matches.sort()
-    matches = []
-    for diff, a, b in potential_matches:
-        if a in first_keys and b in second_keys:
-            first_keys.remove(a)
-            second_keys.remove(b)
-            matches.append((a, b))
-
+    first_keys = list(first_list.keys()) if hasattr(first_list, 'keys') else list(first_list)
+    second_keys = list(second_list.keys()) if hasattr(second_list, 'keys') else list(second_list)
+    first_indexes, second_indexes = associate_indexes(first_keys, second_keys, offset, max_difference)
+    matches = [(first_keys[a], second_keys[b]) for a, b in zip(first_indexes, second_indexes)]
     matches.sort()
     return matches
+
+
+def associate_indexes(first_stamps, second_stamps, offset, max_difference):
+    """
+    Associate two arrays of timestamps, finding the closest match for each stamp.
+    This has the same greedy semantics as the original TUM association, which considered every pair
+    within max_difference in order of increasing time difference, but runs in O((n+m) log(n+m)).
+    That works because once both lists are merged into a single sorted order, the closest unmatched pair
+    must always be adjacent among the unmatched stamps, so only adjacent pairs need to be considered.
+
+    :param first_stamps: A sequence or numpy array of timestamps
+    :param second_stamps: A sequence or numpy array of timestamps
+    :param offset: time offset added to the second stamps
+    :param max_difference: The maximum difference between matched timestamps, exclusive
+    :return: Two integer arrays of the matched indexes in the first and second stamps, ordered by first stamp.
+    """
+    first_stamps = np.asarray(first_stamps, dtype=np.float64).ravel()
+    second_stamps = np.asarray(second_stamps, dtype=np.float64).ravel()
+    shifted_stamps = second_stamps + offset
+    num_first = len(first_stamps)
+
+    # Merge the stamps into a single sorted order, as a doubly linked list so we can drop matched stamps
+    order = np.argsort(np.concatenate((first_stamps, shifted_stamps)), kind='mergesort')
+    is_first = order < num_first
+    prev_node = list(range(-1, len(order) - 1))
+    next_node = list(range(1, len(order) + 1))
+    matched = [False] * len(order)
+
+    def make_candidate(left, right):
+        # Candidate pairs are sorted as (difference, first stamp, second stamp), like the original
+        if is_first[left] == is_first[right]:
+            return None
+        if is_first[left]:
+            a, b = order[left], order[right] - num_first
+        else:
+            a, b = order[right], order[left] - num_first
+        diff = abs(first_stamps[a] - shifted_stamps[b])
+        if diff < max_difference:
+            return diff, first_stamps[a], second_stamps[b], left, right
+        return None
+
+    # Find all the initially adjacent pairs at once
+    cross = np.nonzero(is_first[:-1] != is_first[1:])[0]
+    left_first = is_first[cross]
+    first_idx = np.where(left_first, order[cross], order[cross + 1])
+    second_idx = np.where(left_first, order[cross + 1], order[cross]) - num_first
+    diffs = np.abs(first_stamps[first_idx] - shifted_stamps[second_idx])
+    within = diffs < max_difference
+    candidates = list(zip(diffs[within].tolist(), first_stamps[first_idx[within]].tolist(),
+                          second_stamps[second_idx[within]].tolist(), cross[within].tolist(),
+                          (cross[within] + 1).tolist()))
+    heapq.heapify(candidates)
+
+    first_matches = []
+    second_matches = []
+    while len(candidates) > 0:
+        _, _, _, left, right = heapq.heappop(candidates)
+        if matched[left] or matched[right]:
+            continue
+        matched[left] = matched[right] = True
+        if is_first[left]:
+            first_matches.append(order[left])
+            second_matches.append(order[right] - num_first)
+        else:
+            first_matches.append(order[right])
+            second_matches.append(order[left] - num_first)
+        # Remove both from the list, the stamps either side are now adjacent
+        before = prev_node[left]
+        after = next_node[right]
+        if before >= 0:
+            next_node[before] = after
+        if after < len(order):
+            prev_node[after] = before
+        if before >= 0 and after < len(order):
+            candidate = make_candidate(before, after)
+            if candidate is not None:
+                heapq.heappush(candidates, candidate)
+
+    first_matches = np.array(first_matches, dtype=np.intp)
+    second_matches = np.array(second_matches, dtype=np.intp)
+    sort_order = np.argsort(first_stamps[first_matches], kind='mergesort')
+    return first_matches[sort_order], second_matches[sort_order]
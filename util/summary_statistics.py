@@ -0,0 +1,44 @@
+import numpy as np
+
+
+STATISTICS = ('rmse', 'mean', 'median', 'std', 'min', 'max')
+
+
+def dict_to_arrays(mapping):
+    """
+    Convert a map of timestamps to values into a pair of contiguous numpy arrays.
+    Order is the order of the dict, which for benchmark results is the order the timestamps were measured.
+    :param mapping: A dict of numeric keys to float values, such as timestamps to errors
+    :return: An array of keys, and an array of values in the same order
+    """
+    keys = np.fromiter(mapping.keys(), dtype=np.float64, count=len(mapping))
+    values = np.fromiter(mapping.values(), dtype=np.float64, count=len(mapping))
+    return keys, values
+
+
+def summarise(values, prefix='', suffix=''):
+    """
+    Compute summary statistics for an array of values, for storing in a serialized result.
+    The statistics are plain python floats, so they can be saved to the database and used to query or sort results,
+    or None if there are no values.
+    Keys are the statistic name from STATISTICS plus 'count', wrapped in the given prefix and suffix,
+    so summarise(errors, prefix='trans_') gives 'trans_rmse', 'trans_mean', and so on.
+    :param values: An array-like of numbers
+    :param prefix: A prefix for the statistic names
+    :param suffix: A suffix for the statistic names
+    :return: A dict of statistic names to values
+    """
+    values = np.asarray(values, dtype=np.float64).ravel()
+    if len(values) > 0:
+        summary = {
+            'rmse': float(np.sqrt(np.dot(values, values) / len(values))),
+            'mean': float(np.mean(values)),
+            'median': float(np.median(values)),
+            'std': float(np.std(values)),
+            'min': float(np.min(values)),
+            'max': float(np.max(values))
+        }
+    else:
+        summary = {name: None for name in STATISTICS}
+    summary['count'] = len(values)
+    return {prefix + name + suffix: value for name, value in summary.items()}
@@ -0,0 +1,82 @@
+import unittest
+import numpy as np
+import util.associate as ass
+
+
+def _brute_force_associate(first_list, second_list, offset, max_difference):
+    """
+    The original all-pairs association, as a reference for the expected matches
+    """
+    first_keys = list(first_list)
+    second_keys = list(second_list)
+    potential_matches = [(abs(a - (b + offset)), a, b)
+                         for a in first_keys
+                         for b in second_keys
+                         if abs(a - (b + offset)) < max_difference]
+    potential_matches.sort()
+    matches = []
+    for diff, a, b in potential_matches:
+        if a in first_keys and b in second_keys:
+            first_keys.remove(a)
+            second_keys.remove(b)
+            matches.append((a, b))
+    matches.sort()
+    return matches
+
+
+class TestAssociate(unittest.TestCase):
+
+    def test_matches_identical_stamps(self):
+        stamps = {1.0: 'a', 2.0: 'b', 3.0: 'c'}
+        self.assertEqual([(1.0, 1.0), (2.0, 2.0), (3.0, 3.0)], ass.associate(stamps, stamps, 0, 0.1))
+
+    def test_respects_offset(self):
+        first = {1.0: 'a', 2.0: 'b', 3.0: 'c'}
+        second = {0.5: 'a', 1.5: 'b', 2.5: 'c'}
+        self.assertEqual([(1.0, 0.5), (2.0, 1.5), (3.0, 2.5)], ass.associate(first, second, 0.5, 0.1))
+
+    def test_excludes_matches_at_max_difference(self):
+        self.assertEqual([], ass.associate({1.0: 'a'}, {1.5: 'b'}, 0, 0.5))
+        self.assertEqual([(1.0, 1.5)], ass.associate({1.0: 'a'}, {1.5: 'b'}, 0, 0.50001))
+
+    def test_prefers_closest_match(self):
+        first = {1.0: 'a', 1.3: 'b'}
+        second = {1.2: 'c'}
+        self.assertEqual([(1.3, 1.2)], ass.associate(first, second, 0, 1))
+
+    def test_accepts_numpy_arrays(self):
+        first = np.array([3.0, 1.0, 2.0])
+        second = np.array([1.01, 2.99, 2.02])
+        self.assertEqual([(1.0, 1.01), (2.0, 2.02), (3.0, 2.99)], ass.associate(first, second, 0, 0.1))
+
+    def test_associate_indexes_returns_indexes_ordered_by_first_stamp(self):
+        first = np.array([3.0, 1.0, 2.0, 7.0])
+        second = np.array([1.01, 2.99, 2.02])
+        first_indexes, second_indexes = ass.associate_indexes(first, second, 0, 0.1)
+        self.assertEqual([1, 2, 0], list(first_indexes))
+        self.assertEqual([0, 2, 1], list(second_indexes))
+
+    def test_associate_indexes_handles_empty(self):
+        first_indexes, second_indexes = ass.associate_indexes([], [1, 2, 3], 0, 1)
+        self.assertEqual(0, len(first_indexes))
+        self.assertEqual(0, len(second_indexes))
+
+    def test_same_as_brute_force_with_float_stamps(self):
+        random = np.random.RandomState(16623)
+        for _ in range(200):
+            first = {float(stamp): None for stamp in random.uniform(0, 10, random.randint(0, 40))}
+            second = {float(stamp): None for stamp in random.uniform(0, 10, random.randint(0, 40))}
+            offset = random.uniform(-1, 1)
+            max_difference = random.uniform(0, 3)
+            self.assertEqual(_brute_force_associate(first, second, offset, max_difference),
+                             ass.associate(first, second, offset, max_difference))
+
+    def test_same_as_brute_force_with_tied_differences(self):
+        random = np.random.RandomState(7351)
+        for _ in range(200):
+            first = {int(stamp): None for stamp in random.randint(0, 40, random.randint(0, 30))}
+            second = {int(stamp): None for stamp in random.randint(0, 40, random.randint(0, 30))}
+            offset = int(random.randint(-3, 4))
+            max_difference = random.choice([0.5, 1, 2, 3, 100])
+            self.assertEqual(_brute_force_associate(first, second, offset, max_difference),
+                             ass.associate(first, second, offset, max_difference))
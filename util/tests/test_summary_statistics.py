@@ -0,0 +1,42 @@
+import unittest
+import numpy as np
+import util.summary_statistics as stats
+
+
+class TestSummaryStatistics(unittest.TestCase):
+
+    def test_dict_to_arrays_keeps_dict_order(self):
+        timestamps, values = stats.dict_to_arrays({3.0: 0.3, 1.0: 0.1, 2.0: 0.2})
+        self.assertEqual([3.0, 1.0, 2.0], timestamps.tolist())
+        self.assertEqual([0.3, 0.1, 0.2], values.tolist())
+
+    def test_dict_to_arrays_handles_empty(self):
+        timestamps, values = stats.dict_to_arrays({})
+        self.assertEqual(0, len(timestamps))
+        self.assertEqual(0, len(values))
+
+    def test_summarise_is_correct(self):
+        values = np.random.uniform(-10, 10, 100)
+        summary = stats.summarise(values)
+        self.assertAlmostEqual(np.sqrt(np.mean(values * values)), summary['rmse'])
+        self.assertEqual(np.mean(values), summary['mean'])
+        self.assertEqual(np.median(values), summary['median'])
+        self.assertEqual(np.std(values), summary['std'])
+        self.assertEqual(np.min(values), summary['min'])
+        self.assertEqual(np.max(values), summary['max'])
+        self.assertEqual(100, summary['count'])
+
+    def test_summarise_produces_python_types(self):
+        summary = stats.summarise(np.arange(10, dtype=np.int64))
+        for value in summary.values():
+            self.assertIn(type(value), (float, int))
+
+    def test_summarise_adds_prefix_and_suffix(self):
+        summary = stats.summarise([1, 2, 3], prefix='trans_', suffix='_error')
+        self.assertEqual({'trans_' + name + '_error' for name in stats.STATISTICS + ('count',)}, set(summary.keys()))
+
+    def test_summarise_handles_empty(self):
+        summary = stats.summarise([])
+        self.assertEqual(0, summary['count'])
+        for name in stats.STATISTICS:
+            self.assertIsNone(summary[name])
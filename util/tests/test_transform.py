@@ -1,5 +1,6 @@
 import unittest
 import numpy as np
+import transforms3d as tf3d
 import util.transform as trans
 
 
@@ -232,3 +233,50 @@ class TestTransform(unittest.TestCase):
         if msg is None:
             msg = "{0} is not close to {1}".format(str(a1), str(a2))
         self.assertTrue(np.all(np.isclose(a1, a2)), msg)
+
+
+class TestBatchFunctions(unittest.TestCase):
+
+    def setUp(self):
+        random = np.random.RandomState(seed=6123)
+        self.transforms = [trans.Transform(location=random.uniform(-100, 100, 3),
+                                           rotation=random.uniform(-1, 1, 4), w_first=True)
+                           for _ in range(37)]
+
+    def test_transforms_to_arrays_and_back(self):
+        locations, quaternions = trans.transforms_to_arrays(self.transforms)
+        self.assertEqual((37, 3), locations.shape)
+        self.assertEqual((37, 4), quaternions.shape)
+        result = trans.arrays_to_transforms(locations, quaternions)
+        self.assertEqual(self.transforms, result)
+
+    def test_quat_multiply_matches_transforms3d(self):
+        _, quaternions = trans.transforms_to_arrays(self.transforms)
+        result = trans.quat_multiply(quaternions[:-1], quaternions[1:])
+        for idx in range(len(result)):
+            self.assertTrue(np.all(np.isclose(tf3d.quaternions.qmult(quaternions[idx], quaternions[idx + 1]),
+                                              result[idx])))
+
+    def test_quat_rotate_matches_find_independent(self):
+        locations, quaternions = trans.transforms_to_arrays(self.transforms)
+        result = trans.quat_rotate(quaternions, locations[::-1])
+        for idx, transform in enumerate(self.transforms):
+            expected = transform.find_independent(locations[-1 - idx]) - transform.location
+            self.assertTrue(np.all(np.isclose(expected, result[idx])))
+
+    def test_accumulate_poses_matches_find_independent(self):
+        locations, quaternions = trans.transforms_to_arrays(self.transforms)
+        result_locations, result_quaternions = trans.accumulate_poses(locations, quaternions)
+        current = trans.Transform()
+        for idx, transform in enumerate(self.transforms):
+            current = current.find_independent(transform)
+            self.assertTrue(np.all(np.isclose(current.location, result_locations[idx])))
+            self.assertTrue(np.all(np.isclose(current.rotation_quat(w_first=True), result_quaternions[idx])))
+
+    def test_accumulate_poses_does_not_modify_inputs(self):
+        locations, quaternions = trans.transforms_to_arrays(self.transforms)
+        locations_copy = np.copy(locations)
+        quaternions_copy = np.copy(quaternions)
+        trans.accumulate_poses(locations, quaternions)
+        self.assertTrue(np.array_equal(locations_copy, locations))
+        self.assertTrue(np.array_equal(quaternions_copy, quaternions))
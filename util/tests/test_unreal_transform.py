@@ -197,6 +197,69 @@ class TestToAndFromUnreal(unittest.TestCase):
         self.assertTrue(np.all(np.isclose(a1, a2)), msg)
 
 
+class TestBatchUnrealConversion(unittest.TestCase):
+
+    def setUp(self):
+        random = np.random.RandomState(seed=9711)
+        self.poses = [mytf.Transform(location=random.uniform(-100, 100, 3),
+                                     rotation=random.uniform(-1, 1, 4), w_first=True)
+                      for _ in range(50)]
+        self.ue_poses = [uetrans.transform_to_unreal(pose) for pose in self.poses]
+
+    def test_euler2quat_array_matches_euler2quat(self):
+        angles = np.array([pose.euler for pose in self.ue_poses])
+        result = uetrans.euler2quat_array(angles)
+        for idx, pose in enumerate(self.ue_poses):
+            self.assertTrue(np.all(np.isclose(uetrans.euler2quat(*pose.euler), result[idx])))
+
+    def test_quat2euler_array_matches_quat2euler(self):
+        quaternions = [uetrans.euler2quat(*pose.euler) for pose in self.ue_poses]
+        # Include the gimbal lock cases
+        quaternions.append((np.cos(np.pi / 4), 0, np.sin(np.pi / 4), 0))
+        quaternions.append((np.cos(np.pi / 4), 0.0001, -np.sin(np.pi / 4), 0))
+        result = uetrans.quat2euler_array(quaternions)
+        for idx, quat in enumerate(quaternions):
+            self.assertTrue(np.all(np.isclose(uetrans.quat2euler(*quat), result[idx])))
+
+    def test_transform_to_unreal_array_matches_transform_to_unreal(self):
+        locations, rotations = uetrans.transform_to_unreal_array(*mytf.transforms_to_arrays(self.poses))
+        for idx, ue_pose in enumerate(self.ue_poses):
+            self.assertTrue(np.all(np.isclose(ue_pose.location, locations[idx])))
+            self.assertTrue(np.all(np.isclose(ue_pose.euler, rotations[idx])))
+
+    def test_transform_from_unreal_array_matches_transform_from_unreal(self):
+        locations, quaternions = uetrans.transform_from_unreal_array([pose.location for pose in self.ue_poses],
+                                                                     [pose.euler for pose in self.ue_poses])
+        for idx, ue_pose in enumerate(self.ue_poses):
+            pose = uetrans.transform_from_unreal(ue_pose)
+            self.assertTrue(np.all(np.isclose(pose.location, locations[idx])))
+            self.assertTrue(np.all(np.isclose(pose.rotation_quat(w_first=True), quaternions[idx])))
+
+    def test_transform_from_unreal_array_accepts_quaternions(self):
+        ue_quaternions = [uetrans.euler2quat(*pose.euler) for pose in self.ue_poses]
+        locations, quaternions = uetrans.transform_from_unreal_array([pose.location for pose in self.ue_poses],
+                                                                     ue_quaternions)
+        for idx, pose in enumerate(self.poses):
+            self.assertTrue(np.all(np.isclose(pose.location, locations[idx])))
+            # q and -q are the same rotation
+            self.assertTrue(np.all(np.isclose(pose.rotation_quat(w_first=True), quaternions[idx])) or
+                            np.all(np.isclose(pose.rotation_quat(w_first=True), -1 * quaternions[idx])))
+
+    def test_transforms_to_and_from_unreal(self):
+        ue_poses = uetrans.transforms_to_unreal(self.poses)
+        self.assertEqual(len(self.poses), len(ue_poses))
+        for ue_pose, expected in zip(ue_poses, self.ue_poses):
+            self.assertIsInstance(ue_pose, uetrans.UnrealTransform)
+            self.assertTrue(np.all(np.isclose(expected.location, ue_pose.location)))
+            self.assertTrue(np.all(np.isclose(expected.euler, ue_pose.euler)))
+        poses = uetrans.transforms_from_unreal(ue_poses)
+        for pose, ue_pose in zip(poses, self.ue_poses):
+            expected = uetrans.transform_from_unreal(ue_pose)
+            self.assertIsInstance(pose, mytf.Transform)
+            self.assertTrue(np.all(np.isclose(expected.location, pose.location)))
+            self.assertTrue(np.all(np.isclose(expected.rotation_quat(w_first=True), pose.rotation_quat(w_first=True))))
+
+
 class TestUnrealTransform(unittest.TestCase):
     """
     Tests for my Unreal Transform
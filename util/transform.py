@@ -54,7 +54,8 @@ class Transform:
                 rotation = np.asarray(rotation, dtype=np.dtype('f8'))
                 norm = np.linalg.norm(rotation)
                 loop_count = 0
-                while not np.isclose(norm, (1.0,), 1e-16, 1e-16) and loop_count < 10:
+                # Same tolerance as np.isclose(norm, 1.0, 1e-16, 1e-16), without the per-call array overhead
+                while abs(norm - 1.0) > 2e-16 and loop_count < 10:
                     rotation = rotation / norm
                     norm = np.linalg.norm(rotation)
                     loop_count += 1
@@ -219,3 +220,143 @@ class Transform:
         return cls(location=s_transform['location'],
                    rotation=s_transform['rotation'],
                    w_first=True)
+
+
+def transforms_to_arrays(transforms):
+    """
+    Pack a sequence of Transform objects into location and rotation arrays,
+    for use with the batch functions below.
+    :param transforms: An iterable of Transform objects
+    :return: An Nx3 array of locations, and an Nx4 array of quaternions, W first
+    """
+    transforms = list(transforms)
+    locations = np.empty((len(transforms), 3), dtype=np.float64)
+    quaternions = np.empty((len(transforms), 4), dtype=np.float64)
+    for idx, transform in enumerate(transforms):
+        locations[idx] = transform.location
+        quaternions[idx] = transform.rotation_quat(w_first=True)
+    return locations, quaternions
+
+
+def arrays_to_transforms(locations, quaternions):
+    """
+    Unpack location and rotation arrays back into a list of Transform objects.
+    The inverse of transforms_to_arrays
+    :param locations: An Nx3 array of locations
+    :param quaternions: An Nx4 array of quaternions, W first
+    :return: A list of N Transform objects
+    """
+    return [Transform(location=location, rotation=quaternion, w_first=True)
+            for location, quaternion in zip(locations, quaternions)]
+
+
+def quat_multiply(q1, q2):
+    """
+    Multiply arrays of quaternions element-wise, the batch equivalent of transforms3d.quaternions.qmult.
+    Inputs broadcast against each other, so one side may be a single quaternion.
+    :param q1: An Nx4 array of quaternions, W first
+    :param q2: An Nx4 array of quaternions, W first
+    :return: An Nx4 array of the products q1 * q2
+    """
+    q1 = np.asarray(q1, dtype=np.float64)
+    q2 = np.asarray(q2, dtype=np.float64)
+    w1, x1, y1, z1 = q1[..., 0], q1[..., 1], q1[..., 2], q1[..., 3]
+    w2, x2, y2, z2 = q2[..., 0], q2[..., 1], q2[..., 2], q2[..., 3]
+    return np.stack((
+        w1 * w2 - x1 * x2 - y1 * y2 - z1 * z2,
+        w1 * x2 + x1 * w2 + y1 * z2 - z1 * y2,
+        w1 * y2 + y1 * w2 + z1 * x2 - x1 * z2,
+        w1 * z2 + z1 * w2 + x1 * y2 - y1 * x2
+    ), axis=-1)
+
+
+def quat_rotate(quaternions, vectors):
+    """
+    Rotate an array of vectors by an array of unit quaternions, element-wise.
+    The batch equivalent of transforms3d.quaternions.rotate_vector.
+    :param quaternions: An Nx4 array of unit quaternions, W first
+    :param vectors: An Nx3 array of vectors
+    :return: An Nx3 array of rotated vectors
+    """
+    quaternions = np.asarray(quaternions, dtype=np.float64)
+    vectors = np.asarray(vectors, dtype=np.float64)
+    w = quaternions[..., 0:1]
+    u = quaternions[..., 1:]
+    uv = np.cross(u, vectors)
+    return vectors + 2 * (w * uv + np.cross(u, uv))
+
+
+def accumulate_poses(locations, quaternions):
+    """
+    Chain a sequence of relative poses into absolute poses, so that
+    the output pose i is pose 0 .find_independent( pose 1 ... .find_independent(pose i)).
+    This is done as a parallel prefix scan, which takes log2(N) batched compositions
+    rather than N individual ones.
+    :param locations: An Nx3 array of relative locations
+    :param quaternions: An Nx4 array of relative orientations, as unit quaternions W first
+    :return: An Nx3 array of absolute locations and an Nx4 array of absolute orientations
+    """
+    locations = np.array(locations, dtype=np.float64).reshape(-1, 3)
+    quaternions = np.array(quaternions, dtype=np.float64).reshape(-1, 4)
+    shift = 1
+    while shift < len(locations):
+        # Compose each pose with the partial product ending 'shift' frames earlier
+        prev_loc = locations[:-shift]
+        prev_quat = quaternions[:-shift]
+        new_loc = prev_loc + quat_rotate(prev_quat, locations[shift:])
+        new_quat = quat_multiply(prev_quat, quaternions[shift:])
+        locations[shift:] = new_loc
+        quaternions[shift:] = new_quat
+        shift *= 2
+    quaternions /= np.linalg.norm(quaternions, axis=1, keepdims=True)
+    return locations, quaternions
+
+
+def transform_matrices(locations, quaternions):
+    """
+    Build homogeneous transformation matrices for an array of poses,
+    the batch equivalent of Transform.transform_matrix.
+    :param locations: An Nx3 array of locations
+    :param quaternions: An Nx4 array of unit quaternions, W first
+    :return: An Nx4x4 array of homogeneous transformation matrices
+    """
+    locations = np.asarray(locations, dtype=np.float64).reshape(-1, 3)
+    quaternions = np.asarray(quaternions, dtype=np.float64).reshape(-1, 4)
+    w, x, y, z = quaternions[:, 0], quaternions[:, 1], quaternions[:, 2], quaternions[:, 3]
+    # Same as transforms3d.quaternions.quat2mat, which scales by the squared norm
+    scale = 2.0 / np.sum(quaternions * quaternions, axis=1)
+    scale[~np.isfinite(scale)] = 0
+    xs, ys, zs = x * scale, y * scale, z * scale
+    wx, wy, wz = w * xs, w * ys, w * zs
+    xx, xy, xz = x * xs, x * ys, x * zs
+    yy, yz, zz = y * ys, y * zs, z * zs
+
+    matrices = np.zeros((len(locations), 4, 4), dtype=np.float64)
+    matrices[:, 0, 0] = 1.0 - (yy + zz)
+    matrices[:, 0, 1] = xy - wz
+    matrices[:, 0, 2] = xz + wy
+    matrices[:, 1, 0] = xy + wz
+    matrices[:, 1, 1] = 1.0 - (xx + zz)
+    matrices[:, 1, 2] = yz - wx
+    matrices[:, 2, 0] = xz - wy
+    matrices[:, 2, 1] = yz + wx
+    matrices[:, 2, 2] = 1.0 - (xx + yy)
+    matrices[:, 0:3, 3] = locations
+    matrices[:, 3, 3] = 1.0
+    return matrices
+
+
+def invert_transform_matrices(matrices):
+    """
+    Invert a stack of rigid homogeneous transformation matrices,
+    using the transpose of the rotation rather than a general matrix inverse.
+    :param matrices: An Nx4x4 array of rigid transformation matrices
+    :return: An Nx4x4 array of the inverse transforms
+    """
+    matrices = np.asarray(matrices, dtype=np.float64)
+    inverse = np.zeros_like(matrices)
+    rotation_transpose = np.swapaxes(matrices[..., 0:3, 0:3], -1, -2)
+    inverse[..., 0:3, 0:3] = rotation_transpose
+    inverse[..., 0:3, 3] = -np.einsum('...ij,...j->...i', rotation_transpose, matrices[..., 0:3, 3])
+    inverse[..., 3, 3] = 1.0
+    return inverse
@@ -341,3 +341,108 @@ def transform_from_unreal(pose):
 
         return mytf.Transform(location=location, rotation=rotation, w_first=True)
     return pose[0] / 100, -pose[1] / 100, pose[2] / 100
+
+
+def euler2quat_array(angles):
+    """
+    Convert an array of Unreal Euler angles to quaternions.
+    This is the batch equivalent of euler2quat above.
+    :param angles: An Nx3 array of (roll, pitch, yaw) in degrees
+    :return: An Nx4 array of quaternions in unreal space, w first
+    """
+    angles = np.asarray(angles, dtype=np.float64).reshape(-1, 3) * _TORAD / 2
+    sin = np.sin(angles)
+    cos = np.cos(angles)
+    sr, sp, sy = sin[:, 0], sin[:, 1], sin[:, 2]
+    cr, cp, cy = cos[:, 0], cos[:, 1], cos[:, 2]
+    return np.stack((
+        cr * cp * cy + sr * sp * sy,
+        cr * sp * sy - sr * cp * cy,
+        -cr * sp * cy - sr * cp * sy,
+        cr * cp * sy - sr * sp * cy
+    ), axis=1)
+
+
+def quat2euler_array(quaternions):
+    """
+    Convert an array of quaternions in unreal space to Euler angles.
+    This is the batch equivalent of quat2euler above, including the handling of the singularities.
+    :param quaternions: An Nx4 array of quaternions, w first
+    :return: An Nx3 array of (roll, pitch, yaw) in degrees
+    """
+    SINGULARITY_THRESHOLD = 0.4999995
+
+    quaternions = np.asarray(quaternions, dtype=np.float64).reshape(-1, 4)
+    w, x, y, z = quaternions[:, 0], quaternions[:, 1], quaternions[:, 2], quaternions[:, 3]
+
+    singularity_test = z * x - w * y
+    yaw = np.arctan2(2 * (w * z + x * y), 1 - 2 * (y * y + z * z)) * _TODEG
+    pitch = np.arcsin(np.clip(2 * singularity_test, -1, 1)) * _TODEG
+    roll = np.arctan2(-2 * (w * x + y * z), (1 - 2 * (x * x + y * y))) * _TODEG
+
+    # Handle the gimbal lock cases, as in quat2euler.
+    below = singularity_test < -SINGULARITY_THRESHOLD
+    above = singularity_test > SINGULARITY_THRESHOLD
+    pitch[below] = -90
+    pitch[above] = 90
+    roll[below] = np.mod(-yaw[below] - 2 * np.arctan2(x[below], w[below]) * _TODEG, 360)
+    roll[above] = np.mod(yaw[above] - 2 * np.arctan2(x[above], w[above]) * _TODEG, 360)
+    return np.stack((roll, pitch, yaw), axis=1)
+
+
+def transform_to_unreal_array(locations, quaternions):
+    """
+    Swap an entire trajectory from my standard coordinate frame to the one used by unreal.
+    This is the batch equivalent of transform_to_unreal.
+    :param locations: An Nx3 array of locations, in meters
+    :param quaternions: An Nx4 array of orientations, as quaternions w first
+    :return: An Nx3 array of locations in unreal units, and an Nx3 array of unreal (roll, pitch, yaw)
+    """
+    locations = np.asarray(locations, dtype=np.float64).reshape(-1, 3) * (100, -100, 100)
+    quaternions = np.asarray(quaternions, dtype=np.float64).reshape(-1, 4)
+    # Invert Y axis to go to unreal frame, then invert the rotation direction for the left-handed frame.
+    # Together this negates the x and z components, the inverse also needs to be divided by the squared norm
+    quaternions = quaternions * (1, -1, 1, -1) / np.sum(quaternions * quaternions, axis=1, keepdims=True)
+    return locations, quat2euler_array(quaternions)
+
+
+def transform_from_unreal_array(locations, rotations):
+    """
+    Swap an entire trajectory from unreal coordinates to my standard convention.
+    This is the batch equivalent of transform_from_unreal.
+    :param locations: An Nx3 array of locations, in unreal units
+    :param rotations: Either an Nx3 array of unreal (roll, pitch, yaw), or an Nx4 array of unreal quaternions w first
+    :return: An Nx3 array of locations in meters, and an Nx4 array of quaternions w first
+    """
+    locations = np.asarray(locations, dtype=np.float64).reshape(-1, 3) / (100, -100, 100)
+    rotations = np.asarray(rotations, dtype=np.float64)
+    if rotations.shape[-1] == 3:
+        quaternions = euler2quat_array(rotations)
+    else:
+        quaternions = rotations.reshape(-1, 4)
+    # Invert the direction of rotation to go to a right handed frame, and invert the Y axis
+    quaternions = quaternions * (1, -1, 1, -1) / np.sum(quaternions * quaternions, axis=1, keepdims=True)
+    return locations, quaternions
+
+
+def transforms_to_unreal(poses):
+    """
+    Convert a sequence of Transform objects to UnrealTransform objects all at once.
+    :param poses: An iterable of Transform objects
+    :return: A list of UnrealTransform objects, in the same order
+    """
+    locations, rotations = transform_to_unreal_array(*mytf.transforms_to_arrays(poses))
+    return [UnrealTransform(location=tuple(location), rotation=tuple(rotation))
+            for location, rotation in zip(locations, rotations)]
+
+
+def transforms_from_unreal(poses):
+    """
+    Convert a sequence of UnrealTransform objects to Transform objects all at once.
+    :param poses: An iterable of UnrealTransform objects
+    :return: A list of Transform objects, in the same order
+    """
+    poses = list(poses)
+    locations, quaternions = transform_from_unreal_array([pose.location for pose in poses],
+                                                         [pose.euler for pose in poses])
+    return mytf.arrays_to_transforms(locations, quaternions)